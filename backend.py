@@ -23,6 +23,7 @@ from datetime import datetime, timezone
 import csv
 import io
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
@@ -35,8 +36,12 @@ from typing import Dict, Any, List, Literal
 
 from cozepy import Coze, TokenAuth, JWTAuth, JWTOAuthApp
 import httpx
+import redis
+import redis.asyncio as aioredis
 
 MAX_TICKET_EXPORT_ROWS = 10000
+# 会话列表需要内存筛选 / 综合排序时最多读取的会话摘要数
+SESSION_LIST_SCAN_LIMIT = 10000
 
 # 导入 OAuth Token 管理器
 from src.oauth_token_manager import OAuthTokenManager
@@ -48,9 +53,18 @@ from src.session_state import (
     InMemorySessionStore,
     Message,
     MessageRole,
-    EscalationInfo
+    EscalationInfo,
+    UNASSIGNED_AGENT
 )
 from src.redis_session_store import RedisSessionStore  # Redis 存储实现
+from src.async_redis_session_store import AsyncRedisSessionStore  # Redis 存储实现（asyncio 原生）
+from src.async_stores import (
+    AsyncTicketStore,
+    AsyncAgentManager,
+    AsyncQuickReplyStore,
+    AsyncAuditLogStore,
+    AsyncTicketTemplateStore,
+)
 from src.regulator import Regulator, RegulatorConfig
 from src.shift_config import get_shift_config, is_in_shift
 from src.email_service import get_email_service, send_escalation_email
@@ -80,7 +94,12 @@ from src.ticket import (
     TicketCustomerInfo,
     TicketCommentType,
 )
-from src.ticket_store import TicketStore
+from src.ticket_store import TicketConflictError, TicketStore
+from src.payload_codec import codec_from_env, get_codec
+from src.sse_event_bus import LocalEventBus, create_event_bus
+from src.coze_workflow_client import CozeAPIError, CozeWorkflowClient
+from src.bounded_cache import BoundedCache
+from src.password_hashing import AsyncPasswordHasher, PasswordHasherBusy
 from src.audit_log import AuditLogStore
 from src.ticket_assignment import SmartAssignmentEngine
 from src.ticket_template import TicketTemplateStore, TicketTemplate
@@ -137,6 +156,34 @@ HTTP_TIMEOUT = httpx.Timeout(
     pool=10.0
 )
 
+# Coze 工作流对话共享的异步 HTTP 连接池（keep-alive 复用 TLS 连接）
+COZE_HTTP_MAX_CONNECTIONS = int(os.getenv("COZE_HTTP_MAX_CONNECTIONS", "500"))
+COZE_HTTP_MAX_KEEPALIVE = int(os.getenv("COZE_HTTP_MAX_KEEPALIVE", "100"))
+COZE_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("COZE_HTTP_KEEPALIVE_EXPIRY", "30.0"))
+COZE_HTTP2 = os.getenv("COZE_HTTP2", "true").lower() == "true"
+
+
+def create_coze_http_client() -> httpx.AsyncClient:
+    """创建 Coze 对话共享的 httpx.AsyncClient（未安装 h2 时降级为 HTTP/1.1）"""
+    http2 = COZE_HTTP2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            print("⚠️  未安装 h2，Coze HTTP 客户端降级为 HTTP/1.1（pip install h2）")
+            http2 = False
+
+    return httpx.AsyncClient(
+        timeout=HTTP_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=COZE_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=COZE_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=COZE_HTTP_KEEPALIVE_EXPIRY
+        ),
+        http2=http2,
+        trust_env=False  # 不从环境变量读取代理配置，避免 SOCKS 协议不支持的问题
+    )
+
 ATTACHMENTS_DIR = Path(os.getenv("ATTACHMENTS_DIR", "attachments")).resolve()
 ATTACHMENTS_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -399,25 +446,36 @@ class UpdateAgentStatusRequest(BaseModel):
 
 # 全局变量
 coze_client: Optional[Coze] = None
+coze_http_client: Optional[httpx.AsyncClient] = None  # Coze 工作流对话共享连接池
+coze_workflow_client: Optional[CozeWorkflowClient] = None  # Coze 工作流对话客户端
 token_manager: Optional[OAuthTokenManager] = None
 jwt_oauth_app: Optional[JWTOAuthApp] = None  # 用于 Chat SDK 的 JWTOAuthApp
 session_store: Optional[InMemorySessionStore] = None  # 会话状态存储（P0）
 regulator: Optional[Regulator] = None  # 监管策略引擎（P0）
-agent_manager: Optional[AgentManager] = None  # 坐席账号管理器
+agent_manager: Optional[AsyncAgentManager] = None  # 坐席账号管理器（异步版本）
 agent_token_manager: Optional[AgentTokenManager] = None  # 坐席 JWT Token 管理器
-quick_reply_store: Optional['QuickReplyStore'] = None  # 快捷回复存储管理器（模块3）
+quick_reply_store: Optional['AsyncQuickReplyStore'] = None  # 快捷回复存储管理器（模块3）
 variable_replacer: Optional['VariableReplacer'] = None  # 变量替换器（模块3）
-ticket_store: Optional['TicketStore'] = None  # 工单系统存储（L1-2）
+ticket_store: Optional['AsyncTicketStore'] = None  # 工单系统存储（L1-2）
 smart_assignment_engine: Optional['SmartAssignmentEngine'] = None  # 智能分配引擎
 customer_reply_auto_reopen: Optional['CustomerReplyAutoReopen'] = None  # 客户回复自动恢复规则
 WORKFLOW_ID: str = ""
 APP_ID: str = ""  # AI 应用 ID（应用中嵌入对话流时必需）
 AUTH_MODE: str = ""  # 鉴权模式：OAUTH_JWT 或 PAT
+redis_client: Optional[redis.Redis] = None  # 同步 Redis 客户端（工单/坐席/快捷回复等存储共用）
+async_redis_client: Optional[aioredis.Redis] = None  # asyncio Redis 客户端（对话映射写穿透 / OAuth token 共享缓存）
+redis_io_executor: Optional[ThreadPoolExecutor] = None  # 同步存储的 I/O 线程池
+password_hasher: Optional[AsyncPasswordHasher] = None  # bcrypt 独立线程池（登录/改密）
 
 # Conversation 管理 - 存储每个 session_name 对应的 conversation_id
 # 实现原理: 首次不传 conversation_id,Coze 会自动生成并返回
 # 后续对话必须传入相同的 conversation_id 以保持上下文
-conversation_cache: dict = {}  # {session_name: conversation_id}
+# 有界 LRU/TTL 缓存，条目与会话状态同时过期；Redis 可用时写穿透，多 worker 共享且重启不丢失
+conversation_cache = BoundedCache(
+    "conversation",
+    max_entries=int(os.getenv("CONVERSATION_CACHE_SIZE", "10000")),
+    default_ttl=int(os.getenv("REDIS_SESSION_TTL", "86400"))
+)  # {session_name: conversation_id}
 
 
 def _format_timestamp(ts: Optional[float]) -> str:
@@ -491,29 +549,17 @@ def _tickets_to_csv_bytes(tickets: List['Ticket']) -> bytes:
         ])
     return output.getvalue().encode("utf-8-sig")
 
-# P0-5: SSE 消息队列 - 用于人工消息推送
-# 结构: {session_name: asyncio.Queue()}
-sse_queues: dict = {}  # type: dict[str, asyncio.Queue]
-audit_log_store: Optional[AuditLogStore] = None
-ticket_template_store: Optional[TicketTemplateStore] = None
+# P0-5: SSE 事件总线 - 用于人工消息推送
+# 本地订阅队列结构: {session_name / username: asyncio.Queue()}
+# 启动时按 SSE_EVENT_BUS 替换为 Redis 总线，多 worker 部署时事件经 Redis 分发到各 worker
+event_bus: LocalEventBus = LocalEventBus()
+audit_log_store: Optional[AsyncAuditLogStore] = None
+ticket_template_store: Optional[AsyncTicketTemplateStore] = None
 
 
 async def enqueue_sse_message(target: str, payload: dict):
-    """将消息放入指定目标的 SSE 队列中，队列满时丢弃最旧的数据"""
-    global sse_queues
-    if target not in sse_queues:
-        sse_queues[target] = asyncio.Queue()
-        print(f"✅ 创建全局SSE队列: {target}")
-
-    queue = sse_queues[target]
-    try:
-        queue.put_nowait(payload)
-    except asyncio.QueueFull:
-        try:
-            queue.get_nowait()
-        except asyncio.QueueEmpty:
-            pass
-        queue.put_nowait(payload)
+    """将消息发布到指定目标的 SSE 队列中（目标未连接时先缓存），队列满时丢弃最旧的数据"""
+    await event_bus.publish(target, payload, create=True)
 
 
 async def handle_customer_reply_event(session_state: SessionState, source: str):
@@ -537,7 +583,7 @@ async def handle_customer_reply_event(session_state: SessionState, source: str):
         return
 
     for ticket in updated_tickets:
-        log_ticket_event(
+        await log_ticket_event(
             "status_changed",
             ticket.ticket_id,
             operator=None,
@@ -597,7 +643,7 @@ def _attachment_response(ticket_id: str, attachment):
     return data
 
 
-def log_ticket_event(
+async def log_ticket_event(
     event_type: str,
     ticket_id: str,
     operator: Optional[Dict[str, Any]],
@@ -612,7 +658,7 @@ def log_ticket_event(
         operator_id = operator.get("agent_id") or operator.get("username") or "system"
         operator_name = operator.get("username") or operator_id
     try:
-        audit_log_store.add_log(
+        await audit_log_store.add_log(
             ticket_id=ticket_id,
             event_type=event_type,  # type: ignore[arg-type]
             operator_id=operator_id,
@@ -639,22 +685,26 @@ def _agent_stats_key(agent_identifier: str) -> str:
     return f"agent_stats:{agent_identifier}:{date_key}"
 
 
-def _update_agent_stat(agent_identifier: str, field: str, amount: float, *, as_int: bool = False):
+async def _update_agent_stat(agent_identifier: str, field: str, amount: float, *, as_int: bool = False):
     """更新坐席统计字段"""
     if not agent_manager or not hasattr(agent_manager, "redis"):
         return
 
-    redis_client = getattr(agent_manager, "redis", None)
-    if not redis_client:
+    stats_client = getattr(agent_manager, "redis", None)
+    if not stats_client:
         return
 
     key = _agent_stats_key(agent_identifier)
-    try:
+
+    def _write():
         if as_int:
-            redis_client.hincrby(key, field, int(amount))
+            stats_client.hincrby(key, field, int(amount))
         else:
-            redis_client.hincrbyfloat(key, field, float(amount))
-        redis_client.expire(key, AGENT_STATS_TTL)
+            stats_client.hincrbyfloat(key, field, float(amount))
+        stats_client.expire(key, AGENT_STATS_TTL)
+
+    try:
+        await agent_manager.run(_write)
     except Exception as exc:
         print(f"⚠️ 更新坐席统计失败: {exc}")
 
@@ -673,41 +723,41 @@ def _parse_int(value: Optional[str]) -> int:
         return 0
 
 
-def _record_agent_response_time(agent_identifier: str, seconds: float):
+async def _record_agent_response_time(agent_identifier: str, seconds: float):
     """记录坐席响应时间"""
     if seconds is None or seconds < 0:
         return
-    _update_agent_stat(agent_identifier, "total_response_time", seconds)
-    _update_agent_stat(agent_identifier, "response_samples", 1, as_int=True)
+    await _update_agent_stat(agent_identifier, "total_response_time", seconds)
+    await _update_agent_stat(agent_identifier, "response_samples", 1, as_int=True)
 
 
-def _record_agent_session_duration(agent_identifier: str, seconds: float):
+async def _record_agent_session_duration(agent_identifier: str, seconds: float):
     """记录坐席处理时长并增加完成数"""
     if seconds is None or seconds < 0:
         return
-    _update_agent_stat(agent_identifier, "total_duration", seconds)
-    _update_agent_stat(agent_identifier, "duration_samples", 1, as_int=True)
-    _update_agent_stat(agent_identifier, "processed_count", 1, as_int=True)
+    await _update_agent_stat(agent_identifier, "total_duration", seconds)
+    await _update_agent_stat(agent_identifier, "duration_samples", 1, as_int=True)
+    await _update_agent_stat(agent_identifier, "processed_count", 1, as_int=True)
 
 
-def _load_agent_stats(agent_identifier: str) -> Dict[str, Any]:
+async def _load_agent_stats(agent_identifier: str) -> Dict[str, Any]:
     """读取坐席当日统计原始数据"""
     if not agent_manager or not hasattr(agent_manager, "redis"):
         return {}
-    redis_client = getattr(agent_manager, "redis", None)
-    if not redis_client:
+    stats_client = getattr(agent_manager, "redis", None)
+    if not stats_client:
         return {}
     key = _agent_stats_key(agent_identifier)
     try:
-        return redis_client.hgetall(key) or {}
+        return await agent_manager.run(stats_client.hgetall, key) or {}
     except Exception as exc:
         print(f"⚠️ 读取坐席统计失败: {exc}")
         return {}
 
 
-def _compose_today_stats(agent_identifier: str) -> Dict[str, Any]:
+async def _compose_today_stats(agent_identifier: str) -> Dict[str, Any]:
     """组装今日统计指标"""
-    raw = _load_agent_stats(agent_identifier)
+    raw = await _load_agent_stats(agent_identifier)
     total_response = _parse_float(raw.get("total_response_time"))
     response_samples = _parse_int(raw.get("response_samples"))
     total_duration = _parse_float(raw.get("total_duration"))
@@ -729,19 +779,12 @@ def _compose_today_stats(agent_identifier: str) -> Dict[str, Any]:
 
 
 async def _count_agent_live_sessions(agent_identifier: str) -> int:
-    """统计坐席当前处理中的会话数"""
+    """统计坐席当前处理中的会话数（读取会话统计计数器）"""
     if not session_store:
         return 0
     try:
-        live_sessions = await session_store.list_by_status(
-            status=SessionStatus.MANUAL_LIVE,
-            limit=500
-        )
-        return sum(
-            1
-            for session in live_sessions
-            if session.assigned_agent and session.assigned_agent.id == agent_identifier
-        )
+        stats = await session_store.get_stats()
+        return stats.get("live_by_agent", {}).get(agent_identifier, 0)
     except Exception as exc:
         print(f"⚠️ 统计当前会话失败: {exc}")
         return 0
@@ -749,7 +792,7 @@ async def _count_agent_live_sessions(agent_identifier: str) -> int:
 
 async def _build_agent_status_payload(agent_obj: Agent, agent_identifier: str) -> Dict[str, Any]:
     """构建返回给前端的状态信息"""
-    today_stats = _compose_today_stats(agent_identifier)
+    today_stats = await _compose_today_stats(agent_identifier)
     current_sessions = await _count_agent_live_sessions(agent_identifier)
     return {
         "status": agent_obj.status.value if isinstance(agent_obj.status, AgentStatus) else agent_obj.status,
@@ -762,7 +805,7 @@ async def _build_agent_status_payload(agent_obj: Agent, agent_identifier: str) -
     }
 
 
-def _auto_adjust_agent_status(agent_obj: Agent) -> Agent:
+async def _auto_adjust_agent_status(agent_obj: Agent) -> Agent:
     """根据最近活跃时间自动切换状态"""
     if not agent_manager:
         return agent_obj
@@ -779,7 +822,7 @@ def _auto_adjust_agent_status(agent_obj: Agent) -> Agent:
             agent_obj.status_note = "系统检测到超过5分钟无操作，已自动置为忙碌"
         agent_obj.status_updated_at = now
         try:
-            agent_manager.update_agent(agent_obj)
+            await agent_manager.update_agent(agent_obj)
         except Exception as exc:
             print(f"⚠️ 自动更新坐席状态失败: {exc}")
     return agent_obj
@@ -794,6 +837,103 @@ AGENT_OFFLINE_THRESHOLD = int(os.getenv("AGENT_OFFLINE_THRESHOLD", "30"))  # 默
 AGENT_CHECK_INTERVAL = int(os.getenv("AGENT_CHECK_INTERVAL", "10"))  # 默认10秒检查一次
 _agent_heartbeat_task: Optional[asyncio.Task] = None  # 后台任务引用
 
+# 【会话索引维护】配置
+SESSION_INDEX_PRUNE_INTERVAL = int(os.getenv("SESSION_INDEX_PRUNE_INTERVAL", "600"))  # 默认10分钟清理一次
+SESSION_STATS_RECONCILE_INTERVAL = int(os.getenv("SESSION_STATS_RECONCILE_INTERVAL", "3600"))  # 默认1小时对账一次
+_session_index_task: Optional[asyncio.Task] = None  # 后台任务引用
+
+# 【Token 吊销同步】配置
+TOKEN_REVOCATION_SYNC_INTERVAL = int(os.getenv("TOKEN_REVOCATION_SYNC_INTERVAL", "5"))  # 默认5秒同步一次
+_token_revocation_task: Optional[asyncio.Task] = None  # 后台任务引用
+
+
+async def revoke_agent_tokens(username: str):
+    """吊销坐席已签发的 Token（本 worker 立即生效，其他 worker 经吊销同步任务生效）"""
+    if not agent_token_manager:
+        return
+    epoch = agent_token_manager.revoke_agent_tokens(username)
+    if agent_manager:
+        # 以 Redis 中实际写入的纪元为准（其他 worker 可能已吊销过）
+        epoch = await agent_manager.record_token_revocation(username, epoch)
+        agent_token_manager.revoke_agent_tokens(username, epoch)
+
+
+async def sync_agent_token_revocation(username: str):
+    """签发 Token 前同步坐席的吊销纪元，避免本 worker 尚未同步时签发出随即被吊销的 Token"""
+    if agent_manager and agent_token_manager:
+        agent_token_manager.merge_revocations(
+            {username: await agent_manager.get_token_revocation(username)}
+        )
+
+
+async def token_revocation_sync_task():
+    """
+    Token 吊销同步后台任务
+
+    已验证 Token 缓存在各 worker 进程内，登出/改密/删除账号只在处理请求的 worker 上立即生效，
+    其他 worker 定期从 Redis 拉取吊销记录
+    配置：
+    - TOKEN_REVOCATION_SYNC_INTERVAL: 同步间隔（秒），默认5秒
+    """
+    print(f"🔏 Token 吊销同步启动 (间隔: {TOKEN_REVOCATION_SYNC_INTERVAL}秒)")
+
+    while True:
+        try:
+            await asyncio.sleep(TOKEN_REVOCATION_SYNC_INTERVAL)
+
+            if not agent_manager or not agent_token_manager:
+                continue
+
+            # Token 有效期（另加时钟偏差余量）之前的吊销记录已无意义
+            cutoff = agent_token_manager.revocation_cutoff()
+            agent_token_manager.prune_revocations(cutoff)
+            agent_token_manager.merge_revocations(
+                await agent_manager.get_token_revocations(cutoff)
+            )
+
+        except asyncio.CancelledError:
+            print("🔏 Token 吊销同步已停止")
+            break
+        except Exception as e:
+            print(f"❌ Token 吊销同步异常: {e}")
+
+
+async def session_index_maintenance_task():
+    """
+    会话索引维护后台任务
+
+    会话主数据依靠 TTL 自动过期，ZSET 二级索引中的成员和统计计数器需要定期清理，
+    统计计数器另外定期对账
+    配置：
+    - SESSION_INDEX_PRUNE_INTERVAL: 清理间隔（秒），默认600秒
+    - SESSION_STATS_RECONCILE_INTERVAL: 计数器对账间隔（秒），默认3600秒
+    """
+    print(
+        f"🗂️ 会话索引维护启动 (清理间隔: {SESSION_INDEX_PRUNE_INTERVAL}秒, "
+        f"计数器对账间隔: {SESSION_STATS_RECONCILE_INTERVAL}秒)"
+    )
+    last_reconcile_at = time.time()
+
+    while True:
+        try:
+            await asyncio.sleep(SESSION_INDEX_PRUNE_INTERVAL)
+
+            if not hasattr(session_store, "prune_indexes"):
+                continue
+
+            await session_store.prune_indexes()
+
+            if time.time() - last_reconcile_at >= SESSION_STATS_RECONCILE_INTERVAL:
+                await session_store.reconcile_stats()
+                last_reconcile_at = time.time()
+
+        except asyncio.CancelledError:
+            print("🗂️ 会话索引维护已停止")
+            break
+        except Exception as e:
+            print(f"❌ 会话索引维护异常: {e}")
+            await asyncio.sleep(5)  # 出错后短暂等待再重试
+
 
 async def sla_alert_background_task():
     """
@@ -801,7 +941,7 @@ async def sla_alert_background_task():
 
     定期检查所有活跃工单的 SLA 状态，向负责坐席推送预警
     """
-    global ticket_store, agent_manager, sse_queues
+    global ticket_store, agent_manager, event_bus
 
     print(f"🔔 SLA 预警后台任务启动 (间隔: {SLA_CHECK_INTERVAL}秒)")
 
@@ -813,7 +953,7 @@ async def sla_alert_background_task():
                 continue
 
             # 获取所有预警（只关注 warning/urgent/violated）
-            result = ticket_store.detect_sla_alerts(
+            result = await ticket_store.detect_sla_alerts(
                 status_filter=["warning", "urgent", "violated"]
             )
             alerts = result.get("alerts", [])
@@ -831,13 +971,14 @@ async def sla_alert_background_task():
                     alerts_by_agent[agent_id].append(alert)
 
             # 推送给各坐席
+            # 每个 worker 都运行本任务，只投递给本 worker 的订阅者，避免经事件总线重复推送
             for agent_id, agent_alerts in alerts_by_agent.items():
                 # 查找坐席 username（SSE 队列以 username 为 key）
                 if agent_manager:
-                    agent = agent_manager.get_agent_by_id(agent_id)
-                    if agent and agent.username in sse_queues:
+                    agent = await agent_manager.get_agent_by_id(agent_id)
+                    if agent and event_bus.has_subscriber(agent.username):
                         try:
-                            await sse_queues[agent.username].put({
+                            event_bus.deliver(agent.username, {
                                 "type": "sla_alert",
                                 "alerts": agent_alerts,
                                 "count": len(agent_alerts),
@@ -848,10 +989,10 @@ async def sla_alert_background_task():
 
             # 同时广播给所有在线管理员
             if agent_manager:
-                for agent in agent_manager.get_all_agents():
-                    if agent.role == "admin" and agent.username in sse_queues:
+                for agent in await agent_manager.get_all_agents():
+                    if agent.role == "admin" and event_bus.has_subscriber(agent.username):
                         try:
-                            await sse_queues[agent.username].put({
+                            event_bus.deliver(agent.username, {
                                 "type": "sla_alert_summary",
                                 "summary": result.get("summary", {}),
                                 "timestamp": time.time()
@@ -867,11 +1008,45 @@ async def sla_alert_background_task():
             await asyncio.sleep(5)  # 出错后短暂等待再重试
 
 
+async def publish_agent_presence(agent_obj: Agent, reason: str):
+    """
+    通过 SSE 事件总线推送坐席在线状态变化（推送给坐席本人与全部管理员）
+
+    Args:
+        agent_obj: 状态变化后的坐席
+        reason: 变化原因（login / logout / manual / heartbeat_timeout）
+    """
+    if not agent_manager:
+        return
+
+    payload = {
+        "type": "agent_presence",
+        "username": agent_obj.username,
+        "agent_id": agent_obj.id,
+        "status": agent_obj.status.value if isinstance(agent_obj.status, AgentStatus) else agent_obj.status,
+        "status_note": agent_obj.status_note or "",
+        "last_active_at": agent_obj.last_active_at,
+        "reason": reason,
+        "timestamp": time.time()
+    }
+    targets = {agent_obj.username}
+    for agent in await agent_manager.get_all_agents():
+        if agent.role == "admin":
+            targets.add(agent.username)
+    for target in targets:
+        try:
+            await event_bus.publish(target, payload)
+        except Exception as push_err:
+            print(f"⚠️ 坐席状态推送失败 ({target}): {push_err}")
+
+
 async def agent_heartbeat_monitor_task():
     """
     坐席心跳监控后台任务
 
-    定期检查所有坐席的心跳超时情况，自动设置离线
+    定期领取心跳超时的坐席（agent_presence 有序集合中 score 早于阈值的成员），自动设置离线并推送状态变化。
+    领取操作原子地移除成员，多个 worker 同时巡检时每个坐席只处理一次；
+    每次巡检的开销与超时坐席数成正比，与坐席总数无关。
     配置：
     - AGENT_OFFLINE_THRESHOLD: 心跳超时阈值（秒），默认30秒
     - AGENT_CHECK_INTERVAL: 检查间隔（秒），默认10秒
@@ -889,19 +1064,21 @@ async def agent_heartbeat_monitor_task():
 
             current_time = time.time()
 
-            # 遍历所有坐席，检查心跳超时
-            for agent in agent_manager.get_all_agents():
-                # 只检查在线或忙碌状态的坐席
-                if agent.status in {AgentStatus.ONLINE, AgentStatus.BUSY}:
-                    idle_seconds = current_time - agent.last_active_at
-
-                    if idle_seconds > AGENT_OFFLINE_THRESHOLD:
-                        print(f"⚠️ 坐席【{agent.name}】({agent.username}) 心跳超时 ({idle_seconds:.0f}秒)，自动设为离线")
-                        agent_manager.update_status(
-                            agent.username,
-                            AgentStatus.OFFLINE,
-                            f"心跳超时（{int(idle_seconds)}秒无活动）"
-                        )
+            for username, last_heartbeat in await agent_manager.claim_idle_agents(current_time - AGENT_OFFLINE_THRESHOLD):
+                idle_seconds = current_time - last_heartbeat
+                agent = await agent_manager.get_agent_by_username(username)
+                # 领取后坐席可能已手动切换状态或被删除
+                if not agent or agent.status not in {AgentStatus.ONLINE, AgentStatus.BUSY}:
+                    continue
+
+                print(f"⚠️ 坐席【{agent.name}】({agent.username}) 心跳超时 ({idle_seconds:.0f}秒)，自动设为离线")
+                updated_agent = await agent_manager.update_status(
+                    agent.username,
+                    AgentStatus.OFFLINE,
+                    f"心跳超时（{int(idle_seconds)}秒无活动）"
+                )
+                if updated_agent:
+                    await publish_agent_presence(updated_agent, "heartbeat_timeout")
 
         except asyncio.CancelledError:
             print("💓 坐席心跳监控已停止")
@@ -916,7 +1093,7 @@ async def agent_heartbeat_monitor_task():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
-    global coze_client, token_manager, jwt_oauth_app, session_store, regulator, agent_manager, agent_token_manager, quick_reply_store, variable_replacer, ticket_store, smart_assignment_engine, audit_log_store, ticket_template_store, WORKFLOW_ID, APP_ID, AUTH_MODE, _sla_task, _agent_heartbeat_task, customer_reply_auto_reopen
+    global coze_client, token_manager, jwt_oauth_app, session_store, regulator, agent_manager, agent_token_manager, quick_reply_store, variable_replacer, ticket_store, smart_assignment_engine, audit_log_store, ticket_template_store, WORKFLOW_ID, APP_ID, AUTH_MODE, _sla_task, _agent_heartbeat_task, customer_reply_auto_reopen, redis_client, async_redis_client, redis_io_executor, event_bus, coze_http_client, coze_workflow_client, password_hasher
 
     # 读取配置
     WORKFLOW_ID = os.getenv("COZE_WORKFLOW_ID", "")
@@ -943,37 +1120,79 @@ async def lifespan(app: FastAPI):
     try:
         # 读取 Redis 配置
         USE_REDIS = os.getenv("USE_REDIS", "true").lower() == "true"
+        REDIS_ASYNC = os.getenv("REDIS_ASYNC", "true").lower() == "true"  # 使用 redis.asyncio 原生会话存储
         REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
         REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
         REDIS_TIMEOUT = float(os.getenv("REDIS_TIMEOUT", "5.0"))
+        REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "5.0"))  # 连接池用尽时等待空闲连接的秒数
         REDIS_SESSION_TTL = int(os.getenv("REDIS_SESSION_TTL", "86400"))  # 24小时
+        SESSION_CODEC = os.getenv("SESSION_CODEC", "json")  # json / orjson / msgpack / msgpack+zstd
 
         if USE_REDIS:
             try:
-                session_store = RedisSessionStore(
-                    redis_url=REDIS_URL,
-                    max_connections=REDIS_MAX_CONNECTIONS,
-                    socket_timeout=REDIS_TIMEOUT,
-                    socket_connect_timeout=REDIS_TIMEOUT,
-                    default_ttl=REDIS_SESSION_TTL
-                )
-                print(f"✅ 使用 Redis 存储")
+                if REDIS_ASYNC:
+                    session_store = AsyncRedisSessionStore(
+                        redis_url=REDIS_URL,
+                        max_connections=REDIS_MAX_CONNECTIONS,
+                        socket_timeout=REDIS_TIMEOUT,
+                        socket_connect_timeout=REDIS_TIMEOUT,
+                        default_ttl=REDIS_SESSION_TTL,
+                        codec=get_codec(SESSION_CODEC),
+                        pool_timeout=REDIS_POOL_TIMEOUT
+                    )
+                    await session_store.connect()
+                else:
+                    session_store = RedisSessionStore(
+                        redis_url=REDIS_URL,
+                        max_connections=REDIS_MAX_CONNECTIONS,
+                        socket_timeout=REDIS_TIMEOUT,
+                        socket_connect_timeout=REDIS_TIMEOUT,
+                        default_ttl=REDIS_SESSION_TTL,
+                        codec=get_codec(SESSION_CODEC),
+                        pool_timeout=REDIS_POOL_TIMEOUT
+                    )
+                health = await session_store.check_health()
+                print(f"✅ 使用 Redis 存储 ({'asyncio' if REDIS_ASYNC else '同步客户端'})")
                 print(f"   URL: {REDIS_URL}")
-                print(f"   连接池: {REDIS_MAX_CONNECTIONS}")
+                print(f"   连接池: {REDIS_MAX_CONNECTIONS}（等待空闲连接 {REDIS_POOL_TIMEOUT}s）")
                 print(f"   TTL: {REDIS_SESSION_TTL}s ({REDIS_SESSION_TTL/3600}h)")
+                print(f"   编解码器: {session_store.codec.name}")
 
                 # 健康检查
-                health = session_store.check_health()
                 if health.get("status") == "healthy":
                     print(f"   内存: {health['used_memory_mb']}MB / {health['max_memory_mb']}")
                     print(f"   会话数: {health['total_sessions']}")
                 else:
                     print(f"   ⚠️ 健康检查异常: {health.get('error')}")
 
+                # ZSET 二级索引（升级前的会话需要重建一次）
+                rebuilt = await session_store.ensure_indexes()
+                if rebuilt:
+                    print(f"   索引: 已重建 {rebuilt} 个会话")
+                indexed = await session_store.ensure_search_index()
+                if indexed:
+                    print(f"   检索索引: 已重建 {indexed} 个会话")
+
+                # 工单/坐席/快捷回复等同步存储共用的 Redis 客户端
+                if isinstance(session_store, RedisSessionStore):
+                    redis_client = session_store.redis
+                else:
+                    redis_client = redis.Redis(
+                        connection_pool=redis.BlockingConnectionPool.from_url(
+                            REDIS_URL,
+                            max_connections=REDIS_MAX_CONNECTIONS,
+                            timeout=REDIS_POOL_TIMEOUT,
+                            socket_timeout=REDIS_TIMEOUT,
+                            socket_connect_timeout=REDIS_TIMEOUT,
+                            decode_responses=True
+                        )
+                    )
+
             except Exception as redis_error:
                 print(f"❌ Redis 连接失败: {redis_error}")
                 print(f"⚠️  降级到内存存储（生产环境不推荐）")
                 session_store = InMemorySessionStore()
+                redis_client = None
         else:
             session_store = InMemorySessionStore()
             print(f"⚠️ 使用内存存储（开发/测试环境）")
@@ -982,6 +1201,28 @@ async def lifespan(app: FastAPI):
         print(f"❌ SessionState 存储初始化失败: {str(e)}")
         print(f"⚠️  降级到内存存储")
         session_store = InMemorySessionStore()
+        redis_client = None
+
+    # 同步存储的调用统一投递到有界线程池，避免阻塞事件循环
+    # 线程数不应超过同步连接池大小，否则线程会在取连接时报错
+    redis_io_executor = ThreadPoolExecutor(
+        max_workers=max(1, int(os.getenv("REDIS_IO_THREADS", "16"))),
+        thread_name_prefix="redis-io"
+    )
+
+    # bcrypt 独立线程池，登录洪峰不占用 Redis I/O 线程、不阻塞事件循环
+    password_hasher = AsyncPasswordHasher.from_env()
+    print(f"✅ 密码哈希线程池: {password_hasher.max_workers} 线程, 最大排队 {password_hasher.max_pending}")
+
+    # SSE 事件总线（多 worker 部署时通过 Redis Pub/Sub 分发到各 worker 的本地订阅者）
+    SSE_EVENT_BUS = os.getenv("SSE_EVENT_BUS", "redis" if redis_client else "local")
+    try:
+        event_bus = create_event_bus(SSE_EVENT_BUS, os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+        await event_bus.start()
+        print(f"✅ SSE 事件总线: {event_bus.name}")
+    except Exception as e:
+        print(f"⚠️ SSE 事件总线初始化失败，降级为进程内总线（仅支持单 worker）: {str(e)}")
+        event_bus = LocalEventBus()
 
     # 初始化 Regulator 监管引擎（P0）
     try:
@@ -993,9 +1234,40 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"⚠️  Regulator 初始化失败: {str(e)}")
 
+    # Coze 工作流对话共享连接池（/api/chat 与 /api/chat/stream 复用连接，流式读取不阻塞事件循环）
+    coze_http_client = create_coze_http_client()
+    coze_workflow_client = CozeWorkflowClient(coze_http_client, api_base, WORKFLOW_ID, APP_ID)
+    print(f"✅ Coze HTTP 连接池: 最大连接 {COZE_HTTP_MAX_CONNECTIONS}, keep-alive {COZE_HTTP_MAX_KEEPALIVE}, 空闲过期 {COZE_HTTP_KEEPALIVE_EXPIRY}s")
+
+    # asyncio Redis 客户端：只要 Redis 可用就创建（与会话存储使用同步还是 asyncio 客户端无关）
+    if isinstance(session_store, AsyncRedisSessionStore):
+        async_redis_client = session_store.redis
+    elif redis_client:
+        async_redis_client = aioredis.Redis(
+            connection_pool=aioredis.BlockingConnectionPool.from_url(
+                REDIS_URL,
+                max_connections=REDIS_MAX_CONNECTIONS,
+                timeout=REDIS_POOL_TIMEOUT,
+                socket_timeout=REDIS_TIMEOUT,
+                socket_connect_timeout=REDIS_TIMEOUT,
+                decode_responses=True
+            )
+        )
+
+    # session_name → conversation_id 映射写穿透到 Redis（重启后保留对话上下文）
+    if async_redis_client:
+        conversation_cache.attach_redis(async_redis_client, key_prefix="conversation_map:")
+    else:
+        print("⚠️ Redis 不可用，对话映射仅保存在进程内（重启后丢失）")
+
     # OAuth+JWT 鉴权
     try:
         token_manager = OAuthTokenManager.from_env()
+        # 异步路径：共享连接池 + Redis 共享 token 缓存（多 worker 共用）
+        token_manager.attach_async(
+            http_client=coze_http_client,
+            redis_client=async_redis_client
+        )
         # 获取初始 token
         access_token = token_manager.get_access_token()
 
@@ -1042,17 +1314,24 @@ async def lifespan(app: FastAPI):
             secret_key=JWT_SECRET,
             algorithm="HS256",
             access_token_expire_minutes=int(os.getenv("AGENT_TOKEN_EXPIRE_MINUTES", "60")),
-            refresh_token_expire_days=int(os.getenv("AGENT_REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+            refresh_token_expire_days=int(os.getenv("AGENT_REFRESH_TOKEN_EXPIRE_DAYS", "7")),
+            verified_cache_size=int(os.getenv("AGENT_TOKEN_CACHE_SIZE", "10000"))
         )
 
         # 初始化坐席账号管理器
-        agent_manager = AgentManager(session_store)
+        if not redis_client:
+            raise RuntimeError("坐席账号依赖 Redis 存储")
+        sync_agent_manager = AgentManager(
+            redis_client=redis_client,
+            snapshot_ttl=float(os.getenv("AGENT_SNAPSHOT_TTL", "1.0"))
+        )
 
         # 初始化超级管理员账号（系统根账号）
         print(f"🔐 初始化坐席认证系统...")
         admin_username = os.getenv("SUPER_ADMIN_USERNAME", "admin")
         admin_password = os.getenv("SUPER_ADMIN_PASSWORD", "admin123")
-        initialize_super_admin(agent_manager, admin_username, admin_password)
+        initialize_super_admin(sync_agent_manager, admin_username, admin_password)
+        agent_manager = AsyncAgentManager(sync_agent_manager, redis_io_executor)
 
         print(f"✅ 坐席认证系统初始化成功")
         print(f"   Token过期时间: 60分钟")
@@ -1066,9 +1345,8 @@ async def lifespan(app: FastAPI):
 
     # 【模块3】初始化快捷回复系统
     try:
-        # 使用session_store中的redis_client
-        if USE_REDIS and hasattr(session_store, 'redis'):
-            quick_reply_store = QuickReplyStore(session_store.redis)
+        if redis_client:
+            quick_reply_store = AsyncQuickReplyStore(QuickReplyStore(redis_client), redis_io_executor)
             variable_replacer = VariableReplacer()
             print(f"✅ 快捷回复系统初始化成功")
             print(f"   存储: Redis")
@@ -1084,50 +1362,59 @@ async def lifespan(app: FastAPI):
 
     # 【L1-2】初始化工单系统（MVP）
     try:
-        if USE_REDIS and hasattr(session_store, 'redis'):
-            ticket_store = TicketStore(session_store.redis)
+        if redis_client:
+            ticket_store = AsyncTicketStore(
+                TicketStore(redis_client, codec=codec_from_env("TICKET_CODEC")),
+                redis_io_executor
+            )
             print("✅ 工单系统初始化成功 (Redis)")
+            # 工单二级索引（升级前的工单需要重建一次）
+            rebuilt = await ticket_store.ensure_indexes()
+            if rebuilt:
+                print(f"   索引: 已重建 {rebuilt} 个工单")
         else:
-            ticket_store = TicketStore()
+            ticket_store = AsyncTicketStore(TicketStore(), redis_io_executor)
             print("⚠️  工单系统使用内存存储，仅适用于开发环境")
     except Exception as e:
-        ticket_store = TicketStore()
+        ticket_store = AsyncTicketStore(TicketStore(), redis_io_executor)
         print(f"⚠️  工单系统初始化失败，回退到内存存储: {str(e)}")
     finally:
         if ticket_store:
+            # 自动恢复规则使用同步接口
+            sync_agent_manager = agent_manager.store if agent_manager else None
             if customer_reply_auto_reopen:
                 customer_reply_auto_reopen.update_dependencies(
-                    ticket_store=ticket_store,
-                    agent_manager=agent_manager
+                    ticket_store=ticket_store.store,
+                    agent_manager=sync_agent_manager
                 )
             else:
                 customer_reply_auto_reopen = CustomerReplyAutoReopen(
-                    ticket_store,
-                    agent_manager=agent_manager
+                    ticket_store.store,
+                    agent_manager=sync_agent_manager
                 )
 
     # 初始化协作日志存储
     try:
-        if USE_REDIS and hasattr(session_store, 'redis'):
-            audit_log_store = AuditLogStore(session_store.redis)
+        if redis_client:
+            audit_log_store = AsyncAuditLogStore(AuditLogStore(redis_client), redis_io_executor)
             print("✅ 协作日志存储初始化成功 (Redis)")
         else:
-            audit_log_store = AuditLogStore()
+            audit_log_store = AsyncAuditLogStore(AuditLogStore(), redis_io_executor)
             print("⚠️ 协作日志使用内存存储，仅用于开发/测试")
     except Exception as e:
-        audit_log_store = AuditLogStore()
+        audit_log_store = AsyncAuditLogStore(AuditLogStore(), redis_io_executor)
         print(f"⚠️ 协作日志初始化失败，使用内存存储: {str(e)}")
 
     # 初始化工单模板存储
     try:
-        if USE_REDIS and hasattr(session_store, 'redis'):
-            ticket_template_store = TicketTemplateStore(session_store.redis)
+        if redis_client:
+            ticket_template_store = AsyncTicketTemplateStore(TicketTemplateStore(redis_client), redis_io_executor)
             print("✅ 工单模板存储初始化成功 (Redis)")
         else:
-            ticket_template_store = TicketTemplateStore()
+            ticket_template_store = AsyncTicketTemplateStore(TicketTemplateStore(), redis_io_executor)
             print("⚠️ 工单模板使用内存存储，仅用于开发/测试")
     except Exception as e:
-        ticket_template_store = TicketTemplateStore()
+        ticket_template_store = AsyncTicketTemplateStore(TicketTemplateStore(), redis_io_executor)
         print(f"⚠️ 工单模板初始化失败，使用内存存储: {str(e)}")
 
     # 智能分配引擎
@@ -1148,12 +1435,18 @@ async def lifespan(app: FastAPI):
     print(f"{'=' * 60}\n")
 
     # 【增量3-4】启动 SLA 预警后台任务
-    global _sla_task, _agent_heartbeat_task
+    global _sla_task, _agent_heartbeat_task, _session_index_task, _token_revocation_task
     _sla_task = asyncio.create_task(sla_alert_background_task())
 
     # 【心跳超时自动离线】启动坐席心跳监控任务
     _agent_heartbeat_task = asyncio.create_task(agent_heartbeat_monitor_task())
 
+    # 【会话索引维护】启动过期索引清理任务
+    _session_index_task = asyncio.create_task(session_index_maintenance_task())
+
+    # 【Token 吊销同步】启动吊销记录同步任务
+    _token_revocation_task = asyncio.create_task(token_revocation_sync_task())
+
     yield
 
     # 关闭时清理
@@ -1171,6 +1464,40 @@ async def lifespan(app: FastAPI):
         except asyncio.CancelledError:
             pass
 
+    if _session_index_task:
+        _session_index_task.cancel()
+        try:
+            await _session_index_task
+        except asyncio.CancelledError:
+            pass
+
+    if _token_revocation_task:
+        _token_revocation_task.cancel()
+        try:
+            await _token_revocation_task
+        except asyncio.CancelledError:
+            pass
+
+    if event_bus:
+        await event_bus.close()
+
+    if coze_http_client:
+        await coze_http_client.aclose()
+
+    if isinstance(session_store, AsyncRedisSessionStore):
+        await session_store.close()
+    elif async_redis_client:
+        await async_redis_client.aclose()
+
+    if redis_client:
+        redis_client.close()
+
+    if redis_io_executor:
+        redis_io_executor.shutdown(wait=False)
+
+    if password_hasher:
+        password_hasher.shutdown()
+
     print("👋 关闭 Coze 客户端")
 
 
@@ -1378,7 +1705,7 @@ async def create_conversation(request: NewConversationRequest):
         session_id = request.user_id
 
         # 获取带 session_name 的 token
-        access_token = token_manager.get_access_token(session_name=session_id)
+        access_token = await token_manager.get_access_token_async(session_name=session_id)
 
         # 刷新 coze_client (确保使用正确的 token，禁用环境代理)
         api_base = os.getenv("COZE_API_BASE", "https://api.coze.com")
@@ -1451,7 +1778,7 @@ async def create_new_conversation(request: dict):
         conversation = temp_coze.conversations.create()
 
         # 更新缓存：保存新的 conversation_id
-        conversation_cache[session_id] = conversation.id
+        await conversation_cache.aset(session_id, conversation.id)
 
         print(f"✅ 新对话已创建: {conversation.id} (session: {session_id})")
 
@@ -1490,7 +1817,7 @@ async def clear_conversation_history(request: dict):
 
     try:
         # 记录旧的 conversation_id（用于日志）
-        old_conversation_id = conversation_cache.get(session_id, "无")
+        old_conversation_id = await conversation_cache.aget(session_id, "无")
 
         # 使用 JWTOAuthApp 生成带 session_name 的 token
         token_response = jwt_oauth_app.get_access_token(
@@ -1514,7 +1841,7 @@ async def clear_conversation_history(request: dict):
         new_conversation = temp_coze.conversations.create()
 
         # 更新缓存：用新 conversation_id 替换旧的
-        conversation_cache[session_id] = new_conversation.id
+        await conversation_cache.aset(session_id, new_conversation.id)
 
         print(f"✅ 历史会话已清除")
         print(f"   Session: {session_id}")
@@ -1553,6 +1880,8 @@ async def health_check():
     if token_manager:
         health_info["token_info"] = token_manager.get_token_info()
 
+    health_info["conversation_cache"] = conversation_cache.stats()
+
     return health_info
 
 
@@ -1669,7 +1998,7 @@ async def chat(request: ChatRequest) -> ChatResponse:
         if session_store and regulator:
             try:
                 # 获取或创建会话状态
-                conversation_id_for_state = request.conversation_id or conversation_cache.get(session_id)
+                conversation_id_for_state = request.conversation_id or await conversation_cache.aget(session_id)
                 session_state = await session_store.get_or_create(
                     session_name=session_id,
                     conversation_id=conversation_id_for_state
@@ -1691,7 +2020,7 @@ async def chat(request: ChatRequest) -> ChatResponse:
                 print(f"⚠️  状态检查异常（不影响对话）: {str(state_error)}")
 
         # 【会话隔离核心1】将 session_id 作为 session_name 传入 JWT
-        access_token = token_manager.get_access_token(session_name=session_id)
+        access_token = await token_manager.get_access_token_async(session_name=session_id)
         print(f"🔐 会话隔离: session_name={session_id}")
 
         # 【会话隔离核心2】管理 conversation_id
@@ -1700,105 +2029,43 @@ async def chat(request: ChatRequest) -> ChatResponse:
 
         if not conversation_id:
             # 检查缓存
-            conversation_id = conversation_cache.get(session_id)
+            conversation_id = await conversation_cache.aget(session_id)
 
             if conversation_id:
                 print(f"♻️  使用缓存的 Conversation: {conversation_id}")
             else:
                 print(f"🆕 首次对话,将自动生成 conversation_id")
 
-        # 准备参数（Workflow Chat API 格式）
-        api_base = os.getenv("COZE_API_BASE", "https://api.coze.com")
-        url = f"{api_base}/v1/workflows/chat"
-
-        # 构建请求体 - 添加 session_name 字段实现会话隔离
-        payload = {
-            "workflow_id": WORKFLOW_ID,
-            "app_id": APP_ID,
-            "session_name": session_id,  # 【关键1】session_name
-            "parameters": {
-                "USER_INPUT": request.message,
-            },
-            "additional_messages": [
-                {
-                    "content": request.message,
-                    "content_type": "text",
-                    "role": "user",
-                    "type": "question"
-                }
-            ]
-        }
-
-        # 【关键2】如果有 conversation_id,添加到 payload
+        # 【关键2】如果有 conversation_id，随请求传入以保持上下文
         if conversation_id:
-            payload["conversation_id"] = conversation_id
             print(f"💬 使用 Conversation: {conversation_id}")
 
-        # 如果有额外参数，合并到 parameters
-        if request.parameters:
-            payload["parameters"].update(request.parameters)
-
-        # 【调试】打印完整请求
         print(f"📤 发送请求到 Coze:")
-        print(f"   URL: {url}")
+        print(f"   URL: {coze_workflow_client.url}")
         print(f"   Session: {session_id}")
-        print(f"   Payload session_name: {payload.get('session_name')}")
-        print(f"   完整 Payload: {json.dumps(payload, ensure_ascii=False, indent=2)}")
-
-        # 发送请求（使用流式接收）
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json"
-        }
-
-        http_client = httpx.Client(timeout=HTTP_TIMEOUT, trust_env=False)
-
-        with http_client.stream('POST', url, json=payload, headers=headers) as response:
-            if response.status_code != 200:
-                error_text = response.text
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Coze API 错误: {error_text}"
-                )
-
-            # 收集所有消息内容和 conversation_id
-            response_messages = []
-            returned_conversation_id = None
-            event_type = None
 
-            for line in response.iter_lines():
-                if not line:
-                    continue
-
-                line = line.strip()
-                if line.startswith('event:'):
-                    event_type = line[6:].strip()
-                elif line.startswith('data:'):
-                    try:
-                        data_str = line[5:].strip()
-                        data = json.loads(data_str)
-
-                        # 提取 conversation_id (如果存在)
-                        if 'conversation_id' in data and not returned_conversation_id:
-                            returned_conversation_id = data['conversation_id']
-
-                        # 处理消息增量事件
-                        if event_type == 'conversation.message.delta':
-                            if 'content' in data and data.get('role') == 'assistant':
-                                content = data['content']
-                                if content:
-                                    response_messages.append(content)
+        try:
+            result = await coze_workflow_client.chat(
+                access_token,
+                request.message,
+                session_name=session_id,
+                conversation_id=conversation_id,
+                parameters=request.parameters
+            )
+        except CozeAPIError as api_error:
+            raise HTTPException(status_code=api_error.status_code, detail=str(api_error))
 
-                    except json.JSONDecodeError:
-                        pass
+        returned_conversation_id = result.conversation_id
+        if result.error:
+            print(f"⚠️  Coze 对话失败: {result.error}")
+        print(f"⏱️  Coze 调用: {result.stats.summary()}")
 
         # 【关键3】如果是首次对话,保存自动生成的 conversation_id
         if not conversation_id and returned_conversation_id:
-            conversation_cache[session_id] = returned_conversation_id
+            await conversation_cache.aset(session_id, returned_conversation_id)
             print(f"✅ 保存新 conversation: {returned_conversation_id} (session: {session_id})")
 
-        # 合并所有消息
-        final_message = "".join(response_messages) if response_messages else ""
+        final_message = result.content
 
         # 【P0-3 后置处理】更新会话状态和触发监管检查
         if session_store and regulator and final_message:
@@ -1883,7 +2150,7 @@ async def chat(request: ChatRequest) -> ChatResponse:
                 try:
                     print("🔄 检测到认证错误，清除token缓存...")
                     session_id = request.user_id or generate_user_id()
-                    token_manager.invalidate_token(session_name=session_id)
+                    await token_manager.invalidate_token_async(session_name=session_id)
                     # 递归重试一次
                     return await chat(request)
                 except Exception as retry_error:
@@ -1914,21 +2181,20 @@ async def chat_stream(request: ChatRequest):
 
     async def event_generator():
         """SSE 事件生成器"""
+        connected_target = None
         try:
             # 获取会话标识（session_id），如果没有则生成
             session_id = request.user_id or generate_user_id()
 
-            # 【P0-5】创建 SSE 消息队列（如果不存在）
-            global sse_queues
-            if session_id not in sse_queues:
-                sse_queues[session_id] = asyncio.Queue()
-                print(f"✅ SSE 队列已创建: {session_id}")
+            # 【P0-5】创建 SSE 消息队列（如果不存在），并取出连接前缓存的消息
+            session_queue = await event_bus.connect(session_id)
+            connected_target = session_id
 
             # 【P0-3 前置处理】检查会话状态 - 如果正在人工接管，拒绝AI对话
             if session_store and regulator:
                 try:
                     # 获取或创建会话状态
-                    conversation_id_for_state = request.conversation_id or conversation_cache.get(session_id)
+                    conversation_id_for_state = request.conversation_id or await conversation_cache.aget(session_id)
                     session_state = await session_store.get_or_create(
                         session_name=session_id,
                         conversation_id=conversation_id_for_state
@@ -1950,7 +2216,7 @@ async def chat_stream(request: ChatRequest):
                     print(f"⚠️  流式状态检查异常（不影响对话）: {str(state_error)}")
 
             # 【会话隔离核心1】将 session_id 作为 session_name 传入 JWT
-            access_token = token_manager.get_access_token(session_name=session_id)
+            access_token = await token_manager.get_access_token_async(session_name=session_id)
             print(f"🔐 流式会话隔离: session_name={session_id}")
 
             # 【会话隔离核心2】管理 conversation_id
@@ -1958,123 +2224,71 @@ async def chat_stream(request: ChatRequest):
 
             if not conversation_id:
                 # 检查缓存
-                conversation_id = conversation_cache.get(session_id)
+                conversation_id = await conversation_cache.aget(session_id)
 
                 if conversation_id:
                     print(f"♻️  流式接口使用缓存的 Conversation: {conversation_id}")
                 else:
                     print(f"🆕 流式接口首次对话,将自动生成 conversation_id")
 
-            # 准备参数（Workflow Chat API 格式）
-            api_base = os.getenv("COZE_API_BASE", "https://api.coze.com")
-            url = f"{api_base}/v1/workflows/chat"
-
-            # 构建请求体
-            payload = {
-                "workflow_id": WORKFLOW_ID,
-                "app_id": APP_ID,
-                "session_name": session_id,  # 【关键1】session_name
-                "parameters": {
-                    "USER_INPUT": request.message,
-                },
-                "additional_messages": [
-                    {
-                        "content": request.message,
-                        "content_type": "text",
-                        "role": "user",
-                        "type": "question"
-                    }
-                ]
-            }
-
-            # 【关键2】如果有 conversation_id,添加到 payload
+            # 【关键2】如果有 conversation_id，随请求传入以保持上下文
             if conversation_id:
-                payload["conversation_id"] = conversation_id
                 print(f"💬 流式接口使用 Conversation: {conversation_id}")
 
-            # 如果有额外参数，合并到 parameters
-            if request.parameters:
-                payload["parameters"].update(request.parameters)
-
             print(f"📤 流式请求 - Session: {session_id}")
 
-            # 发送请求（使用流式接收）
-            headers = {
-                "Authorization": f"Bearer {access_token}",
-                "Content-Type": "application/json"
-            }
-
-            http_client = httpx.Client(timeout=HTTP_TIMEOUT, trust_env=False)
+            full_ai_response = []  # 【P0-3】收集完整AI响应用于监管检查
 
-            with http_client.stream('POST', url, json=payload, headers=headers) as response:
-                if response.status_code != 200:
-                    error_text = response.text
-                    error_data = {
-                        "type": "error",
-                        "content": f"Coze API 错误: {error_text}"
-                    }
-                    yield f"data: {json.dumps(error_data, ensure_ascii=False)}\n\n"
-                    return
-
-                # 处理 SSE 流
-                event_type = None
-                returned_conversation_id = None
-                full_ai_response = []  # 【P0-3】收集完整AI响应用于监管检查
-
-                for line in response.iter_lines():
-                    # 【P0-5】检查队列中的人工消息，优先推送
-                    try:
-                        while not sse_queues[session_id].empty():
-                            queued_msg = await sse_queues[session_id].get()
-                            yield f"data: {json.dumps(queued_msg, ensure_ascii=False)}\n\n"
-                            print(f"✅ SSE 推送队列消息: {queued_msg.get('type')}")
-                    except Exception as queue_error:
-                        print(f"⚠️  SSE 队列检查异常: {str(queue_error)}")
-
-                    if not line:
-                        continue
-
-                    line = line.strip()
-                    if line.startswith('event:'):
-                        event_type = line[6:].strip()
-                    elif line.startswith('data:'):
+            try:
+                async with coze_workflow_client.stream_chat(
+                    access_token,
+                    request.message,
+                    session_name=session_id,
+                    conversation_id=conversation_id,
+                    parameters=request.parameters
+                ) as coze_stream:
+                    async for event in coze_stream:
+                        # 【P0-5】检查队列中的人工消息，优先推送
                         try:
-                            data_str = line[5:].strip()
-                            data = json.loads(data_str)
-
-                            # 提取 conversation_id (如果存在)
-                            if 'conversation_id' in data and not returned_conversation_id:
-                                returned_conversation_id = data['conversation_id']
-
-                            # 处理消息增量事件 - 实时推送
-                            if event_type == 'conversation.message.delta':
-                                if 'content' in data and data.get('role') == 'assistant':
-                                    content = data['content']
-                                    if content:
-                                        full_ai_response.append(content)  # 【P0-3】收集内容
-                                        sse_data = {
-                                            "type": "message",
-                                            "content": content
-                                        }
-                                        yield f"data: {json.dumps(sse_data, ensure_ascii=False)}\n\n"
-
-                            # 处理错误事件
-                            elif event_type == 'conversation.chat.failed':
-                                error_content = data.get('last_error', {}).get('msg', '未知错误')
-                                error_data = {
-                                    "type": "error",
-                                    "content": error_content
-                                }
-                                yield f"data: {json.dumps(error_data, ensure_ascii=False)}\n\n"
-                                return
-
-                        except json.JSONDecodeError:
-                            # 跳过非 JSON 数据
-                            pass
+                            while not session_queue.empty():
+                                queued_msg = session_queue.get_nowait()
+                                yield f"data: {json.dumps(queued_msg, ensure_ascii=False)}\n\n"
+                                print(f"✅ SSE 推送队列消息: {queued_msg.get('type')}")
+                        except Exception as queue_error:
+                            print(f"⚠️  SSE 队列检查异常: {str(queue_error)}")
+
+                        # 处理消息增量事件 - 实时推送
+                        content = event.content
+                        if content:
+                            full_ai_response.append(content)  # 【P0-3】收集内容
+                            sse_data = {
+                                "type": "message",
+                                "content": content
+                            }
+                            yield f"data: {json.dumps(sse_data, ensure_ascii=False)}\n\n"
+
+                        # 处理错误事件
+                        elif event.is_failed:
+                            error_data = {
+                                "type": "error",
+                                "content": event.error_message
+                            }
+                            yield f"data: {json.dumps(error_data, ensure_ascii=False)}\n\n"
+                            return
+            except CozeAPIError as api_error:
+                error_data = {
+                    "type": "error",
+                    "content": str(api_error)
+                }
+                yield f"data: {json.dumps(error_data, ensure_ascii=False)}\n\n"
+                return
+
+            returned_conversation_id = coze_stream.conversation_id
+            print(f"⏱️  Coze 流式调用: {coze_stream.stats.summary()}")
 
             # 【关键3】如果是首次对话,保存自动生成的 conversation_id
             if not conversation_id and returned_conversation_id:
-                conversation_cache[session_id] = returned_conversation_id
+                await conversation_cache.aset(session_id, returned_conversation_id)
                 print(f"✅ 流式接口保存新 conversation: {returned_conversation_id} (session: {session_id})")
 
             # 【P0-3 后置处理】更新会话状态和触发监管检查
@@ -2157,6 +2371,10 @@ async def chat_stream(request: ChatRequest):
                 "content": f"服务器错误: {error_msg}"
             }
             yield f"data: {json.dumps(error_data, ensure_ascii=False)}\n\n"
+        finally:
+            # 流结束后释放本 worker 的队列，避免残留队列缓存事件或被后续连接重放
+            if connected_target:
+                event_bus.disconnect(connected_target)
 
     return StreamingResponse(
         event_generator(),
@@ -2179,13 +2397,8 @@ async def agent_events(agent: dict = Depends(require_agent)):
     if not username:
         raise HTTPException(status_code=400, detail="INVALID_AGENT")
 
-    global sse_queues
-    if username not in sse_queues:
-        sse_queues[username] = asyncio.Queue()
-        print(f"✅ 创建坐席事件SSE队列: {username}")
-
     async def event_generator():
-        queue = sse_queues[username]
+        queue = await event_bus.connect(username)
         try:
             while True:
                 payload = await queue.get()
@@ -2195,6 +2408,8 @@ async def agent_events(agent: dict = Depends(require_agent)):
             raise
         except Exception as exc:
             print(f"❌ 坐席事件 SSE 异常: {str(exc)}")
+        finally:
+            event_bus.disconnect(username)
 
     return StreamingResponse(
         event_generator(),
@@ -2280,7 +2495,7 @@ async def manual_escalate(request: dict):
         # 获取或创建会话状态
         session_state = await session_store.get_or_create(
             session_name=session_name,
-            conversation_id=conversation_cache.get(session_name)
+            conversation_id=await conversation_cache.aget(session_name)
         )
 
         # 检查是否已在人工接管中
@@ -2364,14 +2579,13 @@ async def manual_escalate(request: dict):
         }, ensure_ascii=False))
 
         # P0-5: 推送状态变化事件到 SSE
-        if session_name in sse_queues:
-            await sse_queues[session_name].put({
-                "type": "status_change",
-                "status": session_state.status,
-                "reason": reason,
-                "timestamp": int(time.time())
-            })
-            print(f"✅ SSE 推送状态变化: {session_state.status}")
+        await event_bus.publish(session_name, {
+            "type": "status_change",
+            "status": session_state.status,
+            "reason": reason,
+            "timestamp": int(time.time())
+        })
+        print(f"✅ SSE 推送状态变化: {session_state.status}")
 
         return {
             "success": True,
@@ -2503,8 +2717,12 @@ async def _calculate_agent_efficiency_metrics() -> dict:
 
     try:
         # 获取所有人工服务中和已完成的会话
-        live_sessions = await session_store.list_by_status(SessionStatus.MANUAL_LIVE, limit=1000)
-        closed_sessions = await session_store.list_by_status(SessionStatus.CLOSED, limit=1000)
+        live_sessions = await session_store.list_by_status(
+            SessionStatus.MANUAL_LIVE, limit=1000, include_history=False
+        )
+        closed_sessions = await session_store.list_by_status(
+            SessionStatus.CLOSED, limit=1000, include_history=False
+        )
 
         all_manual_sessions = live_sessions + [
             s for s in closed_sessions
@@ -2598,19 +2816,26 @@ async def get_sessions_stats():
     try:
         stats = await session_store.get_stats()
 
-        # 计算平均等待时间
-        pending_sessions = await session_store.list_by_status(
+        # 等待中 / 服务中会话摘要各批量加载一次，以下统计复用同一份数据
+        all_pending, _ = await session_store.query_summaries(
             status=SessionStatus.PENDING_MANUAL,
-            limit=100
+            limit=1000
         )
+        all_live, _ = await session_store.query_summaries(
+            status=SessionStatus.MANUAL_LIVE,
+            limit=1000
+        )
+
+        # 计算平均等待时间（最近更新的 100 个会话）
+        pending_sessions = all_pending[:100]
 
         current_time = time.time()
 
         if pending_sessions:
             waiting_times = [
-                current_time - session.escalation.trigger_at
+                current_time - session.escalation_trigger_at
                 for session in pending_sessions
-                if session.escalation
+                if session.escalation_trigger_at is not None
             ]
             avg_waiting_time = sum(waiting_times) / len(waiting_times) if waiting_times else 0
             max_waiting_time = max(waiting_times) if waiting_times else 0
@@ -2622,14 +2847,15 @@ async def get_sessions_stats():
         stats["max_waiting_time"] = round(max_waiting_time, 2)
 
         # 获取正在服务中的会话，计算服务时长
-        live_sessions = await session_store.list_by_status(
-            status=SessionStatus.MANUAL_LIVE,
-            limit=100
-        )
+        live_sessions = all_live[:100]
 
         if live_sessions:
             service_times = [
-                current_time - (session.escalation.trigger_at if session.escalation else session.updated_at)
+                current_time - (
+                    session.escalation_trigger_at
+                    if session.escalation_trigger_at is not None
+                    else session.updated_at
+                )
                 for session in live_sessions
             ]
             avg_service_time = sum(service_times) / len(service_times) if service_times else 0
@@ -2637,35 +2863,23 @@ async def get_sessions_stats():
             avg_service_time = 0
 
         stats["avg_service_time"] = round(avg_service_time, 2)
-        stats["active_agents"] = len(set(
-            session.assigned_agent.id
-            for session in live_sessions
-            if session.assigned_agent
-        ))
+        stats["active_agents"] = len(stats.get("live_by_agent", {}))
 
         # 按升级原因统计
-        all_pending = await session_store.list_by_status(
-            status=SessionStatus.PENDING_MANUAL,
-            limit=1000
-        )
-        all_live = await session_store.list_by_status(
-            status=SessionStatus.MANUAL_LIVE,
-            limit=1000
-        )
-
         escalation_reasons = {}
         for session in (all_pending + all_live):
-            if session.escalation:
-                reason = session.escalation.reason
+            if session.escalation_reason:
+                reason = session.escalation_reason
                 escalation_reasons[reason] = escalation_reasons.get(reason, 0) + 1
 
         stats["by_escalation_reason"] = escalation_reasons
 
         # 今日统计（简化版，实际应该从持久化存储获取）
         today_stats = {
-            "total_escalations": len(all_pending) + len(all_live),
-            "pending": len(all_pending),
-            "serving": len(all_live)
+            "total_escalations": stats["by_status"].get(SessionStatus.PENDING_MANUAL.value, 0)
+            + stats["by_status"].get(SessionStatus.MANUAL_LIVE.value, 0),
+            "pending": stats["by_status"].get(SessionStatus.PENDING_MANUAL.value, 0),
+            "serving": stats["by_status"].get(SessionStatus.MANUAL_LIVE.value, 0)
         }
         stats["today"] = today_stats
 
@@ -2710,7 +2924,8 @@ async def get_sessions_queue():
 
     try:
         # 获取所有等待接入的会话
-        pending_sessions = await session_store.list_by_status(
+        # 只读取会话摘要投影（session_summary），不反序列化完整会话
+        pending_sessions, _ = await session_store.query_summaries(
             status=SessionStatus.PENDING_MANUAL,
             limit=100  # 限制最多100个排队会话
         )
@@ -2727,13 +2942,10 @@ async def get_sessions_queue():
                 }
             }
 
-        # 紧急关键词列表（配置化）
-        urgent_keywords = ["投诉", "退款", "质量问题", "差评", "赔偿"]
-
         # 更新每个会话的优先级信息
         current_time = time.time()
         for session in pending_sessions:
-            session.update_priority(urgent_keywords=urgent_keywords)
+            session.refresh_priority()
 
         # 按优先级排序
         # 规则:
@@ -2745,13 +2957,13 @@ async def get_sessions_queue():
                 "urgent": 3,
                 "high": 2,
                 "normal": 1
-            }.get(s.priority.level, 1)
+            }.get(s.priority_level, 1)
 
             # VIP客户排第一（vip_priority=1），非VIP=0
-            vip_priority = 1 if s.priority.is_vip else 0
+            vip_priority = 1 if s.priority_is_vip else 0
 
             # 返回: (VIP优先倒序, 优先级权重倒序, 等待时长倒序)
-            return (-vip_priority, -priority_weight, -s.priority.wait_time_seconds)
+            return (-vip_priority, -priority_weight, -s.wait_time_seconds)
 
         sorted_sessions = sorted(pending_sessions, key=priority_sort_key)
 
@@ -2761,30 +2973,30 @@ async def get_sessions_queue():
         total_wait_time = 0
 
         for position, session in enumerate(sorted_sessions, start=1):
-            is_vip = session.user_profile.vip if session.user_profile else False
+            is_vip = session.vip
             if is_vip:
                 vip_count += 1
 
-            wait_time = session.priority.wait_time_seconds
+            wait_time = session.wait_time_seconds
             total_wait_time += wait_time
 
             queue_data.append({
                 "session_name": session.session_name,
                 "position": position,
-                "priority_level": session.priority.level,
+                "priority_level": session.priority_level,
                 "is_vip": is_vip,
                 "wait_time_seconds": round(wait_time, 1),
-                "is_timeout": session.priority.is_timeout,
-                "urgent_keywords": session.priority.urgent_keywords,
+                "is_timeout": session.is_timeout,
+                "urgent_keywords": session.urgent_keywords,
                 "user_profile": {
-                    "nickname": session.user_profile.nickname if session.user_profile else "访客",
+                    "nickname": session.nickname,
                     "vip": is_vip
                 },
-                "last_message": session.history[-1].content[:50] if session.history else ""
+                "last_message": (session.last_message_preview or "")[:50]
             })
 
         avg_wait_time = total_wait_time / len(sorted_sessions) if sorted_sessions else 0
-        max_wait_time = max([s.priority.wait_time_seconds for s in sorted_sessions]) if sorted_sessions else 0
+        max_wait_time = max([s.wait_time_seconds for s in sorted_sessions]) if sorted_sessions else 0
 
         return {
             "success": True,
@@ -2898,16 +3110,15 @@ async def manual_message(request: dict):
         }, ensure_ascii=False))
 
         # P0-5: 通过 SSE 推送消息到客户端
-        if session_name in sse_queues:
-            await sse_queues[session_name].put({
-                "type": "manual_message",
-                "role": role,
-                "content": content,
-                "timestamp": message.timestamp,
-                "agent_id": message.agent_id,
-                "agent_name": message.agent_name
-            })
-            print(f"✅ SSE 推送人工消息到队列: {session_name}, role={role}")
+        await event_bus.publish(session_name, {
+            "type": "manual_message",
+            "role": role,
+            "content": content,
+            "timestamp": message.timestamp,
+            "agent_id": message.agent_id,
+            "agent_name": message.agent_name
+        })
+        print(f"✅ SSE 推送人工消息到队列: {session_name}, role={role}")
 
         if role == "user":
             await handle_customer_reply_event(session_state, source="manual_message")
@@ -2987,30 +3198,29 @@ async def release_session(session_name: str, request: dict):
         }, ensure_ascii=False))
 
         # P0-5: 推送状态变化和系统消息到 SSE
-        if session_name in sse_queues:
-            # 推送系统消息
-            await sse_queues[session_name].put({
-                "type": "manual_message",
-                "role": "system",
-                "content": "人工服务已结束，AI 助手已接管对话",
-                "timestamp": system_message.timestamp
-            })
-            # 推送状态变化
-            await sse_queues[session_name].put({
-                "type": "status_change",
-                "status": session_state.status,
-                "reason": "released",
-                "timestamp": int(time.time())
-            })
-            print(f"✅ SSE 推送会话释放事件: {session_name}")
+        # 推送系统消息
+        await event_bus.publish(session_name, {
+            "type": "manual_message",
+            "role": "system",
+            "content": "人工服务已结束，AI 助手已接管对话",
+            "timestamp": system_message.timestamp
+        })
+        # 推送状态变化
+        await event_bus.publish(session_name, {
+            "type": "status_change",
+            "status": session_state.status,
+            "reason": "released",
+            "timestamp": int(time.time())
+        })
+        print(f"✅ SSE 推送会话释放事件: {session_name}")
 
         # 记录坐席工作统计
         if manual_start_at:
             service_duration = max(0.0, time.time() - manual_start_at)
-            _record_agent_session_duration(agent_id, service_duration)
+            await _record_agent_session_duration(agent_id, service_duration)
 
         if agent_manager:
-            agent_manager.update_last_active(agent_id)
+            await agent_manager.update_last_active(agent_id)
 
         return {
             "success": True,
@@ -3127,35 +3337,34 @@ async def takeover_session(
         }, ensure_ascii=False))
 
         # 🔴 P0-2.8: 推送SSE事件
-        if session_name in sse_queues:
-            # 推送状态变化
-            await sse_queues[session_name].put({
-                "type": "status_change",
-                "status": "manual_live",
-                "agent_info": {
-                    "agent_id": agent_id,
-                    "agent_name": agent_name
-                },
-                "timestamp": int(time.time())
-            })
+        # 推送状态变化
+        await event_bus.publish(session_name, {
+            "type": "status_change",
+            "status": "manual_live",
+            "agent_info": {
+                "agent_id": agent_id,
+                "agent_name": agent_name
+            },
+            "timestamp": int(time.time())
+        })
 
-            # 推送系统消息
-            await sse_queues[session_name].put({
-                "type": "manual_message",
-                "role": "system",
-                "content": f"客服【{agent_name}】已接入，正在为您服务",
-                "timestamp": system_message.timestamp
-            })
+        # 推送系统消息
+        await event_bus.publish(session_name, {
+            "type": "manual_message",
+            "role": "system",
+            "content": f"客服【{agent_name}】已接入，正在为您服务",
+            "timestamp": system_message.timestamp
+        })
 
-            print(f"✅ SSE 推送坐席接入事件: {session_name}")
+        print(f"✅ SSE 推送坐席接入事件: {session_name}")
 
         # 更新坐席统计信息
         if session_state.escalation:
             response_time = max(0.0, takeover_started_at - session_state.escalation.trigger_at)
-            _record_agent_response_time(agent_id, response_time)
+            await _record_agent_response_time(agent_id, response_time)
 
         if agent_manager:
-            agent_manager.update_last_active(agent_id)
+            await agent_manager.update_last_active(agent_id)
 
         if smart_assignment_engine:
             smart_assignment_engine.remember_assignment(session_state, agent_id)
@@ -3265,13 +3474,13 @@ async def transfer_session(
 
         # 【修复】推送SSE通知给目标坐席（实时通知）
         if agent_manager:
-            agent_manager.update_last_active(from_agent_id)
+            await agent_manager.update_last_active(from_agent_id)
 
             # 获取目标坐席对象（用于获取username）
-            target_agent = agent_manager.get_agent_by_id(to_agent_id)
+            target_agent = await agent_manager.get_agent_by_id(to_agent_id)
             if not target_agent:
                 # 兼容：to_agent_id 可能直接是 username
-                target_agent = agent_manager.get_agent_by_username(to_agent_id)
+                target_agent = await agent_manager.get_agent_by_username(to_agent_id)
 
             if target_agent:
                 # 推送SSE事件到目标坐席
@@ -3339,39 +3548,28 @@ async def get_sessions(
         raise HTTPException(status_code=503, detail="SessionStore not initialized")
 
     try:
-        # 🔴 L1-1-Part1-F1: 获取所有会话或按状态筛选
+        # 🔴 L1-1-Part1-F1: 按状态筛选
+        status_enum = None
         if status and status != 'all':
             try:
                 status_enum = SessionStatus(status)
-                sessions = await session_store.list_by_status(
-                    status=status_enum,
-                    limit=10000,  # 先获取所有，再内存筛选
-                    offset=0
-                )
             except ValueError:
                 raise HTTPException(
                     status_code=400,
                     detail=f"Invalid status: {status}. Valid values: {[s.value for s in SessionStatus]}"
                 )
-        else:
-            sessions = await session_store.list_all(limit=10000, offset=0)
-
-        # 🔴 L1-1-Part1-F1-2: 时间范围筛选
-        if time_start:
-            sessions = [s for s in sessions if s.created_at >= time_start]
-        if time_end:
-            sessions = [s for s in sessions if s.created_at <= time_end]
 
         current_agent_id = current_agent.get("agent_id")
 
-        # 🔴 L1-1-Part1-F1-3: 坐席筛选
+        # 🔴 L1-1-Part1-F1-3: 坐席筛选（映射到坐席 ZSET 索引）
+        index_agent_id = None
+        no_match = False
         if agent and agent != 'all':
             if agent == 'unassigned':
                 # 显示 pending_manual 状态且未分配坐席的会话（真正的未分配会话）
-                sessions = [
-                    s for s in sessions
-                    if s.status == SessionStatus.PENDING_MANUAL and not s.assigned_agent
-                ]
+                no_match = status_enum not in (None, SessionStatus.PENDING_MANUAL)
+                status_enum = SessionStatus.PENDING_MANUAL
+                index_agent_id = UNASSIGNED_AGENT
             elif agent == 'mine':
                 if not current_agent_id:
                     raise HTTPException(
@@ -3379,99 +3577,115 @@ async def get_sessions(
                         detail="无法识别当前坐席，token 可能已失效"
                     )
                 # 显示分配给当前坐席的会话（包括pending_manual和manual_live状态）
-                sessions = [
-                    s for s in sessions
-                    if s.assigned_agent and s.assigned_agent.id == current_agent_id
-                ]
+                index_agent_id = current_agent_id
             else:
                 # 指定坐席：显示分配给该坐席的会话
+                index_agent_id = agent
+
+        # 🔴 L1-1-Part1-F1-2: 时间范围筛选（created_at 索引范围查询）
+        created_start = time_start or None
+        created_end = time_end or None
+        has_time_range = created_start is not None or created_end is not None
+
+        # 可由索引直接排序的方式: sort -> (索引字段, 是否倒序)
+        # priority 索引为 VIP 优先、同级按更新时间倒序；默认排序在按状态筛选时状态权重相同，与之等价
+        index_order = {
+            "newest": ("updated_at", True),
+            "oldest": ("updated_at", False),
+            "waitTime": ("created_at", False),
+            "vip": ("priority", True),
+        }.get(sort)
+        if index_order is None and status_enum is not None:
+            index_order = ("priority", True)
+        needs_memory_filter = bool(keyword) or (customer_type and customer_type != 'all')
+
+        if no_match:
+            paginated_sessions, total = [], 0
+        elif (
+            index_order
+            and not needs_memory_filter
+            and (index_order[0] == "created_at" or not has_time_range)
+        ):
+            # 🚀 索引直接分页：只读取当前页的会话摘要
+            order_by, descending = index_order
+            paginated_sessions, total = await session_store.query_summaries(
+                status=status_enum,
+                agent_id=index_agent_id,
+                order_by=order_by,
+                min_score=created_start,
+                max_score=created_end,
+                descending=descending,
+                limit=limit,
+                offset=offset
+            )
+        else:
+            # 🔴 L1-1-Part1-F1-5: 关键词搜索（全文检索倒排索引，与历史消息数量无关）
+            matched_names = await session_store.search_sessions(keyword) if keyword else None
+
+            if matched_names is not None:
+                # 只读取命中会话的摘要，再按状态 / 坐席 / 时间筛选
                 sessions = [
-                    s for s in sessions
-                    if s.assigned_agent and s.assigned_agent.id == agent
+                    s for s in await session_store.get_summaries(matched_names)
+                    if s.matches(status_enum, index_agent_id, created_start, created_end)
                 ]
+            else:
+                # 需要内存筛选 / 综合排序：先用索引缩小候选集（只读取摘要投影，最多 SESSION_LIST_SCAN_LIMIT 个）
+                sessions, _ = await session_store.query_summaries(
+                    status=status_enum,
+                    agent_id=index_agent_id,
+                    order_by="created_at" if has_time_range else "updated_at",
+                    min_score=created_start,
+                    max_score=created_end,
+                    limit=SESSION_LIST_SCAN_LIMIT
+                )
 
-        # 🔴 L1-1-Part1-F1-4: 客户类型筛选
-        if customer_type and customer_type != 'all':
-            if customer_type == 'vip':
-                sessions = [s for s in sessions if s.user_profile and s.user_profile.vip]
-            elif customer_type == 'old':
-                # 老客户：有订单历史（暂时用 metadata 中的 order_count 判断）
-                sessions = [s for s in sessions if s.user_profile and s.user_profile.metadata.get('order_count', 0) > 0]
-            elif customer_type == 'new':
-                # 新客户：无订单历史
-                sessions = [s for s in sessions if not s.user_profile or s.user_profile.metadata.get('order_count', 0) == 0]
-
-        # 🔴 L1-1-Part1-F1-5: 关键词搜索
-        if keyword:
-            keyword_lower = keyword.lower().strip()
-            filtered_sessions = []
-            for session in sessions:
-                # 搜索会话ID
-                if keyword_lower in session.session_name.lower():
-                    filtered_sessions.append(session)
-                    continue
-                # 搜索客户昵称
-                if session.user_profile and session.user_profile.nickname:
-                    if keyword_lower in session.user_profile.nickname.lower():
-                        filtered_sessions.append(session)
-                        continue
-                # 搜索对话历史内容
-                if session.history:
-                    for msg in session.history:
-                        if keyword_lower in msg.content.lower():
-                            filtered_sessions.append(session)
-                            break
-                    else:
-                        # 如果内层循环正常结束(没有break),继续外层循环
-                        continue
-                    # 如果内层循环被break,说明找到了匹配,继续外层下一个session
-                    continue
-                # 搜索坐席名称
-                if session.assigned_agent and session.assigned_agent.name:
-                    if keyword_lower in session.assigned_agent.name.lower():
-                        filtered_sessions.append(session)
-                        continue
-            sessions = filtered_sessions
-
-        # 🔴 L1-1-Part1-F1-7: 智能排序
-        if sort == 'newest':
-            # 最新优先
-            sessions.sort(key=lambda s: s.updated_at, reverse=True)
-        elif sort == 'oldest':
-            # 最早优先
-            sessions.sort(key=lambda s: s.updated_at, reverse=False)
-        elif sort == 'vip':
-            # VIP优先，同级按时间
-            def vip_sort_key(s):
-                is_vip = s.user_profile.vip if s.user_profile else False
-                return (not is_vip, -s.updated_at)  # VIP在前，时间倒序
-            sessions.sort(key=vip_sort_key)
-        elif sort == 'waitTime':
-            # 等待时长优先
-            current_time = time.time()
-            sessions.sort(key=lambda s: -(current_time - s.created_at))
-        else:
-            # 默认排序：优先级 > 更新时间
-            def default_sort_key(s):
-                is_vip = s.user_profile.vip if s.user_profile else False
-                # 状态权重
-                status_weight = {
-                    SessionStatus.PENDING_MANUAL: 3,
-                    SessionStatus.MANUAL_LIVE: 2,
-                    SessionStatus.BOT_ACTIVE: 1,
-                    SessionStatus.CLOSED: 0
-                }.get(s.status, 1)
-                return (not is_vip, -status_weight, -s.updated_at)
-            sessions.sort(key=default_sort_key)
-
-        # 🔴 分页处理
-        total = len(sessions)
-        paginated_sessions = sessions[offset:offset + limit]
+            # 🔴 L1-1-Part1-F1-4: 客户类型筛选
+            if customer_type and customer_type != 'all':
+                if customer_type == 'vip':
+                    sessions = [s for s in sessions if s.vip]
+                elif customer_type == 'old':
+                    # 老客户：有订单历史（暂时用 metadata 中的 order_count 判断）
+                    sessions = [s for s in sessions if s.order_count > 0]
+                elif customer_type == 'new':
+                    # 新客户：无订单历史
+                    sessions = [s for s in sessions if s.order_count == 0]
+
+            # 🔴 L1-1-Part1-F1-7: 智能排序
+            if sort == 'newest':
+                # 最新优先
+                sessions.sort(key=lambda s: s.updated_at, reverse=True)
+            elif sort == 'oldest':
+                # 最早优先
+                sessions.sort(key=lambda s: s.updated_at, reverse=False)
+            elif sort == 'vip':
+                # VIP优先，同级按时间
+                def vip_sort_key(s):
+                    return (not s.vip, -s.updated_at)  # VIP在前，时间倒序
+                sessions.sort(key=vip_sort_key)
+            elif sort == 'waitTime':
+                # 等待时长优先
+                current_time = time.time()
+                sessions.sort(key=lambda s: -(current_time - s.created_at))
+            else:
+                # 默认排序：优先级 > 更新时间
+                def default_sort_key(s):
+                    # 状态权重
+                    status_weight = {
+                        SessionStatus.PENDING_MANUAL: 3,
+                        SessionStatus.MANUAL_LIVE: 2,
+                        SessionStatus.BOT_ACTIVE: 1,
+                        SessionStatus.CLOSED: 0
+                    }.get(s.status, 1)
+                    return (not s.vip, -status_weight, -s.updated_at)
+                sessions.sort(key=default_sort_key)
+
+            # 🔴 分页处理
+            total = len(sessions)
+            paginated_sessions = sessions[offset:offset + limit]
 
         # 【模块2】更新优先级信息（在转换为摘要前）
-        urgent_keywords = ["投诉", "退款", "质量问题", "差评", "赔偿"]
         for session in paginated_sessions:
-            session.update_priority(urgent_keywords=urgent_keywords)
+            session.refresh_priority()
 
         # 🔴 转换为摘要格式
         sessions_summary = [session.to_summary() for session in paginated_sessions]
@@ -3512,7 +3726,7 @@ async def create_ticket_endpoint(
 
     try:
         created_by = agent.get("agent_id") or agent.get("username") or "system"
-        ticket = ticket_store.create_from_payload(
+        ticket = await ticket_store.create_from_payload(
             title=request.title.strip(),
             description=request.description.strip(),
             created_by=created_by,
@@ -3526,7 +3740,7 @@ async def create_ticket_endpoint(
             metadata=request.metadata
         )
 
-        log_ticket_event(
+        await log_ticket_event(
             "created",
             ticket.ticket_id,
             agent,
@@ -3561,7 +3775,7 @@ async def create_manual_ticket_endpoint(
 
     try:
         created_by = agent.get("agent_id") or agent.get("username") or "system"
-        ticket = ticket_store.create_from_payload(
+        ticket = await ticket_store.create_from_payload(
             title=request.title.strip(),
             description=request.description.strip(),
             created_by=created_by,
@@ -3575,7 +3789,7 @@ async def create_manual_ticket_endpoint(
             metadata=request.metadata
         )
 
-        log_ticket_event(
+        await log_ticket_event(
             "created",
             ticket.ticket_id,
             agent,
@@ -3614,7 +3828,7 @@ async def list_tickets_endpoint(
     offset = max(0, offset)
 
     try:
-        total, tickets = ticket_store.list(
+        total, tickets = await ticket_store.list(
             status=status,
             priority=priority,
             assigned_agent_id=assigned_agent_id,
@@ -3640,9 +3854,10 @@ async def list_tickets_endpoint(
 async def search_tickets_endpoint(
     query: str,
     limit: int = 50,
+    offset: int = 0,
     agent: Dict[str, Any] = Depends(require_agent)
 ):
-    """关键词搜索工单"""
+    """关键词搜索工单（工单号 / 订单号精确匹配，其余按相关度排序分页）"""
     if not ticket_store:
         raise HTTPException(status_code=503, detail="工单系统未初始化")
 
@@ -3651,16 +3866,18 @@ async def search_tickets_endpoint(
         raise HTTPException(status_code=400, detail="缺少查询关键词")
 
     limit = max(1, min(limit, 200))
+    offset = max(0, offset)
 
     try:
-        total, tickets = ticket_store.search(keyword, limit=limit)
+        total, tickets = await ticket_store.search(keyword, limit=limit, offset=offset)
         return {
             "success": True,
             "data": {
                 "tickets": [ticket.to_dict() for ticket in tickets],
                 "total": total,
                 "limit": limit,
-                "has_more": total > len(tickets)
+                "offset": offset,
+                "has_more": total > offset + len(tickets)
             }
         }
     except Exception as e:
@@ -3691,7 +3908,7 @@ async def filter_tickets_endpoint(
         raise HTTPException(status_code=400, detail=f"INVALID_SORT_FIELD: {sort_by}")
 
     try:
-        total, tickets = ticket_store.filter_tickets(
+        total, tickets = await ticket_store.filter_tickets(
             statuses=filters.statuses,
             priorities=filters.priorities,
             ticket_types=filters.ticket_types,
@@ -3815,7 +4032,7 @@ async def export_tickets_endpoint(
     offset = filters_payload.offset if "offset" in provided_fields else 0
 
     try:
-        total, tickets = ticket_store.filter_tickets(
+        total, tickets = await ticket_store.filter_tickets(
             statuses=filters_payload.statuses,
             priorities=filters_payload.priorities,
             ticket_types=filters_payload.ticket_types,
@@ -3860,11 +4077,11 @@ async def get_ticket_detail(ticket_id: str, agent: Dict[str, Any] = Depends(requ
     if not ticket_store:
         raise HTTPException(status_code=503, detail="工单系统未初始化")
 
-    ticket = ticket_store.get(ticket_id)
+    ticket = await ticket_store.get(ticket_id)
     if not ticket:
         raise HTTPException(status_code=404, detail="工单不存在")
 
-    log_ticket_event(
+    await log_ticket_event(
         "assigned",
         ticket.ticket_id,
         agent,
@@ -3891,9 +4108,9 @@ async def update_ticket_endpoint(
     if not ticket_store:
         raise HTTPException(status_code=503, detail="工单系统未初始化")
 
-    original_ticket = ticket_store.get(ticket_id) if ticket_store else None
+    original_ticket = await ticket_store.get(ticket_id, with_children=False) if ticket_store else None
     try:
-        ticket = ticket_store.update_ticket(
+        ticket = await ticket_store.update_ticket(
             ticket_id,
             status=request.status,
             priority=request.priority,
@@ -3902,8 +4119,11 @@ async def update_ticket_endpoint(
             note=request.note,
             metadata_updates=request.metadata_updates,
             changed_by=agent.get("agent_id") or agent.get("username") or "system",
-            change_reason=request.change_reason
+            change_reason=request.change_reason,
+            with_children=True
         )
+    except TicketConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -3911,7 +4131,7 @@ async def update_ticket_endpoint(
         raise HTTPException(status_code=404, detail="工单不存在")
 
     if original_ticket and request.status and ticket.status != original_ticket.status:
-        log_ticket_event(
+        await log_ticket_event(
             "status_changed",
             ticket.ticket_id,
             agent,
@@ -3922,7 +4142,7 @@ async def update_ticket_endpoint(
             }
         )
     if original_ticket and request.priority and ticket.priority != original_ticket.priority:
-        log_ticket_event(
+        await log_ticket_event(
             "priority_changed",
             ticket.ticket_id,
             agent,
@@ -3934,7 +4154,7 @@ async def update_ticket_endpoint(
         )
     if original_ticket and (request.assigned_agent_id or request.assigned_agent_name):
         if ticket.assigned_agent_id != original_ticket.assigned_agent_id or ticket.assigned_agent_name != original_ticket.assigned_agent_name:
-            log_ticket_event(
+            await log_ticket_event(
                 "assigned",
                 ticket.ticket_id,
                 agent,
@@ -3982,7 +4202,7 @@ async def create_ticket_from_session(
         country=session_state.user_profile.country
     )
 
-    ticket = ticket_store.create_from_payload(
+    ticket = await ticket_store.create_from_payload(
         title=request.title or f"{session_state.user_profile.nickname} 的工单",
         description=request.description or default_description,
         created_by=agent.get("agent_id") or agent.get("username") or "system",
@@ -4022,14 +4242,17 @@ async def assign_ticket_endpoint(
         raise HTTPException(status_code=503, detail="工单系统未初始化")
 
     try:
-        ticket = ticket_store.update_ticket(
+        ticket = await ticket_store.update_ticket(
             ticket_id,
             assigned_agent_id=request.agent_id,
             assigned_agent_name=request.agent_name,
             note=request.note,
             changed_by=agent.get("agent_id") or agent.get("username") or "system",
-            change_reason="assign"
+            change_reason="assign",
+            with_children=True
         )
+    except TicketConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except ValueError as e:
         msg = str(e)
         if "ARCHIVED" in msg:
@@ -4057,7 +4280,7 @@ async def batch_assign_tickets_endpoint(
     operator_id = agent.get("agent_id") or agent.get("username") or "system"
 
     try:
-        result = ticket_store.batch_assign(
+        result = await ticket_store.batch_assign(
             request.ticket_ids,
             assigned_agent_id=request.target_agent_id.strip(),
             assigned_agent_name=request.target_agent_name.strip() if request.target_agent_name else None,
@@ -4069,7 +4292,7 @@ async def batch_assign_tickets_endpoint(
 
     updated_dicts = [ticket.to_dict() for ticket in result["tickets"]]
     for ticket in result["tickets"]:
-        log_ticket_event(
+        await log_ticket_event(
             "assigned",
             ticket.ticket_id,
             agent,
@@ -4103,7 +4326,7 @@ async def batch_close_tickets_endpoint(
     operator = agent.get("agent_id") or agent.get("username") or "system"
 
     try:
-        result = ticket_store.batch_close(
+        result = await ticket_store.batch_close(
             request.ticket_ids,
             reason=request.close_reason,
             comment=request.comment,
@@ -4114,7 +4337,7 @@ async def batch_close_tickets_endpoint(
 
     closed_tickets = [ticket.to_dict() for ticket in result["tickets"]]
     for ticket in result["tickets"]:
-        log_ticket_event(
+        await log_ticket_event(
             "status_changed",
             ticket.ticket_id,
             agent,
@@ -4148,7 +4371,7 @@ async def batch_update_priority_endpoint(
     operator = agent.get("agent_id") or agent.get("username") or "system"
 
     try:
-        result = ticket_store.batch_update_priority(
+        result = await ticket_store.batch_update_priority(
             request.ticket_ids,
             priority=request.priority,
             reason=request.reason,
@@ -4159,7 +4382,7 @@ async def batch_update_priority_endpoint(
 
     updated_tickets = [ticket.to_dict() for ticket in result["tickets"]]
     for ticket in result["tickets"]:
-        log_ticket_event(
+        await log_ticket_event(
             "priority_changed",
             ticket.ticket_id,
             agent,
@@ -4190,7 +4413,7 @@ async def add_ticket_comment(
         raise HTTPException(status_code=503, detail="工单系统未初始化")
 
     try:
-        comment = ticket_store.add_comment(
+        comment = await ticket_store.add_comment(
             ticket_id,
             content=request.content.strip(),
             author_id=agent.get("agent_id") or agent.get("username") or "system",
@@ -4198,6 +4421,8 @@ async def add_ticket_comment(
             comment_type=request.comment_type,
             mentions=request.mentions or []
         )
+    except TicketConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -4220,7 +4445,7 @@ async def add_ticket_comment(
                 "created_at": comment.created_at
             })
 
-    log_ticket_event(
+    await log_ticket_event(
         "commented",
         ticket_id,
         agent,
@@ -4243,7 +4468,7 @@ async def list_ticket_comments(ticket_id: str, agent: Dict[str, Any] = Depends(r
     if not ticket_store:
         raise HTTPException(status_code=503, detail="工单系统未初始化")
 
-    comments = ticket_store.list_comments(ticket_id)
+    comments = await ticket_store.list_comments(ticket_id)
     if comments is None:
         raise HTTPException(status_code=404, detail="工单不存在")
 
@@ -4259,7 +4484,7 @@ async def list_ticket_attachments(ticket_id: str, agent: Dict[str, Any] = Depend
     if not ticket_store:
         raise HTTPException(status_code=503, detail="工单系统未初始化")
 
-    attachments = ticket_store.list_attachments(ticket_id)
+    attachments = await ticket_store.list_attachments(ticket_id)
     if attachments is None:
         raise HTTPException(status_code=404, detail="工单不存在")
 
@@ -4273,7 +4498,7 @@ async def list_ticket_attachments(ticket_id: str, agent: Dict[str, Any] = Depend
 async def list_ticket_templates(agent: Dict[str, Any] = Depends(require_agent)):
     if not ticket_template_store:
         raise HTTPException(status_code=503, detail="模板存储未初始化")
-    templates = ticket_template_store.list()
+    templates = await ticket_template_store.list()
     return {
         "success": True,
         "data": [template.dict() for template in templates]
@@ -4287,7 +4512,7 @@ async def create_ticket_template(
 ):
     if not ticket_template_store:
         raise HTTPException(status_code=503, detail="模板存储未初始化")
-    template = ticket_template_store.create(
+    template = await ticket_template_store.create(
         name=request.name.strip(),
         ticket_type=request.ticket_type,
         category=request.category.strip(),
@@ -4306,7 +4531,7 @@ async def create_ticket_template(
 async def get_ticket_template(template_id: str, agent: Dict[str, Any] = Depends(require_agent)):
     if not ticket_template_store:
         raise HTTPException(status_code=503, detail="模板存储未初始化")
-    template = ticket_template_store.get(template_id)
+    template = await ticket_template_store.get(template_id)
     if not template:
         raise HTTPException(status_code=404, detail="模板不存在")
     return {
@@ -4323,7 +4548,7 @@ async def update_ticket_template(
 ):
     if not ticket_template_store:
         raise HTTPException(status_code=503, detail="模板存储未初始化")
-    template = ticket_template_store.update(
+    template = await ticket_template_store.update(
         template_id,
         name=request.name.strip(),
         ticket_type=request.ticket_type,
@@ -4344,7 +4569,7 @@ async def update_ticket_template(
 async def delete_ticket_template(template_id: str, agent: Dict[str, Any] = Depends(require_agent)):
     if not ticket_template_store:
         raise HTTPException(status_code=503, detail="模板存储未初始化")
-    deleted = ticket_template_store.delete(template_id)
+    deleted = await ticket_template_store.delete(template_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="模板不存在")
     return {"success": True}
@@ -4358,10 +4583,10 @@ async def render_ticket_template(
 ):
     if not ticket_template_store:
         raise HTTPException(status_code=503, detail="模板存储未初始化")
-    template = ticket_template_store.get(template_id)
+    template = await ticket_template_store.get(template_id)
     if not template:
         raise HTTPException(status_code=404, detail="模板不存在")
-    rendered = ticket_template_store.render_template(
+    rendered = await ticket_template_store.render_template(
         template,
         {
             "customer_name": request.customer_name or ""
@@ -4386,7 +4611,7 @@ async def list_ticket_audit_logs(
     if not audit_log_store:
         return {"success": True, "data": []}
 
-    logs = audit_log_store.list_logs(ticket_id, limit=limit)
+    logs = await audit_log_store.list_logs(ticket_id, limit=limit)
     return {
         "success": True,
         "data": [log.dict() for log in logs]
@@ -4403,14 +4628,17 @@ async def delete_ticket_comment(
     if not ticket_store:
         raise HTTPException(status_code=503, detail="工单系统未初始化")
 
-    ticket = ticket_store.get(ticket_id)
+    ticket = await ticket_store.get(ticket_id, with_children=False)
     if not ticket:
         raise HTTPException(status_code=404, detail="工单不存在")
 
     if ticket.status == TicketStatus.ARCHIVED:
         raise HTTPException(status_code=400, detail="ARCHIVED_TICKET: 归档工单不能删除评论")
 
-    success = ticket_store.delete_comment(ticket_id, comment_id)
+    try:
+        success = await ticket_store.delete_comment(ticket_id, comment_id)
+    except TicketConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     if not success:
         raise HTTPException(status_code=404, detail="评论不存在")
 
@@ -4454,7 +4682,7 @@ async def upload_ticket_attachment(
         raise HTTPException(status_code=500, detail=f"UPLOAD_FAILED: {str(exc)}")
 
     try:
-        attachment = ticket_store.add_attachment(
+        attachment = await ticket_store.add_attachment(
             ticket_id,
             filename=file.filename,
             stored_path=str(stored_path),
@@ -4471,10 +4699,12 @@ async def upload_ticket_attachment(
             stored_path.unlink()
         if isinstance(exc, HTTPException):
             raise
+        if isinstance(exc, TicketConflictError):
+            raise HTTPException(status_code=409, detail=str(exc))
         raise HTTPException(status_code=500, detail=f"保存附件失败: {str(exc)}")
 
     response_data = _attachment_response(ticket_id, attachment)
-    log_ticket_event(
+    await log_ticket_event(
         "attachment_uploaded",
         ticket_id,
         agent,
@@ -4502,7 +4732,7 @@ async def download_ticket_attachment(
     if not ticket_store:
         raise HTTPException(status_code=503, detail="工单系统未初始化")
 
-    attachment = ticket_store.get_attachment(ticket_id, attachment_id)
+    attachment = await ticket_store.get_attachment(ticket_id, attachment_id)
     if not attachment:
         raise HTTPException(status_code=404, detail="附件不存在")
 
@@ -4528,13 +4758,14 @@ async def reopen_ticket_endpoint(
         raise HTTPException(status_code=503, detail="工单系统未初始化")
 
     try:
-        ticket = ticket_store.reopen_ticket(
+        ticket = await ticket_store.reopen_ticket(
             ticket_id,
             agent_id=agent.get("agent_id") or agent.get("username") or "system",
             reason=request.reason,
-            comment=request.comment
+            comment=request.comment,
+            with_children=True
         )
-        log_ticket_event(
+        await log_ticket_event(
             "status_changed",
             ticket.ticket_id,
             agent,
@@ -4546,6 +4777,8 @@ async def reopen_ticket_endpoint(
             }
         )
         return {"success": True, "data": ticket.to_dict()}
+    except TicketConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except ValueError as e:
         msg = str(e)
         if "NOT_FOUND" in msg:
@@ -4564,12 +4797,13 @@ async def archive_ticket_endpoint(
         raise HTTPException(status_code=503, detail="工单系统未初始化")
 
     try:
-        ticket = ticket_store.archive_ticket(
+        ticket = await ticket_store.archive_ticket(
             ticket_id,
             agent_id=agent.get("agent_id") or agent.get("username") or "system",
-            reason=request.reason
+            reason=request.reason,
+            with_children=True
         )
-        log_ticket_event(
+        await log_ticket_event(
             "status_changed",
             ticket.ticket_id,
             agent,
@@ -4580,6 +4814,8 @@ async def archive_ticket_endpoint(
             }
         )
         return {"success": True, "data": ticket.to_dict()}
+    except TicketConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except ValueError as e:
         msg = str(e)
         if "NOT_FOUND" in msg:
@@ -4598,12 +4834,12 @@ async def auto_archive_tickets(
 
     older_days = request.older_than_days or 30
     seconds = older_days * 86400
-    result = ticket_store.auto_archive_closed(
+    result = await ticket_store.auto_archive_closed(
         older_than_seconds=seconds,
         agent_id=admin.get("agent_id") or admin.get("username") or "system"
     )
     for ticket_id in result.get("ticket_ids", []):
-        log_ticket_event(
+        await log_ticket_event(
             "status_changed",
             ticket_id,
             admin,
@@ -4650,7 +4886,7 @@ async def get_archived_tickets(
     start_ts = _parse_date(start_date)
     end_ts = _parse_date(end_date)
 
-    total, tickets = ticket_store.list_archived(
+    total, tickets = await ticket_store.list_archived(
         email=customer_email,
         start_ts=start_ts,
         end_ts=end_ts,
@@ -4675,7 +4911,7 @@ async def get_ticket_sla_summary(agent: Dict[str, Any] = Depends(require_agent))
     if not ticket_store:
         raise HTTPException(status_code=503, detail="工单系统未初始化")
 
-    summary = ticket_store.get_sla_summary()
+    summary = await ticket_store.get_sla_summary()
     return {
         "success": True,
         "data": summary
@@ -4688,7 +4924,7 @@ async def get_ticket_sla_alerts(agent: Dict[str, Any] = Depends(require_agent)):
     if not ticket_store:
         raise HTTPException(status_code=503, detail="工单系统未初始化")
 
-    alerts = ticket_store.detect_sla_alerts()
+    alerts = await ticket_store.detect_sla_alerts()
     return {
         "success": True,
         "data": alerts
@@ -4712,7 +4948,7 @@ async def get_ticket_sla_info(
     if not ticket_store:
         raise HTTPException(status_code=503, detail="工单系统未初始化")
 
-    ticket = ticket_store.get(ticket_id)
+    ticket = await ticket_store.get(ticket_id, with_children=False)
     if not ticket:
         raise HTTPException(status_code=404, detail="TICKET_NOT_FOUND")
 
@@ -4746,7 +4982,7 @@ async def get_sla_dashboard(
         raise HTTPException(status_code=503, detail="工单系统未初始化")
 
     # 获取所有未完成的工单
-    _, tickets = ticket_store.filter_tickets(
+    _, tickets = await ticket_store.filter_tickets(
         statuses=[
             TicketStatus.PENDING,
             TicketStatus.IN_PROGRESS,
@@ -4802,7 +5038,7 @@ async def get_sla_dashboard(
     ))
 
     # 获取 SLA 概览统计
-    summary = ticket_store.get_sla_summary()
+    summary = await ticket_store.get_sla_summary()
 
     return {
         "success": True,
@@ -4848,19 +5084,19 @@ async def agent_login(request: LoginRequest):
                 detail="坐席认证系统未初始化"
             )
 
-        # 验证坐席账号
-        agent = agent_manager.authenticate(
-            username=request.username,
-            password=request.password
-        )
-
-        if not agent:
+        # 验证坐席账号（bcrypt 在独立线程池中执行）
+        agent = await agent_manager.get_agent_by_username(request.username)
+        if not agent or not await password_hasher.verify_password(request.password, agent.password_hash):
             raise HTTPException(
                 status_code=401,
                 detail="用户名或密码错误"
             )
 
+        agent = await agent_manager.record_login(agent)
+        await publish_agent_presence(agent, "login")
+
         # 生成 Token
+        await sync_agent_token_revocation(agent.username)
         access_token = agent_token_manager.create_access_token(agent)
         refresh_token = agent_token_manager.create_refresh_token(agent)
 
@@ -4875,6 +5111,8 @@ async def agent_login(request: LoginRequest):
 
     except HTTPException:
         raise
+    except PasswordHasherBusy as e:
+        raise HTTPException(status_code=503, detail=f"LOGIN_BUSY: {str(e)}")
     except Exception as e:
         print(f"❌ 坐席登录失败: {str(e)}")
         raise HTTPException(
@@ -4884,15 +5122,19 @@ async def agent_login(request: LoginRequest):
 
 
 @app.post("/api/agent/logout")
-async def agent_logout(username: str):
+async def agent_logout(
+    username: Optional[str] = None,
+    agent: Dict[str, Any] = Depends(require_agent)
+):
     """
     坐席登出接口
 
     功能:
     - 更新坐席状态为离线
+    - 吊销该坐席已签发的全部 Token
 
     Args:
-        username: 坐席用户名
+        username: 坐席用户名（默认当前登录坐席；登出其他坐席需要管理员权限）
 
     Returns:
         success: bool
@@ -4904,13 +5146,25 @@ async def agent_logout(username: str):
                 detail="坐席认证系统未初始化"
             )
 
-        agent_manager.update_status(username, AgentStatus.OFFLINE)
+        username = username or agent["username"]
+        if username != agent["username"] and agent.get("role") != "admin":
+            raise HTTPException(
+                status_code=403,
+                detail="只能登出当前坐席"
+            )
+
+        logged_out_agent = await agent_manager.update_status(username, AgentStatus.OFFLINE)
+        await revoke_agent_tokens(username)
+        if logged_out_agent:
+            await publish_agent_presence(logged_out_agent, "logout")
 
         return {
             "success": True,
             "message": "登出成功"
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ 坐席登出失败: {str(e)}")
         raise HTTPException(
@@ -4944,7 +5198,7 @@ async def get_agent_profile(username: str):
                 detail="坐席认证系统未初始化"
             )
 
-        agent = agent_manager.get_agent_by_username(username)
+        agent = await agent_manager.get_agent_by_username(username)
 
         if not agent:
             raise HTTPException(
@@ -4975,12 +5229,12 @@ async def get_agent_status(agent: Dict[str, Any] = Depends(require_agent)):
             raise HTTPException(status_code=500, detail="坐席认证系统未初始化")
 
         username = agent.get("username")
-        current_agent = agent_manager.get_agent_by_username(username)
+        current_agent = await agent_manager.get_agent_by_username(username)
 
         if not current_agent:
             raise HTTPException(status_code=404, detail="坐席不存在")
 
-        current_agent = _auto_adjust_agent_status(current_agent)
+        current_agent = await _auto_adjust_agent_status(current_agent)
         payload = await _build_agent_status_payload(current_agent, username)
 
         return {
@@ -5005,7 +5259,7 @@ async def update_agent_status_api(
             raise HTTPException(status_code=500, detail="坐席认证系统未初始化")
 
         username = agent.get("username")
-        updated_agent = agent_manager.update_status(
+        updated_agent = await agent_manager.update_status(
             username=username,
             status=request.status,
             status_note=request.status_note
@@ -5014,6 +5268,7 @@ async def update_agent_status_api(
         if not updated_agent:
             raise HTTPException(status_code=404, detail="坐席不存在")
 
+        await publish_agent_presence(updated_agent, "manual")
         payload = await _build_agent_status_payload(updated_agent, username)
         return {
             "success": True,
@@ -5034,7 +5289,7 @@ async def heartbeat_agent_status(agent: Dict[str, Any] = Depends(require_agent))
             raise HTTPException(status_code=500, detail="坐席认证系统未初始化")
 
         username = agent.get("username")
-        last_active = agent_manager.update_last_active(username)
+        last_active = await agent_manager.update_last_active(username)
 
         return {
             "success": True,
@@ -5055,9 +5310,9 @@ async def get_agent_today_stats(agent: Dict[str, Any] = Depends(require_agent)):
             raise HTTPException(status_code=500, detail="坐席认证系统未初始化")
 
         username = agent.get("username")
-        today_stats = _compose_today_stats(username)
+        today_stats = await _compose_today_stats(username)
         current_sessions = await _count_agent_live_sessions(username)
-        current_agent = agent_manager.get_agent_by_username(username)
+        current_agent = await agent_manager.get_agent_by_username(username)
 
         today_stats.update({
             "current_sessions": current_sessions,
@@ -5101,8 +5356,11 @@ async def refresh_agent_token(request: RefreshTokenRequest):
                 detail="坐席认证系统未初始化"
             )
 
-        # 验证刷新 Token
+        # 验证刷新 Token（先同步吊销纪元，其他 worker 上刚吊销的刷新 Token 也立即失效）
         payload = agent_token_manager.verify_token(request.refresh_token)
+        if payload:
+            await sync_agent_token_revocation(payload.get("username"))
+            payload = agent_token_manager.verify_token(request.refresh_token)
 
         if not payload or payload.get("type") != "refresh":
             raise HTTPException(
@@ -5112,7 +5370,7 @@ async def refresh_agent_token(request: RefreshTokenRequest):
 
         # 获取坐席信息
         username = payload.get("username")
-        agent = agent_manager.get_agent_by_username(username)
+        agent = await agent_manager.get_agent_by_username(username)
 
         if not agent:
             raise HTTPException(
@@ -5151,7 +5409,6 @@ from src.agent_auth import (
     ChangePasswordRequest,
     UpdateProfileRequest,
     validate_password,
-    PasswordHasher,
     AgentRole
 )
 
@@ -5186,7 +5443,7 @@ async def get_agents_list(
             raise HTTPException(status_code=500, detail="坐席管理系统未初始化")
 
         # 获取所有坐席
-        agents = agent_manager.get_all_agents()
+        agents = await agent_manager.get_all_agents()
 
         # 过滤
         if status:
@@ -5250,7 +5507,7 @@ async def get_available_agents(
             raise HTTPException(status_code=500, detail="坐席管理系统未初始化")
 
         # 获取所有坐席
-        all_agents = agent_manager.get_all_agents()
+        all_agents = await agent_manager.get_all_agents()
 
         # 过滤：排除当前登录坐席，只返回在线状态的坐席
         current_agent_id = agent.get("agent_id")
@@ -5318,7 +5575,7 @@ async def create_agent(
             raise HTTPException(status_code=500, detail="坐席管理系统未初始化")
 
         # 检查用户名是否已存在
-        if agent_manager.get_agent_by_username(request.username):
+        if await agent_manager.get_agent_by_username(request.username):
             raise HTTPException(
                 status_code=400,
                 detail="USERNAME_EXISTS: 用户名已存在"
@@ -5332,18 +5589,19 @@ async def create_agent(
             )
 
         # 创建坐席
-        agent = agent_manager.create_agent(
+        agent = await agent_manager.create_agent(
             username=request.username,
             password=request.password,
             name=request.name,
             role=request.role,
-            max_sessions=request.max_sessions
+            max_sessions=request.max_sessions,
+            password_hash=await password_hasher.hash_password(request.password)
         )
 
         # 更新头像
         if request.avatar_url:
             agent.avatar_url = request.avatar_url
-            agent_manager.update_agent(agent)
+            await agent_manager.update_agent(agent)
 
         # 返回结果（隐藏密码）
         agent_dict = agent.dict()
@@ -5358,6 +5616,8 @@ async def create_agent(
 
     except HTTPException:
         raise
+    except PasswordHasherBusy as e:
+        raise HTTPException(status_code=503, detail=f"PASSWORD_HASH_BUSY: {str(e)}")
     except Exception as e:
         print(f"❌ 创建坐席账号失败: {str(e)}")
         raise HTTPException(
@@ -5389,7 +5649,7 @@ async def update_agent(
             raise HTTPException(status_code=500, detail="坐席管理系统未初始化")
 
         # 获取坐席
-        agent = agent_manager.get_agent_by_username(username)
+        agent = await agent_manager.get_agent_by_username(username)
         if not agent:
             raise HTTPException(
                 status_code=404,
@@ -5398,7 +5658,7 @@ async def update_agent(
 
         # 检查是否要降级最后一个管理员
         if request.role == AgentRole.AGENT and agent.role == AgentRole.ADMIN:
-            if agent_manager.count_admins() <= 1:
+            if await agent_manager.count_admins() <= 1:
                 raise HTTPException(
                     status_code=400,
                     detail="LAST_ADMIN: 不能降级最后一个管理员"
@@ -5417,7 +5677,7 @@ async def update_agent(
             agent.avatar_url = request.avatar_url
 
         # 保存
-        agent_manager.update_agent(agent)
+        await agent_manager.update_agent(agent)
 
         # 返回结果（隐藏密码）
         agent_dict = agent.dict()
@@ -5457,10 +5717,10 @@ async def update_agent_skills_endpoint(
         if not agent_manager:
             raise HTTPException(status_code=500, detail="坐席管理系统未初始化")
 
-        agent = agent_manager.get_agent_by_id(agent_id)
+        agent = await agent_manager.get_agent_by_id(agent_id)
         if not agent:
             # 兼容：允许直接传入用户名
-            agent = agent_manager.get_agent_by_username(agent_id)
+            agent = await agent_manager.get_agent_by_username(agent_id)
 
         if not agent:
             raise HTTPException(
@@ -5469,7 +5729,9 @@ async def update_agent_skills_endpoint(
             )
 
         agent.skills = request.skills
-        agent_manager.update_agent(agent)
+        await agent_manager.update_agent(agent)
+        if smart_assignment_engine:
+            smart_assignment_engine.refresh_agent(agent)
 
         agent_dict = agent_to_dict(agent)
 
@@ -5515,7 +5777,7 @@ async def delete_agent(
             raise HTTPException(status_code=500, detail="坐席管理系统未初始化")
 
         # 获取坐席
-        agent = agent_manager.get_agent_by_username(username)
+        agent = await agent_manager.get_agent_by_username(username)
         if not agent:
             raise HTTPException(
                 status_code=404,
@@ -5523,20 +5785,24 @@ async def delete_agent(
             )
 
         # 检查是否是最后一个管理员
-        if agent.role == AgentRole.ADMIN and agent_manager.count_admins() <= 1:
+        if agent.role == AgentRole.ADMIN and await agent_manager.count_admins() <= 1:
             raise HTTPException(
                 status_code=400,
                 detail="LAST_ADMIN: 不能删除最后一个管理员"
             )
 
         # 删除坐席
-        result = agent_manager.delete_agent(username)
+        result = await agent_manager.delete_agent(username)
         if not result:
             raise HTTPException(
                 status_code=500,
                 detail="删除失败"
             )
 
+        await revoke_agent_tokens(username)
+        if smart_assignment_engine:
+            smart_assignment_engine.forget_agent(agent.id)
+
         print(f"✅ 删除坐席账号: {username}")
 
         return {
@@ -5577,7 +5843,7 @@ async def reset_agent_password(
             raise HTTPException(status_code=500, detail="坐席管理系统未初始化")
 
         # 获取坐席
-        agent = agent_manager.get_agent_by_username(username)
+        agent = await agent_manager.get_agent_by_username(username)
         if not agent:
             raise HTTPException(
                 status_code=404,
@@ -5592,8 +5858,9 @@ async def reset_agent_password(
             )
 
         # 更新密码
-        agent.password_hash = PasswordHasher.hash_password(request.new_password)
-        agent_manager.update_agent(agent)
+        agent.password_hash = await password_hasher.hash_password(request.new_password)
+        await agent_manager.update_agent(agent)
+        await revoke_agent_tokens(username)
 
         print(f"✅ 重置坐席密码: {username}")
 
@@ -5604,6 +5871,8 @@ async def reset_agent_password(
 
     except HTTPException:
         raise
+    except PasswordHasherBusy as e:
+        raise HTTPException(status_code=503, detail=f"PASSWORD_HASH_BUSY: {str(e)}")
     except Exception as e:
         print(f"❌ 重置坐席密码失败: {str(e)}")
         raise HTTPException(
@@ -5651,7 +5920,7 @@ async def change_password(
 
         # 获取当前登录的坐席
         username = agent.get("username")
-        current_agent = agent_manager.get_agent_by_username(username)
+        current_agent = await agent_manager.get_agent_by_username(username)
 
         if not current_agent:
             raise HTTPException(
@@ -5660,7 +5929,7 @@ async def change_password(
             )
 
         # 验证旧密码
-        if not PasswordHasher.verify_password(request.old_password, current_agent.password_hash):
+        if not await password_hasher.verify_password(request.old_password, current_agent.password_hash):
             raise HTTPException(
                 status_code=400,
                 detail="OLD_PASSWORD_INCORRECT: 旧密码不正确"
@@ -5674,25 +5943,32 @@ async def change_password(
             )
 
         # 验证新密码不能与旧密码相同
-        if PasswordHasher.verify_password(request.new_password, current_agent.password_hash):
+        if await password_hasher.verify_password(request.new_password, current_agent.password_hash):
             raise HTTPException(
                 status_code=400,
                 detail="PASSWORD_SAME: 新密码不能与旧密码相同"
             )
 
         # 更新密码
-        current_agent.password_hash = PasswordHasher.hash_password(request.new_password)
-        agent_manager.update_agent(current_agent)
+        current_agent.password_hash = await password_hasher.hash_password(request.new_password)
+        await agent_manager.update_agent(current_agent)
+
+        # 吊销旧 Token（其他设备需重新登录），并为当前设备签发新 Token
+        await revoke_agent_tokens(username)
 
         print(f"✅ 坐席修改密码: {username}")
 
         return {
             "success": True,
-            "message": "密码修改成功"
+            "message": "密码修改成功",
+            "token": agent_token_manager.create_access_token(current_agent),
+            "refresh_token": agent_token_manager.create_refresh_token(current_agent)
         }
 
     except HTTPException:
         raise
+    except PasswordHasherBusy as e:
+        raise HTTPException(status_code=503, detail=f"PASSWORD_HASH_BUSY: {str(e)}")
     except Exception as e:
         print(f"❌ 坐席修改密码失败: {str(e)}")
         raise HTTPException(
@@ -5723,7 +5999,7 @@ async def update_profile(
 
         # 获取当前登录的坐席
         username = agent.get("username")
-        current_agent = agent_manager.get_agent_by_username(username)
+        current_agent = await agent_manager.get_agent_by_username(username)
 
         if not current_agent:
             raise HTTPException(
@@ -5746,7 +6022,7 @@ async def update_profile(
             current_agent.avatar_url = request.avatar_url
 
         # 更新坐席信息
-        agent_manager.update_agent(current_agent)
+        await agent_manager.update_agent(current_agent)
 
         # 返回结果（隐藏密码）
         agent_dict = current_agent.dict()
@@ -5877,7 +6153,7 @@ async def get_quick_reply_stats(
         if not quick_reply_store:
             raise HTTPException(status_code=503, detail="快捷回复系统未初始化")
 
-        stats = quick_reply_store.get_stats()
+        stats = await quick_reply_store.get_stats()
 
         return {
             "success": True,
@@ -5935,7 +6211,7 @@ async def get_quick_replies(
 
         # 关键词搜索
         if keyword:
-            replies = quick_reply_store.search(
+            replies = await quick_reply_store.search(
                 keyword=keyword,
                 agent_id=agent_id,
                 category=category,
@@ -5943,14 +6219,14 @@ async def get_quick_replies(
             )
         # 按分类查询
         elif category:
-            replies = quick_reply_store.list_by_category(
+            replies = await quick_reply_store.list_by_category(
                 category=category,
                 limit=limit,
                 offset=offset
             )
         # 按坐席查询
         elif agent_id:
-            replies = quick_reply_store.list_by_agent(
+            replies = await quick_reply_store.list_by_agent(
                 agent_id=agent_id,
                 include_shared=include_shared,
                 limit=limit,
@@ -5958,7 +6234,7 @@ async def get_quick_replies(
             )
         # 获取全部
         else:
-            replies = quick_reply_store.list_all(limit=limit, offset=offset)
+            replies = await quick_reply_store.list_all(limit=limit, offset=offset)
 
         return {
             "success": True,
@@ -6040,7 +6316,7 @@ async def create_quick_reply(
         )
 
         # 保存到存储
-        created = quick_reply_store.create(quick_reply)
+        created = await quick_reply_store.create(quick_reply)
 
         print(f"✅ 创建快捷回复: {created.id} by {agent.get('username')}")
 
@@ -6078,7 +6354,7 @@ async def get_quick_reply(
         if not quick_reply_store:
             raise HTTPException(status_code=503, detail="快捷回复系统未初始化")
 
-        reply = quick_reply_store.get(reply_id)
+        reply = await quick_reply_store.get(reply_id)
 
         if not reply:
             raise HTTPException(
@@ -6136,7 +6412,7 @@ async def update_quick_reply(
             raise HTTPException(status_code=503, detail="快捷回复系统未初始化")
 
         # 获取原快捷回复
-        reply = quick_reply_store.get(reply_id)
+        reply = await quick_reply_store.get(reply_id)
 
         if not reply:
             raise HTTPException(
@@ -6178,7 +6454,7 @@ async def update_quick_reply(
             updates["is_shared"] = request["is_shared"]
 
         # 更新
-        updated = quick_reply_store.update(reply_id, updates)
+        updated = await quick_reply_store.update(reply_id, updates)
 
         if not updated:
             raise HTTPException(
@@ -6227,7 +6503,7 @@ async def delete_quick_reply(
             raise HTTPException(status_code=503, detail="快捷回复系统未初始化")
 
         # 获取快捷回复
-        reply = quick_reply_store.get(reply_id)
+        reply = await quick_reply_store.get(reply_id)
 
         if not reply:
             raise HTTPException(
@@ -6243,7 +6519,7 @@ async def delete_quick_reply(
             )
 
         # 删除
-        result = quick_reply_store.delete(reply_id)
+        result = await quick_reply_store.delete(reply_id)
 
         if not result:
             raise HTTPException(
@@ -6297,7 +6573,7 @@ async def use_quick_reply(
             raise HTTPException(status_code=503, detail="快捷回复系统未初始化")
 
         # 获取快捷回复
-        reply = quick_reply_store.get(reply_id)
+        reply = await quick_reply_store.get(reply_id)
 
         if not reply:
             raise HTTPException(
@@ -6319,7 +6595,7 @@ async def use_quick_reply(
         )
 
         # 增加使用次数
-        quick_reply_store.increment_usage(reply_id)
+        await quick_reply_store.increment_usage(reply_id)
 
         print(f"✅ 使用快捷回复: {reply_id} by {agent.get('username')}")
 
@@ -6815,27 +7091,26 @@ async def respond_transfer_request(
         append_history(record)
 
         # 推送 SSE
-        if session_name in sse_queues:
-            await sse_queues[session_name].put({
-                "type": "manual_message",
-                "role": "system",
-                "content": system_message.content,
-                "timestamp": system_message.timestamp
-            })
-            await sse_queues[session_name].put({
-                "type": "status_change",
-                "status": "manual_live",
-                "agent_info": {
-                    "agent_id": to_agent_id,
-                    "agent_name": to_agent_name
-                },
-                "reason": "transferred",
-                "timestamp": int(time.time())
-            })
+        await event_bus.publish(session_name, {
+            "type": "manual_message",
+            "role": "system",
+            "content": system_message.content,
+            "timestamp": system_message.timestamp
+        })
+        await event_bus.publish(session_name, {
+            "type": "status_change",
+            "status": "manual_live",
+            "agent_info": {
+                "agent_id": to_agent_id,
+                "agent_name": to_agent_name
+            },
+            "reason": "transferred",
+            "timestamp": int(time.time())
+        })
 
         if agent_manager:
-            agent_manager.update_last_active(from_agent_id)
-            agent_manager.update_last_active(to_agent_id)
+            await agent_manager.update_last_active(from_agent_id)
+            await agent_manager.update_last_active(to_agent_id)
 
         return {
             "success": True,
@@ -6871,7 +7146,7 @@ async def create_assist_request(
     """
     try:
         # 验证协助者是否存在
-        assistant_agent = agent_manager.get_agent_by_username(request.assistant)
+        assistant_agent = await agent_manager.get_agent_by_username(request.assistant)
         if not assistant_agent:
             raise HTTPException(
                 status_code=404,
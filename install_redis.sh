@@ -47,6 +47,15 @@ echo ""
 echo "Redis 版本:"
 redis-cli --version
 
+# 最低支持版本 5.0（会话 / 工单 / 坐席的 Lua 脚本只使用 5.0 已有的命令）
+REDIS_MIN_MAJOR=5
+REDIS_SERVER_VERSION=$(redis-cli info server | grep '^redis_version:' | cut -d: -f2 | tr -d '\r')
+if [ -n "$REDIS_SERVER_VERSION" ] && [ "${REDIS_SERVER_VERSION%%.*}" -lt "$REDIS_MIN_MAJOR" ]; then
+    echo "❌ Redis 服务端版本 $REDIS_SERVER_VERSION 过低，需要 $REDIS_MIN_MAJOR.0 或更高版本"
+    exit 1
+fi
+echo "Redis 服务端版本: ${REDIS_SERVER_VERSION:-未知}（最低要求 $REDIS_MIN_MAJOR.0）"
+
 echo ""
 echo "Redis 服务状态:"
 sudo systemctl status redis-server --no-pager | head -n 10
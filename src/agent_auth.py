@@ -14,12 +14,15 @@
 
 import jwt
 import bcrypt
+import hashlib
 import time
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from pydantic import BaseModel, Field, field_validator
 from enum import Enum
 
+from src.bounded_cache import BoundedCache
+
 
 # ====================
 # 数据模型定义
@@ -41,6 +44,10 @@ class AgentStatus(str, Enum):
     OFFLINE = "offline"    # 离线
 
 
+# 需要心跳保活的状态（超时后自动离线）
+PRESENT_STATUSES = frozenset({AgentStatus.ONLINE, AgentStatus.BUSY})
+
+
 class AgentSkillLevel(str, Enum):
     """坐席技能熟练度"""
     JUNIOR = "junior"
@@ -127,6 +134,7 @@ class TokenPayload(BaseModel):
     role: AgentRole
     exp: float  # 过期时间（Unix 时间戳）
     iat: float  # 签发时间
+    rev: int = 0  # 签发时坐席的吊销纪元
 
 
 # ====================
@@ -159,6 +167,27 @@ class PasswordHasher:
 # JWT Token 管理器
 # ====================
 
+# 清理吊销记录时在 Token 有效期之外额外保留的秒数（容忍各节点间的时钟偏差与吊销同步延迟）
+REVOCATION_CLOCK_SKEW = 300
+
+
+def next_revocation_epoch(current: float, now: Optional[float] = None) -> int:
+    """
+    计算下一个吊销纪元
+
+    纪元取吊销时刻的毫秒时间戳，且严格大于当前纪元（节点时钟落后或回拨时仍递增）
+
+    Args:
+        current: 当前纪元（无记录时为 0）
+        now: 当前时间（默认 time.time()）
+
+    Returns:
+        新纪元
+    """
+    now = time.time() if now is None else now
+    return max(int(current) + 1, int(now * 1000))
+
+
 class AgentTokenManager:
     """坐席 JWT Token 管理器"""
 
@@ -167,13 +196,21 @@ class AgentTokenManager:
         secret_key: str,
         algorithm: str = "HS256",
         access_token_expire_minutes: int = 60,  # 访问Token 1小时
-        refresh_token_expire_days: int = 7  # 刷新Token 7天
+        refresh_token_expire_days: int = 7,  # 刷新Token 7天
+        verified_cache_size: int = 10000
     ):
         self.secret_key = secret_key
         self.algorithm = algorithm
         self.access_token_expire = timedelta(minutes=access_token_expire_minutes)
         self.refresh_token_expire = timedelta(days=refresh_token_expire_days)
 
+        # 已验证 Token 缓存：{sha256(token): payload}，条目在 Token exp 时过期
+        # 工作台每秒多次轮询，命中缓存时鉴权只需一次字典查找，无需 JWT 解码与 HMAC 校验
+        self._verified = BoundedCache("verified_jwt", max_entries=verified_cache_size)
+        # 吊销纪元：{username: 纪元}，签发时把坐席当前纪元写入 Token（rev），rev 小于当前纪元的 Token 均视为无效
+        # 只比较纪元先后，不比较签发节点与吊销节点的时钟（iat），节点间时钟偏差不影响吊销结果
+        self._revocation_epochs: Dict[str, int] = {}
+
     def create_access_token(self, agent: Agent) -> str:
         """
         生成访问 Token
@@ -194,7 +231,8 @@ class AgentTokenManager:
             "username": agent.username,
             "role": agent.role.value,
             "iat": now,
-            "exp": expire
+            "exp": expire,
+            "rev": self._revocation_epochs.get(agent.username, 0)
         }
 
         token = jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
@@ -219,7 +257,8 @@ class AgentTokenManager:
             "username": agent.username,
             "type": "refresh",
             "iat": now,
-            "exp": expire
+            "exp": expire,
+            "rev": self._revocation_epochs.get(agent.username, 0)
         }
 
         token = jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
@@ -233,21 +272,84 @@ class AgentTokenManager:
             token: JWT Token 字符串
 
         Returns:
-            Token 载荷（验证成功）或 None（验证失败）
+            Token 载荷（验证成功）或 None（验证失败或已吊销）
         """
-        try:
-            payload = jwt.decode(
-                token,
-                self.secret_key,
-                algorithms=[self.algorithm]
-            )
-            return payload
-        except jwt.ExpiredSignatureError:
-            # Token 已过期
-            return None
-        except jwt.InvalidTokenError:
-            # Token 无效
+        digest = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        payload = self._verified.get(digest)
+        if payload is None:
+            try:
+                payload = jwt.decode(
+                    token,
+                    self.secret_key,
+                    algorithms=[self.algorithm]
+                )
+            except jwt.ExpiredSignatureError:
+                # Token 已过期
+                return None
+            except jwt.InvalidTokenError:
+                # Token 无效
+                return None
+            self._verified.set(digest, payload, expires_at=payload.get("exp"))
+
+        if self._is_revoked(payload):
             return None
+        return dict(payload)
+
+    def _is_revoked(self, payload: Dict[str, Any]) -> bool:
+        epoch = self._revocation_epochs.get(payload.get("username"))
+        return epoch is not None and payload.get("rev", 0) < epoch
+
+    def revoke_agent_tokens(self, username: str, epoch: Optional[int] = None) -> int:
+        """
+        吊销坐席在此之前签发的全部 Token（登出、修改密码、删除账号时调用）
+
+        Args:
+            username: 坐席用户名
+            epoch: 吊销纪元（默认由本地纪元递增得到；多 worker 部署时传入 Redis 中记录的纪元）
+
+        Returns:
+            吊销纪元
+        """
+        current = self._revocation_epochs.get(username, 0)
+        epoch = next_revocation_epoch(current) if epoch is None else epoch
+        self._revocation_epochs[username] = max(epoch, current)
+        return epoch
+
+    def merge_revocations(self, revocations: Dict[str, int]):
+        """合并其他 worker 的吊销记录（取较大的纪元）"""
+        for username, epoch in revocations.items():
+            if epoch > self._revocation_epochs.get(username, 0):
+                self._revocation_epochs[username] = epoch
+
+    def revocation_cutoff(self, now: Optional[float] = None) -> int:
+        """
+        可清理的吊销纪元上限
+
+        早于该纪元的吊销记录之前签发的 Token（访问与刷新 Token 均受吊销约束，按较长的有效期计算）
+        都已过期，另留 REVOCATION_CLOCK_SKEW 秒余量
+
+        Returns:
+            纪元（毫秒时间戳）
+        """
+        now = time.time() if now is None else now
+        retention = max(self.access_token_expire, self.refresh_token_expire).total_seconds()
+        return int((now - retention - REVOCATION_CLOCK_SKEW) * 1000)
+
+    def prune_revocations(self, cutoff: Optional[int] = None) -> int:
+        """
+        清理早于 cutoff 的本地吊销记录
+
+        Returns:
+            清理条数
+        """
+        cutoff = self.revocation_cutoff() if cutoff is None else cutoff
+        expired = [username for username, epoch in self._revocation_epochs.items() if epoch < cutoff]
+        for username in expired:
+            del self._revocation_epochs[username]
+        return len(expired)
+
+    def verified_cache_stats(self) -> Dict[str, Any]:
+        return {**self._verified.stats(), "revoked_agents": len(self._revocation_epochs)}
 
     def decode_token(self, token: str) -> Optional[TokenPayload]:
         """
@@ -275,20 +377,107 @@ class AgentTokenManager:
 # 坐席账号管理器
 # ====================
 
+# 原子领取心跳超时的在线坐席：取出 score <= cutoff 的成员并从在线集合移除，
+# 多个 worker 同时巡检时每个坐席只会被其中一个领取
+# KEYS[1]=在线集合  ARGV[1]=cutoff  ARGV[2]=单次上限
+# 返回 [username, last_heartbeat, ...]
+CLAIM_IDLE_PRESENCE_LUA = """
+local idle = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'WITHSCORES', 'LIMIT', 0, ARGV[2])
+if #idle > 0 then
+    local members = {}
+    for i = 1, #idle, 2 do
+        members[#members + 1] = idle[i]
+    end
+    redis.call('ZREM', KEYS[1], unpack(members))
+end
+return idle
+"""
+
+# 记录吊销纪元：严格大于已记录的纪元，各 worker 并发吊销同一坐席时纪元仍单调递增
+# KEYS[1]=吊销记录  ARGV[1]=username  ARGV[2]=本地计算的纪元
+# 返回实际写入的纪元
+RECORD_REVOCATION_LUA = """
+local current = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0')
+local epoch = math.max(current + 1, tonumber(ARGV[2]))
+redis.call('HSET', KEYS[1], ARGV[1], string.format('%d', epoch))
+return epoch
+"""
+
+# 旧版本按秒记录吊销时刻，小于该值的记录换算为毫秒纪元
+LEGACY_REVOCATION_LIMIT = 1e11
+
+# 在线集合分数只前移：记录中的 last_active_at 可能早于心跳写入的分数，不能把心跳时间回拨
+# （等价于 ZADD GT，但 GT 需要 Redis 6.2，发行版自带的 5.0 / 6.0 不支持）
+# KEYS[1]=在线集合  ARGV[1]=username  ARGV[2]=last_active_at
+# 返回 1 已更新 / 0 分数未前移
+ADVANCE_PRESENCE_LUA = """
+local current = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if current and tonumber(current) >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+return 1
+"""
+
+
+def _apply_presence(agent: Agent, last_heartbeat) -> Agent:
+    """用在线集合中的心跳时间覆盖坐席 JSON 中的 last_active_at（取较新者）"""
+    if last_heartbeat is not None and float(last_heartbeat) > (agent.last_active_at or 0):
+        agent.last_active_at = float(last_heartbeat)
+    return agent
+
+
+class _AgentSnapshot:
+    """进程内坐席快照（按注册表版本号失效）"""
+
+    __slots__ = ("version", "agents", "presence", "checked_at")
+
+    def __init__(self, version: str, agents: List[Agent], presence: Dict[str, float], checked_at: float):
+        self.version = version
+        self.agents = agents
+        self.presence = presence
+        self.checked_at = checked_at
+
+    def copy_agents(self) -> List[Agent]:
+        return [
+            _apply_presence(agent.model_copy(deep=True), self.presence.get(agent.username))
+            for agent in self.agents
+        ]
+
+
 class AgentManager:
     """坐席账号管理器（基于 Redis 存储）"""
 
-    def __init__(self, redis_store):
+    def __init__(self, redis_store=None, *, redis_client=None, snapshot_ttl: float = 1.0):
         """
         初始化坐席管理器
 
+        坐席记录除 agent:{username} 外，还维护一份注册表，列出全部坐席无需 SCAN 整个 keyspace:
+        - agent_registry          Hash {username: 坐席 JSON}
+        - agent_registry:ids      Set  坐席 ID（按 ID 查询的快速否定判断）
+        - agent_registry:version  每次写入自增的版本号，各 worker 据此判断进程内快照是否过期
+        - agent_presence          ZSet {username: 最近心跳时间}，仅包含在线/忙碌坐席；
+                                  心跳只执行一次 ZADD，不改写坐席 JSON，也不使快照失效
+
         Args:
-            redis_store: Redis 存储实例
+            redis_store: Redis 存储实例（使用其 redis 客户端）
+            redis_client: 同步 Redis 客户端（优先于 redis_store）
+            snapshot_ttl: 进程内坐席快照免校验秒数（期间不访问 Redis，0 表示每次校验版本号）
         """
-        self.redis = redis_store.redis
+        self.redis = redis_client if redis_client is not None else redis_store.redis
         self.key_prefix = "agent:"
         self.id_index_prefix = "agent_id:"
+        self.registry_key = "agent_registry"
+        self.registry_ids_key = "agent_registry:ids"
+        self.registry_version_key = "agent_registry:version"
+        self.presence_key = "agent_presence"
+        self.token_revocation_key = "agent_token_revocations"
         self.default_ttl = 86400 * 365  # 1年
+        self.snapshot_ttl = snapshot_ttl
+        self._snapshot: Optional[_AgentSnapshot] = None
+        self._claim_idle_script = self.redis.register_script(CLAIM_IDLE_PRESENCE_LUA)
+        self._advance_presence_script = self.redis.register_script(ADVANCE_PRESENCE_LUA)
+        self._record_revocation_script = self.redis.register_script(RECORD_REVOCATION_LUA)
 
     def _username_key(self, username: str) -> str:
         return f"{self.key_prefix}{username}"
@@ -297,10 +486,24 @@ class AgentManager:
         return f"{self.id_index_prefix}{agent_id}"
 
     def _store_agent_record(self, agent: Agent):
-        """将坐席信息写入Redis并刷新索引"""
+        """将坐席信息写入Redis并刷新索引与注册表"""
         data = agent.json()
-        self.redis.set(self._username_key(agent.username), data, ex=self.default_ttl)
-        self.redis.set(self._id_index_key(agent.id), agent.username, ex=self.default_ttl)
+        pipe = self.redis.pipeline()
+        pipe.set(self._username_key(agent.username), data, ex=self.default_ttl)
+        pipe.set(self._id_index_key(agent.id), agent.username, ex=self.default_ttl)
+        pipe.hset(self.registry_key, agent.username, data)
+        pipe.sadd(self.registry_ids_key, agent.id)
+        pipe.incr(self.registry_version_key)
+        if agent.status in PRESENT_STATUSES:
+            self._advance_presence_script(
+                keys=[self.presence_key],
+                args=[agent.username, agent.last_active_at],
+                client=pipe
+            )
+        else:
+            pipe.zrem(self.presence_key, agent.username)
+        pipe.execute()
+        self._snapshot = None
 
     def create_agent(
         self,
@@ -308,7 +511,8 @@ class AgentManager:
         password: str,
         name: str,
         role: AgentRole = AgentRole.AGENT,
-        max_sessions: int = 5
+        max_sessions: int = 5,
+        password_hash: Optional[str] = None
     ) -> Agent:
         """
         创建坐席账号
@@ -319,6 +523,7 @@ class AgentManager:
             name: 显示名称
             role: 角色
             max_sessions: 最大同时服务会话数
+            password_hash: 已计算好的密码哈希（异步接口在 bcrypt 线程池中预先计算）
 
         Returns:
             创建的坐席账号
@@ -327,7 +532,8 @@ class AgentManager:
         agent_id = f"agent_{int(time.time() * 1000)}"
 
         # 加密密码
-        password_hash = PasswordHasher.hash_password(password)
+        if password_hash is None:
+            password_hash = PasswordHasher.hash_password(password)
 
         # 创建坐席对象
         agent = Agent(
@@ -354,11 +560,13 @@ class AgentManager:
         Returns:
             坐席账号或 None
         """
-        key = self._username_key(username)
-        data = self.redis.get(key)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.get(self._username_key(username))
+        pipe.zscore(self.presence_key, username)
+        data, last_heartbeat = pipe.execute()
 
         if data:
-            return Agent.parse_raw(data)
+            return _apply_presence(Agent.parse_raw(data), last_heartbeat)
         return None
 
     def get_agent_by_id(self, agent_id: str) -> Optional[Agent]:
@@ -374,15 +582,10 @@ class AgentManager:
                 username = username.decode("utf-8")
             return self.get_agent_by_username(username)
 
-        # 兼容旧数据：扫描所有坐席
-        for key in self.redis.scan_iter(f"{self.key_prefix}*", count=100):
-            data = self.redis.get(key)
-            if not data:
-                continue
-            try:
-                agent = Agent.parse_raw(data)
-            except Exception:
-                continue
+        # ID 索引缺失：注册表中不存在该 ID 时直接返回，否则从坐席快照中查找并修复索引
+        if self.redis.exists(self.registry_version_key) and not self.redis.sismember(self.registry_ids_key, agent_id):
+            return None
+        for agent in self.get_all_agents():
             if agent.id == agent_id:
                 self.redis.set(self._id_index_key(agent_id), agent.username, ex=self.default_ttl)
                 return agent
@@ -417,7 +620,15 @@ class AgentManager:
         if not PasswordHasher.verify_password(password, agent.password_hash):
             return None
 
-        # 更新最后登录时间
+        return self.record_login(agent)
+
+    def record_login(self, agent: Agent) -> Agent:
+        """
+        记录登录成功（更新最后登录时间并置为在线）
+
+        Args:
+            agent: 已通过密码验证的坐席账号
+        """
         agent.last_login = time.time()
         agent.status = AgentStatus.ONLINE
         agent.status_note = None
@@ -456,19 +667,44 @@ class AgentManager:
         """
         更新坐席最近活跃时间
 
+        在线/忙碌坐席只更新在线集合中的心跳时间（一次 ZADD XX）；
+        不在集合中时回退读取坐席：离线坐席不记录心跳，旧数据中的在线坐席补写入集合。
+
         Args:
             username: 用户名
 
         Returns:
             float: 更新时间戳或 None（坐席不存在）
         """
+        now = time.time()
+        if self.redis.zadd(self.presence_key, {username: now}, xx=True, ch=True):
+            return now
+
         agent = self.get_agent_by_username(username)
         if not agent:
             return None
+        if agent.status in PRESENT_STATUSES:
+            agent.last_active_at = now
+            self.update_agent(agent)
+        return now
 
-        agent.last_active_at = time.time()
-        self.update_agent(agent)
-        return agent.last_active_at
+    def claim_idle_agents(self, cutoff: float, limit: int = 1000) -> List[Tuple[str, float]]:
+        """
+        领取最近心跳早于 cutoff 的在线/忙碌坐席（原子地从在线集合移除）
+
+        Args:
+            cutoff: 心跳截止时间戳
+            limit: 单次领取上限
+
+        Returns:
+            [(username, 最近心跳时间)]
+        """
+        idle = self._claim_idle_script(keys=[self.presence_key], args=[cutoff, limit])
+        claimed = []
+        for i in range(0, len(idle), 2):
+            username = idle[i].decode("utf-8") if isinstance(idle[i], bytes) else idle[i]
+            claimed.append((username, float(idle[i + 1])))
+        return claimed
 
     def get_all_agents(self) -> list:
         """
@@ -477,16 +713,88 @@ class AgentManager:
         Returns:
             坐席列表
         """
+        return self.get_agents_snapshot()[1]
+
+    def get_agents_snapshot(self) -> Tuple[Optional[str], List[Agent]]:
+        """
+        获取所有坐席及注册表版本号
+
+        快照在 snapshot_ttl 内直接返回（零次 Redis 访问）；之后校验注册表版本号（同时读取在线集合），
+        未变化时续期快照，变化时在一次 MULTI 中读取版本号与全部坐席。
+        返回的是快照的深拷贝，调用方可以修改。
+        版本号相同则坐席记录（技能、角色等）未变化，调用方可据此复用派生数据（如技能标签索引）。
+
+        Returns:
+            (注册表版本号, 坐席列表)；注册表刚重建时版本号为 None
+        """
+        snapshot = self._snapshot
+        now = time.time()
+        if snapshot is not None and now - snapshot.checked_at < self.snapshot_ttl:
+            return snapshot.version, snapshot.copy_agents()
+
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.get(self.registry_version_key)
+        pipe.zrange(self.presence_key, 0, -1, withscores=True)
+        version, presence = pipe.execute()
+        presence = self._decode_presence(presence)
+        if version is None:
+            agents = self.rebuild_registry()
+            return None, [_apply_presence(agent, presence.get(agent.username)) for agent in agents]
+        if snapshot is not None and snapshot.version == str(version):
+            snapshot.presence = presence
+            snapshot.checked_at = now
+            return snapshot.version, snapshot.copy_agents()
+
+        pipe = self.redis.pipeline()
+        pipe.get(self.registry_version_key)
+        pipe.hvals(self.registry_key)
+        version, values = pipe.execute()
+        snapshot = _AgentSnapshot(str(version), self._parse_agents(values), presence, now)
+        self._snapshot = snapshot
+        return snapshot.version, snapshot.copy_agents()
+
+    @staticmethod
+    def _decode_presence(presence) -> Dict[str, float]:
+        return {
+            (username.decode("utf-8") if isinstance(username, bytes) else username): float(score)
+            for username, score in presence
+        }
+
+    @staticmethod
+    def _parse_agents(values) -> List[Agent]:
+        agents = []
+        for data in values:
+            try:
+                agents.append(Agent.parse_raw(data))
+            except Exception:
+                pass
+        return agents
+
+    def rebuild_registry(self) -> List[Agent]:
+        """
+        从 agent:* 记录重建注册表（兼容旧数据，注册表版本号不存在时自动执行一次）
+
+        Returns:
+            重建后的坐席列表
+        """
         agents = []
-        # 使用 SCAN 遍历所有坐席 key
         for key in self.redis.scan_iter(f"{self.key_prefix}*", count=100):
             data = self.redis.get(key)
             if data:
                 try:
-                    agent = Agent.parse_raw(data)
-                    agents.append(agent)
+                    agents.append(Agent.parse_raw(data))
                 except Exception:
                     pass
+
+        pipe = self.redis.pipeline()
+        pipe.delete(self.registry_key, self.registry_ids_key)
+        for agent in agents:
+            pipe.hset(self.registry_key, agent.username, agent.json())
+            pipe.sadd(self.registry_ids_key, agent.id)
+        pipe.incr(self.registry_version_key)
+        pipe.execute()
+        self._snapshot = None
+        print(f"✅ 坐席注册表已重建: {len(agents)} 个坐席")
         return agents
 
     def delete_agent(self, username: str) -> bool:
@@ -501,11 +809,62 @@ class AgentManager:
         """
         key = self._username_key(username)
         agent = self.get_agent_by_username(username)
-        result = self.redis.delete(key)
+        pipe = self.redis.pipeline()
+        pipe.delete(key)
         if agent:
-            self.redis.delete(self._id_index_key(agent.id))
+            pipe.delete(self._id_index_key(agent.id))
+            pipe.srem(self.registry_ids_key, agent.id)
+        pipe.hdel(self.registry_key, username)
+        pipe.zrem(self.presence_key, username)
+        pipe.incr(self.registry_version_key)
+        result = pipe.execute()[0]
+        self._snapshot = None
         return result > 0
 
+    def record_token_revocation(self, username: str, epoch: int) -> int:
+        """
+        记录 Token 吊销纪元（供其他 worker 同步）
+
+        Args:
+            username: 坐席用户名
+            epoch: 本地计算的纪元
+
+        Returns:
+            实际写入的纪元（不小于已记录纪元 + 1）
+        """
+        return int(self._record_revocation_script(keys=[self.token_revocation_key], args=[username, epoch]))
+
+    @staticmethod
+    def _parse_revocation_epoch(value) -> int:
+        epoch = float(value)
+        if epoch < LEGACY_REVOCATION_LIMIT:
+            epoch *= 1000
+        return int(epoch)
+
+    def get_token_revocation(self, username: str) -> int:
+        """读取坐席当前吊销纪元（签发 Token 前调用，无记录时为 0）"""
+        value = self.redis.hget(self.token_revocation_key, username)
+        return 0 if value is None else self._parse_revocation_epoch(value)
+
+    def get_token_revocations(self, min_epoch: int = 0) -> Dict[str, int]:
+        """
+        读取 Token 吊销记录，并清理早于 min_epoch 的记录（此前签发的 Token 均已过期）
+
+        Returns:
+            {username: 吊销纪元}
+        """
+        revocations: Dict[str, int] = {}
+        expired = []
+        for username, value in self.redis.hgetall(self.token_revocation_key).items():
+            epoch = self._parse_revocation_epoch(value)
+            if epoch < min_epoch:
+                expired.append(username)
+            else:
+                revocations[username] = epoch
+        if expired:
+            self.redis.hdel(self.token_revocation_key, *expired)
+        return revocations
+
     def count_admins(self) -> int:
         """
         统计管理员数量
@@ -0,0 +1,122 @@
+"""
+Redis 会话状态存储实现（asyncio 原生版本）
+
+RedisSessionStore 虽然对外暴露 async 接口，但内部使用同步 redis.Redis 客户端，
+每次 get/save/smembers 都会阻塞 uvicorn 事件循环，并拖慢同一进程内所有 SSE 连接。
+
+本模块基于 redis.asyncio 实现同一套 SessionStateStore 接口：
+1. 独立的异步连接池，所有网络 I/O 都通过 await 让出事件循环
+2. 数据结构（session:{name} / session_history:{name} / session_summary:{name} /
+   status:{status} / session_idx:*）与 RedisSessionStore 完全一致，可直接切换
+3. 由 backend.py 的 lifespan() 根据 REDIS_ASYNC 配置选择
+
+Key 构造、脚本参数、结果解析和读写流程由 RedisSessionStoreBase 提供，本模块只实现
+asyncio 客户端的 I/O 原语和连接管理。
+
+遵守约束16：生产环境安全性与稳定性要求
+"""
+
+import logging
+from typing import Any, Callable, Optional, List
+
+import redis.asyncio as aioredis
+
+from src.payload_codec import PayloadCodec, get_codec
+from src.redis_session_store import MGET_BATCH_SIZE, RedisSessionStoreBase
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRedisSessionStore(RedisSessionStoreBase):
+    """
+    Redis 会话状态存储（asyncio 原生实现）
+
+    设计原则：
+    1. ✅ 非阻塞 - 基于 redis.asyncio，不占用事件循环
+    2. ✅ 资源限制 - 独立连接池，限制最大连接数
+    3. ✅ 数据过期 - 所有会话数据设置 TTL（24小时）
+    4. ✅ 错误处理 - 所有 Redis 操作都有异常处理
+    5. ✅ 兼容性 - 与 RedisSessionStore 共用 Key 结构和 RedisSessionStoreBase 的实现
+
+    使用方式:
+        store = AsyncRedisSessionStore(redis_url=...)
+        await store.connect()   # 验证连接
+        ...
+        await store.close()     # 关闭连接池
+    """
+
+    def __init__(
+        self,
+        redis_url: str = "redis://localhost:6379/0",
+        max_connections: int = 50,
+        socket_timeout: float = 5.0,
+        socket_connect_timeout: float = 5.0,
+        default_ttl: int = 86400,  # 24小时
+        codec: Optional[PayloadCodec] = None,
+        pool_timeout: float = 5.0
+    ):
+        """
+        初始化异步连接池（不会发起网络请求，需调用 connect() 验证连接）
+
+        Args:
+            redis_url: Redis 连接地址
+            max_connections: 最大连接数（约束16.1.3 - 限制连接数）
+            socket_timeout: Socket 超时时间（约束16.3.2 - 超时保护）
+            socket_connect_timeout: 连接超时时间
+            default_ttl: 默认过期时间（秒），约束16.1.1 - 必须设置 TTL
+            codec: 会话数据编解码器（默认 json 旧格式，读取时自动识别所有格式）
+            pool_timeout: 连接全部占用时等待空闲连接的秒数，超时抛出 ConnectionError
+        """
+        self.redis_url = redis_url
+        self.max_connections = max_connections
+        self.default_ttl = default_ttl
+        self.codec = codec or get_codec("json")
+
+        # 创建异步连接池（约束16.1.3 - 数据库连接池；连接用尽时等待空闲连接，而不是直接报 Too many connections）
+        self.pool = aioredis.BlockingConnectionPool.from_url(
+            redis_url,
+            max_connections=max_connections,
+            timeout=pool_timeout,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_connect_timeout,
+            decode_responses=True  # 自动解码为字符串
+        )
+        self.redis = aioredis.Redis(connection_pool=self.pool)
+        self._register_scripts()
+
+    async def connect(self) -> "AsyncRedisSessionStore":
+        """
+        验证 Redis 连接
+
+        Returns:
+            AsyncRedisSessionStore: 自身，便于链式调用
+
+        Raises:
+            Exception: 连接失败时抛出
+        """
+        try:
+            await self.redis.ping()
+            logger.info(f"✅ Redis(asyncio) 连接成功: {self.redis_url} (连接池大小: {self.max_connections})")
+            return self
+        except Exception as e:
+            logger.error(f"❌ Redis(asyncio) 连接失败: {e}")
+            raise
+
+    async def close(self):
+        """关闭连接池（应用关闭时调用）"""
+        try:
+            await self.redis.aclose()
+            await self.pool.disconnect()
+        except Exception as e:
+            logger.warning(f"⚠️ 关闭 Redis(asyncio) 连接池失败: {e}")
+
+    async def _io(self, result):
+        return await result
+
+    async def _pipeline(self, queue: Callable[[Any], None], transaction: bool = False) -> list:
+        async with self.redis.pipeline(transaction=transaction) as pipe:
+            queue(pipe)
+            return await pipe.execute()
+
+    async def _scan(self, pattern: str, count: int = MGET_BATCH_SIZE) -> List[str]:
+        return [key async for key in self.redis.scan_iter(pattern, count=count)]
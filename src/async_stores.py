@@ -0,0 +1,98 @@
+"""
+同步存储的异步适配层
+
+TicketStore / AgentManager / QuickReplyStore / AuditLogStore / TicketTemplateStore
+使用同步 redis.Redis 客户端。它们在 FastAPI 请求处理函数中被直接调用时，
+每一次 Redis 往返都会阻塞事件循环。
+
+本模块为这些存储提供异步版本：
+1. 方法调用被投递到有界线程池执行，事件循环只负责 await 结果
+2. 线程池大小即每个 worker 的最大并发 Redis 调用数（约束16.1.3 - 限制资源）
+3. 业务逻辑仍只在同步存储中实现一份，适配层不复制任何逻辑
+
+使用方式:
+    executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="redis-io")
+    ticket_store = AsyncTicketStore(TicketStore(redis_client), executor)
+    ticket = await ticket_store.get("TKT-1")
+"""
+
+import asyncio
+import functools
+from concurrent.futures import Executor
+from typing import Any, Callable, Optional
+
+from src.agent_auth import AgentManager
+from src.audit_log import AuditLogStore
+from src.quick_reply_store import QuickReplyStore
+from src.ticket_store import TicketStore
+from src.ticket_template import TicketTemplateStore
+
+
+class AsyncStoreAdapter:
+    """
+    将同步存储包装为异步接口
+
+    - 访问可调用属性时返回协程函数，调用时在线程池中执行原方法
+    - 访问普通属性（如 redis、key_prefix）时直接返回原值
+    """
+
+    def __init__(self, store: Any, executor: Optional[Executor] = None):
+        """
+        Args:
+            store: 被包装的同步存储实例
+            executor: 执行同步调用的线程池，None 时使用事件循环默认线程池
+        """
+        self.store = store
+        self.executor = executor
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """在线程池中执行任意同步函数（用于需要组合多次 Redis 调用的场景）"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor,
+            functools.partial(func, *args, **kwargs)
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.store, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+
+        return call
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.store!r})"
+
+
+class AsyncTicketStore(AsyncStoreAdapter):
+    """TicketStore 的异步版本"""
+
+    store: TicketStore
+
+
+class AsyncAgentManager(AsyncStoreAdapter):
+    """AgentManager 的异步版本"""
+
+    store: AgentManager
+
+
+class AsyncQuickReplyStore(AsyncStoreAdapter):
+    """QuickReplyStore 的异步版本"""
+
+    store: QuickReplyStore
+
+
+class AsyncAuditLogStore(AsyncStoreAdapter):
+    """AuditLogStore 的异步版本"""
+
+    store: AuditLogStore
+
+
+class AsyncTicketTemplateStore(AsyncStoreAdapter):
+    """TicketTemplateStore 的异步版本"""
+
+    store: TicketTemplateStore
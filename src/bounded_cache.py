@@ -0,0 +1,211 @@
+"""
+有界 LRU/TTL 缓存
+
+OAuthTokenManager._token_cache 与 backend.py 中的 conversation_cache 原先是普通 dict，
+每个访客一条记录且永不清理，长时间运行的 worker 内存持续增长，重启后映射全部丢失。
+
+BoundedCache 提供:
+1. LRU 淘汰       - 超过 max_entries 时淘汰最久未访问的条目
+2. TTL 过期       - 每个条目独立的过期时刻（可对齐 token expires_at / REDIS_SESSION_TTL）
+3. 命中统计       - hits / misses / evictions / expirations
+4. Redis 写穿透层 - 可选，aget()/aset() 在本地未命中时读 Redis、写入时同步写 Redis，
+                    多 worker 共享且重启不丢失（值需可 JSON 序列化）
+
+使用方式:
+    cache = BoundedCache("conversation", max_entries=10000, default_ttl=86400)
+    cache.attach_redis(async_redis, key_prefix="conversation_map:")
+    await cache.aset("session_1", "conv_1")
+    conversation_id = await cache.aget("session_1")
+"""
+
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+_MISSING = object()
+
+
+class BoundedCache:
+    """线程不安全：仅在事件循环线程中使用"""
+
+    def __init__(self, name: str, max_entries: int = 10000, default_ttl: Optional[float] = None):
+        """
+        Args:
+            name: 缓存名称（用于日志与统计）
+            max_entries: 最大条目数
+            default_ttl: 默认存活秒数（None 表示不过期，仅按 LRU 淘汰）
+        """
+        if max_entries <= 0:
+            raise ValueError("max_entries 必须大于 0")
+        self.name = name
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._redis = None
+        self._key_prefix = ""
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    # ==================== 本地层 ====================
+
+    def _expires_at(self, ttl: Optional[float], expires_at: Optional[float]) -> Optional[float]:
+        if expires_at is not None:
+            return expires_at
+        ttl = self.default_ttl if ttl is None else ttl
+        return time.time() + ttl if ttl is not None else None
+
+    def _lookup(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._entries[key]
+            self.expirations += 1
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """读取本地缓存（过期条目视为未命中）"""
+        value = self._lookup(key)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def peek(self, key: str, default: Any = None) -> Any:
+        """读取未过期条目，不影响 LRU 顺序与统计（用于调试/监控接口）"""
+        entry = self._entries.get(key)
+        if entry is None or (entry[1] is not None and entry[1] <= time.time()):
+            return default
+        return entry[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, expires_at: Optional[float] = None):
+        """
+        写入本地缓存
+
+        Args:
+            ttl: 存活秒数（None 使用 default_ttl）
+            expires_at: 过期时刻 Unix 时间戳（优先于 ttl）
+        """
+        self._entries[key] = (value, self._expires_at(ttl, expires_at))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        self._entries.clear()
+
+    def purge_expired(self) -> int:
+        """清理全部过期条目，返回清理数量"""
+        now = time.time()
+        expired = [key for key, (_, expires_at) in self._entries.items() if expires_at is not None and expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        self.expirations += len(expired)
+        return len(expired)
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        """遍历未过期条目（不影响 LRU 顺序与统计）"""
+        now = time.time()
+        for key, (value, expires_at) in list(self._entries.items()):
+            if expires_at is None or expires_at > now:
+                yield key, value
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and (entry[1] is None or entry[1] > time.time())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "redis_tier": self._redis is not None,
+        }
+
+    # ==================== Redis 写穿透层 ====================
+
+    def attach_redis(self, redis_client, key_prefix: str):
+        """
+        启用 Redis 写穿透层
+
+        Args:
+            redis_client: redis.asyncio 客户端（decode_responses=True）
+            key_prefix: Redis key 前缀
+        """
+        self._redis = redis_client
+        self._key_prefix = key_prefix
+
+    async def aget(self, key: str, default: Any = None) -> Any:
+        """读取缓存：本地未命中时读取 Redis 并回填本地（保留 Redis 剩余 TTL）"""
+        value = self._lookup(key)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+        self.misses += 1
+        if self._redis is None:
+            return default
+
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.get(f"{self._key_prefix}{key}")
+                pipe.ttl(f"{self._key_prefix}{key}")
+                raw, ttl = await pipe.execute()
+        except Exception as e:
+            print(f"⚠️ 缓存 {self.name} 读取 Redis 失败: {e}")
+            return default
+        if raw is None:
+            return default
+
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            return default
+        self.set(key, value, ttl=ttl if ttl and ttl > 0 else None)
+        return value
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None, expires_at: Optional[float] = None):
+        """写入本地缓存并同步写入 Redis"""
+        self.set(key, value, ttl=ttl, expires_at=expires_at)
+        if self._redis is None:
+            return
+
+        expiry = self._entries[key][1]
+        redis_ttl = int(expiry - time.time()) if expiry is not None else None
+        if redis_ttl is not None and redis_ttl <= 0:
+            return
+        try:
+            await self._redis.set(f"{self._key_prefix}{key}", json.dumps(value, ensure_ascii=False), ex=redis_ttl)
+        except Exception as e:
+            print(f"⚠️ 缓存 {self.name} 写入 Redis 失败: {e}")
+
+    async def adelete(self, key: str):
+        """删除本地与 Redis 中的条目"""
+        self.pop(key)
+        if self._redis is None:
+            return
+        try:
+            await self._redis.delete(f"{self._key_prefix}{key}")
+        except Exception as e:
+            print(f"⚠️ 缓存 {self.name} 删除 Redis 条目失败: {e}")
@@ -0,0 +1,395 @@
+"""
+Coze 工作流对话客户端
+
+/api/chat 与 /api/chat/stream 原先各自维护一份 SSE 解析循环（跟踪 event:/data: 行、
+提取 conversation_id、处理 conversation.message.delta 与 conversation.chat.failed），
+并对每一行 data 调用 json.loads —— 包括体积最大、但我们并不使用的
+conversation.message.completed（完整消息重复一遍）。
+
+本模块提供:
+1. SSEFrameParser     - 增量 SSE 帧解析器，直接处理字节流（aiter_bytes），
+                        不做 str 解码和逐行切分，只在组帧时切出 data 字节
+2. CozeEvent          - 类型化事件，只对关心的事件类型解析 JSON（DECODED_EVENTS）
+3. CozeWorkflowClient - 基于共享 httpx.AsyncClient 的工作流对话客户端，
+                        stream_chat() 逐个产出事件，chat() 汇总完整回复（供批量调用）
+4. CozeCallStats      - 单次调用耗时统计（TTFB、首字、token 数、总耗时）
+
+使用方式:
+    client = CozeWorkflowClient(http_client, api_base, workflow_id, app_id)
+    async with client.stream_chat(access_token, message, session_name) as stream:
+        async for event in stream:
+            if event.content:
+                ...
+    print(stream.conversation_id, stream.stats.to_dict())
+"""
+
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, FrozenSet, List, Optional
+
+import httpx
+
+EVENT_CHAT_CREATED = "conversation.chat.created"
+EVENT_CHAT_COMPLETED = "conversation.chat.completed"
+EVENT_CHAT_FAILED = "conversation.chat.failed"
+EVENT_MESSAGE_DELTA = "conversation.message.delta"
+EVENT_ERROR = "error"
+EVENT_DONE = "done"
+
+# 需要解析 JSON 的事件类型，其余事件（message.completed、chat.in_progress 等）只保留事件名
+DECODED_EVENTS: FrozenSet[str] = frozenset({
+    EVENT_CHAT_CREATED,
+    EVENT_CHAT_COMPLETED,
+    EVENT_CHAT_FAILED,
+    EVENT_MESSAGE_DELTA,
+    EVENT_ERROR,
+})
+
+
+@dataclass
+class SSEFrame:
+    """SSE 帧（data 为原始字节，多行 data 以换行拼接）"""
+    event: Optional[str]
+    data: bytes
+
+
+class SSEFrameParser:
+    """
+    增量 SSE 帧解析器
+
+    feed() 接收任意切分的字节块，返回已完整的帧；流结束时调用 flush() 取出最后一帧。
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._event: Optional[str] = None
+        self._data: List[bytes] = []
+
+    def feed(self, chunk: bytes) -> List[SSEFrame]:
+        """输入字节块，返回已完整的帧"""
+        buffer = self._buffer
+        buffer += chunk
+        frames: List[SSEFrame] = []
+        start = 0
+
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            line_end = end - 1 if end > start and buffer[end - 1] == 0x0D else end
+            self._handle_line(buffer, start, line_end, frames)
+            start = end + 1
+
+        if start:
+            del buffer[:start]
+        return frames
+
+    def flush(self) -> List[SSEFrame]:
+        """流结束：处理缓冲区中剩余的不完整行和帧"""
+        frames: List[SSEFrame] = []
+        if self._buffer:
+            buffer = self._buffer
+            line_end = len(buffer) - 1 if buffer[-1] == 0x0D else len(buffer)
+            self._handle_line(buffer, 0, line_end, frames)
+            buffer.clear()
+        self._dispatch(frames)
+        return frames
+
+    def _handle_line(self, buffer: bytearray, start: int, end: int, frames: List[SSEFrame]):
+        if start == end:
+            self._dispatch(frames)
+        elif buffer.startswith(b"data:", start, end):
+            value_start = start + 5
+            if value_start < end and buffer[value_start] == 0x20:
+                value_start += 1
+            self._data.append(bytes(buffer[value_start:end]))
+        elif buffer.startswith(b"event:", start, end):
+            self._event = buffer[start + 6:end].strip().decode("utf-8", errors="replace")
+        # 注释行（":" 开头）与 id:/retry: 字段不使用，直接忽略
+
+    def _dispatch(self, frames: List[SSEFrame]):
+        if self._data:
+            data = self._data[0] if len(self._data) == 1 else b"\n".join(self._data)
+            frames.append(SSEFrame(event=self._event, data=data))
+        self._event = None
+        self._data = []
+
+
+@dataclass
+class CozeEvent:
+    """
+    类型化 Coze 事件
+
+    data 仅在事件类型属于 DECODED_EVENTS 且为合法 JSON 对象时有值，其余为 None。
+    """
+    event: str
+    data: Optional[Dict[str, Any]] = None
+
+    @property
+    def conversation_id(self) -> Optional[str]:
+        if self.data:
+            return self.data.get("conversation_id")
+        return None
+
+    @property
+    def content(self) -> str:
+        """助手回复增量（非 assistant 消息增量返回空串）"""
+        if self.event == EVENT_MESSAGE_DELTA and self.data and self.data.get("role") == "assistant":
+            return self.data.get("content") or ""
+        return ""
+
+    @property
+    def is_failed(self) -> bool:
+        return self.event == EVENT_CHAT_FAILED
+
+    @property
+    def error_message(self) -> str:
+        """失败原因（conversation.chat.failed / error 事件）"""
+        if not self.data:
+            return "未知错误"
+        if self.event == EVENT_CHAT_FAILED:
+            return (self.data.get("last_error") or {}).get("msg") or "未知错误"
+        return self.data.get("msg") or "未知错误"
+
+
+@dataclass
+class CozeCallStats:
+    """单次调用耗时统计（毫秒）"""
+    started_at: float = 0.0
+    ttfb_ms: Optional[float] = None          # 收到响应头
+    first_token_ms: Optional[float] = None   # 收到第一个回复增量
+    total_ms: Optional[float] = None
+    delta_count: int = 0                     # 回复增量事件数
+    output_tokens: Optional[int] = None      # chat.completed 中 usage.output_count
+    bytes_received: int = 0
+
+    def _elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.started_at) * 1000, 1)
+
+    @property
+    def tokens(self) -> int:
+        """输出 token 数（Coze 未返回 usage 时以增量事件数近似）"""
+        return self.output_tokens if self.output_tokens is not None else self.delta_count
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ttfb_ms": self.ttfb_ms,
+            "first_token_ms": self.first_token_ms,
+            "total_ms": self.total_ms,
+            "tokens": self.tokens,
+            "bytes": self.bytes_received,
+        }
+
+    def summary(self) -> str:
+        return (
+            f"TTFB {self.ttfb_ms}ms, 首字 {self.first_token_ms}ms, "
+            f"tokens {self.tokens}, 总耗时 {self.total_ms}ms"
+        )
+
+
+class CozeAPIError(Exception):
+    """Coze 接口返回非 200 状态码"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(f"Coze API 错误: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+@dataclass
+class CozeChatResult:
+    """chat() 汇总结果"""
+    content: str
+    conversation_id: Optional[str]
+    error: Optional[str]
+    stats: CozeCallStats
+
+
+class CozeChatStream:
+    """
+    单次流式对话（异步上下文管理器 + 异步迭代器）
+
+    进入时发送请求并检查状态码，退出时关闭响应（提前 break/return 也会归还连接）。
+    """
+
+    def __init__(
+        self,
+        http_client: httpx.AsyncClient,
+        url: str,
+        payload: Dict[str, Any],
+        headers: Dict[str, str],
+        decoded_events: FrozenSet[str]
+    ):
+        self._http_client = http_client
+        self._url = url
+        self._payload = payload
+        self._headers = headers
+        self._decoded_events = decoded_events
+        self._request = None
+        self.response: Optional[httpx.Response] = None
+        self.conversation_id: Optional[str] = payload.get("conversation_id")
+        self.stats = CozeCallStats()
+
+    async def __aenter__(self) -> "CozeChatStream":
+        self.stats.started_at = time.perf_counter()
+        self._request = self._http_client.stream("POST", self._url, json=self._payload, headers=self._headers)
+        self.response = await self._request.__aenter__()
+        self.stats.ttfb_ms = self.stats._elapsed_ms()
+
+        if self.response.status_code != 200:
+            detail = (await self.response.aread()).decode("utf-8", errors="replace")
+            await self._close()
+            raise CozeAPIError(self.response.status_code, detail)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._close(exc_type, exc, tb)
+
+    async def _close(self, exc_type=None, exc=None, tb=None):
+        if self._request is not None:
+            request, self._request = self._request, None
+            self.stats.total_ms = self.stats._elapsed_ms()
+            await request.__aexit__(exc_type, exc, tb)
+
+    async def __aiter__(self) -> AsyncIterator[CozeEvent]:
+        parser = SSEFrameParser()
+        async for chunk in self.response.aiter_bytes():
+            self.stats.bytes_received += len(chunk)
+            for frame in parser.feed(chunk):
+                yield self._to_event(frame)
+        for frame in parser.flush():
+            yield self._to_event(frame)
+
+    def _to_event(self, frame: SSEFrame) -> CozeEvent:
+        event = CozeEvent(event=frame.event or "message")
+        if event.event not in self._decoded_events:
+            return event
+
+        try:
+            data = json.loads(frame.data)
+        except ValueError:
+            return event
+        if not isinstance(data, dict):
+            return event
+        event.data = data
+
+        if not self.conversation_id and data.get("conversation_id"):
+            self.conversation_id = data["conversation_id"]
+
+        if event.event == EVENT_MESSAGE_DELTA and event.content:
+            self.stats.delta_count += 1
+            if self.stats.first_token_ms is None:
+                self.stats.first_token_ms = self.stats._elapsed_ms()
+        elif event.event == EVENT_CHAT_COMPLETED:
+            output_count = (data.get("usage") or {}).get("output_count")
+            if isinstance(output_count, int):
+                self.stats.output_tokens = output_count
+        return event
+
+
+class CozeWorkflowClient:
+    """Coze 工作流对话客户端（Workflow Chat API，SSE 流式）"""
+
+    def __init__(
+        self,
+        http_client: httpx.AsyncClient,
+        api_base: str,
+        workflow_id: str,
+        app_id: str,
+        decoded_events: FrozenSet[str] = DECODED_EVENTS
+    ):
+        """
+        Args:
+            http_client: 共享的 httpx.AsyncClient（由调用方负责关闭）
+            api_base: Coze API 地址，如 https://api.coze.com
+            workflow_id: 工作流 ID
+            app_id: 应用 ID
+            decoded_events: 需要解析 JSON 的事件类型
+        """
+        self.http_client = http_client
+        self.url = f"{api_base.rstrip('/')}/v1/workflows/chat"
+        self.workflow_id = workflow_id
+        self.app_id = app_id
+        self.decoded_events = decoded_events
+
+    def build_payload(
+        self,
+        message: str,
+        session_name: str,
+        conversation_id: Optional[str] = None,
+        parameters: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """构建请求体（session_name 实现会话隔离，conversation_id 保持多轮上下文）"""
+        payload: Dict[str, Any] = {
+            "workflow_id": self.workflow_id,
+            "app_id": self.app_id,
+            "session_name": session_name,
+            "parameters": {
+                "USER_INPUT": message,
+            },
+            "additional_messages": [
+                {
+                    "content": message,
+                    "content_type": "text",
+                    "role": "user",
+                    "type": "question"
+                }
+            ]
+        }
+        if conversation_id:
+            payload["conversation_id"] = conversation_id
+        if parameters:
+            payload["parameters"].update(parameters)
+        return payload
+
+    def stream_chat(
+        self,
+        access_token: str,
+        message: str,
+        session_name: str,
+        conversation_id: Optional[str] = None,
+        parameters: Optional[Dict[str, Any]] = None
+    ) -> CozeChatStream:
+        """
+        发起流式对话
+
+        Raises:
+            CozeAPIError: 进入上下文时 Coze 返回非 200 状态码
+        """
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json"
+        }
+        payload = self.build_payload(message, session_name, conversation_id, parameters)
+        return CozeChatStream(self.http_client, self.url, payload, headers, self.decoded_events)
+
+    async def chat(
+        self,
+        access_token: str,
+        message: str,
+        session_name: str,
+        conversation_id: Optional[str] = None,
+        parameters: Optional[Dict[str, Any]] = None
+    ) -> CozeChatResult:
+        """
+        非流式对话：汇总全部回复增量
+
+        Raises:
+            CozeAPIError: Coze 返回非 200 状态码
+        """
+        parts: List[str] = []
+        error: Optional[str] = None
+        async with self.stream_chat(access_token, message, session_name, conversation_id, parameters) as stream:
+            async for event in stream:
+                content = event.content
+                if content:
+                    parts.append(content)
+                elif event.is_failed:
+                    error = event.error_message
+        return CozeChatResult(
+            content="".join(parts),
+            conversation_id=stream.conversation_id,
+            error=error,
+            stats=stream.stats
+        )
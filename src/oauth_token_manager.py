@@ -1,16 +1,36 @@
 """
 OAuth Token 管理器
 负责使用 JWT 获取和管理 Coze Access Token
+
+同步接口 get_access_token() 使用 requests 阻塞请求，仅用于启动阶段和命令行工具。
+异步请求处理函数应使用 get_access_token_async():
+1. 进程内缓存 → Redis 共享缓存（多 worker 共用同一 session 的 token）→ 请求 Coze OAuth
+2. 同一 session 的并发请求只发起一次 OAuth 请求（single-flight），其余调用方等待同一结果
+3. token 进入过期前的刷新窗口后，仍返回当前 token，同时在后台提前刷新
 """
 
+import asyncio
+import json
 import time
 import requests
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
 import os
 
+import httpx
+
+from src.bounded_cache import BoundedCache
 from src.jwt_signer import JWTSigner
 
+# Redis 共享缓存 key 前缀：coze_oauth_token:{session_name}
+TOKEN_CACHE_KEY_PREFIX = "coze_oauth_token:"
+
+# 过期前多少秒开始后台刷新
+REFRESH_AHEAD_SECONDS = 600
+
+# expires_in 超过该值时视为 Unix 时间戳（Coze 返回的是过期时刻），否则视为有效秒数
+_EPOCH_THRESHOLD = 10 * 365 * 86400
+
 
 class OAuthTokenManager:
     """OAuth 令牌管理器 - 使用 JWT 获取和刷新 Access Token"""
@@ -19,7 +39,8 @@ class OAuthTokenManager:
         self,
         jwt_signer: JWTSigner,
         api_base: str = "https://api.coze.com",
-        token_ttl: int = 86399  # 令牌有效期，默认 24 小时 - 1 秒
+        token_ttl: int = 86399,  # 令牌有效期，默认 24 小时 - 1 秒
+        token_cache_size: int = 10000
     ):
         """
         初始化令牌管理器
@@ -28,20 +49,27 @@ class OAuthTokenManager:
             jwt_signer: JWT 签名器实例
             api_base: Coze API 基础 URL
             token_ttl: Access Token 请求的有效期（秒），最大 86400
+            token_cache_size: 进程内 token 缓存最大条目数（按 LRU 淘汰）
         """
         self.jwt_signer = jwt_signer
         self.api_base = api_base.rstrip('/')
         self.token_ttl = min(token_ttl, 86400)  # 最大 24 小时
 
-        # Token 缓存（按 session_name 分别缓存）
-        self._token_cache: Dict[str, Dict[str, Any]] = {}  # {session_name: {token, expires_at}}
+        # Token 缓存（按 session_name 分别缓存，条目随 token 过期）
+        self._token_cache = BoundedCache("oauth_token", max_entries=token_cache_size)  # {session_name: {token, expires_at}}
+
+        # 异步路径依赖（由 attach_async() 注入）
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._redis = None  # redis.asyncio.Redis（decode_responses=True）
+        self._inflight: Dict[str, asyncio.Task] = {}  # {cache_key: 进行中的 OAuth 请求}
 
     @classmethod
     def from_env(cls) -> "OAuthTokenManager":
         """从环境变量创建令牌管理器"""
         jwt_signer = JWTSigner.from_env()
         api_base = os.getenv("COZE_API_BASE", "https://api.coze.com")
-        return cls(jwt_signer=jwt_signer, api_base=api_base)
+        token_cache_size = int(os.getenv("OAUTH_TOKEN_CACHE_SIZE", "10000"))
+        return cls(jwt_signer=jwt_signer, api_base=api_base, token_cache_size=token_cache_size)
 
     def _request_access_token(
         self,
@@ -93,6 +121,19 @@ class OAuthTokenManager:
         except requests.exceptions.RequestException as e:
             raise Exception(f"请求 Access Token 失败: {str(e)}")
 
+    def _token_expires_at(self, token_data: Dict[str, Any]) -> datetime:
+        """
+        计算缓存过期时间（提前 5 分钟刷新，避免边界情况）
+
+        Coze 返回的 expires_in 为过期时刻的 Unix 时间戳；兼容按有效秒数返回的情况。
+        """
+        expires_in = token_data.get("expires_in", self.token_ttl)
+        if expires_in > _EPOCH_THRESHOLD:
+            expires_at = datetime.fromtimestamp(expires_in)
+        else:
+            expires_at = datetime.now() + timedelta(seconds=expires_in)
+        return expires_at - timedelta(seconds=300)
+
     def get_access_token(
         self,
         session_name: Optional[str] = None,
@@ -114,9 +155,10 @@ class OAuthTokenManager:
         cache_key = session_name or "default"
 
         # 检查缓存的令牌是否仍然有效
-        if not force_refresh and self._is_token_valid(cache_key):
+        token_info = None if force_refresh else self._valid_token_info(cache_key)
+        if token_info:
             print(f"♻️  使用缓存的 Token (session: {cache_key})")
-            return self._token_cache[cache_key]["token"]
+            return token_info["token"]
 
         # 请求新令牌
         print(f"🔄 为 session '{cache_key}' 获取新的 Access Token...")
@@ -127,27 +169,36 @@ class OAuthTokenManager:
 
         # 更新缓存
         access_token = token_data["access_token"]
-        expires_in = token_data.get("expires_in", self.token_ttl)
-
-        # 计算过期时间（提前 5 分钟刷新，避免边界情况）
-        expires_at = datetime.now() + timedelta(seconds=expires_in - 300)
+        expires_at = self._token_expires_at(token_data)
 
-        self._token_cache[cache_key] = {
+        self._cache_token(cache_key, {
             "token": access_token,
             "expires_at": expires_at,
             "session_name": session_name
-        }
+        })
 
         print(f"✅ Access Token 获取成功 (session: {cache_key})，有效期至: {expires_at}")
 
         return access_token
 
+    def _cache_token(self, cache_key: str, token_info: Dict[str, Any]):
+        """写入进程内缓存（缓存条目与 token 同时过期）"""
+        self._token_cache.set(cache_key, token_info, expires_at=token_info["expires_at"].timestamp())
+
+    def _valid_token_info(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存中仍然有效的令牌信息"""
+        token_info = self._token_cache.get(cache_key)
+        if token_info and self._is_token_info_valid(token_info):
+            return token_info
+        return None
+
     def _is_token_valid(self, cache_key: str) -> bool:
         """检查指定 session 的缓存令牌是否仍然有效"""
-        if cache_key not in self._token_cache:
-            return False
+        token_info = self._token_cache.peek(cache_key)
+        return bool(token_info) and self._is_token_info_valid(token_info)
 
-        token_info = self._token_cache[cache_key]
+    @staticmethod
+    def _is_token_info_valid(token_info: Dict[str, Any]) -> bool:
         expires_at = token_info.get("expires_at")
 
         if expires_at is None:
@@ -156,6 +207,195 @@ class OAuthTokenManager:
         # 检查是否过期（提前 1 分钟判定为过期）
         return datetime.now() < (expires_at - timedelta(minutes=1))
 
+    # ==================== 异步接口 ====================
+
+    def attach_async(self, http_client: Optional[httpx.AsyncClient] = None, redis_client=None):
+        """
+        注入异步路径依赖
+
+        Args:
+            http_client: 共享的 httpx.AsyncClient（None 时每次请求临时创建）
+            redis_client: redis.asyncio 客户端（decode_responses=True），None 表示不使用共享缓存
+        """
+        self._http_client = http_client
+        self._redis = redis_client
+
+    async def _request_access_token_async(
+        self,
+        session_name: Optional[str] = None,
+        device_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """使用 JWT 向 Coze API 请求 Access Token（异步版本）"""
+        jwt_token = self.jwt_signer.create_jwt(
+            session_name=session_name,
+            device_id=device_id
+        )
+
+        url = f"{self.api_base}/api/permission/oauth2/token"
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {jwt_token}"
+        }
+        payload = {
+            "duration_seconds": self.token_ttl,
+            "grant_type": "urn:ietf:params:oauth:grant-type:jwt-bearer"
+        }
+
+        try:
+            if self._http_client is not None:
+                response = await self._http_client.post(url, json=payload, headers=headers, timeout=10)
+            else:
+                async with httpx.AsyncClient(timeout=10, trust_env=False) as client:
+                    response = await client.post(url, json=payload, headers=headers)
+            response.raise_for_status()
+            data = response.json()
+        except httpx.HTTPError as e:
+            raise Exception(f"请求 Access Token 失败: {str(e)}")
+
+        if "access_token" not in data:
+            raise Exception(f"响应中缺少 access_token: {data}")
+        return data
+
+    async def _load_shared_token(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """从 Redis 共享缓存加载 token 到进程内缓存，返回有效的令牌信息"""
+        if self._redis is None:
+            return None
+        try:
+            raw = await self._redis.get(f"{TOKEN_CACHE_KEY_PREFIX}{cache_key}")
+        except Exception as e:
+            print(f"⚠️  读取共享 Token 缓存失败 (session: {cache_key}): {e}")
+            return None
+        if not raw:
+            return None
+
+        try:
+            data = json.loads(raw)
+            token_info = {
+                "token": data["token"],
+                "expires_at": datetime.fromtimestamp(data["expires_at"]),
+                "session_name": data.get("session_name")
+            }
+        except (ValueError, KeyError, TypeError):
+            return None
+        if not self._is_token_info_valid(token_info):
+            return None
+        self._cache_token(cache_key, token_info)
+        return token_info
+
+    async def _store_shared_token(self, cache_key: str, token_info: Dict[str, Any]):
+        """写入 Redis 共享缓存（随 token 一同过期）"""
+        if self._redis is None:
+            return
+        expires_at = token_info["expires_at"].timestamp()
+        ttl = int(expires_at - time.time())
+        if ttl <= 0:
+            return
+        try:
+            await self._redis.set(
+                f"{TOKEN_CACHE_KEY_PREFIX}{cache_key}",
+                json.dumps({
+                    "token": token_info["token"],
+                    "expires_at": expires_at,
+                    "session_name": token_info["session_name"]
+                }),
+                ex=ttl
+            )
+        except Exception as e:
+            print(f"⚠️  写入共享 Token 缓存失败 (session: {cache_key}): {e}")
+
+    async def _fetch_token(
+        self,
+        cache_key: str,
+        session_name: Optional[str],
+        device_id: Optional[str]
+    ) -> str:
+        print(f"🔄 为 session '{cache_key}' 获取新的 Access Token...")
+        token_data = await self._request_access_token_async(
+            session_name=session_name,
+            device_id=device_id
+        )
+        token_info = {
+            "token": token_data["access_token"],
+            "expires_at": self._token_expires_at(token_data),
+            "session_name": session_name
+        }
+        self._cache_token(cache_key, token_info)
+        await self._store_shared_token(cache_key, token_info)
+        print(f"✅ Access Token 获取成功 (session: {cache_key})，有效期至: {token_info['expires_at']}")
+        return token_data["access_token"]
+
+    def _start_fetch(
+        self,
+        cache_key: str,
+        session_name: Optional[str],
+        device_id: Optional[str]
+    ) -> asyncio.Task:
+        """发起（或复用进行中的）OAuth 请求"""
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(
+                self._fetch_token(cache_key, session_name, device_id)
+            )
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda done: self._finish_fetch(cache_key, done))
+        return task
+
+    def _finish_fetch(self, cache_key: str, task: asyncio.Task):
+        if self._inflight.get(cache_key) is task:
+            del self._inflight[cache_key]
+        if not task.cancelled() and task.exception() is not None:
+            print(f"⚠️  Access Token 获取失败 (session: {cache_key}): {task.exception()}")
+
+    @staticmethod
+    def _needs_refresh_ahead(token_info: Dict[str, Any]) -> bool:
+        expires_at = token_info["expires_at"]
+        return datetime.now() >= expires_at - timedelta(seconds=REFRESH_AHEAD_SECONDS)
+
+    async def get_access_token_async(
+        self,
+        session_name: Optional[str] = None,
+        device_id: Optional[str] = None,
+        force_refresh: bool = False
+    ) -> str:
+        """
+        获取有效的 Access Token（异步，按 session_name 隔离）
+
+        Args:
+            session_name: 用户会话名称（用于会话隔离）
+            device_id: 设备 ID
+            force_refresh: 是否强制刷新令牌
+
+        Returns:
+            有效的 Access Token 字符串
+        """
+        cache_key = session_name or "default"
+
+        if not force_refresh:
+            token_info = self._valid_token_info(cache_key) or await self._load_shared_token(cache_key)
+            if token_info:
+                if self._needs_refresh_ahead(token_info):
+                    # 即将过期：返回当前 token，后台提前刷新
+                    self._start_fetch(cache_key, session_name, device_id)
+                return token_info["token"]
+
+        # shield: 单个调用方被取消不影响其他等待同一请求的调用方
+        return await asyncio.shield(self._start_fetch(cache_key, session_name, device_id))
+
+    async def invalidate_token_async(self, session_name: Optional[str] = None):
+        """使令牌失效（同时清除 Redis 共享缓存）"""
+        self.invalidate_token(session_name)
+        if self._redis is None:
+            return
+        try:
+            if session_name:
+                await self._redis.delete(f"{TOKEN_CACHE_KEY_PREFIX}{session_name}")
+            else:
+                keys = [key async for key in self._redis.scan_iter(match=f"{TOKEN_CACHE_KEY_PREFIX}*", count=500)]
+                if keys:
+                    await self._redis.delete(*keys)
+        except Exception as e:
+            print(f"⚠️  清除共享 Token 缓存失败: {e}")
+
     def refresh_token(
         self,
         session_name: Optional[str] = None,
@@ -186,8 +426,7 @@ class OAuthTokenManager:
         """
         if session_name:
             cache_key = session_name
-            if cache_key in self._token_cache:
-                del self._token_cache[cache_key]
+            if self._token_cache.pop(cache_key) is not None:
                 print(f"🗑️  令牌缓存已清除 (session: {cache_key})")
         else:
             self._token_cache.clear()
@@ -202,8 +441,8 @@ class OAuthTokenManager:
         """
         if session_name:
             cache_key = session_name
-            if cache_key in self._token_cache:
-                token_info = self._token_cache[cache_key]
+            token_info = self._token_cache.peek(cache_key)
+            if token_info:
                 return {
                     "session_name": cache_key,
                     "has_token": True,
@@ -220,6 +459,7 @@ class OAuthTokenManager:
             # 返回所有 session 的信息
             return {
                 "total_sessions": len(self._token_cache),
+                "cache": self._token_cache.stats(),
                 "sessions": {
                     key: {
                         "is_valid": self._is_token_valid(key),
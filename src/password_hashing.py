@@ -0,0 +1,127 @@
+"""
+密码哈希异步执行层
+
+PasswordHasher 的 bcrypt 计算（默认代价约 250ms）原先在事件循环中直接执行
+（/api/agent/login 经 AsyncAgentManager 占用 Redis I/O 线程池，修改/重置密码直接阻塞事件循环），
+交接班时的集中登录会让同一 worker 上的所有对话流停顿。
+
+AsyncPasswordHasher:
+1. 独立的 bcrypt 线程池（bcrypt 计算期间释放 GIL，线程即可并行，无需进程池），
+   不再占用 Redis I/O 线程池
+2. 准入限制：执行中 + 排队中的任务超过上限时抛出 PasswordHasherBusy（接口返回 503），
+   避免登录洪峰在 worker 内无限堆积
+3. 验证结果缓存：仅缓存验证成功的凭据，key 为 HMAC-SHA256(进程内随机 pepper, 密码哈希 + 明文)，
+   短 TTL；密码修改后哈希变化，旧缓存自然失效
+
+配置方式（环境变量）:
+    PASSWORD_HASH_THREADS=4           # bcrypt 线程数（默认 min(4, CPU 核数)）
+    PASSWORD_HASH_MAX_PENDING=64      # 最大排队数
+    CREDENTIAL_CACHE_TTL=300          # 验证成功缓存秒数（0 表示关闭）
+"""
+
+import asyncio
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from src.agent_auth import PasswordHasher
+from src.bounded_cache import BoundedCache
+
+
+class PasswordHasherBusy(Exception):
+    """密码哈希任务超过准入上限"""
+
+
+class AsyncPasswordHasher:
+    """在独立线程池中执行 bcrypt，并限制单个 worker 的排队深度"""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_pending: int = 64,
+        cache_ttl: float = 300,
+        cache_size: int = 1024,
+        pepper: Optional[bytes] = None
+    ):
+        """
+        Args:
+            max_workers: bcrypt 线程数（默认 min(4, CPU 核数)）
+            max_pending: 线程全部忙碌时允许排队的任务数
+            cache_ttl: 验证成功结果的缓存秒数（0 表示不缓存）
+            cache_size: 验证成功结果的最大缓存条目数
+            pepper: 缓存 key 的 HMAC 密钥（默认每个进程随机生成，缓存不出进程）
+        """
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+        self._in_flight = 0
+        self.rejected = 0
+        self._pepper = pepper or os.urandom(32)
+        self._verified = BoundedCache("verified_credential", max_entries=cache_size, default_ttl=cache_ttl) if cache_ttl > 0 else None
+
+    @classmethod
+    def from_env(cls) -> "AsyncPasswordHasher":
+        """从环境变量创建"""
+        threads = int(os.getenv("PASSWORD_HASH_THREADS", "0"))
+        return cls(
+            max_workers=threads or None,
+            max_pending=int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64")),
+            cache_ttl=float(os.getenv("CREDENTIAL_CACHE_TTL", "300"))
+        )
+
+    def _credential_key(self, password: str, password_hash: str) -> str:
+        message = password_hash.encode("utf-8") + b"\0" + password.encode("utf-8")
+        return hmac.new(self._pepper, message, hashlib.sha256).hexdigest()
+
+    async def _run(self, func: Callable[..., Any], *args) -> Any:
+        if self._in_flight >= self.max_workers + self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusy("密码校验请求过多，请稍后重试")
+
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self._in_flight -= 1
+
+    async def hash_password(self, password: str) -> str:
+        """
+        加密密码
+
+        Raises:
+            PasswordHasherBusy: 超过准入上限
+        """
+        return await self._run(PasswordHasher.hash_password, password)
+
+    async def verify_password(self, password: str, password_hash: str) -> bool:
+        """
+        验证密码（命中验证成功缓存时不执行 bcrypt）
+
+        Raises:
+            PasswordHasherBusy: 超过准入上限
+        """
+        key = None
+        if self._verified is not None:
+            key = self._credential_key(password, password_hash)
+            if self._verified.get(key):
+                return True
+
+        verified = await self._run(PasswordHasher.verify_password, password, password_hash)
+        if verified and key is not None:
+            self._verified.set(key, True)
+        return verified
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "in_flight": self._in_flight,
+            "rejected": self.rejected,
+            "credential_cache": self._verified.stats() if self._verified is not None else None,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
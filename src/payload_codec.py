@@ -0,0 +1,210 @@
+"""
+存储序列化编解码层
+
+会话（SessionState）和工单（Ticket）原先以 JSON 文本写入 Redis。会话最多携带 50 条消息，
+字段名重复出现，体积大且在 list 类接口中解析开销明显。
+
+本模块提供可插拔的编解码器：
+1. json          - 旧格式（纯 JSON 文本，无头部），默认值，与旧版本完全兼容
+2. orjson        - orjson 编码的紧凑 JSON
+3. msgpack       - MessagePack 二进制
+4. *+zstd        - 在上述格式基础上使用 zstd 压缩（如 msgpack+zstd）
+
+新格式数据带版本头：
+    0xFE | 版本号(1字节) | 编解码器ID(1字节，最高位表示 zstd 压缩) | 正文
+0xFE 不可能出现在 UTF-8 文本开头，因此旧 JSON 数据无需迁移即可继续读取。
+
+配置方式（环境变量）:
+    SESSION_CODEC=msgpack+zstd
+    TICKET_CODEC=orjson
+"""
+
+import json
+import os
+from typing import Any, Callable, Dict, Optional, Union
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack  # type: ignore
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+try:
+    import zstandard  # type: ignore
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+ENVELOPE_MAGIC = 0xFE
+ENVELOPE_VERSION = 1
+ZSTD_FLAG = 0x80
+
+CODEC_ORJSON = 1
+CODEC_MSGPACK = 2
+
+ZSTD_LEVEL = 3
+
+
+def _json_loads(body: Union[bytes, str]) -> Any:
+    """解析 JSON（优先使用 orjson）"""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def _require(module: Any, package: str, codec_name: str):
+    if module is None:
+        raise RuntimeError(f"编解码器 {codec_name} 需要安装 {package}（pip install {package}）")
+
+
+class PayloadCodec:
+    """
+    编解码器
+
+    dumps() 输出带版本头的 bytes（json 编解码器输出旧格式 JSON）；
+    解码统一使用 decode_payload()，按数据头自动识别格式。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        codec_id: Optional[int],
+        encode: Callable[[Dict[str, Any]], Union[bytes, str]],
+        compress: bool = False
+    ):
+        """
+        Args:
+            name: 编解码器名称
+            codec_id: 版本头中的编解码器 ID（None 表示旧 JSON 格式，无头部）
+            encode: 正文编码函数
+            compress: 是否使用 zstd 压缩正文
+        """
+        self.name = name
+        self.codec_id = codec_id
+        self._encode = encode
+        self.compress = compress
+        self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL) if compress else None
+
+    @property
+    def is_legacy(self) -> bool:
+        """是否为旧 JSON 格式（无版本头）"""
+        return self.codec_id is None
+
+    @property
+    def is_json_body(self) -> bool:
+        """正文是否为 JSON（json / orjson 系列）"""
+        return self.codec_id in (None, CODEC_ORJSON)
+
+    def dumps(self, data: Dict[str, Any]) -> Union[bytes, str]:
+        """编码为存储格式"""
+        return self.wrap(self._encode(data))
+
+    def wrap(self, body: Union[bytes, str]) -> Union[bytes, str]:
+        """
+        为已编码的正文加上版本头（按配置压缩）
+
+        正文为 JSON 的编解码器可直接包装 Pydantic model_dump_json() 的输出，省去一次 dict 转换。
+        """
+        if self.is_legacy:
+            return body
+
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        flags = self.codec_id
+        if self._compressor is not None:
+            body = self._compressor.compress(body)
+            flags |= ZSTD_FLAG
+        return bytes((ENVELOPE_MAGIC, ENVELOPE_VERSION, flags)) + body
+
+    def __repr__(self) -> str:
+        return f"PayloadCodec({self.name!r})"
+
+
+def _encode_legacy_json(data: Dict[str, Any]) -> str:
+    return json.dumps(data, ensure_ascii=False)
+
+
+def _encode_orjson(data: Dict[str, Any]) -> bytes:
+    return orjson.dumps(data)
+
+
+def _encode_msgpack(data: Dict[str, Any]) -> bytes:
+    return msgpack.packb(data, use_bin_type=True)
+
+
+def get_codec(name: Optional[str] = None) -> PayloadCodec:
+    """
+    按名称获取编解码器
+
+    Args:
+        name: json / orjson / msgpack / orjson+zstd / msgpack+zstd（None 或空表示 json）
+
+    Raises:
+        ValueError: 名称不支持
+        RuntimeError: 缺少对应的依赖包
+    """
+    normalized = (name or "json").strip().lower()
+    base, _, suffix = normalized.partition("+")
+    if suffix not in ("", "zstd"):
+        raise ValueError(f"不支持的编解码器: {name}")
+
+    compress = suffix == "zstd"
+    if compress:
+        _require(zstandard, "zstandard", normalized)
+
+    if base == "json":
+        if compress:
+            raise ValueError("json 为旧格式编解码器，不支持压缩；请使用 orjson+zstd")
+        return PayloadCodec("json", None, _encode_legacy_json)
+    if base == "orjson":
+        _require(orjson, "orjson", normalized)
+        return PayloadCodec(normalized, CODEC_ORJSON, _encode_orjson, compress)
+    if base == "msgpack":
+        _require(msgpack, "msgpack", normalized)
+        return PayloadCodec(normalized, CODEC_MSGPACK, _encode_msgpack, compress)
+
+    raise ValueError(f"不支持的编解码器: {name}")
+
+
+def codec_from_env(env_var: str, default: str = "json") -> PayloadCodec:
+    """从环境变量读取编解码器配置"""
+    return get_codec(os.getenv(env_var, default))
+
+
+def decode_payload(raw: Union[bytes, str]) -> Any:
+    """
+    解码存储数据（自动识别旧 JSON / 带版本头的新格式）
+
+    Raises:
+        ValueError: 版本号或编解码器 ID 无法识别
+    """
+    if isinstance(raw, str):
+        return _json_loads(raw)
+
+    if not raw or raw[0] != ENVELOPE_MAGIC:
+        return _json_loads(raw)
+
+    if len(raw) < 3:
+        raise ValueError("数据头不完整")
+
+    version, flags = raw[1], raw[2]
+    if version != ENVELOPE_VERSION:
+        raise ValueError(f"不支持的数据版本: {version}")
+
+    body = raw[3:]
+    if flags & ZSTD_FLAG:
+        _require(zstandard, "zstandard", "zstd")
+        body = zstandard.ZstdDecompressor().decompress(body)
+
+    codec_id = flags & ~ZSTD_FLAG
+    if codec_id == CODEC_ORJSON:
+        return _json_loads(body)
+    if codec_id == CODEC_MSGPACK:
+        _require(msgpack, "msgpack", "msgpack")
+        return msgpack.unpackb(body, raw=False)
+
+    raise ValueError(f"不支持的编解码器 ID: {codec_id}")
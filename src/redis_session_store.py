@@ -12,21 +12,912 @@ Redis 会话状态存储实现
 import redis
 import json
 import logging
-from typing import Optional, List
+from typing import Any, Awaitable, Callable, Optional, List, Iterable, Iterator, NamedTuple, Tuple, Union
 from datetime import datetime, timezone
 
+from redis.client import NEVER_DECODE
+from redis.exceptions import WatchError
+
 from src.session_state import (
+    Message,
     SessionState,
     SessionStatus,
     SessionStateStore,
+    SessionSummary,
+    SESSION_HISTORY_LIMIT,
+    UNASSIGNED_AGENT,
+    session_index_score,
 )
+from src.payload_codec import PayloadCodec, decode_payload, get_codec
+from src.session_search import index_terms, query_terms
 
 logger = logging.getLogger(__name__)
 
 
-class RedisSessionStore(SessionStateStore):
+def session_key(session_name: str) -> str:
+    """会话数据 Key"""
+    return f"session:{session_name}"
+
+
+def history_key(session_name: str) -> str:
+    """
+    会话消息历史 Key（LIST，每个元素为一条消息的 JSON）
+
+    不使用 session:{name}:history，避免与 SCAN session:* 遍历会话主数据冲突。
+    """
+    return f"session_history:{session_name}"
+
+
+def summary_key(session_name: str) -> str:
+    """会话摘要投影 Key（HASH，列表 / 排队接口读取）"""
+    return f"session_summary:{session_name}"
+
+
+# ==================== 全文检索倒排索引 ====================
+#
+# session_search:term:{term}       包含该词项的会话名称（SET）
+# session_search:doc:{name}        会话消息已建立索引的词项（SET，只追加，用于增量去重和删除时清理）
+# session_search:profile:{name}    会话 ID、客户昵称、坐席名称的词项（SET，每次保存整体替换）
+# session_search:lexicon           全部词项（ZSET，分数均为 0，按字典序 ZRANGEBYLEX 做前缀匹配）
+#
+# 昵称、坐席名称可能变化：保存时与上次的 profile 词项比较，不再出现且不在消息词项中的
+# 词项从倒排集合移除。消息词项只追加：历史列表按 SESSION_HISTORY_LIMIT 裁剪后，
+# 已裁剪消息的词项仍保留（检索覆盖会话的全部消息），会话删除 / 过期清理时一并移除；
+# 重建索引时只包含仍保留的历史消息。
+# 均不设置 TTL，会话删除 / 过期清理时由 DELETE_SESSION_LUA 一并移除；倒排集合清空时词项移出词典。
+#
+# 查询时前面的词项完整匹配（SINTER），最后一个词项按前缀匹配（边输入边搜索）：
+# 从词典展开为以其开头的词项，由 SEARCH_SESSIONS_LUA 求并集后再与其他词项求交集。
+
+SEARCH_INDEX_VERSION_KEY = "session_search:version"
+# 版本 2 起 profile 词项单独存放；版本 3 起维护词项词典
+SEARCH_INDEX_VERSION = "3"
+SEARCH_LEXICON_KEY = "session_search:lexicon"
+SEARCH_TEMP_KEY = "session_search:tmp"
+# 单个前缀最多展开的词项数（超出时只匹配字典序靠前的词项，过短的前缀结果不完整）
+SEARCH_PREFIX_EXPANSION_LIMIT = 1000
+
+
+def search_term_key(term: str) -> str:
+    """词项倒排集合 Key"""
+    return f"session_search:term:{term}"
+
+
+def search_doc_key(session_name: str) -> str:
+    """会话已索引词项集合 Key"""
+    return f"session_search:doc:{session_name}"
+
+
+def search_profile_key(session_name: str) -> str:
+    """会话 profile 词项集合 Key"""
+    return f"session_search:profile:{session_name}"
+
+
+def session_profile_terms(state: SessionState) -> List[str]:
+    """会话 ID、客户昵称、坐席名称的检索词项"""
+    return sorted(index_terms(
+        state.session_name,
+        state.user_profile.nickname if state.user_profile else "",
+        state.assigned_agent.name if state.assigned_agent else "",
+    ))
+
+
+def message_search_terms(messages: Iterable[Message]) -> List[str]:
+    """指定消息的检索词项"""
+    return sorted(index_terms(*[message.content for message in messages]))
+
+
+def queue_search_terms(pipe, state: SessionState, indexed: Iterable[str] = ()):
+    """
+    在 pipeline 中重写会话词项（重建索引使用，保存时由 SAVE_SESSION_LUA 增量写入）
+
+    Args:
+        pipe: Redis pipeline
+        state: 带完整历史的会话状态
+        indexed: 重建前已索引的词项（doc / profile 集合的并集，用于移除不再出现的词项）
+    """
+    name = state.session_name
+    message_terms = message_search_terms(state.history)
+    profile_terms = session_profile_terms(state)
+    for term in set(indexed) - set(message_terms) - set(profile_terms):
+        pipe.srem(search_term_key(term), name)
+
+    pipe.delete(search_doc_key(name), search_profile_key(name))
+    if message_terms:
+        pipe.sadd(search_doc_key(name), *message_terms)
+    if profile_terms:
+        pipe.sadd(search_profile_key(name), *profile_terms)
+    terms = set(message_terms) | set(profile_terms)
+    for term in terms:
+        pipe.sadd(search_term_key(term), name)
+    if terms:
+        pipe.zadd(SEARCH_LEXICON_KEY, {term: 0 for term in terms})
+
+
+def lexicon_range(prefix: str) -> Tuple[bytes, bytes]:
+    """词典中以 prefix 开头的词项的 ZRANGEBYLEX 区间（按 UTF-8 字节比较，上界用 0xff）"""
+    start = prefix.encode("utf-8")
+    return b"[" + start, b"[" + start + b"\xff"
+
+
+def search_script_params(terms: List[str], expansions: List[str]) -> Tuple[List[str], List[str]]:
+    """
+    构造 SEARCH_SESSIONS_LUA 的 KEYS / ARGV
+
+    Args:
+        terms: 查询词项（最后一个按前缀匹配）
+        expansions: 最后一个词项在词典中展开得到的词项
+    """
+    keys = [SEARCH_TEMP_KEY, *[search_term_key(term) for term in expansions]]
+    keys.extend(search_term_key(term) for term in terms[:-1])
+    return keys, [str(len(expansions))]
+
+
+# KEYS: [1] 临时 key  [2..] 前缀展开词项的倒排集合，其后为其他词项的倒排集合
+# ARGV: [1] 前缀展开词项数
+# 返回: 命中的会话名称
+SEARCH_SESSIONS_LUA = """
+local count = tonumber(ARGV[1])
+redis.call('SUNIONSTORE', KEYS[1], unpack(KEYS, 2, count + 1))
+local names = redis.call('SINTER', KEYS[1], unpack(KEYS, count + 2))
+redis.call('DEL', KEYS[1])
+return names
+"""
+
+
+def status_index_key(status) -> str:
+    """
+    状态索引 Key
+
+    统一使用枚举值（如 status:pending_manual）。Python 3.11 起 f-string 格式化
+    str 枚举会得到 "SessionStatus.PENDING_MANUAL"，因此不能直接拼接枚举对象。
+    """
+    return f"status:{SessionStatus(status).value}"
+
+
+# 单次 MGET 的最大 Key 数量（约束16.3.2 - 避免单条命令过大阻塞 Redis）
+MGET_BATCH_SIZE = 500
+
+
+def chunked(items: Iterable[str], size: int = MGET_BATCH_SIZE) -> Iterator[List[str]]:
+    """按固定大小切分会话名称"""
+    batch: List[str] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# 读取会话数据时不做 UTF-8 解码（二进制编解码器），其余命令仍返回字符串
+RAW_READ = {NEVER_DECODE: True}
+
+
+def encode_session(state: SessionState, codec: PayloadCodec) -> Union[bytes, str]:
+    """
+    按编解码器序列化会话主数据（JSON 正文直接使用 Pydantic 的 model_dump_json）
+
+    主数据只保留最后一条消息（列表摘要预览使用），完整历史存放在 session_history:{name}。
+    """
+    if len(state.history) > 1:
+        # 浅拷贝替换 history（比 exclude 按下标排除快一个数量级）
+        state = state.model_copy(update={"history": state.history[-1:]})
+
+    if codec.is_json_body:
+        return codec.wrap(state.model_dump_json())
+    return codec.dumps(state.model_dump(mode="json"))
+
+
+def encode_message(message: Message) -> str:
+    """序列化单条历史消息"""
+    return message.model_dump_json()
+
+
+def encode_summary(state: SessionState) -> List[str]:
+    """
+    生成摘要投影的 HSET 参数（field1, value1, field2, value2, ...）
+
+    每个字段值为 JSON，读取时按原类型还原；所有字段都会写入（None 写为 null），
+    保存时直接覆盖旧值，无需先删除。
+    """
+    fields = []
+    for name, value in SessionSummary.from_state(state).to_dict().items():
+        fields.append(name)
+        fields.append(json.dumps(value, ensure_ascii=False))
+    return fields
+
+
+def decode_summary(fields: dict) -> SessionSummary:
+    """解析 HGETALL 得到的摘要投影"""
+    return SessionSummary.from_dict({name: json.loads(value) for name, value in fields.items()})
+
+
+def decode_session(raw: Union[bytes, str]) -> SessionState:
+    """反序列化会话（自动识别旧 JSON / 带版本头的新格式）"""
+    return SessionState.model_validate(decode_payload(raw))
+
+
+def restore_history(state: SessionState, raw_history: Optional[List[bytes]]) -> SessionState:
+    """
+    合并历史列表到会话主数据
+
+    Args:
+        state: 主数据反序列化得到的会话
+        raw_history: LRANGE 结果；None 表示未加载历史（摘要加载）
+    """
+    if raw_history:
+        state.history = [Message.model_validate_json(raw) for raw in raw_history]
+        return state
+
+    if raw_history is None and len(state.history) <= 1:
+        return state
+
+    # 历史列表不存在：旧格式会话（完整历史仍在主数据中），下次保存时整体写入历史列表
+    state.queue_history_migration()
+    return state
+
+
+def decode_sessions(
+    session_names: List[str],
+    payloads: List[Optional[bytes]],
+    histories: Optional[List[List[bytes]]] = None
+) -> List[SessionState]:
+    """
+    解析 MGET（及 LRANGE）结果
+
+    不存在（已过期）的会话被跳过；单条数据损坏只记录日志，不影响整批结果。
+
+    Args:
+        session_names: 会话名称
+        payloads: 主数据
+        histories: 对应的历史列表；None 表示只加载摘要
+    """
+    sessions = []
+    for index, (name, raw) in enumerate(zip(session_names, payloads)):
+        if not raw:
+            continue
+        try:
+            raw_history = histories[index] if histories is not None else None
+            sessions.append(restore_history(decode_session(raw), raw_history))
+        except Exception as e:
+            logger.error(f"❌ 解析会话数据失败 {name}: {e}")
+    return sessions
+
+
+# ==================== ZSET 二级索引 ====================
+#
+# session_idx:{field}                        全部会话
+# session_idx:{field}:status:{status}        按状态
+# session_idx:{field}:agent:{agent_id}       按坐席（未分配为 __unassigned__）
+# session_idx:{field}:status:{status}:agent:{agent_id}
+#                                            按状态 + 坐席（组合查询直接分页，不在内存中过滤）
+#
+# field 为 updated_at / created_at / priority，score 见 session_index_score()
+# （priority 为 VIP 优先、同级按更新时间，列表的 VIP 排序和按状态筛选时的默认排序直接分页）。
+# session_idx:agent / session_idx:status 哈希记录每个会话当前所在的坐席和状态索引，
+# 用于坐席或状态变化时移除旧成员。
+# session_idx:version 为索引结构版本，与 SESSION_INDEX_VERSION 不一致时启动重建。
+
+SESSION_INDEX_FIELDS = ("updated_at", "created_at", "priority")
+SESSION_AGENT_HASH = "session_idx:agent"
+SESSION_STATUS_HASH = "session_idx:status"
+SESSION_INDEX_VERSION_KEY = "session_idx:version"
+# 版本 2 起维护状态 + 坐席组合索引；版本 3 起增加 priority 排序字段
+SESSION_INDEX_VERSION = "3"
+
+
+def session_index_key(
+    field: str,
+    status: Optional[SessionStatus] = None,
+    agent_id: Optional[str] = None
+) -> str:
+    """会话 ZSET 索引 Key"""
+    if field not in SESSION_INDEX_FIELDS:
+        raise ValueError(f"不支持的索引字段: {field}")
+    key = f"session_idx:{field}"
+    if status is not None:
+        key += f":status:{SessionStatus(status).value}"
+    if agent_id is not None:
+        key += f":agent:{agent_id}"
+    return key
+
+
+def index_agent_id(state: SessionState) -> str:
+    """会话所属坐席索引 ID"""
+    if state.assigned_agent and state.assigned_agent.id:
+        return state.assigned_agent.id
+    return UNASSIGNED_AGENT
+
+
+def queue_index_update(pipe, state: SessionState, previous_agent_id: Optional[str] = None):
+    """
+    在 pipeline 中写入会话的 ZSET 索引（重建索引时使用，不更新统计计数器）
+
+    同步与异步 pipeline 的命令缓冲接口一致，两种存储共用本函数。
+
+    Args:
+        pipe: Redis pipeline
+        state: 会话状态
+        previous_agent_id: 保存前的坐席索引 ID（用于清理旧坐席索引）
+    """
+    name = state.session_name
+    status = SessionStatus(state.status)
+    agent_id = index_agent_id(state)
+
+    for field in SESSION_INDEX_FIELDS:
+        member = {name: session_index_score(state, field)}
+        pipe.zadd(session_index_key(field), member)
+        pipe.zadd(session_index_key(field, status=status), member)
+        pipe.zadd(session_index_key(field, agent_id=agent_id), member)
+        pipe.zadd(session_index_key(field, status=status, agent_id=agent_id), member)
+        for other in SessionStatus:
+            if other != status:
+                pipe.zrem(session_index_key(field, status=other), name)
+                pipe.zrem(session_index_key(field, status=other, agent_id=agent_id), name)
+        if previous_agent_id and previous_agent_id != agent_id:
+            pipe.zrem(session_index_key(field, agent_id=previous_agent_id), name)
+            for other in SessionStatus:
+                pipe.zrem(session_index_key(field, status=other, agent_id=previous_agent_id), name)
+
+    pipe.hset(SESSION_AGENT_HASH, name, agent_id)
+    pipe.hset(SESSION_STATUS_HASH, name, status.value)
+    pipe.hset(SESSION_VIP_HASH, name, "1" if is_vip_session(state) else "0")
+
+
+# ==================== 原子保存 / 删除脚本 ====================
+#
+# 保存：一次往返完成写入会话 JSON（带 TTL）、状态集合迁移、ZSET 索引更新和统计计数器更新。
+# 删除：删除会话并移除全部索引、扣减统计计数器；用于主动删除和 TTL 过期后的索引清理。
+#
+# 旧状态 / 旧坐席 / 旧 VIP 标记从 session_idx:status / agent / vip 读取，脚本在 Redis
+# 中原子执行，不会因进程中途退出留下错误的索引或计数。
+# 脚本访问的 Key 全部由 Python 计算后通过 KEYS 传入（见 save_script_params() /
+# delete_script_params()），脚本中不拼接 Key 名。
+#
+# 统计计数器 session_stats（哈希）:
+#   total                  会话总数
+#   status:{status}        各状态会话数
+#   live:{agent_id}        坐席服务中（manual_live）的会话数
+#   pending:{agent_id}     已分配给坐席、等待接入（pending_manual）的会话数
+#   vip_pending            等待人工（pending_manual）的 VIP 会话数
+#   schema                 计数器字段版本（与 SESSION_STATS_SCHEMA 不一致时启动对账重建）
+
+SESSION_VIP_HASH = "session_idx:vip"
+SESSION_STATS_HASH = "session_stats"
+SESSION_STATS_SCHEMA = "2"
+# 脚本发现调用方读取的快照已失效（并发修改）时的返回值；调用方重新读取快照后重试
+SCRIPT_STALE = -1
+SCRIPT_RETRY_LIMIT = 5
+
+_STATS_LUA = """
+local function apply_stats(stats, status, agent, vip, delta)
+    redis.call('HINCRBY', stats, 'status:' .. status, delta)
+    local load_prefix = nil
+    if status == 'manual_live' then
+        load_prefix = 'live:'
+    elseif status == 'pending_manual' then
+        load_prefix = 'pending:'
+    end
+    if load_prefix and agent and agent ~= '__unassigned__' then
+        local field = load_prefix .. agent
+        if redis.call('HINCRBY', stats, field, delta) <= 0 then
+            redis.call('HDEL', stats, field)
+        end
+    end
+    if status == 'pending_manual' and vip == '1' then
+        redis.call('HINCRBY', stats, 'vip_pending', delta)
+    end
+end
+"""
+
+# 需要清理的旧索引取决于保存前的状态 / 坐席 / profile 词项，调用方先读取快照
+# （queue_session_snapshot()）再构造参数；脚本核对快照仍然有效，否则不写入并返回
+# SCRIPT_STALE，由调用方重新读取快照后重试。
+#
+# KEYS: [1] session:{name}  [2] session_idx:status  [3] session_idx:agent
+#       [4] session_idx:vip  [5] session_stats  [6] session_history:{name}
+#       [7] session_summary:{name}  [8] session_search:doc:{name}
+#       [9] session_search:profile:{name}  [10] session_search:lexicon
+#       [11] status:{新状态}
+#       [12..23] 新状态 / 新坐席的 ZSET 索引（每个排序字段依次为：全部、按状态、按坐席、按状态 + 坐席）
+#       [24..] 依次为五段（元素个数见 ARGV）：
+#              需移除成员的旧 ZSET 索引、需移除成员的旧状态集合、
+#              新消息词项 / profile 词项 / 快照 profile 词项的倒排集合（与 ARGV 中的词项一一对应）
+# ARGV: [1] name  [2] ttl  [3] 主数据  [4] 新状态  [5] 新坐席索引 ID  [6] VIP（1/0）
+#       [7] updated_at  [8] created_at  [9] priority 分数  [10] 历史保留条数
+#       [11] 快照中的旧状态（无则为空串）  [12] 快照中的旧坐席（无则为空串）
+#       [13] 旧 ZSET 索引 Key 数  [14] 旧状态集合 Key 数
+#       [15..] 依次为五个变长段，每段先给出元素个数再列出元素：
+#              新消息、摘要 field/value、新消息检索词项、profile 检索词项、快照 profile 词项
+# 返回: 保存前的状态（新会话为 false）；快照已失效时返回 SCRIPT_STALE（-1）
+SAVE_SESSION_LUA = _STATS_LUA + """
+local name = ARGV[1]
+local status = ARGV[4]
+local agent = ARGV[5]
+local vip = ARGV[6]
+
+local cursor = 15
+local function segment()
+    local count = tonumber(ARGV[cursor])
+    local first = cursor + 1
+    cursor = first + count
+    return first, count
+end
+local message_start, message_count = segment()
+local summary_start, summary_count = segment()
+local term_start, term_count = segment()
+local profile_start, profile_count = segment()
+local snapshot_start, snapshot_count = segment()
+
+local key_cursor = 24
+local function key_segment(count)
+    local first = key_cursor
+    key_cursor = first + count
+    return first, count
+end
+local index_start, index_count = key_segment(tonumber(ARGV[13]))
+local set_start, set_count = key_segment(tonumber(ARGV[14]))
+local term_key_start = key_segment(term_count)
+local profile_key_start = key_segment(profile_count)
+local snapshot_key_start = key_segment(snapshot_count)
+
+local old_status = redis.call('HGET', KEYS[2], name)
+local old_agent = redis.call('HGET', KEYS[3], name)
+local old_vip = redis.call('HGET', KEYS[4], name)
+
+-- 快照核对：旧状态 / 旧坐席 / profile 词项在读取快照后被并发修改时不写入
+if (old_status or '') ~= ARGV[11] or (old_agent or '') ~= ARGV[12]
+        or redis.call('SCARD', KEYS[9]) ~= snapshot_count then
+    return -1
+end
+for i = snapshot_start, snapshot_start + snapshot_count - 1 do
+    if redis.call('SISMEMBER', KEYS[9], ARGV[i]) == 0 then
+        return -1
+    end
+end
+
+redis.call('SET', KEYS[1], ARGV[3], 'EX', ARGV[2])
+
+if message_count > 0 then
+    redis.call('RPUSH', KEYS[6], unpack(ARGV, message_start, message_start + message_count - 1))
+    redis.call('LTRIM', KEYS[6], -tonumber(ARGV[10]), -1)
+end
+redis.call('EXPIRE', KEYS[6], ARGV[2])
+
+redis.call('HSET', KEYS[7], unpack(ARGV, summary_start, summary_start + summary_count - 1))
+redis.call('EXPIRE', KEYS[7], ARGV[2])
+
+-- 全文检索：消息词项只为会话中首次出现的词项写入倒排集合和词典
+for i = 0, term_count - 1 do
+    local term = ARGV[term_start + i]
+    if redis.call('SADD', KEYS[8], term) == 1 then
+        redis.call('SADD', KEYS[term_key_start + i], name)
+        redis.call('ZADD', KEYS[10], 0, term)
+    end
+end
+
+-- profile 词项整体替换：上次的词项不再出现且不是消息词项时移出倒排集合
+local profile = {}
+for i = 0, profile_count - 1 do
+    local term = ARGV[profile_start + i]
+    profile[term] = true
+    redis.call('SADD', KEYS[profile_key_start + i], name)
+    redis.call('ZADD', KEYS[10], 0, term)
+end
+for i = 0, snapshot_count - 1 do
+    local term = ARGV[snapshot_start + i]
+    if not profile[term] and redis.call('SISMEMBER', KEYS[8], term) == 0 then
+        local term_key = KEYS[snapshot_key_start + i]
+        redis.call('SREM', term_key, name)
+        if redis.call('SCARD', term_key) == 0 then
+            redis.call('ZREM', KEYS[10], term)
+        end
+    end
+end
+redis.call('DEL', KEYS[9])
+if profile_count > 0 then
+    redis.call('SADD', KEYS[9], unpack(ARGV, profile_start, profile_start + profile_count - 1))
+end
+
+if old_status then
+    apply_stats(KEYS[5], old_status, old_agent, old_vip, -1)
+else
+    redis.call('HINCRBY', KEYS[5], 'total', 1)
+end
+apply_stats(KEYS[5], status, agent, vip, 1)
+
+redis.call('SADD', KEYS[11], name)
+for i = set_start, set_start + set_count - 1 do
+    redis.call('SREM', KEYS[i], name)
+end
+
+local scores = {ARGV[7], ARGV[8], ARGV[9]}
+for i, score in ipairs(scores) do
+    for j = 1, 4 do
+        redis.call('ZADD', KEYS[7 + 4 * i + j], score, name)
+    end
+end
+for i = index_start, index_start + index_count - 1 do
+    redis.call('ZREM', KEYS[i], name)
+end
+
+redis.call('HSET', KEYS[2], name, status)
+redis.call('HSET', KEYS[3], name, agent)
+redis.call('HSET', KEYS[4], name, vip)
+return old_status
+"""
+
+# KEYS: [1..10] 同 SAVE_SESSION_LUA
+#       [11..] 依次为三段（元素个数见 ARGV）：需移除成员的 ZSET 索引、全部状态集合、
+#              快照词项的倒排集合（与 ARGV 中的词项一一对应）
+# ARGV: [1] name  [2] 仅清理已过期会话（1/0）  [3] 快照中的旧坐席（无则为空串）
+#       [4] ZSET 索引 Key 数  [5] 状态集合 Key 数  [6..] 快照词项（doc / profile 集合的并集）
+# 返回: 1 已删除 / 0 未执行（会话仍存在且仅清理过期会话）/ SCRIPT_STALE（-1）快照已失效
+DELETE_SESSION_LUA = _STATS_LUA + """
+local name = ARGV[1]
+
+if ARGV[2] == '1' and redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+
+local index_count = tonumber(ARGV[4])
+local set_count = tonumber(ARGV[5])
+local term_offset = 5 + index_count + set_count
+
+local old_status = redis.call('HGET', KEYS[2], name)
+local old_agent = redis.call('HGET', KEYS[3], name)
+local old_vip = redis.call('HGET', KEYS[4], name)
+
+-- 快照核对：旧坐席或检索词项在读取快照后被并发修改时不删除
+local terms = redis.call('SUNION', KEYS[8], KEYS[9])
+if (old_agent or '') ~= ARGV[3] or #terms ~= #ARGV - 5 then
+    return -1
+end
+local declared = {}
+for i = 6, #ARGV do
+    declared[ARGV[i]] = true
+end
+for _, term in ipairs(terms) do
+    if not declared[term] then
+        return -1
+    end
+end
+
+redis.call('DEL', KEYS[1], KEYS[6], KEYS[7])
+
+for i = 6, #ARGV do
+    local term_key = KEYS[term_offset + i]
+    redis.call('SREM', term_key, name)
+    if redis.call('SCARD', term_key) == 0 then
+        redis.call('ZREM', KEYS[10], ARGV[i])
+    end
+end
+redis.call('DEL', KEYS[8], KEYS[9])
+
+if old_status then
+    apply_stats(KEYS[5], old_status, old_agent, old_vip, -1)
+    redis.call('HINCRBY', KEYS[5], 'total', -1)
+end
+
+for i = 11, 10 + index_count do
+    redis.call('ZREM', KEYS[i], name)
+end
+for i = 11 + index_count, 10 + index_count + set_count do
+    redis.call('SREM', KEYS[i], name)
+end
+
+redis.call('HDEL', KEYS[2], name)
+redis.call('HDEL', KEYS[3], name)
+redis.call('HDEL', KEYS[4], name)
+return 1
+"""
+
+
+def _script_keys(session_name: str) -> List[str]:
+    return [
+        session_key(session_name),
+        SESSION_STATUS_HASH,
+        SESSION_AGENT_HASH,
+        SESSION_VIP_HASH,
+        SESSION_STATS_HASH,
+        history_key(session_name),
+        summary_key(session_name),
+        search_doc_key(session_name),
+        search_profile_key(session_name),
+        SEARCH_LEXICON_KEY,
+    ]
+
+
+def is_vip_session(state: SessionState) -> bool:
+    """会话是否为 VIP 客户"""
+    return bool(state.user_profile and state.user_profile.vip)
+
+
+class SessionSnapshot(NamedTuple):
+    """保存 / 删除脚本构造 KEYS 所依据的会话旧值（见 queue_session_snapshot()）"""
+    status: Optional[str]
+    agent_id: Optional[str]
+    terms: List[str]
+
+
+EMPTY_SNAPSHOT = SessionSnapshot(None, None, [])
+
+
+def queue_session_snapshot(pipe, session_name: str, include_messages: bool = False):
+    """
+    在 pipeline 中读取会话旧状态、旧坐席和检索词项（每个会话 3 条命令）
+
+    同步与异步 pipeline 的命令缓冲接口一致，两种存储共用本函数。
+
+    Args:
+        pipe: Redis pipeline
+        session_name: 会话名称
+        include_messages: 词项是否包含消息词项（删除时需要；保存时只读取 profile 词项）
+    """
+    pipe.hget(SESSION_STATUS_HASH, session_name)
+    pipe.hget(SESSION_AGENT_HASH, session_name)
+    if include_messages:
+        pipe.sunion(search_doc_key(session_name), search_profile_key(session_name))
+    else:
+        pipe.smembers(search_profile_key(session_name))
+
+
+def parse_session_snapshots(values: list) -> List[SessionSnapshot]:
+    """解析 queue_session_snapshot() 的结果（按会话顺序，每 3 个结果一个快照）"""
+    return [
+        SessionSnapshot(values[i], values[i + 1], sorted(values[i + 2]))
+        for i in range(0, len(values), 3)
+    ]
+
+
+def stale_index_keys(
+    status: SessionStatus,
+    agent_id: str,
+    snapshot: SessionSnapshot
+) -> Tuple[List[str], List[str]]:
+    """
+    保存后需要移除会话成员的旧 ZSET 索引和旧状态集合
+
+    快照中没有旧状态（新会话或升级前数据）时按全部其他状态清理。
+    组合索引需要清理：旧状态（或全部其他状态）× 旧坐席 / 新坐席。
+    """
+    if snapshot.status is None:
+        stale = [other for other in SessionStatus if other != status]
+    elif snapshot.status != status.value:
+        stale = [SessionStatus(snapshot.status)]
+    else:
+        stale = []
+    old_agent = snapshot.agent_id if snapshot.agent_id not in (None, agent_id) else None
+    combo_agents = [agent_id] + ([old_agent] if old_agent else [])
+
+    index_keys = []
+    for field in SESSION_INDEX_FIELDS:
+        index_keys.extend(session_index_key(field, status=other) for other in stale)
+        if old_agent:
+            index_keys.append(session_index_key(field, agent_id=old_agent))
+        for other in [status, *stale]:
+            for combo_agent in combo_agents:
+                if other != status or combo_agent != agent_id:
+                    index_keys.append(session_index_key(field, status=other, agent_id=combo_agent))
+    return index_keys, [status_index_key(other) for other in stale]
+
+
+def save_script_params(
+    state: SessionState,
+    ttl: int,
+    codec: Optional[PayloadCodec] = None,
+    snapshot: SessionSnapshot = EMPTY_SNAPSHOT
+) -> Tuple[List[str], List[Union[bytes, str]]]:
     """
-    Redis 会话状态存储实现
+    构造 SAVE_SESSION_LUA 的 KEYS / ARGV（只追加尚未保存的新消息）
+
+    Args:
+        state: 会话状态
+        ttl: 过期时间（秒）
+        codec: 主数据编码
+        snapshot: 保存前读取的会话快照（新会话为 EMPTY_SNAPSHOT）
+    """
+    status = SessionStatus(state.status)
+    agent_id = index_agent_id(state)
+    messages = [encode_message(message) for message in state.unsaved_messages]
+    summary = encode_summary(state)
+    terms = message_search_terms(state.unsaved_messages)
+    profile_terms = session_profile_terms(state)
+    stale_indexes, stale_sets = stale_index_keys(status, agent_id, snapshot)
+
+    keys = _script_keys(state.session_name)
+    keys.append(status_index_key(status))
+    for field in SESSION_INDEX_FIELDS:
+        keys.extend([
+            session_index_key(field),
+            session_index_key(field, status=status),
+            session_index_key(field, agent_id=agent_id),
+            session_index_key(field, status=status, agent_id=agent_id),
+        ])
+    keys.extend(stale_indexes)
+    keys.extend(stale_sets)
+    for segment in (terms, profile_terms, snapshot.terms):
+        keys.extend(search_term_key(term) for term in segment)
+
+    args = [
+        state.session_name,
+        str(ttl),
+        encode_session(state, codec or get_codec("json")),
+        status.value,
+        agent_id,
+        "1" if is_vip_session(state) else "0",
+        repr(float(state.updated_at)),
+        repr(float(state.created_at)),
+        repr(float(session_index_score(state, "priority"))),
+        str(SESSION_HISTORY_LIMIT),
+        snapshot.status or "",
+        snapshot.agent_id or "",
+        str(len(stale_indexes)),
+        str(len(stale_sets)),
+    ]
+    for segment in (messages, summary, terms, profile_terms, snapshot.terms):
+        args.append(str(len(segment)))
+        args.extend(segment)
+    return keys, args
+
+
+def delete_script_params(
+    session_name: str,
+    snapshot: SessionSnapshot = EMPTY_SNAPSHOT,
+    expired_only: bool = False
+) -> Tuple[List[str], List[str]]:
+    """
+    构造 DELETE_SESSION_LUA 的 KEYS / ARGV
+
+    Args:
+        session_name: 会话名称
+        snapshot: 删除前读取的会话快照（queue_session_snapshot(..., include_messages=True)）
+        expired_only: 仅在会话主数据已过期时清理
+    """
+    old_agent = snapshot.agent_id
+    index_keys = []
+    for field in SESSION_INDEX_FIELDS:
+        index_keys.append(session_index_key(field))
+        index_keys.extend(session_index_key(field, status=status) for status in SessionStatus)
+        if old_agent:
+            index_keys.append(session_index_key(field, agent_id=old_agent))
+            index_keys.extend(
+                session_index_key(field, status=status, agent_id=old_agent) for status in SessionStatus
+            )
+    set_keys = [status_index_key(status) for status in SessionStatus]
+
+    keys = _script_keys(session_name) + index_keys + set_keys
+    keys.extend(search_term_key(term) for term in snapshot.terms)
+    args = [
+        session_name,
+        "1" if expired_only else "0",
+        old_agent or "",
+        str(len(index_keys)),
+        str(len(set_keys)),
+        *snapshot.terms,
+    ]
+    return keys, args
+
+
+def compute_session_stats(states: Iterable[SessionState]) -> dict:
+    """
+    根据会话数据计算统计计数器（对账任务使用）
+
+    Returns:
+        dict: 与 session_stats 哈希字段一致的计数
+    """
+    counters = {"total": 0, "vip_pending": 0, "schema": SESSION_STATS_SCHEMA}
+    for status in SessionStatus:
+        counters[f"status:{status.value}"] = 0
+
+    for state in states:
+        status = SessionStatus(state.status)
+        agent_id = index_agent_id(state)
+        counters["total"] += 1
+        counters[f"status:{status.value}"] += 1
+        if status == SessionStatus.MANUAL_LIVE and agent_id != UNASSIGNED_AGENT:
+            counters[f"live:{agent_id}"] = counters.get(f"live:{agent_id}", 0) + 1
+        if status == SessionStatus.PENDING_MANUAL and agent_id != UNASSIGNED_AGENT:
+            counters[f"pending:{agent_id}"] = counters.get(f"pending:{agent_id}", 0) + 1
+        if status == SessionStatus.PENDING_MANUAL and is_vip_session(state):
+            counters["vip_pending"] += 1
+
+    return counters
+
+
+def parse_session_stats(raw: dict) -> dict:
+    """
+    将 session_stats 哈希转换为 get_stats() 的返回格式
+
+    计数器可能因并发对账出现短暂负数，统一按 0 处理。
+    """
+    def count(field: str) -> int:
+        return max(0, int(raw.get(field) or 0))
+
+    def by_agent(prefix: str) -> dict:
+        return {
+            field[len(prefix):]: count(field)
+            for field in raw
+            if field.startswith(prefix) and count(field) > 0
+        }
+
+    by_status = {status.value: count(f"status:{status.value}") for status in SessionStatus}
+    return {
+        "total": count("total"),
+        "by_status": by_status,
+        "live_by_agent": by_agent("live:"),
+        "pending_by_agent": by_agent("pending:"),
+        "vip_pending": count("vip_pending"),
+    }
+
+
+def resolve_index_query(
+    status: Optional[SessionStatus],
+    agent_id: Optional[str],
+    order_by: str
+) -> str:
+    """
+    选择查询使用的 ZSET 索引
+
+    同时按状态和坐席筛选时使用组合索引，与单条件查询一样按排名直接分页。
+    """
+    return session_index_key(order_by, status=status, agent_id=agent_id)
+
+
+def score_bound(value: Optional[float], default: str) -> str:
+    """ZRANGEBYSCORE 的分数边界（None 表示不限）"""
+    return default if value is None else repr(float(value))
+
+
+def index_rank_window(
+    total: int,
+    skipped: int,
+    offset: int,
+    limit: Optional[int]
+) -> Optional[Tuple[int, int]]:
+    """
+    计算 ZRANGE/ZREVRANGE 的排名窗口
+
+    Args:
+        total: 分数范围内的成员数
+        skipped: 排序方向上位于分数范围之前的成员数
+        offset: 分页偏移量
+        limit: 每页数量（None 表示取到范围末尾）
+
+    Returns:
+        (start, stop) 闭区间排名；没有数据时返回 None
+    """
+    if offset >= total or limit == 0:
+        return None
+    start = skipped + offset
+    last = skipped + total - 1
+    stop = last if limit is None else min(last, start + limit - 1)
+    return start, stop
+
+
+def queue_script(pipe, script, keys: List[str], args: list):
+    """
+    在 pipeline 中缓冲一次脚本调用
+
+    同步与异步 pipeline 共用（异步 Script.__call__ 是协程，不能在缓冲命令时直接调用）；
+    pipeline 执行前会按 scripts 集合自动 SCRIPT LOAD。
+    """
+    pipe.scripts.add(script)
+    pipe.evalsha(script.sha, len(keys), *keys, *args)
+
+
+class RedisSessionStoreBase(SessionStateStore):
+    """
+    Redis 会话存储的公共实现（RedisSessionStore / AsyncRedisSessionStore 共用）
+
+    Key 与脚本参数构造、结果解析和读写流程都在本类中，子类只提供客户端和以下 I/O 原语：
+        _io(result)               取得单条命令的结果（同步客户端直接返回，asyncio 客户端 await）
+        _pipeline(queue, ...)     在 pipeline 中缓冲 queue(pipe) 的命令并执行，返回结果列表
+        _scan(pattern, count)     SCAN 匹配的全部 Key
+
+    子类在 __init__ 中设置 self.redis / self.default_ttl / self.codec，并调用 _register_scripts()。
 
     设计原则：
     1. ✅ 资源限制 - 使用连接池，限制最大连接数
@@ -36,46 +927,32 @@ class RedisSessionStore(SessionStateStore):
     5. ✅ 监控友好 - 详细的日志记录
     """
 
-    def __init__(
-        self,
-        redis_url: str = "redis://localhost:6379/0",
-        max_connections: int = 50,
-        socket_timeout: float = 5.0,
-        socket_connect_timeout: float = 5.0,
-        default_ttl: int = 86400  # 24小时
-    ):
-        """
-        初始化 Redis 连接
+    redis: Any
+    default_ttl: int
+    codec: PayloadCodec
 
-        Args:
-            redis_url: Redis 连接地址
-                - 本地开发: redis://localhost:6379/0
-                - 生产环境: redis://:password@host:6379/0
-            max_connections: 最大连接数（约束16.1.3 - 限制连接数）
-            socket_timeout: Socket 超时时间（约束16.3.2 - 超时保护）
-            socket_connect_timeout: 连接超时时间
-            default_ttl: 默认过期时间（秒），约束16.1.1 - 必须设置 TTL
-        """
-        try:
-            # 创建连接池（约束16.1.3 - 数据库连接池）
-            pool = redis.ConnectionPool.from_url(
-                redis_url,
-                max_connections=max_connections,
-                socket_timeout=socket_timeout,
-                socket_connect_timeout=socket_connect_timeout,
-                decode_responses=True  # 自动解码为字符串
-            )
+    def _register_scripts(self):
+        self._save_script = self.redis.register_script(SAVE_SESSION_LUA)
+        self._delete_script = self.redis.register_script(DELETE_SESSION_LUA)
+        self._search_script = self.redis.register_script(SEARCH_SESSIONS_LUA)
 
-            self.redis = redis.Redis(connection_pool=pool)
-            self.default_ttl = default_ttl
+    # ------------------
+    # I/O 原语（子类实现）
+    # ------------------
+    async def _io(self, result):
+        """取得单条命令（或脚本调用）的结果"""
+        raise NotImplementedError
 
-            # 验证连接
-            self.redis.ping()
-            logger.info(f"✅ Redis 连接成功: {redis_url} (连接池大小: {max_connections})")
+    async def _pipeline(self, queue: Callable[[Any], None], transaction: bool = False) -> list:
+        """在 pipeline 中缓冲 queue(pipe) 的命令并执行"""
+        raise NotImplementedError
 
-        except Exception as e:
-            logger.error(f"❌ Redis 连接失败: {e}")
-            raise
+    async def _scan(self, pattern: str, count: int = MGET_BATCH_SIZE) -> List[str]:
+        """SCAN 匹配 pattern 的全部 Key（不使用 KEYS，避免阻塞 Redis）"""
+        raise NotImplementedError
+
+    async def _scan_session_names(self) -> List[str]:
+        return [key.replace("session:", "", 1) for key in await self._scan("session:*")]
 
     async def save(self, state: SessionState) -> bool:
         """
@@ -86,6 +963,12 @@ class RedisSessionStore(SessionStateStore):
         2. 存储到 Redis: session:{session_name}
         3. 更新状态索引: status:{status}
         4. 设置 24 小时过期时间（约束16.1.1 - 必须设置 TTL）
+        5. 更新 ZSET 二级索引（session_idx:*）
+        6. 新消息 RPUSH 到 session_history:{name} 并 LTRIM 保留最近 50 条
+
+        2-6 步由 SAVE_SESSION_LUA 在 Redis 中原子执行。脚本访问的旧索引 Key 由保存前
+        读取的快照（旧状态 / 旧坐席 / profile 词项）计算，快照被并发修改时重新读取后重试。
+        主数据不含完整历史，每轮对话写入量与历史长度无关。
 
         Args:
             state: 会话状态对象
@@ -94,22 +977,17 @@ class RedisSessionStore(SessionStateStore):
             bool: 保存是否成功
         """
         try:
-            # 1. 序列化（使用 Pydantic 的 model_dump_json）
-            key = f"session:{state.session_name}"
-            json_data = state.model_dump_json()
-
-            # 2. 存储（带过期时间 - 约束16.1.1）
-            self.redis.setex(key, self.default_ttl, json_data)
-
-            # 3. 更新状态索引（用于按状态查询）
-            status_key = f"status:{state.status}"
-            self.redis.sadd(status_key, state.session_name)
-
-            # 4. 清理旧状态索引（如果状态发生变化）
-            for status in SessionStatus:
-                if status != state.status:
-                    old_status_key = f"status:{status}"
-                    self.redis.srem(old_status_key, state.session_name)
+            # 1. 序列化，2-6. 读取快照后在 Lua 脚本中原子执行
+            for _ in range(SCRIPT_RETRY_LIMIT):
+                snapshot, = parse_session_snapshots(await self._pipeline(
+                    lambda pipe: queue_session_snapshot(pipe, state.session_name)
+                ))
+                keys, args = save_script_params(state, self.default_ttl, self.codec, snapshot)
+                if await self._io(self._save_script(keys=keys, args=args)) != SCRIPT_STALE:
+                    break
+            else:
+                raise WatchError("会话快照持续被并发修改")
+            state.mark_messages_saved()
 
             logger.debug(f"💾 会话已保存: {state.session_name} (状态: {state.status})")
             return True
@@ -123,8 +1001,8 @@ class RedisSessionStore(SessionStateStore):
         从 Redis 获取会话
 
         工作流程:
-        1. 从 Redis 读取 JSON 数据
-        2. 反序列化为 SessionState 对象
+        1. 同一次网络往返读取主数据和历史列表
+        2. 按数据头解码并反序列化为 SessionState 对象
 
         Args:
             session_name: 会话名称
@@ -132,23 +1010,98 @@ class RedisSessionStore(SessionStateStore):
         Returns:
             SessionState 对象，如果不存在则返回 None
         """
+        def queue(pipe):
+            pipe.execute_command("GET", session_key(session_name), **RAW_READ)
+            pipe.execute_command("LRANGE", history_key(session_name), 0, -1, **RAW_READ)
+
         try:
-            key = f"session:{session_name}"
-            json_data = self.redis.get(key)
+            raw, raw_history = await self._pipeline(queue)
 
-            if json_data:
-                # 使用 Pydantic 的 model_validate_json 反序列化
-                state = SessionState.model_validate_json(json_data)
+            if raw:
+                state = restore_history(decode_session(raw), raw_history)
                 logger.debug(f"📖 会话已加载: {session_name}")
                 return state
-            else:
-                logger.debug(f"🔍 会话不存在: {session_name}")
-                return None
+
+            logger.debug(f"🔍 会话不存在: {session_name}")
+            return None
 
         except Exception as e:
             logger.error(f"❌ 读取会话失败 {session_name}: {e}")
             return None
 
+    async def get_many(
+        self,
+        session_names: Iterable[str],
+        include_history: bool = True
+    ) -> List[SessionState]:
+        """
+        批量获取会话（分批 MGET，每批一次网络往返）
+
+        Args:
+            session_names: 会话名称列表
+            include_history: 是否加载完整历史（False 时只读主数据，history 只有最后一条消息）
+
+        Returns:
+            按输入顺序排列的会话列表（不存在的会话被跳过）
+        """
+        def queue(pipe, batch):
+            pipe.execute_command("MGET", *[session_key(name) for name in batch], **RAW_READ)
+            if include_history:
+                for name in batch:
+                    pipe.execute_command("LRANGE", history_key(name), 0, -1, **RAW_READ)
+
+        sessions = []
+        try:
+            for batch in chunked(session_names):
+                payloads, *histories = await self._pipeline(lambda pipe: queue(pipe, batch))
+                sessions.extend(decode_sessions(batch, payloads, histories if include_history else None))
+
+            logger.debug(f"📖 批量加载会话: {len(sessions)} 个")
+            return sessions
+
+        except Exception as e:
+            logger.error(f"❌ 批量读取会话失败: {e}")
+            return sessions
+
+    async def get_summaries(self, session_names: Iterable[str]) -> List[SessionSummary]:
+        """
+        批量获取会话摘要（每批一次网络往返，只读 session_summary:{name} 哈希）
+
+        升级前保存、尚无摘要投影的会话回退为读取主数据生成。
+
+        Args:
+            session_names: 会话名称列表
+
+        Returns:
+            按输入顺序排列的摘要列表（不存在的会话被跳过）
+        """
+        def queue(pipe, batch):
+            for name in batch:
+                pipe.hgetall(summary_key(name))
+
+        summaries = []
+        try:
+            for batch in chunked(session_names):
+                found = dict(zip(batch, await self._pipeline(lambda pipe: queue(pipe, batch))))
+
+                missing = [name for name, fields in found.items() if not fields]
+                fallback = {
+                    state.session_name: SessionSummary.from_state(state)
+                    for state in await self.get_many(missing, include_history=False)
+                } if missing else {}
+
+                for name in batch:
+                    if found[name]:
+                        summaries.append(decode_summary(found[name]))
+                    elif name in fallback:
+                        summaries.append(fallback[name])
+
+            return summaries
+
+        except Exception as e:
+            logger.error(f"❌ 批量读取会话摘要失败: {e}")
+            return summaries
+
     async def get_or_create(
         self,
         session_name: str,
@@ -181,16 +1134,16 @@ class RedisSessionStore(SessionStateStore):
                     await self.save(state)
                     logger.debug(f"🔄 更新会话 conversation_id: {session_name}")
                 return state
-            else:
-                # 3. 创建新会话
-                state = SessionState(
-                    session_name=session_name,
-                    conversation_id=conversation_id,
-                    status=SessionStatus.BOT_ACTIVE
-                )
-                await self.save(state)
-                logger.info(f"✨ 创建新会话: {session_name}")
-                return state
+
+            # 3. 创建新会话
+            state = SessionState(
+                session_name=session_name,
+                conversation_id=conversation_id,
+                status=SessionStatus.BOT_ACTIVE
+            )
+            await self.save(state)
+            logger.info(f"✨ 创建新会话: {session_name}")
+            return state
 
         except Exception as e:
             logger.error(f"❌ 获取或创建会话失败 {session_name}: {e}")
@@ -212,17 +1165,8 @@ class RedisSessionStore(SessionStateStore):
             bool: 删除是否成功
         """
         try:
-            # 1. 先获取会话状态，用于清理索引
-            state = await self.get(session_name)
-
-            # 2. 删除主数据
-            key = f"session:{session_name}"
-            self.redis.delete(key)
-
-            # 3. 清理状态索引
-            if state:
-                status_key = f"status:{state.status}"
-                self.redis.srem(status_key, session_name)
+            # 删除主数据、清理全部索引并扣减统计计数器（DELETE_SESSION_LUA 原子执行）
+            await self._delete_sessions([session_name])
 
             logger.debug(f"🗑️  会话已删除: {session_name}")
             return True
@@ -231,51 +1175,373 @@ class RedisSessionStore(SessionStateStore):
             logger.error(f"❌ 删除会话失败 {session_name}: {e}")
             return False
 
+    async def query(
+        self,
+        *,
+        status: Optional[SessionStatus] = None,
+        agent_id: Optional[str] = None,
+        order_by: str = "updated_at",
+        min_score: Optional[float] = None,
+        max_score: Optional[float] = None,
+        descending: bool = True,
+        limit: Optional[int] = 50,
+        offset: int = 0,
+        include_history: bool = True
+    ) -> Tuple[List[SessionState], int]:
+        """
+        基于 ZSET 索引的分页查询
+
+        只读取当前页的会话数据，代价为 O(log N + limit)，不再扫描全部 session:* Key。
+
+        Args:
+            status: 会话状态（None 表示不限）
+            agent_id: 坐席 ID，UNASSIGNED_AGENT 表示未分配（None 表示不限）
+            order_by: 排序及范围字段（updated_at / created_at / priority）
+            min_score: order_by 字段下限（含）
+            max_score: order_by 字段上限（含）
+            descending: 是否倒序
+            limit: 每页数量（None 表示返回全部）
+            offset: 偏移量
+            include_history: 是否加载完整历史（列表视图传 False，只读主数据）
+
+        Returns:
+            (当前页会话列表, 符合条件的总数)
+        """
+        return await self._query(
+            lambda names: self.get_many(names, include_history),
+            status, agent_id, order_by, min_score, max_score, descending, limit, offset
+        )
+
+    async def query_summaries(
+        self,
+        *,
+        status: Optional[SessionStatus] = None,
+        agent_id: Optional[str] = None,
+        order_by: str = "updated_at",
+        min_score: Optional[float] = None,
+        max_score: Optional[float] = None,
+        descending: bool = True,
+        limit: Optional[int] = 50,
+        offset: int = 0
+    ) -> Tuple[List[SessionSummary], int]:
+        """
+        基于 ZSET 索引分页查询会话摘要（参数同 query()）
+
+        只读取 session_summary:{name} 哈希，不反序列化会话主数据。
+        """
+        return await self._query(
+            self.get_summaries,
+            status, agent_id, order_by, min_score, max_score, descending, limit, offset
+        )
+
+    async def _query(
+        self,
+        loader: Callable[[List[str]], Awaitable[list]],
+        status: Optional[SessionStatus],
+        agent_id: Optional[str],
+        order_by: str,
+        min_score: Optional[float],
+        max_score: Optional[float],
+        descending: bool,
+        limit: Optional[int],
+        offset: int
+    ) -> Tuple[list, int]:
+        """索引分页查询（loader 按名称批量读取会话或摘要）"""
+        try:
+            key = resolve_index_query(status, agent_id, order_by)
+            names, total = await self._index_window(key, min_score, max_score, descending, offset, limit)
+            sessions = await self._load_indexed(names, loader)
+            if len(sessions) < len(names):
+                # 已过期的会话已从索引清理，重新读取本页
+                names, total = await self._index_window(key, min_score, max_score, descending, offset, limit)
+                sessions = await loader(names)
+
+            logger.debug(f"📋 索引查询: {key}, 总数={total}, 返回={len(sessions)}")
+            return sessions, total
+
+        except Exception as e:
+            logger.error(f"❌ 索引查询会话失败: {e}")
+            return [], 0
+
+    async def _index_window(
+        self,
+        key: str,
+        min_score: Optional[float],
+        max_score: Optional[float],
+        descending: bool,
+        offset: int,
+        limit: Optional[int]
+    ) -> Tuple[List[str], int]:
+        """
+        按排名读取索引窗口
+
+        先用 ZCOUNT 求出分数范围的起始排名，再按排名 ZRANGE/ZREVRANGE，
+        避免 ZRANGEBYSCORE ... LIMIT offset 逐个跳过 offset 个成员。
+        """
+        low = score_bound(min_score, "-inf")
+        high = score_bound(max_score, "+inf")
+
+        def queue(pipe):
+            pipe.zcount(key, low, high)
+            if descending:
+                pipe.zcount(key, f"({high}", "+inf")
+            else:
+                pipe.zcount(key, "-inf", f"({low}")
+
+        total, skipped = await self._pipeline(queue)
+
+        window = index_rank_window(total, skipped, offset, limit)
+        if window is None:
+            return [], total
+
+        start, stop = window
+        if descending:
+            return await self._io(self.redis.zrevrange(key, start, stop)), total
+        return await self._io(self.redis.zrange(key, start, stop)), total
+
+    async def _load_indexed(
+        self,
+        names: List[str],
+        loader: Callable[[List[str]], Awaitable[list]]
+    ) -> list:
+        """读取索引命中的会话（或摘要），并清理 TTL 已到期的索引成员"""
+        sessions = await loader(names)
+        if len(sessions) < len(names):
+            found = {state.session_name for state in sessions}
+            await self._purge_missing([name for name in names if name not in found])
+        return sessions
+
+    async def _delete_sessions(self, session_names: List[str], expired_only: bool = False) -> int:
+        """
+        批量执行 DELETE_SESSION_LUA（先读取快照，快照失效的会话重新读取后重试）
+
+        Returns:
+            int: 实际删除的会话数量
+        """
+        def queue_snapshots(pipe):
+            for name in pending:
+                queue_session_snapshot(pipe, name, include_messages=True)
+
+        def queue_deletes(pipe):
+            for name, snapshot in zip(pending, snapshots):
+                keys, args = delete_script_params(name, snapshot, expired_only)
+                queue_script(pipe, self._delete_script, keys, args)
+
+        deleted = 0
+        pending = list(session_names)
+        for _ in range(SCRIPT_RETRY_LIMIT):
+            snapshots = parse_session_snapshots(await self._pipeline(queue_snapshots))
+            results = await self._pipeline(queue_deletes)
+
+            deleted += sum(result for result in results if result != SCRIPT_STALE)
+            pending = [name for name, result in zip(pending, results) if result == SCRIPT_STALE]
+            if not pending:
+                return deleted
+        raise WatchError(f"会话快照持续被并发修改: {pending}")
+
+    async def _purge_missing(self, session_names: List[str]) -> int:
+        """
+        从索引和统计计数器中移除主数据已过期的会话
+
+        会话主数据依靠 TTL 过期，索引成员和计数器需要单独清理。
+        脚本内部 EXISTS 确认会话不存在后才清理，避免误删刚刚保存的会话。
+        """
+        if not session_names:
+            return 0
+
+        purged = await self._delete_sessions(session_names, expired_only=True)
+
+        if purged:
+            logger.debug(f"🧹 清理过期会话索引: {purged} 个")
+        return purged
+
+    async def prune_indexes(self) -> int:
+        """
+        清理索引中 TTL 已到期的会话（由后台任务定期调用）
+
+        会话在 updated_at 之后保存时才会刷新 TTL，因此只有 updated_at
+        早于 TTL 窗口的成员才可能已经过期，只需检查这部分成员。
+
+        Returns:
+            int: 清理的索引成员数量
+        """
+        try:
+            threshold = datetime.now(timezone.utc).timestamp() - self.default_ttl
+            candidates = await self._io(self.redis.zrangebyscore(
+                session_index_key("updated_at"), "-inf", threshold
+            ))
+            pruned = 0
+            for batch in chunked(candidates):
+                pruned += await self._purge_missing(batch)
+
+            if pruned:
+                logger.info(f"🧹 清理过期会话索引: {pruned} 个")
+            return pruned
+
+        except Exception as e:
+            logger.error(f"❌ 清理会话索引失败: {e}")
+            return 0
+
+    async def ensure_indexes(self) -> int:
+        """
+        确保 ZSET 索引存在（启动时调用）
+
+        升级前写入的会话没有 ZSET 索引（或缺少新版本增加的组合索引），
+        全局索引为空或索引版本变化时扫描重建一次。
+
+        Returns:
+            int: 重建索引的会话数量（索引已存在时为 0）
+        """
+        try:
+            if (
+                await self._io(self.redis.zcard(session_index_key("updated_at"))) > 0
+                and await self._io(self.redis.get(SESSION_INDEX_VERSION_KEY)) == SESSION_INDEX_VERSION
+            ):
+                if await self._io(self.redis.hget(SESSION_STATS_HASH, "schema")) != SESSION_STATS_SCHEMA:
+                    await self.reconcile_stats()
+                return 0
+
+            def queue(pipe):
+                for state in sessions:
+                    queue_index_update(pipe, state)
+
+            rebuilt = 0
+            for batch in chunked(await self._scan_session_names()):
+                sessions = await self.get_many(batch, include_history=False)
+                await self._pipeline(queue)
+                rebuilt += len(sessions)
+
+            await self._io(self.redis.set(SESSION_INDEX_VERSION_KEY, SESSION_INDEX_VERSION))
+            if rebuilt:
+                logger.info(f"🔧 已重建会话索引: {rebuilt} 个会话")
+            await self.reconcile_stats()
+            return rebuilt
+
+        except Exception as e:
+            logger.error(f"❌ 重建会话索引失败: {e}")
+            return 0
+
+    async def ensure_search_index(self) -> int:
+        """
+        确保全文检索倒排索引存在（启动时调用）
+
+        升级前写入的会话没有检索词项，索引版本标记不存在或版本变化时读取完整历史重建一次。
+
+        Returns:
+            int: 重建索引的会话数量（索引已存在时为 0）
+        """
+        try:
+            if await self._io(self.redis.get(SEARCH_INDEX_VERSION_KEY)) == SEARCH_INDEX_VERSION:
+                return 0
+
+            def queue_indexed(pipe):
+                for state in sessions:
+                    pipe.sunion(search_doc_key(state.session_name), search_profile_key(state.session_name))
+
+            def queue_terms(pipe):
+                for state, terms in zip(sessions, indexed):
+                    queue_search_terms(pipe, state, terms)
+
+            rebuilt = 0
+            for batch in chunked(await self._scan_session_names()):
+                sessions = await self.get_many(batch)
+                indexed = await self._pipeline(queue_indexed)
+                await self._pipeline(queue_terms)
+                rebuilt += len(sessions)
+
+            await self._io(self.redis.set(SEARCH_INDEX_VERSION_KEY, SEARCH_INDEX_VERSION))
+            logger.info(f"🔎 已重建会话检索索引: {rebuilt} 个会话")
+            return rebuilt
+
+        except Exception as e:
+            logger.error(f"❌ 重建会话检索索引失败: {e}")
+            return 0
+
+    async def search_sessions(self, keyword: str) -> Optional[List[str]]:
+        """
+        关键词检索会话（倒排索引，与历史消息数量无关）
+
+        Args:
+            keyword: 搜索关键词（多个词项为 AND 关系，最后一个词项按前缀匹配）
+
+        Returns:
+            命中的会话名称；关键词为空时返回 None（不做过滤），
+            没有可检索的词项（只有标点符号等）时返回空列表
+        """
+        if not (keyword or "").strip():
+            return None
+        terms = query_terms(keyword)
+        if not terms:
+            return []
+        try:
+            low, high = lexicon_range(terms[-1])
+            expansions = await self._io(self.redis.zrangebylex(
+                SEARCH_LEXICON_KEY, low, high, start=0, num=SEARCH_PREFIX_EXPANSION_LIMIT
+            ))
+            if not expansions:
+                return []
+            keys, args = search_script_params(terms, expansions)
+            names = await self._io(self._search_script(keys=keys, args=args))
+            logger.debug(f"🔎 检索会话: {terms}, 命中={len(names)}")
+            return list(names)
+        except Exception as e:
+            logger.error(f"❌ 检索会话失败: {e}")
+            return []
+
+    async def reconcile_stats(self) -> Optional[dict]:
+        """
+        对账统计计数器（由后台任务定期调用）
+
+        计数器在保存 / 删除 / 过期清理时增量更新；对账任务扫描全部会话重新计算，
+        修正进程异常、人工改数据或升级前数据带来的偏差。
+
+        Returns:
+            dict: 对账后的计数器；失败时返回 None
+        """
+        try:
+            counters = compute_session_stats(await self.get_all_sessions(include_history=False))
+
+            def queue(pipe):
+                pipe.delete(SESSION_STATS_HASH)
+                pipe.hset(SESSION_STATS_HASH, mapping=counters)
+
+            await self._pipeline(queue, transaction=True)
+
+            logger.info(f"📊 会话统计计数器已对账: 总数={counters['total']}")
+            return counters
+
+        except Exception as e:
+            logger.error(f"❌ 会话统计计数器对账失败: {e}")
+            return None
+
     async def list_by_status(
         self,
         status: SessionStatus,
         limit: int = 50,
-        offset: int = 0
+        offset: int = 0,
+        include_history: bool = True
     ) -> List[SessionState]:
         """
         按状态查询会话列表
 
         工作流程:
-        1. 从状态索引获取会话名称列表
+        1. 从状态 ZSET 索引按更新时间倒序读取当前页会话名称
         2. 批量读取会话数据
-        3. 排序和分页
 
         Args:
             status: 会话状态
             limit: 每页数量
             offset: 偏移量
+            include_history: 是否加载完整历史
 
         Returns:
             会话列表
         """
-        try:
-            status_key = f"status:{status}"
-            session_names = self.redis.smembers(status_key)
-
-            # 批量获取会话数据
-            sessions = []
-            for name in session_names:
-                state = await self.get(name)
-                if state:
-                    sessions.append(state)
-
-            # 排序（按更新时间倒序）
-            sessions.sort(key=lambda x: x.updated_at, reverse=True)
-
-            # 分页
-            result = sessions[offset:offset + limit]
-
-            logger.debug(f"📋 查询会话列表: 状态={status}, 总数={len(sessions)}, 返回={len(result)}")
-            return result
-
-        except Exception as e:
-            logger.error(f"❌ 查询会话列表失败 (状态={status}): {e}")
-            return []
+        sessions, total = await self.query(
+            status=status, limit=limit, offset=offset, include_history=include_history
+        )
+        logger.debug(f"📋 查询会话列表: 状态={status}, 总数={total}, 返回={len(sessions)}")
+        return sessions
 
     async def count_by_status(self, status: SessionStatus) -> int:
         """
@@ -288,9 +1554,10 @@ class RedisSessionStore(SessionStateStore):
             int: 会话数量
         """
         try:
-            status_key = f"status:{status}"
-            count = self.redis.scard(status_key)
-            return count
+            count = await self._io(
+                self.redis.hget(SESSION_STATS_HASH, f"status:{SessionStatus(status).value}")
+            )
+            return max(0, int(count or 0))
         except Exception as e:
             logger.error(f"❌ 统计会话数量失败 (状态={status}): {e}")
             return 0
@@ -299,64 +1566,42 @@ class RedisSessionStore(SessionStateStore):
         """
         获取会话统计信息
 
-        返回各状态的会话数量统计
+        读取 session_stats 计数器（一次 HGETALL，O(1) 与会话数量无关）
 
         Returns:
-            dict: 包含各状态会话数量的字典
+            dict: total / by_status / live_by_agent（坐席服务中会话数）/
+                  pending_by_agent（已分配待接入会话数）/ vip_pending
         """
         try:
-            stats = {
-                "total": 0,
-                "by_status": {}
-            }
-
-            # 统计各状态的会话数量
-            for status in SessionStatus:
-                count = await self.count_by_status(status)
-                stats["by_status"][status.value] = count
-                stats["total"] += count
+            stats = parse_session_stats(await self._io(self.redis.hgetall(SESSION_STATS_HASH)))
 
             logger.debug(f"📊 会话统计: 总数={stats['total']}")
             return stats
 
         except Exception as e:
             logger.error(f"❌ 获取会话统计失败: {e}")
-            return {
-                "total": 0,
-                "by_status": {status.value: 0 for status in SessionStatus}
-            }
+            return parse_session_stats({})
 
     async def list_all(
         self,
         limit: int = 50,
-        offset: int = 0
+        offset: int = 0,
+        include_history: bool = True
     ) -> List[SessionState]:
         """
-        获取所有会话列表（分页）
+        获取所有会话列表（分页，按更新时间倒序）
 
         Args:
             limit: 每页数量
             offset: 偏移量
+            include_history: 是否加载完整历史
 
         Returns:
             List[SessionState]: 会话列表
         """
-        try:
-            # 获取所有会话
-            all_sessions = await self.get_all_sessions()
-
-            # 按更新时间倒序排序
-            all_sessions.sort(key=lambda x: x.updated_at, reverse=True)
-
-            # 分页
-            paginated_sessions = all_sessions[offset:offset + limit]
-
-            logger.debug(f"📋 获取会话列表: {len(paginated_sessions)}/{len(all_sessions)} 个")
-            return paginated_sessions
-
-        except Exception as e:
-            logger.error(f"❌ 获取会话列表失败: {e}")
-            return []
+        sessions, total = await self.query(limit=limit, offset=offset, include_history=include_history)
+        logger.debug(f"📋 获取会话列表: {len(sessions)}/{total} 个")
+        return sessions
 
     async def count_all(self) -> int:
         """
@@ -366,10 +1611,8 @@ class RedisSessionStore(SessionStateStore):
             int: 会话总数
         """
         try:
-            # 使用 SCAN 统计所有 session: 前缀的 key
-            count = 0
-            for _ in self.redis.scan_iter("session:*", count=100):
-                count += 1
+            # 读取 session_stats 计数器（不再 SCAN 全部 Key）
+            count = max(0, int(await self._io(self.redis.hget(SESSION_STATS_HASH, "total")) or 0))
 
             logger.debug(f"📊 会话总数: {count}")
             return count
@@ -378,24 +1621,21 @@ class RedisSessionStore(SessionStateStore):
             logger.error(f"❌ 统计会话总数失败: {e}")
             return 0
 
-    async def get_all_sessions(self) -> List[SessionState]:
+    async def get_all_sessions(self, include_history: bool = True) -> List[SessionState]:
         """
         获取所有会话（用于统计和管理）
 
         注意：生产环境谨慎使用，可能返回大量数据
 
+        Args:
+            include_history: 是否加载完整历史
+
         Returns:
             所有会话列表
         """
         try:
-            sessions = []
-
             # 使用 SCAN 遍历所有会话 key（约束16.2.1 - 避免 KEYS 命令阻塞）
-            for key in self.redis.scan_iter("session:*", count=100):
-                session_name = key.replace("session:", "")
-                state = await self.get(session_name)
-                if state:
-                    sessions.append(state)
+            sessions = await self.get_many(await self._scan_session_names(), include_history)
 
             logger.debug(f"📊 获取所有会话: 总数={len(sessions)}")
             return sessions
@@ -413,12 +1653,18 @@ class RedisSessionStore(SessionStateStore):
         """
         try:
             deleted = 0
-            session_keys = list(self.redis.scan_iter("session:*", count=100))
+            session_keys = await self._scan("session:*", count=100)
             if session_keys:
-                deleted += self.redis.delete(*session_keys)
+                deleted += await self._io(self.redis.delete(*session_keys))
+
+            for pattern in ("session_history:*", "session_summary:*", "session_search:*", "session_idx:*"):
+                extra_keys = await self._scan(pattern, count=100)
+                if extra_keys:
+                    await self._io(self.redis.delete(*extra_keys))
 
-            for status in SessionStatus:
-                self.redis.delete(f"status:{status.value}")
+            await self._io(self.redis.delete(
+                *[status_index_key(status) for status in SessionStatus], SESSION_STATS_HASH
+            ))
 
             logger.warning(f"🧹 已清空会话数据: 删除 {deleted} 条记录")
             return deleted
@@ -426,7 +1672,7 @@ class RedisSessionStore(SessionStateStore):
             logger.error(f"❌ 清空会话数据失败: {e}")
             return 0
 
-    def check_health(self) -> dict:
+    async def check_health(self) -> dict:
         """
         健康检查（约束16.5.2 - 健康检查端点）
 
@@ -435,15 +1681,15 @@ class RedisSessionStore(SessionStateStore):
         """
         try:
             # 1. 检查连接
-            self.redis.ping()
+            await self._io(self.redis.ping())
 
             # 2. 获取内存使用情况（约束16.2.2 - 监控存储使用量）
-            info = self.redis.info('memory')
+            info = await self._io(self.redis.info('memory'))
             used_memory_mb = info['used_memory'] / 1024 / 1024
             max_memory_mb = info.get('maxmemory', 0) / 1024 / 1024 if info.get('maxmemory', 0) > 0 else None
 
-            # 3. 统计会话数量
-            total_sessions = len(list(self.redis.scan_iter("session:*", count=10)))
+            # 3. 统计会话数量（session_stats 计数器）
+            total_sessions = await self.count_all()
 
             health_info = {
                 "status": "healthy",
@@ -483,14 +1729,17 @@ class RedisSessionStore(SessionStateStore):
             threshold = datetime.now(timezone.utc).timestamp() - days * 24 * 3600
             cleaned_count = 0
 
-            # 使用 SCAN 遍历（避免 KEYS 阻塞）
-            for key in self.redis.scan_iter("session:*", count=100):
-                session_name = key.replace("session:", "")
-                state = await self.get(session_name)
+            # 使用 SCAN 遍历（避免 KEYS 阻塞），按批读取和删除
+            for batch in chunked(await self._scan_session_names()):
+                expired = [
+                    state for state in await self.get_many(batch, include_history=False)
+                    if state.updated_at < threshold
+                ]
+                if not expired:
+                    continue
 
-                if state and state.updated_at < threshold:
-                    await self.delete(session_name)
-                    cleaned_count += 1
+                await self._delete_sessions([state.session_name for state in expired])
+                cleaned_count += len(expired)
 
             if cleaned_count > 0:
                 logger.info(f"🧹 清理过期会话: {cleaned_count} 个（超过 {days} 天未活跃）")
@@ -500,3 +1749,71 @@ class RedisSessionStore(SessionStateStore):
         except Exception as e:
             logger.error(f"❌ 清理过期会话失败: {e}")
             return 0
+
+
+class RedisSessionStore(RedisSessionStoreBase):
+    """
+    Redis 会话状态存储实现（同步 redis.Redis 客户端）
+
+    接口为 async，但每次 Redis 调用都会阻塞事件循环；高并发部署使用
+    AsyncRedisSessionStore（src/async_redis_session_store.py）。两者共用 RedisSessionStoreBase。
+    """
+
+    def __init__(
+        self,
+        redis_url: str = "redis://localhost:6379/0",
+        max_connections: int = 50,
+        socket_timeout: float = 5.0,
+        socket_connect_timeout: float = 5.0,
+        default_ttl: int = 86400,  # 24小时
+        codec: Optional[PayloadCodec] = None,
+        pool_timeout: float = 5.0
+    ):
+        """
+        初始化 Redis 连接
+
+        Args:
+            redis_url: Redis 连接地址
+                - 本地开发: redis://localhost:6379/0
+                - 生产环境: redis://:password@host:6379/0
+            max_connections: 最大连接数（约束16.1.3 - 限制连接数）
+            socket_timeout: Socket 超时时间（约束16.3.2 - 超时保护）
+            socket_connect_timeout: 连接超时时间
+            default_ttl: 默认过期时间（秒），约束16.1.1 - 必须设置 TTL
+            codec: 会话数据编解码器（默认 json 旧格式，读取时自动识别所有格式）
+            pool_timeout: 连接全部占用时等待空闲连接的秒数，超时抛出 ConnectionError
+        """
+        try:
+            # 创建连接池（约束16.1.3 - 数据库连接池；连接用尽时等待空闲连接，而不是直接报 Too many connections）
+            pool = redis.BlockingConnectionPool.from_url(
+                redis_url,
+                max_connections=max_connections,
+                timeout=pool_timeout,
+                socket_timeout=socket_timeout,
+                socket_connect_timeout=socket_connect_timeout,
+                decode_responses=True  # 自动解码为字符串
+            )
+
+            self.redis = redis.Redis(connection_pool=pool)
+            self.default_ttl = default_ttl
+            self.codec = codec or get_codec("json")
+            self._register_scripts()
+
+            # 验证连接
+            self.redis.ping()
+            logger.info(f"✅ Redis 连接成功: {redis_url} (连接池大小: {max_connections})")
+
+        except Exception as e:
+            logger.error(f"❌ Redis 连接失败: {e}")
+            raise
+
+    async def _io(self, result):
+        return result
+
+    async def _pipeline(self, queue: Callable[[Any], None], transaction: bool = False) -> list:
+        pipe = self.redis.pipeline(transaction=transaction)
+        queue(pipe)
+        return pipe.execute()
+
+    async def _scan(self, pattern: str, count: int = MGET_BATCH_SIZE) -> List[str]:
+        return list(self.redis.scan_iter(pattern, count=count))
@@ -12,11 +12,14 @@
 import asyncio
 import json
 import os
-from typing import Optional, Dict, List, Any, Literal
+from dataclasses import dataclass, field
+from typing import Optional, Dict, List, Any, Literal, Iterable, Tuple
 from datetime import datetime, timezone
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 from enum import Enum
 
+from src.session_search import index_terms, match_terms, query_terms
+
 
 # ==================== 枚举定义 ====================
 
@@ -62,6 +65,12 @@ class PriorityLevel(str, Enum):
 
 # ==================== 数据模型 ====================
 
+# 每个会话保留的历史消息数量
+SESSION_HISTORY_LIMIT = 50
+
+# 紧急关键词（用户消息命中时提升优先级）
+URGENT_KEYWORDS = ["投诉", "退款", "质量问题", "差评", "赔偿"]
+
 class Message(BaseModel):
     """消息模型"""
     role: MessageRole
@@ -152,6 +161,7 @@ class SessionState(BaseModel):
     user_profile: UserProfile = Field(default_factory=UserProfile)
 
     # 消息历史 (最多保留 50 条)
+    # Redis 存储中完整历史单独存放于 session_history:{name} 列表，主数据只保留最后一条
     history: List[Message] = Field(default_factory=list)
 
     # 人工接管信息
@@ -176,17 +186,41 @@ class SessionState(BaseModel):
     # 工单关联
     tickets: List[str] = Field(default_factory=list)
 
+    # 尚未写入存储的新消息（Redis 存储保存时追加到历史列表）
+    _unsaved_messages: List[Message] = PrivateAttr(default_factory=list)
+
     class Config:
         use_enum_values = True
 
-    def add_message(self, message: Message, max_history: int = 50):
+    def add_message(self, message: Message, max_history: int = SESSION_HISTORY_LIMIT):
         """添加消息到历史记录"""
         self.history.append(message)
+        self._unsaved_messages.append(message)
         # 限制历史消息数量
         if len(self.history) > max_history:
             self.history = self.history[-max_history:]
+
+        # 记录命中的紧急关键词，列表视图无需加载完整历史即可展示
+        if message.role == MessageRole.USER:
+            found_keywords = [keyword for keyword in URGENT_KEYWORDS if keyword in message.content]
+            if found_keywords:
+                self.priority.urgent_keywords = sorted(set(self.priority.urgent_keywords) | set(found_keywords))
+
         self.updated_at = round(datetime.now(timezone.utc).timestamp(), 3)
 
+    @property
+    def unsaved_messages(self) -> List[Message]:
+        """尚未写入存储的新消息"""
+        return self._unsaved_messages
+
+    def mark_messages_saved(self):
+        """新消息已写入存储"""
+        self._unsaved_messages = []
+
+    def queue_history_migration(self):
+        """将当前历史全部标记为未保存（旧格式会话迁移到历史列表）"""
+        self._unsaved_messages = list(self.history)
+
     def update_priority(self, urgent_keywords: List[str] = None):
         """
         更新优先级信息 (模块2)
@@ -216,6 +250,8 @@ class SessionState(BaseModel):
                     for keyword in urgent_keywords:
                         if keyword in msg.content:
                             found_keywords.append(keyword)
+            # 合并 add_message 时记录的关键词（摘要加载的会话只有最后一条消息）
+            found_keywords.extend(self.priority.urgent_keywords)
             self.priority.urgent_keywords = list(set(found_keywords))
 
         # 重新计算优先级等级
@@ -270,65 +306,202 @@ class SessionState(BaseModel):
             return True
         return False
 
+    def to_summary(self) -> Dict[str, Any]:
+        """转换为摘要格式 (用于列表展示)"""
+        return SessionSummary.from_state(self).to_summary()
+
+    def add_ticket_reference(self, ticket_id: str):
+        """关联工单 ID"""
+        if ticket_id not in self.tickets:
+            self.tickets.append(ticket_id)
+            self.updated_at = round(datetime.now(timezone.utc).timestamp(), 3)
+
+
+def _message_preview(content: str) -> str:
+    """消息预览（最多 50 字）"""
+    return content[:50] + "..." if len(content) > 50 else content
+
+
+@dataclass
+class SessionSummary:
+    """
+    会话摘要投影（列表 / 排队接口使用）
+
+    只包含列表展示、筛选和排序需要的字段。Redis 存储在保存会话时同步写入
+    session_summary:{name} 哈希，列表接口无需反序列化完整 SessionState。
+    """
+
+    session_name: str
+    status: str
+    nickname: str = "访客"
+    vip: bool = False
+    order_count: int = 0                        # user_profile.metadata.order_count（客户类型筛选）
+    agent_id: Optional[str] = None
+    agent_name: Optional[str] = None
+    last_message_role: Optional[str] = None
+    last_message_preview: Optional[str] = None
+    last_message_at: Optional[float] = None
+    escalation_reason: Optional[str] = None
+    escalation_trigger_at: Optional[float] = None
+    priority_level: str = PriorityLevel.NORMAL.value
+    priority_is_vip: bool = False
+    wait_time_seconds: float = 0
+    is_timeout: bool = False
+    is_repeat: bool = False
+    urgent_keywords: List[str] = field(default_factory=list)
+    tickets: List[str] = field(default_factory=list)
+    created_at: float = 0
+    updated_at: float = 0
+
+    @classmethod
+    def from_state(cls, state: SessionState) -> 'SessionSummary':
+        """从完整会话生成摘要"""
+        last_msg = state.history[-1] if state.history else None
+        profile = state.user_profile
+        return cls(
+            session_name=state.session_name,
+            status=SessionStatus(state.status).value,
+            nickname=profile.nickname,
+            vip=profile.vip,
+            order_count=int(profile.metadata.get("order_count", 0) or 0),
+            agent_id=state.assigned_agent.id if state.assigned_agent else None,
+            agent_name=state.assigned_agent.name if state.assigned_agent else None,
+            last_message_role=MessageRole(last_msg.role).value if last_msg else None,
+            last_message_preview=_message_preview(last_msg.content) if last_msg else None,
+            last_message_at=last_msg.timestamp if last_msg else None,
+            escalation_reason=EscalationReason(state.escalation.reason).value if state.escalation else None,
+            escalation_trigger_at=state.escalation.trigger_at if state.escalation else None,
+            priority_level=PriorityLevel(state.priority.level).value,
+            priority_is_vip=state.priority.is_vip,
+            wait_time_seconds=state.priority.wait_time_seconds,
+            is_timeout=state.priority.is_timeout,
+            is_repeat=state.priority.is_repeat,
+            urgent_keywords=list(state.priority.urgent_keywords),
+            tickets=list(state.tickets),
+            created_at=state.created_at,
+            updated_at=state.updated_at
+        )
+
+    def refresh_priority(self):
+        """
+        重新计算优先级（与 SessionState.update_priority 相同的规则）
+
+        紧急关键词使用 add_message 时记录的结果，无需扫描历史消息。
+        """
+        self.priority_is_vip = self.vip
+        if self.escalation_trigger_at is not None and self.status == SessionStatus.PENDING_MANUAL:
+            self.wait_time_seconds = round(datetime.now(timezone.utc).timestamp(), 3) - self.escalation_trigger_at
+            self.is_timeout = self.wait_time_seconds > 300
+        else:
+            self.wait_time_seconds = 0
+            self.is_timeout = False
+
+        self.priority_level = PriorityInfo(
+            is_vip=self.priority_is_vip,
+            is_timeout=self.is_timeout,
+            is_repeat=self.is_repeat,
+            urgent_keywords=self.urgent_keywords
+        ).calculate_priority().value
+
     def to_summary(self) -> Dict[str, Any]:
         """转换为摘要格式 (用于列表展示)"""
         summary = {
             "session_name": self.session_name,
             "status": self.status,
             "user_profile": {
-                "nickname": self.user_profile.nickname,
-                "vip": self.user_profile.vip
+                "nickname": self.nickname,
+                "vip": self.vip
             },
             "updated_at": self.updated_at
         }
 
         # 添加最后一条消息预览
-        if self.history:
-            last_msg = self.history[-1]
+        if self.last_message_role is not None:
             summary["last_message_preview"] = {
-                "role": last_msg.role,
-                "content": last_msg.content[:50] + "..." if len(last_msg.content) > 50 else last_msg.content,
-                "timestamp": last_msg.timestamp
+                "role": self.last_message_role,
+                "content": self.last_message_preview,
+                "timestamp": self.last_message_at
             }
 
         # 添加人工接管信息
-        if self.escalation:
+        if self.escalation_reason is not None:
             summary["escalation"] = {
-                "reason": self.escalation.reason,
-                "trigger_at": self.escalation.trigger_at,
-                "waiting_seconds": round(datetime.now(timezone.utc).timestamp(), 3) - self.escalation.trigger_at
+                "reason": self.escalation_reason,
+                "trigger_at": self.escalation_trigger_at,
+                "waiting_seconds": round(datetime.now(timezone.utc).timestamp(), 3) - self.escalation_trigger_at
             }
 
-        if self.assigned_agent:
+        if self.agent_id is not None:
             summary["assigned_agent"] = {
-                "id": self.assigned_agent.id,
-                "name": self.assigned_agent.name
+                "id": self.agent_id,
+                "name": self.agent_name
             }
 
         # 【模块2】添加优先级信息
-        if self.priority:
-            summary["priority"] = {
-                "level": self.priority.level,
-                "is_vip": self.priority.is_vip,
-                "wait_time_seconds": self.priority.wait_time_seconds,
-                "is_timeout": self.priority.is_timeout,
-                "urgent_keywords": self.priority.urgent_keywords
-            }
+        summary["priority"] = {
+            "level": self.priority_level,
+            "is_vip": self.priority_is_vip,
+            "wait_time_seconds": self.wait_time_seconds,
+            "is_timeout": self.is_timeout,
+            "urgent_keywords": self.urgent_keywords
+        }
 
         if self.tickets:
             summary["tickets"] = self.tickets
 
         return summary
 
-    def add_ticket_reference(self, ticket_id: str):
-        """关联工单 ID"""
-        if ticket_id not in self.tickets:
-            self.tickets.append(ticket_id)
-            self.updated_at = round(datetime.now(timezone.utc).timestamp(), 3)
+    def matches(
+        self,
+        status: Optional[SessionStatus] = None,
+        agent_id: Optional[str] = None,
+        min_created: Optional[float] = None,
+        max_created: Optional[float] = None
+    ) -> bool:
+        """是否满足状态 / 坐席 / 创建时间条件（语义同 query()）"""
+        if status is not None and self.status != SessionStatus(status).value:
+            return False
+        if agent_id is not None and (self.agent_id or UNASSIGNED_AGENT) != agent_id:
+            return False
+        if min_created is not None and self.created_at < min_created:
+            return False
+        if max_created is not None and self.created_at > max_created:
+            return False
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SessionSummary':
+        """从字典创建对象（忽略未知字段）"""
+        known = cls.__dataclass_fields__
+        return cls(**{key: value for key, value in data.items() if key in known})
 
 
 # ==================== 状态存储接口 ====================
 
+# 按坐席查询时表示“未分配坐席”的会话
+UNASSIGNED_AGENT = "__unassigned__"
+
+# priority 排序字段中 VIP 会话的分数偏移（大于任何时间戳，VIP 优先，同级按更新时间）
+VIP_PRIORITY_OFFSET = 1e10
+
+
+def session_index_score(state: "SessionState", order_by: str) -> float:
+    """
+    会话在排序字段上的分数
+
+    order_by 为 updated_at / created_at 时取对应时间戳；
+    priority 为 VIP 优先、同级按 updated_at 的综合分数。
+    """
+    if order_by == "priority":
+        vip = bool(state.user_profile and state.user_profile.vip)
+        return state.updated_at + (VIP_PRIORITY_OFFSET if vip else 0)
+    return getattr(state, order_by)
+
+
 class SessionStateStore:
     """会话状态存储抽象接口"""
 
@@ -336,6 +509,29 @@ class SessionStateStore:
         """获取会话状态"""
         raise NotImplementedError
 
+    async def get_many(
+        self,
+        session_names: Iterable[str],
+        include_history: bool = True
+    ) -> List[SessionState]:
+        """
+        批量获取会话状态
+
+        按输入顺序返回存在的会话，不存在的会话被跳过。
+        默认实现逐个调用 get()，存储实现应覆盖为批量读取。
+
+        Args:
+            session_names: 会话名称列表
+            include_history: 是否加载完整历史（False 时 history 可能只有最后一条消息，
+                适用于只需要摘要的列表视图）
+        """
+        states = []
+        for name in session_names:
+            state = await self.get(name)
+            if state:
+                states.append(state)
+        return states
+
     async def save(self, state: SessionState) -> bool:
         """保存会话状态"""
         raise NotImplementedError
@@ -348,7 +544,8 @@ class SessionStateStore:
         self,
         status: SessionStatus,
         limit: int = 50,
-        offset: int = 0
+        offset: int = 0,
+        include_history: bool = True
     ) -> List[SessionState]:
         """按状态查询会话列表"""
         raise NotImplementedError
@@ -357,6 +554,64 @@ class SessionStateStore:
         """统计指定状态的会话数量"""
         raise NotImplementedError
 
+    async def query(
+        self,
+        *,
+        status: Optional[SessionStatus] = None,
+        agent_id: Optional[str] = None,
+        order_by: str = "updated_at",
+        min_score: Optional[float] = None,
+        max_score: Optional[float] = None,
+        descending: bool = True,
+        limit: Optional[int] = 50,
+        offset: int = 0,
+        include_history: bool = True
+    ) -> Tuple[List[SessionState], int]:
+        """
+        按状态 / 坐席 / 时间范围分页查询会话
+
+        Args:
+            status: 会话状态（None 表示不限）
+            agent_id: 坐席 ID，UNASSIGNED_AGENT 表示未分配（None 表示不限）
+            order_by: 排序及范围字段（updated_at / created_at / priority，见 session_index_score()）
+            min_score: order_by 字段下限（含）
+            max_score: order_by 字段上限（含）
+            descending: 是否倒序
+            limit: 每页数量（None 表示返回全部）
+            offset: 偏移量
+            include_history: 是否加载完整历史（False 时只保证最后一条消息）
+
+        Returns:
+            (当前页会话列表, 符合条件的总数)
+        """
+        raise NotImplementedError
+
+    async def get_summaries(self, session_names: Iterable[str]) -> List[SessionSummary]:
+        """
+        批量获取会话摘要（按输入顺序，不存在的会话被跳过）
+
+        默认实现由会话数据生成，Redis 存储直接读取摘要投影。
+        """
+        states = await self.get_many(session_names, include_history=False)
+        return [SessionSummary.from_state(state) for state in states]
+
+    async def query_summaries(self, **kwargs) -> Tuple[List[SessionSummary], int]:
+        """分页查询会话摘要（参数同 query()）"""
+        states, total = await self.query(include_history=False, **kwargs)
+        return [SessionSummary.from_state(state) for state in states], total
+
+    async def search_sessions(self, keyword: str) -> Optional[List[str]]:
+        """
+        关键词检索会话（会话 ID、客户昵称、坐席名称、消息内容）
+
+        分词规则见 session_search：多个词项为 AND 关系，最后一个词项按前缀匹配。
+
+        Returns:
+            命中的会话名称；关键词为空时返回 None（不做过滤），
+            没有可检索的词项（只有标点符号等）时返回空列表
+        """
+        raise NotImplementedError
+
     async def clear_all(self) -> int:
         """清空所有会话，返回清理数量"""
         raise NotImplementedError
@@ -394,10 +649,23 @@ class InMemorySessionStore(SessionStateStore):
         async with self._lock:
             return self._store.get(session_name)
 
+    async def get_many(
+        self,
+        session_names: Iterable[str],
+        include_history: bool = True
+    ) -> List[SessionState]:
+        """批量获取会话状态 (线程安全，内存存储始终包含完整历史)"""
+        async with self._lock:
+            return [
+                self._store[name] for name in session_names
+                if name in self._store
+            ]
+
     async def save(self, state: SessionState) -> bool:
         """保存会话状态 (线程安全)"""
         async with self._lock:
             state.updated_at = round(datetime.now(timezone.utc).timestamp(), 3)
+            state.mark_messages_saved()
             self._store[state.session_name] = state
 
             # 异步备份到文件 (如果配置了)
@@ -420,7 +688,8 @@ class InMemorySessionStore(SessionStateStore):
         self,
         status: SessionStatus,
         limit: int = 50,
-        offset: int = 0
+        offset: int = 0,
+        include_history: bool = True
     ) -> List[SessionState]:
         """按状态查询会话列表"""
         async with self._lock:
@@ -439,7 +708,66 @@ class InMemorySessionStore(SessionStateStore):
         async with self._lock:
             return sum(1 for state in self._store.values() if state.status == status)
 
-    async def list_all(self, limit: int = 50, offset: int = 0) -> List[SessionState]:
+    async def query(
+        self,
+        *,
+        status: Optional[SessionStatus] = None,
+        agent_id: Optional[str] = None,
+        order_by: str = "updated_at",
+        min_score: Optional[float] = None,
+        max_score: Optional[float] = None,
+        descending: bool = True,
+        limit: Optional[int] = 50,
+        offset: int = 0,
+        include_history: bool = True
+    ) -> Tuple[List[SessionState], int]:
+        """按状态 / 坐席 / 时间范围分页查询会话（内存过滤 + 排序）"""
+        async with self._lock:
+            states = list(self._store.values())
+
+        if status is not None:
+            states = [s for s in states if s.status == status]
+        if agent_id is not None:
+            states = [
+                s for s in states
+                if (s.assigned_agent.id if s.assigned_agent else UNASSIGNED_AGENT) == agent_id
+            ]
+        if min_score is not None:
+            states = [s for s in states if session_index_score(s, order_by) >= min_score]
+        if max_score is not None:
+            states = [s for s in states if session_index_score(s, order_by) <= max_score]
+
+        states.sort(key=lambda x: session_index_score(x, order_by), reverse=descending)
+        end = None if limit is None else offset + limit
+        return states[offset:end], len(states)
+
+    async def search_sessions(self, keyword: str) -> Optional[List[str]]:
+        """关键词检索会话（内存实现逐个会话分词，匹配规则与 Redis 倒排索引一致）"""
+        if not (keyword or "").strip():
+            return None
+        terms = query_terms(keyword)
+        if not terms:
+            return []
+
+        async with self._lock:
+            states = list(self._store.values())
+
+        def matched(state: SessionState) -> bool:
+            return match_terms(index_terms(
+                state.session_name,
+                state.user_profile.nickname if state.user_profile else "",
+                state.assigned_agent.name if state.assigned_agent else "",
+                *[msg.content for msg in state.history],
+            ), terms)
+
+        return [state.session_name for state in states if matched(state)]
+
+    async def list_all(
+        self,
+        limit: int = 50,
+        offset: int = 0,
+        include_history: bool = True
+    ) -> List[SessionState]:
         """获取所有会话列表"""
         async with self._lock:
             # 获取所有会话
@@ -511,13 +839,29 @@ class InMemorySessionStore(SessionStateStore):
                 if count > 0:
                     by_status[status.value] = count
 
+            live_by_agent: Dict[str, int] = {}
+            pending_by_agent: Dict[str, int] = {}
+            vip_pending = 0
+            for state in self._store.values():
+                if state.status == SessionStatus.MANUAL_LIVE and state.assigned_agent:
+                    agent_id = state.assigned_agent.id
+                    live_by_agent[agent_id] = live_by_agent.get(agent_id, 0) + 1
+                if state.status == SessionStatus.PENDING_MANUAL and state.assigned_agent:
+                    agent_id = state.assigned_agent.id
+                    pending_by_agent[agent_id] = pending_by_agent.get(agent_id, 0) + 1
+                if state.status == SessionStatus.PENDING_MANUAL and state.user_profile.vip:
+                    vip_pending += 1
+
             return {
                 "total_sessions": total,
                 "by_status": by_status,
                 "active_sessions": sum(
                     1 for state in self._store.values()
                     if state.status != SessionStatus.CLOSED
-                )
+                ),
+                "live_by_agent": live_by_agent,
+                "pending_by_agent": pending_by_agent,
+                "vip_pending": vip_pending
             }
 
     async def clear_all(self) -> int:
@@ -0,0 +1,319 @@
+"""
+SSE 事件总线
+
+原先 SSE 推送依赖 backend.py 中的进程内字典 sse_queues（{目标: asyncio.Queue}），
+人工消息、会话状态变化、SLA 预警等只能送达连接在同一 uvicorn worker 上的客户端，
+服务只能以 --workers 1 运行。
+
+本模块将"发布"与"本地投递"拆开:
+1. LocalEventBus  - 进程内总线（单 worker / 开发环境），行为与原 sse_queues 一致
+2. RedisEventBus  - 发布到 Redis Pub/Sub 频道，每个 worker 各自订阅，
+                    收到事件后投递给本进程内的订阅者（chat_stream / agent_events 的队列）
+
+事件格式（JSON）: {"target": 会话名或坐席用户名, "payload": {...}, "create": bool, "id": 缓存事件 ID}
+- create=False: 仅当目标在本 worker 有订阅队列时投递（原 `if name in sse_queues` 语义）
+- create=True:  目标尚未连接时也缓存事件（原 enqueue_sse_message 语义），连接后补发
+
+所有 worker 共用一个频道，由 target 在本地过滤：SSE 事件量远小于 Redis 吞吐上限。
+Redis 总线的 create=True 事件同时写入共享缓存列表 {channel}:pending:{target}（带 TTL），
+目标连接所在的 worker 用 LREM 取走后投递，尚未连接时留在列表中，由 connect() 取出补发；
+每个事件只被取走一次，不会在各 worker 上各留一份缓存，重连到其他 worker 也不会重复补发。
+SSE 连接断开时调用 disconnect() 释放本地队列。
+
+配置方式（环境变量）:
+    SSE_EVENT_BUS=redis        # redis / local，默认 Redis 可用时使用 redis
+    SSE_EVENT_CHANNEL=sse:events
+    SSE_QUEUE_MAXSIZE=200      # 单个目标的本地队列上限，满时丢弃最旧事件
+"""
+
+import asyncio
+import json
+import os
+import uuid
+from typing import Any, Dict, Optional
+
+import redis.asyncio as aioredis
+
+DEFAULT_CHANNEL = "sse:events"
+DEFAULT_QUEUE_MAXSIZE = 200
+RECONNECT_DELAY_SECONDS = 1.0
+# 目标未连接时 create=True 事件在 Redis 中的缓存时间（秒）
+PENDING_TTL_SECONDS = 86400
+
+
+def encode_event(
+    target: str,
+    payload: Dict[str, Any],
+    create: bool = False,
+    event_id: Optional[str] = None
+) -> str:
+    """编码总线事件（event_id 仅用于缓存事件，保证序列化结果唯一）"""
+    event = {"target": target, "payload": payload, "create": create}
+    if event_id:
+        event["id"] = event_id
+    return json.dumps(event, ensure_ascii=False, default=str)
+
+
+def decode_event(raw: str) -> Optional[Dict[str, Any]]:
+    """解码总线事件（格式错误返回 None）"""
+    try:
+        event = json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(event, dict) or not event.get("target") or not isinstance(event.get("payload"), dict):
+        return None
+    return event
+
+
+class LocalEventBus:
+    """
+    进程内事件总线
+
+    queues 保存本 worker 的订阅队列，由 chat_stream / agent_events 通过 connect() 创建、
+    disconnect() 释放；connections 记录每个目标当前的 SSE 连接数。
+    """
+
+    name = "local"
+
+    def __init__(self, queue_maxsize: int = DEFAULT_QUEUE_MAXSIZE):
+        """
+        Args:
+            queue_maxsize: 单个目标的队列上限（0 表示不限制）
+        """
+        self.queue_maxsize = queue_maxsize
+        self.queues: Dict[str, asyncio.Queue] = {}
+        self.connections: Dict[str, int] = {}
+
+    def subscribe(self, target: str) -> asyncio.Queue:
+        """获取（不存在则创建）目标的本地订阅队列"""
+        queue = self.queues.get(target)
+        if queue is None:
+            queue = asyncio.Queue(maxsize=self.queue_maxsize)
+            self.queues[target] = queue
+            print(f"✅ SSE 队列已创建: {target}")
+        return queue
+
+    async def connect(self, target: str) -> asyncio.Queue:
+        """SSE 连接建立：获取目标的订阅队列（包含连接前缓存的事件）"""
+        self.connections[target] = self.connections.get(target, 0) + 1
+        return self.subscribe(target)
+
+    def disconnect(self, target: str):
+        """SSE 连接断开：目标在本 worker 没有其他连接时释放订阅队列"""
+        remaining = self.connections.get(target, 0) - 1
+        if remaining > 0:
+            self.connections[target] = remaining
+            return
+        self.connections.pop(target, None)
+        if self.queues.pop(target, None) is not None:
+            print(f"🗑️  SSE 队列已释放: {target}")
+
+    def has_subscriber(self, target: str) -> bool:
+        """目标在本 worker 是否有订阅队列"""
+        return target in self.queues
+
+    def deliver(self, target: str, payload: Dict[str, Any], create: bool = False) -> bool:
+        """
+        投递到本地队列，队列满时丢弃最旧的数据
+
+        Returns:
+            是否已投递
+        """
+        if target in self.queues:
+            queue = self.queues[target]
+        elif create:
+            queue = self.subscribe(target)
+        else:
+            return False
+
+        try:
+            queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            queue.put_nowait(payload)
+        return True
+
+    async def publish(self, target: str, payload: Dict[str, Any], create: bool = False):
+        """发布事件"""
+        self.deliver(target, payload, create)
+
+    async def start(self):
+        """启动总线（本地总线无需处理）"""
+
+    async def close(self):
+        """关闭总线（本地总线无需处理）"""
+
+
+class RedisEventBus(LocalEventBus):
+    """
+    基于 Redis Pub/Sub 的跨 worker 事件总线
+
+    publish() 只写 Redis，本 worker 的订阅者同样通过监听任务收到事件，
+    保证同一目标的事件在各 worker 上顺序一致。Redis 发布失败时降级为本地投递。
+    create=True 的事件缓存在 Redis 列表中，本地只为已连接的目标创建队列。
+    """
+
+    name = "redis"
+
+    def __init__(
+        self,
+        redis_url: str,
+        channel: str = DEFAULT_CHANNEL,
+        queue_maxsize: int = DEFAULT_QUEUE_MAXSIZE,
+        socket_connect_timeout: float = 5.0
+    ):
+        """
+        Args:
+            redis_url: Redis 连接 URL
+            channel: Pub/Sub 频道名
+            queue_maxsize: 单个目标的本地队列上限
+            socket_connect_timeout: 连接超时（秒）
+        """
+        super().__init__(queue_maxsize)
+        self.channel = channel
+        # 订阅连接会一直阻塞读取，不设置 socket_timeout
+        self.redis = aioredis.from_url(
+            redis_url,
+            decode_responses=True,
+            socket_connect_timeout=socket_connect_timeout
+        )
+        self._listener: Optional[asyncio.Task] = None
+        self._subscribed = asyncio.Event()
+
+    async def start(self):
+        """启动订阅监听任务，等待首次订阅成功"""
+        if self._listener is not None:
+            return
+        await self.redis.ping()
+        self._listener = asyncio.create_task(self._listen())
+        await self._subscribed.wait()
+
+    async def close(self):
+        """停止监听并关闭连接"""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        await self.redis.aclose()
+
+    def pending_key(self, target: str) -> str:
+        """目标的 create=True 事件缓存列表"""
+        return f"{self.channel}:pending:{target}"
+
+    async def connect(self, target: str) -> asyncio.Queue:
+        """SSE 连接建立：创建本地队列，并取出目标未连接期间缓存在 Redis 中的事件"""
+        queue = await super().connect(target)
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.lrange(self.pending_key(target), 0, -1)
+                pipe.delete(self.pending_key(target))
+                pending, _ = await pipe.execute()
+        except Exception as exc:
+            print(f"⚠️ 读取 SSE 缓存事件失败 ({target}): {exc}")
+            return queue
+        for raw in pending:
+            event = decode_event(raw)
+            if event is not None:
+                self.deliver(target, event["payload"])
+        return queue
+
+    async def publish(self, target: str, payload: Dict[str, Any], create: bool = False):
+        """发布事件到 Redis 频道（create=True 时同时写入缓存列表；失败时本地投递）"""
+        try:
+            if not create:
+                await self.redis.publish(self.channel, encode_event(target, payload))
+                return
+            raw = encode_event(target, payload, create=True, event_id=uuid.uuid4().hex)
+            key = self.pending_key(target)
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.rpush(key, raw)
+                if self.queue_maxsize > 0:
+                    pipe.ltrim(key, -self.queue_maxsize, -1)
+                pipe.expire(key, PENDING_TTL_SECONDS)
+                pipe.publish(self.channel, raw)
+                await pipe.execute()
+        except Exception as exc:
+            print(f"⚠️ SSE 事件发布到 Redis 失败，降级为本地投递: {exc}")
+            self.deliver(target, payload, create)
+
+    async def handle_message(self, raw: str) -> bool:
+        """
+        处理频道消息，投递给本地订阅者
+
+        create=True 的事件只有从缓存列表中取走（LREM 成功）的 worker 才投递，
+        目标未连接时事件留在列表中，等待 connect() 补发。
+        """
+        event = decode_event(raw)
+        if event is None:
+            print("⚠️ 忽略格式错误的 SSE 事件")
+            return False
+        target = event["target"]
+        if not self.has_subscriber(target):
+            return False
+        if event.get("create") and not await self.redis.lrem(self.pending_key(target), 1, raw):
+            return False
+        return self.deliver(target, event["payload"])
+
+    async def _listen(self):
+        """订阅频道并持续投递，连接断开后自动重连"""
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                self._subscribed.set()
+                print(f"✅ SSE 事件总线已订阅: {self.channel}")
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        await self.handle_message(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"⚠️ SSE 事件总线订阅中断，{RECONNECT_DELAY_SECONDS}s 后重连: {exc}")
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+
+def create_event_bus(
+    backend: Optional[str],
+    redis_url: Optional[str] = None,
+    channel: Optional[str] = None,
+    queue_maxsize: Optional[int] = None
+) -> LocalEventBus:
+    """
+    按配置创建事件总线
+
+    Args:
+        backend: redis / local（None 或空表示 local）
+        redis_url: backend=redis 时必填
+        channel: Pub/Sub 频道名（默认读取 SSE_EVENT_CHANNEL）
+        queue_maxsize: 本地队列上限（默认读取 SSE_QUEUE_MAXSIZE）
+
+    Raises:
+        ValueError: backend 不支持或缺少 redis_url
+    """
+    normalized = (backend or "local").strip().lower()
+    if queue_maxsize is None:
+        queue_maxsize = int(os.getenv("SSE_QUEUE_MAXSIZE", str(DEFAULT_QUEUE_MAXSIZE)))
+
+    if normalized == "local":
+        return LocalEventBus(queue_maxsize)
+    if normalized == "redis":
+        if not redis_url:
+            raise ValueError("SSE_EVENT_BUS=redis 需要配置 REDIS_URL")
+        return RedisEventBus(
+            redis_url,
+            channel=channel or os.getenv("SSE_EVENT_CHANNEL", DEFAULT_CHANNEL),
+            queue_maxsize=queue_maxsize
+        )
+
+    raise ValueError(f"不支持的 SSE 事件总线: {backend}")
@@ -12,7 +12,7 @@ from datetime import datetime, timezone
 from enum import Enum
 from typing import Optional, Dict, Any, List
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class TicketType(str, Enum):
@@ -97,6 +97,10 @@ class TicketStatusHistory(BaseModel):
     changed_at: float = Field(default_factory=lambda: time.time())
 
 
+# 子记录集合（独立存储：工单主体只保存表头字段，子记录按需加载）
+TICKET_CHILD_COLLECTIONS = ("history", "assignments", "comments", "attachments")
+
+
 class Ticket(BaseModel):
     """工单实体"""
     ticket_id: str
@@ -125,6 +129,42 @@ class Ticket(BaseModel):
     attachments: List[TicketAttachment] = Field(default_factory=list)
     created_at: float = Field(default_factory=lambda: time.time())
     updated_at: float = Field(default_factory=lambda: time.time())
+    version: int = 0  # 乐观锁版本号（每次保存加 1，保存时校验未被其他请求修改）
+
+    # 尚未写入存储的子记录（保存时追加到子记录存储）
+    _unsaved_children: Dict[str, List[BaseModel]] = PrivateAttr(default_factory=dict)
+    # 待从子记录存储删除的记录 ID（保存时与工单主体一起提交）
+    _deleted_children: Dict[str, List[str]] = PrivateAttr(default_factory=dict)
+
+    @property
+    def unsaved_children(self) -> Dict[str, List[BaseModel]]:
+        """尚未写入存储的子记录 {集合名: 记录列表}"""
+        return self._unsaved_children
+
+    @property
+    def deleted_children(self) -> Dict[str, List[str]]:
+        """待从存储删除的子记录 {集合名: 记录 ID 列表}"""
+        return self._deleted_children
+
+    def mark_children_saved(self):
+        """新子记录已写入存储，待删除的子记录已删除"""
+        self._unsaved_children = {}
+        self._deleted_children = {}
+
+    def queue_children_migration(self):
+        """将当前全部子记录标记为未保存（旧格式工单迁移到独立存储）"""
+        self._unsaved_children = {
+            name: list(getattr(self, name))
+            for name in TICKET_CHILD_COLLECTIONS
+            if getattr(self, name)
+        }
+
+    def _track_child(self, name: str, record: BaseModel):
+        self._unsaved_children.setdefault(name, []).append(record)
+
+    def header_dict(self) -> Dict[str, Any]:
+        """工单主体（不含子记录）"""
+        return self.dict(exclude=set(TICKET_CHILD_COLLECTIONS))
 
     def to_dict(self) -> Dict[str, Any]:
         data = self.dict()
@@ -192,6 +232,7 @@ class Ticket(BaseModel):
             comment=comment
         )
         self.history.append(record)
+        self._track_child("history", record)
 
     def add_assignment_record(
         self,
@@ -208,6 +249,7 @@ class Ticket(BaseModel):
             note=note
         )
         self.assignments.append(record)
+        self._track_child("assignments", record)
 
     def add_comment(
         self,
@@ -228,8 +270,26 @@ class Ticket(BaseModel):
             mentions=self._normalize_mentions(mentions or [])
         )
         self.comments.append(comment)
+        self._track_child("comments", comment)
         return comment
 
+    def remove_comment(self, comment_id: str) -> bool:
+        """
+        删除评论（保存时从评论存储中删除）
+
+        Returns:
+            评论是否在已加载的评论（含尚未保存的新评论）中
+        """
+        pending = self._unsaved_children.get("comments")
+        if pending:
+            self._unsaved_children["comments"] = [c for c in pending if c.comment_id != comment_id]
+        self._deleted_children.setdefault("comments", []).append(comment_id)
+        for idx, comment in enumerate(self.comments):
+            if comment.comment_id == comment_id:
+                del self.comments[idx]
+                return True
+        return False
+
     def add_attachment(
         self,
         *,
@@ -252,6 +312,7 @@ class Ticket(BaseModel):
             uploader_name=uploader_name
         )
         self.attachments.append(attachment)
+        self._track_child("attachments", attachment)
         return attachment
 
     def get_attachment(self, attachment_id: str) -> Optional[TicketAttachment]:
@@ -3,32 +3,122 @@
 
 实现思路：
 - 过滤在线坐席
-- 优先匹配技能标签
-- 统计当前工作负载（人工会话+已分配待接入会话）
+- 优先匹配技能标签（技能标签倒排索引：标签 -> 坐席 ID，坐席记录变化时增量更新）
+- 统计当前工作负载（人工会话+已分配待接入会话，读取会话存储维护的按坐席计数器）
 - 结合历史偏好（同一客户优先安排熟悉坐席）
 """
 
 from __future__ import annotations
 
+import heapq
+import inspect
 from collections import defaultdict
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Set
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
 
 from src.agent_auth import Agent, AgentManager, AgentStatus, AgentSkill
 from src.session_state import (
     AgentInfo,
     SessionState,
     SessionStateStore,
-    SessionStatus,
 )
 
 
+def agent_skill_tags(agent: Agent) -> FrozenSet[str]:
+    """坐席的全部技能标签（技能分类 + 关键词，AgentSkill 已做小写归一化）"""
+    tags: Set[str] = set()
+    for skill in agent.skills or []:
+        tags.add(skill.category)
+        tags.update(skill.tags)
+    return frozenset(tags)
+
+
+class SkillTagIndex:
+    """
+    坐席技能标签倒排索引（标签 -> 坐席 ID 集合）
+
+    - sync(): 与坐席列表同步；注册表版本号未变化时直接跳过，变化时逐个比对并只更新标签变化的坐席
+    - update_agent() / remove_agent(): 技能修改、坐席删除后立即增量更新
+    - match(): 命中任一标签的坐席 ID（集合并集，不遍历坐席模型）
+    """
+
+    def __init__(self):
+        self.version: Optional[str] = None
+        self._tags_by_agent: Dict[str, FrozenSet[str]] = {}
+        self._agents_by_tag: Dict[str, Set[str]] = defaultdict(set)
+
+    def update_agent(self, agent: Agent) -> bool:
+        """
+        更新单个坐席的标签
+
+        Returns:
+            标签是否有变化
+        """
+        tags = agent_skill_tags(agent)
+        previous = self._tags_by_agent.get(agent.id)
+        if previous == tags:
+            return False
+
+        previous = previous or frozenset()
+        for tag in previous - tags:
+            members = self._agents_by_tag.get(tag)
+            if members is not None:
+                members.discard(agent.id)
+                if not members:
+                    del self._agents_by_tag[tag]
+        for tag in tags - previous:
+            self._agents_by_tag[tag].add(agent.id)
+        self._tags_by_agent[agent.id] = tags
+        return True
+
+    def remove_agent(self, agent_id: str):
+        """移除坐席"""
+        for tag in self._tags_by_agent.pop(agent_id, frozenset()):
+            members = self._agents_by_tag.get(tag)
+            if members is not None:
+                members.discard(agent_id)
+                if not members:
+                    del self._agents_by_tag[tag]
+
+    def sync(self, agents: Iterable[Agent], version: Optional[str] = None):
+        """
+        与坐席列表同步
+
+        Args:
+            agents: 全部坐席
+            version: 坐席注册表版本号（None 表示未知，每次都逐个比对）
+        """
+        if version is not None and version == self.version:
+            return
+
+        seen: Set[str] = set()
+        for agent in agents:
+            seen.add(agent.id)
+            self.update_agent(agent)
+        for agent_id in [agent_id for agent_id in self._tags_by_agent if agent_id not in seen]:
+            self.remove_agent(agent_id)
+        self.version = version
+
+    def tags_of(self, agent_id: str) -> FrozenSet[str]:
+        return self._tags_by_agent.get(agent_id, frozenset())
+
+    def match(self, tags: Iterable[str]) -> Set[str]:
+        """命中任一标签的坐席 ID"""
+        matched: Set[str] = set()
+        for tag in tags:
+            members = self._agents_by_tag.get(tag)
+            if members:
+                matched |= members
+        return matched
+
+
 @dataclass
 class AgentSnapshot:
     """坐席快照，包含技能和负载信息"""
     agent: Agent
     manual_sessions: int = 0
     pending_sessions: int = 0
+    tags: Optional[FrozenSet[str]] = None
 
     @property
     def load_score(self) -> float:
@@ -36,11 +126,9 @@ class AgentSnapshot:
         return self.manual_sessions * 2 + self.pending_sessions
 
     def skill_tags(self) -> Set[str]:
-        tags: Set[str] = set()
-        for skill in self.agent.skills or []:
-            tags.add(skill.category)
-            tags.update(skill.tags)
-        return tags
+        if self.tags is None:
+            self.tags = agent_skill_tags(self.agent)
+        return set(self.tags)
 
 
 @dataclass
@@ -72,6 +160,7 @@ class SmartAssignmentEngine:
     ):
         self.agent_manager = agent_manager
         self.session_store = session_store
+        self.skill_index = SkillTagIndex()
         # 最近一次成功分配的客户 -> 坐席映射，用于简单的历史偏好
         self._customer_agent_cache: Dict[str, str] = {}
 
@@ -84,7 +173,9 @@ class SmartAssignmentEngine:
         if not self.agent_manager:
             return None
 
-        available_agents = self._get_available_agents()
+        version, all_agents = await self._load_agents()
+        self.skill_index.sync(all_agents, version)
+        available_agents = self._get_available_agents(all_agents)
         if not available_agents:
             return None
 
@@ -106,21 +197,11 @@ class SmartAssignmentEngine:
                     self._remember_customer(session_state, decision.agent.id)
                 return decision
 
-        sorted_candidates = sorted(
-            snapshots,
-            key=lambda snap: (
-                self.STATUS_PRIORITY.get(snap.agent.status, 5),
-                snap.load_score,
-                snap.manual_sessions,
-                snap.pending_sessions,
-                snap.agent.id
-            )
-        )
-
-        if not sorted_candidates:
+        best_candidates = heapq.nsmallest(1, snapshots, key=self._candidate_rank)
+        if not best_candidates:
             return None
 
-        decision = self._build_decision(sorted_candidates[0], context_tags)
+        decision = self._build_decision(best_candidates[0], context_tags)
         if remember_choice:
             self._remember_customer(session_state, decision.agent.id)
         return decision
@@ -131,47 +212,77 @@ class SmartAssignmentEngine:
         """
         self._remember_customer(session_state, agent_id)
 
+    def refresh_agent(self, agent: Agent):
+        """坐席技能修改后立即更新技能标签索引"""
+        self.skill_index.update_agent(agent)
+
+    def forget_agent(self, agent_id: str):
+        """坐席删除后从技能标签索引移除"""
+        self.skill_index.remove_agent(agent_id)
+
+    def _candidate_rank(self, snap: AgentSnapshot):
+        """候选排序键：状态优先级 > 负载分 > 人工会话数 > 待接入数 > 坐席 ID"""
+        return (
+            self.STATUS_PRIORITY.get(snap.agent.status, 5),
+            snap.load_score,
+            snap.manual_sessions,
+            snap.pending_sessions,
+            snap.agent.id
+        )
+
     async def _calculate_agent_loads(self) -> Dict[str, Dict[str, int]]:
-        loads: Dict[str, Dict[str, int]] = defaultdict(lambda: {"manual": 0, "pending": 0})
+        """
+        读取各坐席负载
 
-        manual_sessions = await self.session_store.list_by_status(SessionStatus.MANUAL_LIVE, limit=1000)
-        for session in manual_sessions:
-            if session.assigned_agent:
-                loads[session.assigned_agent.id]["manual"] += 1
+        会话存储在保存 / 删除时增量维护按坐席的 live / pending 计数器（并由后台任务定期对账），
+        一次 get_stats() 即可取得全部坐席负载，与会话数量无关。
+        """
+        loads: Dict[str, Dict[str, int]] = defaultdict(lambda: {"manual": 0, "pending": 0})
 
-        pending_sessions = await self.session_store.list_by_status(SessionStatus.PENDING_MANUAL, limit=1000)
-        for session in pending_sessions:
-            if session.assigned_agent:
-                loads[session.assigned_agent.id]["pending"] += 1
+        stats = await self.session_store.get_stats()
+        for agent_id, count in (stats.get("live_by_agent") or {}).items():
+            loads[agent_id]["manual"] = count
+        for agent_id, count in (stats.get("pending_by_agent") or {}).items():
+            loads[agent_id]["pending"] = count
 
         return loads
 
-    def _get_available_agents(self) -> List[Agent]:
+    async def _load_agents(self) -> Tuple[Optional[str], List[Agent]]:
         """
-        获取可用坐席（在线或忙碌状态）
+        读取全部坐席及注册表版本号
+
+        agent_manager 可以是 AgentManager 或其异步版本 AsyncAgentManager；
+        不提供 get_agents_snapshot() 的实现返回版本号 None
         """
+        get_snapshot = getattr(self.agent_manager, "get_agents_snapshot", None)
+        if get_snapshot is not None:
+            result = get_snapshot()
+        else:
+            result = self.agent_manager.get_all_agents()
+        if inspect.isawaitable(result):
+            result = await result
+        if get_snapshot is not None:
+            return result
+        return None, result
+
+    def _get_available_agents(self, all_agents: List[Agent]) -> List[Agent]:
+        """获取可用坐席（在线或忙碌状态）"""
         candidates: List[Agent] = []
-        for agent in self.agent_manager.get_all_agents():
+        for agent in all_agents:
             status = agent.status if isinstance(agent.status, AgentStatus) else AgentStatus(agent.status)
             if status in {AgentStatus.ONLINE, AgentStatus.BUSY}:
                 candidates.append(agent)
         return candidates
 
     def _filter_by_skills(self, agents: List[Agent], tags: Set[str]) -> List[Agent]:
+        """按技能标签倒排索引筛选：命中任一标签的坐席 ID 与可用坐席求交集"""
         if not tags:
             return agents
 
-        matched: List[Agent] = []
-        for agent in agents:
-            skill_tags = set()
-            for skill in agent.skills or []:
-                skill_tags.add(skill.category)
-                skill_tags.update(skill.tags)
-
-            if skill_tags.intersection(tags):
-                matched.append(agent)
-
-        return matched
+        matched_ids = self.skill_index.match(tags)
+        if not matched_ids:
+            return []
+        return [agent for agent in agents if agent.id in matched_ids]
 
     def _build_snapshots(
         self,
@@ -185,7 +296,8 @@ class SmartAssignmentEngine:
                 AgentSnapshot(
                     agent=agent,
                     manual_sessions=agent_load["manual"],
-                    pending_sessions=agent_load["pending"]
+                    pending_sessions=agent_load["pending"],
+                    tags=self.skill_index.tags_of(agent.id)
                 )
             )
         return snapshots
@@ -0,0 +1,788 @@
+"""
+工单二级索引（Redis）
+
+TicketStore 的列表 / 筛选原先 SMEMBERS ticket:index 后逐个加载全部工单，再在 Python 中过滤排序，
+工单量增长后每次筛选都是 O(全部工单) 的反序列化。
+
+索引结构（均不设置 TTL，由 SAVE_TICKET_LUA 在保存工单时原子维护）:
+    ticket:idx:{维度}:{值}      SET   维度取值 -> 工单 ID
+                                      维度: status / priority / type / assignee / email / tag / category /
+                                            order（订单号精确匹配，大写）
+    ticket:idx:term:{词项}      ZSET  全文检索词项 -> 工单 ID，分数为词项所在字段的最高权重
+    ticket:idx:lexicon          ZSET  全部词项（分数为 0），最后一个查询词按前缀展开（边输入边搜索）
+    ticket:idx:of:{维度}        HASH  工单 ID -> 当前索引值（多值以 \\x1f 分隔，用于增量迁移旧值）
+    ticket:idx:z:{字段}         ZSET  工单 ID -> 排序分数（空值为 0，与原 Python 排序一致）
+                                      字段: created_at / updated_at / resolved_at / first_response_at /
+                                            reopened_at / closed_at / archived_at / priority / status
+    ticket:idx:version          索引版本（与 TICKET_INDEX_VERSION 不一致时启动重建）
+    ticket:version              HASH  工单 ID -> 工单版本号（乐观锁，与工单主体的 version 字段同步写入）
+
+SAVE_TICKET_LUA 同时写入工单的新子记录（工单主体 ticket:{id} 不含子记录）:
+    ticket:{id}:history         LIST  状态历史（只追加）
+    ticket:{id}:assignments     LIST  指派记录（只追加）
+    ticket:{id}:comments        HASH  评论 ID -> 评论 JSON
+    ticket:{id}:attachments     HASH  附件 ID -> 附件 JSON
+
+查询由 QUERY_TICKETS_LUA 在 Redis 中完成：组内并集、组间交集、范围过滤、排序分页，
+只返回当前页的工单 ID。全文检索的词项组带权重，排序分数 = 相关度 × RELEVANCE_SCALE + 排序字段，
+相关度相同时按排序字段排列。
+
+检索分词复用 src/session_search.py（中日韩文字按单字 + 二元组，其他按整词），
+检索字段与权重见 ticket_search_fields()。
+"""
+
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.session_search import index_terms
+from src.ticket import TICKET_CHILD_COLLECTIONS, Ticket, TicketPriority, TicketStatus
+
+# 版本 3 起工单主体不含子记录，重建时同时把旧数据的子记录迁移到独立存储；版本 4 起维护词项词典
+TICKET_INDEX_VERSION = "4"
+TICKET_INDEX_VERSION_KEY = "ticket:idx:version"
+INDEX_KEY_PREFIX = "ticket:idx:"
+# 查询脚本的临时 key 前缀（脚本原子执行，返回前删除）
+QUERY_TEMP_KEY = "ticket:idx:tmp"
+# 全部词项（分数均为 0，按字典序 ZRANGEBYLEX 做前缀匹配）
+TERM_LEXICON_KEY = "ticket:idx:lexicon"
+# 单个前缀最多展开的词项数（超出时只匹配字典序靠前的词项，过短的前缀结果不完整）
+PREFIX_EXPANSION_LIMIT = 1000
+# 工单版本号（工单主体可能是二进制编码，Lua 无法解析，版本号单独存放）
+TICKET_VERSION_KEY = "ticket:version"
+UNASSIGNED = "__unassigned__"
+MEMBER_SEPARATOR = "\x1f"
+# ticket:idx:of:{维度} 中记录的维度（ticket_set_dimensions() 的集合维度和全文检索词项）
+INDEX_DIMENSIONS = ("status", "priority", "type", "assignee", "email", "tag", "category", "order", "term")
+
+PRIORITY_WEIGHT = {
+    TicketPriority.URGENT: 4,
+    TicketPriority.HIGH: 3,
+    TicketPriority.MEDIUM: 2,
+    TicketPriority.LOW: 1,
+}
+STATUS_WEIGHT = {
+    TicketStatus.PENDING: 6,
+    TicketStatus.IN_PROGRESS: 5,
+    TicketStatus.WAITING_CUSTOMER: 4,
+    TicketStatus.WAITING_VENDOR: 3,
+    TicketStatus.RESOLVED: 2,
+    TicketStatus.CLOSED: 1,
+    TicketStatus.ARCHIVED: 0,
+}
+
+# 订单号所在的 metadata 字段
+ORDER_METADATA_KEYS = (
+    "order_id",
+    "order_number",
+    "related_order_id",
+    "order_no",
+    "shopify_order_id",
+)
+
+# 检索字段权重
+TITLE_WEIGHT = 3.0
+IDENTITY_WEIGHT = 3.0      # 工单 ID、订单号、客户姓名 / 邮箱 / 电话
+CONTEXT_WEIGHT = 2.0       # 创建人、坐席、会话、客户国家、其他 metadata
+DESCRIPTION_WEIGHT = 1.0
+# 相关度分数的放大倍数（大于任何时间戳，相关度优先于排序字段）
+RELEVANCE_SCALE = 1e10
+
+# 按 ID 存储（HASH）的子记录集合及其 ID 字段，其余集合为只追加的 LIST
+KEYED_CHILD_COLLECTIONS = {
+    "comments": "comment_id",
+    "attachments": "attachment_id",
+}
+
+SORT_FIELDS = (
+    "created_at",
+    "updated_at",
+    "resolved_at",
+    "first_response_at",
+    "reopened_at",
+    "closed_at",
+    "archived_at",
+    "priority",
+    "status",
+)
+
+
+def index_member(dimension: str, value: str) -> str:
+    """查询条件中的集合名（相对 ticket:idx: 前缀）"""
+    return f"{dimension}:{value}"
+
+
+def normalized_values(value: Any) -> List[str]:
+    """标签 / 分类取值归一化（去空白、小写、去重）"""
+    if isinstance(value, str):
+        values = [value]
+    elif isinstance(value, dict):
+        values = list(value.values())
+    elif isinstance(value, list):
+        values = value
+    elif isinstance(value, (int, float)):
+        values = [value]
+    else:
+        values = []
+    normalized = []
+    for item in values:
+        if not item:
+            continue
+        text = str(item).strip().lower().replace(MEMBER_SEPARATOR, " ")
+        if text and text not in normalized:
+            normalized.append(text)
+    return normalized
+
+
+def ticket_tags(ticket: Ticket) -> List[str]:
+    """metadata.tags 归一化后的标签"""
+    return normalized_values((ticket.metadata or {}).get("tags", []))
+
+
+def ticket_categories(ticket: Ticket) -> List[str]:
+    """metadata.category / categories 归一化后的分类"""
+    metadata = ticket.metadata or {}
+    values = normalized_values(metadata.get("category")) if metadata.get("category") else []
+    for value in normalized_values(metadata.get("categories")):
+        if value not in values:
+            values.append(value)
+    return values
+
+
+def normalize_order_number(value: Any) -> str:
+    """订单号归一化（去空白、大写）"""
+    return str(value).strip().upper().replace(MEMBER_SEPARATOR, " ")
+
+
+def ticket_order_numbers(ticket: Ticket) -> List[str]:
+    """metadata 中的订单号 / Shopify 订单 ID"""
+    metadata = ticket.metadata or {}
+    values: List[str] = []
+    for key in ORDER_METADATA_KEYS:
+        value = metadata.get(key)
+        if value:
+            number = normalize_order_number(value)
+            if number and number not in values:
+                values.append(number)
+    return values
+
+
+def _metadata_texts(metadata: Dict[str, Any]) -> List[str]:
+    texts: List[str] = []
+    for value in metadata.values():
+        items = value if isinstance(value, list) else [value]
+        for item in items:
+            if isinstance(item, dict):
+                texts.extend(str(v) for v in item.values() if isinstance(v, (str, int, float)))
+            elif isinstance(item, (str, int, float)):
+                texts.append(str(item))
+    return texts
+
+
+def ticket_search_fields(ticket: Ticket) -> List[Tuple[str, float]]:
+    """全文检索的字段文本及权重"""
+    customer = ticket.customer
+    fields: List[Tuple[str, float]] = [
+        (ticket.title, TITLE_WEIGHT),
+        (ticket.ticket_id, IDENTITY_WEIGHT),
+        (ticket.description, DESCRIPTION_WEIGHT),
+    ]
+    if customer:
+        fields.extend((value, IDENTITY_WEIGHT) for value in (customer.name, customer.email, customer.phone))
+        fields.append((customer.country, CONTEXT_WEIGHT))
+    fields.extend((value, CONTEXT_WEIGHT) for value in (
+        ticket.created_by,
+        ticket.created_by_name,
+        ticket.assigned_agent_id,
+        ticket.assigned_agent_name,
+        ticket.session_name,
+    ))
+    fields.extend((text, CONTEXT_WEIGHT) for text in _metadata_texts(ticket.metadata or {}))
+    fields.extend((number, IDENTITY_WEIGHT) for number in ticket_order_numbers(ticket))
+    return [(text, weight) for text, weight in fields if text]
+
+
+def ticket_term_weights(ticket: Ticket) -> Dict[str, float]:
+    """全文检索词项 -> 词项所在字段的最高权重"""
+    weights: Dict[str, float] = {}
+    for text, weight in ticket_search_fields(ticket):
+        for term in index_terms(text):
+            if weights.get(term, 0) < weight:
+                weights[term] = weight
+    return weights
+
+
+def ticket_set_dimensions(ticket: Ticket) -> Dict[str, List[str]]:
+    """工单各集合维度的索引值"""
+    email = (ticket.customer.email or "").strip().lower() if ticket.customer else ""
+    return {
+        "status": [TicketStatus(ticket.status).value],
+        "priority": [TicketPriority(ticket.priority).value],
+        "type": [ticket.ticket_type.value if hasattr(ticket.ticket_type, "value") else str(ticket.ticket_type)],
+        "assignee": [ticket.assigned_agent_id or UNASSIGNED],
+        "email": [email.replace(MEMBER_SEPARATOR, " ")] if email else [],
+        "tag": ticket_tags(ticket),
+        "category": ticket_categories(ticket),
+        "order": ticket_order_numbers(ticket),
+    }
+
+
+def ticket_index_members(ticket: Ticket) -> Dict[str, float]:
+    """工单全部索引成员：集合名（index_member()）-> 分数（集合维度为 1）"""
+    members = {
+        index_member(name, value): 1.0
+        for name, values in ticket_set_dimensions(ticket).items()
+        for value in values
+    }
+    for term, weight in ticket_term_weights(ticket).items():
+        members[index_member("term", term)] = weight
+    return members
+
+
+def ticket_sort_scores(ticket: Ticket) -> Dict[str, float]:
+    """工单各排序字段的分数（空值为 0）"""
+    scores = {
+        name: float(getattr(ticket, name) or 0)
+        for name in SORT_FIELDS
+        if name not in ("priority", "status", "archived_at")
+    }
+    archived_at = ticket.archived_at
+    if not archived_at and ticket.status == TicketStatus.ARCHIVED:
+        archived_at = ticket.created_at
+    scores["archived_at"] = float(archived_at or 0)
+    scores["priority"] = float(PRIORITY_WEIGHT.get(ticket.priority, 0))
+    scores["status"] = float(STATUS_WEIGHT.get(ticket.status, 0))
+    return scores
+
+
+def owner_key(dimension: str) -> str:
+    """工单当前索引值哈希（ticket:idx:of:{维度}）"""
+    return f"{INDEX_KEY_PREFIX}of:{dimension}"
+
+
+def queue_index_snapshot(pipe, ticket_id: str):
+    """在 pipeline 中读取工单各维度当前的索引值（INDEX_DIMENSIONS 中每个维度 1 条 HGET）"""
+    for dimension in INDEX_DIMENSIONS:
+        pipe.hget(owner_key(dimension), ticket_id)
+
+
+def parse_index_snapshots(values: List[Any]) -> List[Dict[str, str]]:
+    """
+    解析 queue_index_snapshot() 的结果（按工单顺序，每个工单 len(INDEX_DIMENSIONS) 个结果）
+
+    Returns:
+        每个工单的 维度 -> 索引值（多值以 \\x1f 分隔，无索引时为空串）
+    """
+    width = len(INDEX_DIMENSIONS)
+    return [
+        {
+            dimension: value.decode("utf-8") if isinstance(value, bytes) else (value or "")
+            for dimension, value in zip(INDEX_DIMENSIONS, values[start:start + width])
+        }
+        for start in range(0, len(values), width)
+    ]
+
+
+def index_params(ticket: Ticket, snapshot: Dict[str, str]) -> Tuple[List[str], List[str]]:
+    """
+    SAVE_TICKET_LUA 中索引段的 KEYS / ARGV
+
+    Args:
+        ticket: 工单
+        snapshot: 保存前读取的各维度索引值（parse_index_snapshots()），用于声明需要移除工单的旧集合
+    """
+    keys: List[str] = []
+    args: List[str] = []
+    dimensions: Dict[str, List[Tuple[str, Optional[float]]]] = {
+        name: [(member, None) for member in members]
+        for name, members in ticket_set_dimensions(ticket).items()
+    }
+    dimensions["term"] = list(ticket_term_weights(ticket).items())
+    args.append(str(len(dimensions)))
+    for name, members in dimensions.items():
+        previous = snapshot.get(name, "")
+        scored = name == "term"
+        keys.append(owner_key(name))
+        keys.extend(
+            f"{INDEX_KEY_PREFIX}{index_member(name, member)}"
+            for member in previous.split(MEMBER_SEPARATOR) if member
+        )
+        keys.extend(f"{INDEX_KEY_PREFIX}{index_member(name, member)}" for member, _ in members)
+        args.extend([name, "z" if scored else "s", previous, str(len(members))])
+        for member, weight in members:
+            args.append(member)
+            if scored:
+                args.append(repr(weight))
+    scores = ticket_sort_scores(ticket)
+    args.append(str(len(scores)))
+    for name, score in scores.items():
+        keys.append(f"{INDEX_KEY_PREFIX}z:{name}")
+        args.extend([name, repr(score)])
+    return keys, args
+
+
+def child_params(ticket: Ticket, key_prefix: str) -> Tuple[List[str], List[str]]:
+    """SAVE_TICKET_LUA 中子记录段的 KEYS / ARGV（只包含尚未保存的子记录与待删除的记录 ID）"""
+    collections = [
+        (name, ticket.unsaved_children[name])
+        for name in TICKET_CHILD_COLLECTIONS
+        if ticket.unsaved_children.get(name)
+    ]
+    deletions = [
+        (name, ticket.deleted_children[name])
+        for name in KEYED_CHILD_COLLECTIONS
+        if ticket.deleted_children.get(name)
+    ]
+    keys = [
+        f"{key_prefix}:{ticket.ticket_id}:{name}"
+        for name, _ in [*collections, *deletions]
+    ]
+    args: List[str] = [str(len(collections) + len(deletions))]
+    for name, records in collections:
+        id_field = KEYED_CHILD_COLLECTIONS.get(name)
+        args.extend([name, "h" if id_field else "l", str(len(records))])
+        for record in records:
+            if id_field:
+                args.append(getattr(record, id_field))
+            args.append(record.model_dump_json())
+    for name, record_ids in deletions:
+        args.extend([name, "d", str(len(record_ids)), *record_ids])
+    return keys, args
+
+
+def save_script_params(
+    ticket: Ticket,
+    data: bytes,
+    expected_version: int,
+    key_prefix: str,
+    index_key: str,
+    snapshot: Optional[Dict[str, str]] = None
+) -> Tuple[List[str], List[Any]]:
+    """
+    构造 SAVE_TICKET_LUA 的 KEYS / ARGV
+
+    Args:
+        expected_version: 读取工单时的版本号
+        snapshot: 保存前读取的各维度索引值（queue_index_snapshot()，新工单为 None）
+    """
+    index_keys, index_arguments = index_params(ticket, snapshot or {})
+    child_keys, child_arguments = child_params(ticket, key_prefix)
+    keys = [
+        f"{key_prefix}:{ticket.ticket_id}", index_key, TICKET_VERSION_KEY, TERM_LEXICON_KEY,
+        *index_keys, *child_keys,
+    ]
+    args: List[Any] = [ticket.ticket_id, data, expected_version, *index_arguments, *child_arguments]
+    return keys, args
+
+
+def _bound(value: Optional[float], default: str, exclusive: bool = False) -> str:
+    if value is None:
+        return default
+    return f"({float(value)!r}" if exclusive else repr(float(value))
+
+
+@dataclass
+class TicketQuery:
+    """
+    工单索引查询计划
+
+    groups 为 (集合名列表, 相关度权重)：组内为集合名（index_member()）的并集，组间求交集，空组表示无结果；
+    带权重的组（全文检索词项）按 组内最高成员分数 × 权重 × RELEVANCE_SCALE 计入排序分数。
+    prefixes 为 (词项前缀, 相关度权重)：匹配任一以该前缀开头的词项；Redis 模式查询前由 expand_prefixes()
+    通过词项词典展开为条件组。
+    ranges 为 {字段: (下界, 上界, 下界是否为开区间)}，None 表示不限。
+    Redis 模式由 QUERY_TICKETS_LUA 执行，内存模式由 score() 逐个计算，两种模式语义一致。
+    """
+
+    sort_by: str = "updated_at"
+    sort_desc: bool = True
+    groups: List[Tuple[List[str], float]] = field(default_factory=list)
+    prefixes: List[Tuple[str, float]] = field(default_factory=list)
+    ranges: Dict[str, Tuple[Optional[float], Optional[float], bool]] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if self.sort_by not in SORT_FIELDS:
+            raise ValueError(f"INVALID_SORT_FIELD: {self.sort_by}")
+
+    def where(self, dimension: str, values: Iterable[str], *, weight: float = 0.0) -> "TicketQuery":
+        """
+        增加一个条件组：dimension 取 values 中任一值
+
+        Args:
+            weight: 相关度权重（仅用于 term 组，0 表示只过滤不计分）
+        """
+        members: List[str] = []
+        for value in values:
+            member = index_member(dimension, value)
+            if member not in members:
+                members.append(member)
+        self.groups.append((members, weight))
+        return self
+
+    def match_terms(
+        self,
+        terms: Iterable[str],
+        *,
+        ranked: bool = False,
+        prefix_last: bool = False
+    ) -> "TicketQuery":
+        """
+        全文检索：每个词项都必须出现（AND），ranked 时按相关度优先排序
+
+        Args:
+            prefix_last: 最后一个词项按前缀匹配（边输入边搜索）
+        """
+        terms = list(terms)
+        weight = 1.0 if ranked else 0.0
+        for term in terms[:-1] if prefix_last else terms:
+            self.where("term", [term], weight=weight)
+        if prefix_last and terms:
+            self.prefixes.append((terms[-1], weight))
+        return self
+
+    def expand_prefixes(self, lookup: Callable[[str], List[str]]) -> "TicketQuery":
+        """
+        将前缀条件展开为词项条件组（Redis 模式查询前调用）
+
+        Args:
+            lookup: 前缀 -> 以该前缀开头的词项列表（为空时查询无结果）
+        """
+        expanded = replace(self, groups=list(self.groups), prefixes=[], ranges=dict(self.ranges))
+        for prefix, weight in self.prefixes:
+            expanded.where("term", lookup(prefix), weight=weight)
+        return expanded
+
+    @property
+    def ranked(self) -> bool:
+        return any(weight for _, weight in self.groups) or any(weight for _, weight in self.prefixes)
+
+    def between(
+        self,
+        field_name: str,
+        low: Optional[float] = None,
+        high: Optional[float] = None,
+        *,
+        low_exclusive: bool = False
+    ) -> "TicketQuery":
+        """增加分数范围条件（上下界均为 None 时忽略）"""
+        if field_name not in SORT_FIELDS:
+            raise ValueError(f"不支持的范围字段: {field_name}")
+        if low is not None or high is not None:
+            self.ranges[field_name] = (low, high, low_exclusive)
+        return self
+
+    def score(self, ticket: Ticket) -> Optional[float]:
+        """内存模式：工单满足全部条件时返回排序分数，否则返回 None"""
+        members = ticket_index_members(ticket)
+        if any(not members.keys() & set(group) for group, _ in self.groups):
+            return None
+        prefix_scores = []
+        for prefix, weight in self.prefixes:
+            start = index_member("term", prefix)
+            matched = [score for member, score in members.items() if member.startswith(start)]
+            if not matched:
+                return None
+            prefix_scores.append(max(matched) * weight)
+        scores = ticket_sort_scores(ticket)
+        for field_name, (low, high, low_exclusive) in self.ranges.items():
+            score = scores[field_name]
+            if low is not None and (score <= low if low_exclusive else score < low):
+                return None
+            if high is not None and score > high:
+                return None
+        relevance = sum(
+            max(members.get(member, 0.0) for member in group) * weight
+            for group, weight in self.groups if weight
+        ) + sum(prefix_scores)
+        return relevance * RELEVANCE_SCALE + scores[self.sort_by]
+
+    def script_params(self, offset: int = 0, limit: int = 50) -> Tuple[List[str], List[str]]:
+        """
+        构造 QUERY_TICKETS_LUA 的 KEYS / ARGV
+
+        Args:
+            offset: 偏移量
+            limit: 返回数量（-1 表示不限）
+        """
+        if self.prefixes:
+            raise ValueError("前缀条件需要先调用 expand_prefixes()")
+        bounds = {
+            name: (_bound(low, "-inf", low_exclusive), _bound(high, "+inf"))
+            for name, (low, high, low_exclusive) in self.ranges.items()
+        }
+        # 带相关度时排序分数不再是字段原值，排序字段的范围改为普通范围条件
+        sort_min, sort_max = ("-inf", "+inf") if self.ranked else bounds.pop(self.sort_by, ("-inf", "+inf"))
+
+        keys = [f"{INDEX_KEY_PREFIX}z:{self.sort_by}", f"{QUERY_TEMP_KEY}:c"]
+        args = ["1" if self.sort_desc else "0", str(offset), str(limit), sort_min, sort_max, str(len(self.groups))]
+        for index, (group, weight) in enumerate(self.groups, 1):
+            args.extend([str(len(group)), repr(float(weight * RELEVANCE_SCALE))])
+            keys.extend(f"{INDEX_KEY_PREFIX}{member}" for member in group)
+            if len(group) > 1:
+                keys.append(f"{QUERY_TEMP_KEY}:g{index}")
+        args.append(str(len(bounds)))
+        for index, (name, (low, high)) in enumerate(bounds.items(), 1):
+            keys.extend([f"{INDEX_KEY_PREFIX}z:{name}", f"{QUERY_TEMP_KEY}:r{index}"])
+            args.extend([low, high])
+        return keys, args
+
+
+# 脚本访问的全部 Key 都由 save_script_params() 计算后通过 KEYS 传入，与 ARGV 按顺序一一对应。
+# 需要移除工单的旧集合来自保存前读取的 ticket:idx:of:{维度}（ARGV 中的快照值），脚本核对快照与
+# 当前值一致后才写入，否则与版本冲突一样返回 0（由调用方重新读取后重试）。
+#
+# KEYS: [1] ticket:{id}  [2] ticket:index  [3] ticket:version  [4] ticket:idx:lexicon
+#       其后每个维度: ticket:idx:of:{维度}, 快照中各值的集合..., 当前各值的集合...
+#       其后每个排序字段: ticket:idx:z:{字段}
+#       其后每个子记录集合: ticket:{id}:{集合名}
+# ARGV: [1] 工单 ID  [2] 工单数据  [3] 读取时的版本号（与当前版本不一致时不写入，返回 0）
+#       [4] 维度数，每个维度: 名称, 类型（s 集合 / z 带分数）, 快照值（\x1f 分隔，无则为空串）,
+#           值个数, 值...（z 类型为 值, 分数...）
+#       其后: 排序字段数，每个字段: 名称, 分数
+#       其后: 子记录集合数，每个集合: 名称, 类型（l 追加到 LIST / h 写入 HASH / d 从 HASH 删除）, 记录数,
+#             记录...（h 类型为 ID, 记录...；d 类型为 ID...）
+SAVE_TICKET_LUA = """
+local id = ARGV[1]
+local current = redis.call('HGET', KEYS[3], id) or '0'
+if current ~= ARGV[3] then
+    return 0
+end
+
+local key_cursor = 5
+local function take_key()
+    local key = KEYS[key_cursor]
+    key_cursor = key_cursor + 1
+    return key
+end
+
+-- 先解析全部维度并核对快照，核对通过后才写入
+local cursor = 4
+local dimension_count = tonumber(ARGV[cursor])
+cursor = cursor + 1
+local dimensions = {}
+for _ = 1, dimension_count do
+    local dimension = {
+        name = ARGV[cursor],
+        scored = ARGV[cursor + 1] == 'z',
+        previous = ARGV[cursor + 2],
+        owner = take_key(),
+        old = {},
+        old_keys = {},
+        members = {},
+        scores = {},
+        keys = {},
+        current = {},
+    }
+    local count = tonumber(ARGV[cursor + 3])
+    cursor = cursor + 4
+    if (redis.call('HGET', dimension.owner, id) or '') ~= dimension.previous then
+        return 0
+    end
+    for member in string.gmatch(dimension.previous, '[^\\031]+') do
+        dimension.old[#dimension.old + 1] = member
+        dimension.old_keys[member] = take_key()
+    end
+    local step = dimension.scored and 2 or 1
+    for i = cursor, cursor + count * step - 1, step do
+        dimension.members[#dimension.members + 1] = ARGV[i]
+        dimension.scores[#dimension.scores + 1] = ARGV[i + 1]
+        dimension.keys[#dimension.keys + 1] = take_key()
+        dimension.current[ARGV[i]] = true
+    end
+    cursor = cursor + count * step
+    dimensions[#dimensions + 1] = dimension
+end
+
+redis.call('HINCRBY', KEYS[3], id, 1)
+redis.call('SET', KEYS[1], ARGV[2])
+redis.call('SADD', KEYS[2], id)
+
+for _, dimension in ipairs(dimensions) do
+    local is_term = dimension.name == 'term'
+    for _, member in ipairs(dimension.old) do
+        if not dimension.current[member] then
+            local key = dimension.old_keys[member]
+            redis.call(dimension.scored and 'ZREM' or 'SREM', key, id)
+            if is_term and redis.call('ZCARD', key) == 0 then
+                redis.call('ZREM', KEYS[4], member)
+            end
+        end
+    end
+    for i, member in ipairs(dimension.members) do
+        if dimension.scored then
+            redis.call('ZADD', dimension.keys[i], dimension.scores[i], id)
+            if is_term then
+                redis.call('ZADD', KEYS[4], 0, member)
+            end
+        elseif not dimension.old_keys[member] then
+            redis.call('SADD', dimension.keys[i], id)
+        end
+    end
+    if #dimension.members > 0 then
+        redis.call('HSET', dimension.owner, id, table.concat(dimension.members, '\\031'))
+    elseif dimension.previous ~= '' then
+        redis.call('HDEL', dimension.owner, id)
+    end
+end
+
+local score_count = tonumber(ARGV[cursor])
+cursor = cursor + 1
+for _ = 1, score_count do
+    redis.call('ZADD', take_key(), ARGV[cursor + 1], id)
+    cursor = cursor + 2
+end
+
+local child_count = tonumber(ARGV[cursor])
+cursor = cursor + 1
+for _ = 1, child_count do
+    local key = take_key()
+    local kind = ARGV[cursor + 1]
+    local count = tonumber(ARGV[cursor + 2])
+    cursor = cursor + 3
+    if kind == 'd' then
+        for i = cursor, cursor + count - 1 do
+            redis.call('HDEL', key, ARGV[i])
+        end
+        cursor = cursor + count
+    elseif kind == 'h' then
+        for i = cursor, cursor + count * 2 - 1, 2 do
+            redis.call('HSET', key, ARGV[i], ARGV[i + 1])
+        end
+        cursor = cursor + count * 2
+    else
+        for i = cursor, cursor + count - 1 do
+            redis.call('RPUSH', key, ARGV[i])
+        end
+        cursor = cursor + count
+    end
+end
+return 1
+"""
+
+# KEYS: [1] 排序字段 ZSET  [2] 候选集临时 key
+#       其后每个条件组: 组内集合 key...（多于一个集合时再加一个并集临时 key）
+#       其后每个范围条件: 字段 ZSET, 临时 key
+# ARGV: [1] 倒序（1/0）  [2] offset  [3] limit（-1 不限）  [4] [5] 排序字段分数范围
+#       [6] 条件组数，每组: 集合个数, 权重（组内并集取最高分数、组间交集）
+#       其后: 范围条件数，每个: min, max
+# 返回: {总数, {当前页工单 ID...}}
+#
+# 脚本原子执行，用到的 key（含临时 key）全部通过 KEYS 传入，临时 key 在返回前删除。
+# 范围条件不在 Lua 中逐个取出成员：有条件组时先求交集得到候选集，再与范围字段 ZSET 以权重 0 / 1 求交集
+# 并用 ZREMRANGEBYSCORE 裁掉范围外的成员；没有条件组时第一个范围条件先复制字段 ZSET 再同样裁剪
+# （只使用 Redis 5.0 已有的命令，不依赖 6.2 的 ZRANGESTORE）。
+# 排序字段的范围直接作为 ZCOUNT / ZRANGEBYSCORE 的分页区间。
+QUERY_TICKETS_LUA = """
+local sort_key, candidate = KEYS[1], KEYS[2]
+local temp_keys = {}
+local filters, weights = {}, {}
+local empty = false
+
+local key_cursor = 3
+local cursor = 6
+local group_count = tonumber(ARGV[cursor])
+cursor = cursor + 1
+for _ = 1, group_count do
+    local count = tonumber(ARGV[cursor])
+    local weight = ARGV[cursor + 1]
+    cursor = cursor + 2
+    if count == 0 then
+        empty = true
+    elseif count == 1 then
+        filters[#filters + 1] = KEYS[key_cursor]
+        weights[#weights + 1] = weight
+        key_cursor = key_cursor + 1
+    else
+        -- 组内取最高分数（前缀展开的词项组按最相关的词项计分；集合维度分数均为 1）
+        local union_key = KEYS[key_cursor + count]
+        local args = {union_key, count}
+        for i = key_cursor, key_cursor + count - 1 do
+            args[#args + 1] = KEYS[i]
+        end
+        args[#args + 1] = 'AGGREGATE'
+        args[#args + 1] = 'MAX'
+        redis.call('ZUNIONSTORE', unpack(args))
+        temp_keys[#temp_keys + 1] = union_key
+        filters[#filters + 1] = union_key
+        weights[#weights + 1] = weight
+        key_cursor = key_cursor + count + 1
+    end
+end
+
+local ranges = {}
+local range_count = tonumber(ARGV[cursor])
+cursor = cursor + 1
+for _ = 1, range_count do
+    ranges[#ranges + 1] = {KEYS[key_cursor], KEYS[key_cursor + 1], ARGV[cursor], ARGV[cursor + 1]}
+    key_cursor = key_cursor + 2
+    cursor = cursor + 2
+end
+
+local function cleanup()
+    if #temp_keys > 0 then
+        redis.call('DEL', unpack(temp_keys))
+    end
+end
+
+if empty then
+    cleanup()
+    return {0, {}}
+end
+
+-- 裁掉临时 ZSET 中分数不在 [low, high] 内的成员（low 可带 '(' 表示开区间）
+local function trim(key, low, high)
+    if low ~= '-inf' then
+        local below = string.sub(low, 1, 1) == '(' and string.sub(low, 2) or '(' .. low
+        redis.call('ZREMRANGEBYSCORE', key, '-inf', below)
+    end
+    if high ~= '+inf' then
+        redis.call('ZREMRANGEBYSCORE', key, '(' .. high, '+inf')
+    end
+end
+
+local first_range = 1
+if #filters == 0 and #ranges > 0 then
+    local range = ranges[1]
+    redis.call('ZINTERSTORE', range[2], 1, range[1])
+    temp_keys[#temp_keys + 1] = range[2]
+    trim(range[2], range[3], range[4])
+    filters[1] = range[2]
+    weights[1] = 0
+    first_range = 2
+end
+
+local result = sort_key
+if #filters > 0 then
+    local args = {candidate, #filters + 1, sort_key}
+    for _, key in ipairs(filters) do
+        args[#args + 1] = key
+    end
+    args[#args + 1] = 'WEIGHTS'
+    args[#args + 1] = 1
+    for _, weight in ipairs(weights) do
+        args[#args + 1] = weight
+    end
+    redis.call('ZINTERSTORE', unpack(args))
+    temp_keys[#temp_keys + 1] = candidate
+    result = candidate
+end
+
+for i = first_range, #ranges do
+    local range = ranges[i]
+    local field_key, range_key, low, high = range[1], range[2], range[3], range[4]
+    redis.call('ZINTERSTORE', range_key, 2, result, field_key, 'WEIGHTS', 0, 1)
+    temp_keys[#temp_keys + 1] = range_key
+    trim(range_key, low, high)
+    redis.call('ZINTERSTORE', result, 2, result, range_key, 'WEIGHTS', 1, 0)
+end
+
+local min_score, max_score = ARGV[4], ARGV[5]
+local total = redis.call('ZCOUNT', result, min_score, max_score)
+local ids
+if ARGV[1] == '1' then
+    ids = redis.call('ZREVRANGEBYSCORE', result, max_score, min_score, 'LIMIT', ARGV[2], ARGV[3])
+else
+    ids = redis.call('ZRANGEBYSCORE', result, min_score, max_score, 'LIMIT', ARGV[2], ARGV[3])
+end
+cleanup()
+return {total, ids}
+"""
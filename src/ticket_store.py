@@ -2,112 +2,472 @@
 工单存储管理
 
 最小可行版本：支持创建与列出工单
+
+Redis 模式下保存工单时同步维护二级索引与全文检索索引（src/ticket_index.py），
+列表 / 筛选 / 归档 / 搜索在 Redis 中完成交集与分页，只加载当前页的工单。
+
+批量读取统一走 load_many()：分批 MGET 在一个 pipeline 中一次往返，整批校验。
+
+工单主体（ticket:{id}）只保存表头字段；状态历史、指派记录、评论、附件存放在独立的子记录存储中，
+保存时只追加新记录（见 ticket_index.SAVE_TICKET_LUA）。列表 / 筛选 / 批量操作与所有写操作只读取工单主体，
+get() 与评论 / 附件接口按需加载子记录；写操作传 with_children=True 时保存后再加载子记录（返回详情的接口使用）。
+
+并发写入使用乐观锁：工单带版本号，保存时校验读取后未被其他请求修改（Redis 模式在 SAVE_TICKET_LUA 中比较并设置），
+版本冲突时重新读取并重新应用修改，最多重试 MAX_SAVE_RETRIES 次，仍冲突时抛出 TicketConflictError。
 """
 
 from __future__ import annotations
 
-import json
+import threading
 import time
-from typing import List, Optional, Dict, Any
+from typing import Callable, Iterable, Iterator, List, Optional, Dict, Any, Tuple, TypeVar
+
+from pydantic import TypeAdapter, ValidationError
 
 try:
     import redis  # type: ignore
+    from redis.client import NEVER_DECODE  # type: ignore
 except ImportError:  # pragma: no cover
     redis = None
+    NEVER_DECODE = "NEVER_DECODE"
 
 from src.ticket import (
+    TICKET_CHILD_COLLECTIONS,
     Ticket,
     TicketStatus,
     TicketPriority,
     TicketCustomerInfo,
     TicketType,
+    TicketComment,
     TicketCommentType,
     TicketAttachment,
+    TicketAssignmentRecord,
+    TicketStatusHistory,
     generate_ticket_id,
 )
 from src.sla_timer import check_sla_alerts, SLAAlert
+from src.payload_codec import PayloadCodec, decode_payload, get_codec
+from src.ticket_index import (
+    KEYED_CHILD_COLLECTIONS,
+    PREFIX_EXPANSION_LIMIT,
+    QUERY_TICKETS_LUA,
+    SAVE_TICKET_LUA,
+    TERM_LEXICON_KEY,
+    TICKET_INDEX_VERSION,
+    TICKET_INDEX_VERSION_KEY,
+    UNASSIGNED,
+    TicketQuery,
+    normalize_order_number,
+    normalized_values,
+    parse_index_snapshots,
+    queue_index_snapshot,
+    save_script_params,
+)
+from src.session_search import query_terms
+
+
+# 单次 MGET 的最大 Key 数量（避免单条命令过大阻塞 Redis）
+MGET_BATCH_SIZE = 500
+
+# 版本冲突后重新读取并重新应用修改的最大次数
+MAX_SAVE_RETRIES = 3
+
+T = TypeVar("T")
+
+_TICKET_LIST = TypeAdapter(List[Ticket])
+
+CHILD_RECORD_MODELS = {
+    "history": TicketStatusHistory,
+    "assignments": TicketAssignmentRecord,
+    "comments": TicketComment,
+    "attachments": TicketAttachment,
+}
+
+
+class TicketConflictError(Exception):
+    """工单在读取后被其他请求修改（乐观锁版本冲突，重试后仍失败）"""
+
+
+def _decode_id(value: Any) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else str(value)
+
+
+def _chunked(items: List[Any], size: int) -> Iterator[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _from_header(ticket: Ticket) -> Ticket:
+    """旧格式工单主体内嵌子记录时标记为待迁移（下次保存写入子记录存储）"""
+    if any(getattr(ticket, name) for name in TICKET_CHILD_COLLECTIONS):
+        ticket.queue_children_migration()
+    return ticket
+
+
+def decode_children(name: str, raw: Any) -> List[Any]:
+    """解析子记录存储：LIST 保持追加顺序，HASH 按创建时间排序"""
+    model = CHILD_RECORD_MODELS[name]
+    if isinstance(raw, dict):
+        records = [model.model_validate_json(value) for value in raw.values()]
+        return sorted(records, key=lambda record: record.created_at)
+    return [model.model_validate_json(value) for value in raw or []]
+
+
+def decode_tickets(ticket_ids: List[str], payloads: List[Any]) -> List[Ticket]:
+    """
+    解析 MGET 结果
+
+    整批交给 pydantic-core 一次校验；批内有损坏数据时逐个校验，跳过损坏项并记录日志。
+    不存在的工单（空数据）被跳过。
+    """
+    records: List[Dict[str, Any]] = []
+    record_ids: List[str] = []
+    for ticket_id, raw in zip(ticket_ids, payloads):
+        if not raw:
+            continue
+        try:
+            records.append(decode_payload(raw))
+            record_ids.append(ticket_id)
+        except Exception as e:
+            print(f"⚠️ 解析工单数据失败 {ticket_id}: {e}")
+
+    try:
+        tickets = _TICKET_LIST.validate_python(records)
+    except ValidationError:
+        tickets = []
+        for ticket_id, record in zip(record_ids, records):
+            try:
+                tickets.append(Ticket.from_dict(record))
+            except ValidationError as e:
+                print(f"⚠️ 解析工单数据失败 {ticket_id}: {e}")
+    return [_from_header(ticket) for ticket in tickets]
 
 
 class TicketStore:
     """工单存储（支持 Redis / 内存双模式）"""
 
-    def __init__(self, redis_client: Optional["redis.Redis"] = None):
+    def __init__(
+        self,
+        redis_client: Optional["redis.Redis"] = None,
+        codec: Optional[PayloadCodec] = None
+    ):
+        """
+        Args:
+            redis_client: Redis 客户端（None 时使用内存存储）
+            codec: 工单数据编解码器（默认 json 旧格式，读取时自动识别所有格式）
+        """
         self.redis = redis_client
+        self.codec = codec or get_codec("json")
         self.key_prefix = "ticket"
         self.index_key = f"{self.key_prefix}:index"
         self._memory_store = {} if redis_client is None else None
-
-    def _ticket_searchable_strings(self, ticket: Ticket) -> List[str]:
-        fields: List[str] = [
-            ticket.ticket_id,
-            ticket.title,
-            ticket.description,
-            ticket.created_by,
-            ticket.created_by_name or "",
-            ticket.assigned_agent_id or "",
-            ticket.assigned_agent_name or "",
-            ticket.session_name or "",
-        ]
-        if ticket.customer:
-            fields.extend([
-                ticket.customer.name or "",
-                ticket.customer.email or "",
-                ticket.customer.phone or "",
-                ticket.customer.country or ""
-            ])
-
-        metadata = ticket.metadata or {}
-        for value in metadata.values():
-            if isinstance(value, (str, int, float)):
-                fields.append(str(value))
-            elif isinstance(value, list):
-                fields.extend(str(item) for item in value if item is not None)
-            elif isinstance(value, dict):
-                fields.extend(str(item) for item in value.values() if item is not None)
-
-        return [str(field) for field in fields if field]
+        # 内存模式的子记录：{工单 ID: {集合名: JSON 列表（LIST）或 {ID: JSON}（HASH）}}
+        self._memory_children: Dict[str, Dict[str, Any]] = {}
+        # 内存模式的版本号（线程池中并发调用时比较并设置需要加锁）
+        self._memory_versions: Dict[str, int] = {}
+        self._memory_lock = threading.Lock()
+        if redis_client is not None:
+            self._save_script = redis_client.register_script(SAVE_TICKET_LUA)
+            self._query_script = redis_client.register_script(QUERY_TICKETS_LUA)
 
     # ------------------
     # 基础方法
     # ------------------
     def _save_ticket(self, ticket: Ticket):
-        data = json.dumps(ticket.to_dict(), ensure_ascii=False)
+        """
+        保存工单主体，并追加尚未保存的子记录
+
+        仅当存储中的版本号仍是 ticket.version（读取时的版本）时写入，成功后版本号加 1。
+        Redis 模式先读取工单当前的索引值（保存脚本据此声明需要移除工单的旧索引集合）。
+
+        Raises:
+            TicketConflictError: 工单在读取后已被其他请求保存
+        """
+        expected = ticket.version
+        ticket.version = expected + 1
+        data = self.codec.dumps(ticket.header_dict())
         if self.redis:
-            pipe = self.redis.pipeline()
-            pipe.set(f"{self.key_prefix}:{ticket.ticket_id}", data)
-            pipe.sadd(self.index_key, ticket.ticket_id)
-            pipe.execute()
+            pipe = self.redis.pipeline(transaction=False)
+            queue_index_snapshot(pipe, ticket.ticket_id)
+            snapshot, = parse_index_snapshots(pipe.execute())
+            keys, args = save_script_params(
+                ticket, data, expected, self.key_prefix, self.index_key, snapshot
+            )
+            saved = bool(self._save_script(keys=keys, args=args))
         else:
+            saved = self._save_memory(ticket, data, expected)
+        if not saved:
+            ticket.version = expected
+            raise TicketConflictError(f"TICKET_CONFLICT: 工单 {ticket.ticket_id} 已被其他请求修改，请刷新后重试")
+        ticket.mark_children_saved()
+
+    def _save_memory(self, ticket: Ticket, data: bytes, expected: int) -> bool:
+        with self._memory_lock:
+            if self._memory_versions.get(ticket.ticket_id, 0) != expected:
+                return False
+            self._memory_versions[ticket.ticket_id] = ticket.version
             self._memory_store[ticket.ticket_id] = data  # type: ignore
+            self._append_memory_children(ticket)
+        return True
+
+    def _append_memory_children(self, ticket: Ticket):
+        children = self._memory_children.setdefault(ticket.ticket_id, {})
+        for name, records in ticket.unsaved_children.items():
+            id_field = KEYED_CHILD_COLLECTIONS.get(name)
+            if id_field:
+                children.setdefault(name, {}).update(
+                    {getattr(record, id_field): record.model_dump_json() for record in records}
+                )
+            else:
+                children.setdefault(name, []).extend(record.model_dump_json() for record in records)
+        for name, record_ids in ticket.deleted_children.items():
+            for record_id in record_ids:
+                children.get(name, {}).pop(record_id, None)
+
+    def _child_key(self, ticket_id: str, name: str) -> str:
+        return f"{self.key_prefix}:{ticket_id}:{name}"
 
     def _load_ticket(self, ticket_id: str) -> Optional[Ticket]:
+        """读取工单主体（不含子记录）"""
         if self.redis:
-            data = self.redis.get(f"{self.key_prefix}:{ticket_id}")
+            # 不做 UTF-8 解码，二进制编解码器的数据由 decode_payload 识别
+            data = self.redis.execute_command(
+                "GET", f"{self.key_prefix}:{ticket_id}", **{NEVER_DECODE: True}
+            )
         else:
             data = self._memory_store.get(ticket_id) if self._memory_store else None  # type: ignore
 
         if not data:
             return None
 
-        if isinstance(data, bytes):
-            data = data.decode("utf-8")
+        return _from_header(Ticket.from_dict(decode_payload(data)))
+
+    def _load_with_children(
+        self,
+        ticket_id: str,
+        names: Iterable[str] = TICKET_CHILD_COLLECTIONS
+    ) -> Optional[Ticket]:
+        """读取工单主体及指定的子记录集合（Redis 模式一次往返）"""
+        names = list(names)
+        if self.redis:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.execute_command("GET", f"{self.key_prefix}:{ticket_id}", **{NEVER_DECODE: True})
+            for name in names:
+                if name in KEYED_CHILD_COLLECTIONS:
+                    pipe.hgetall(self._child_key(ticket_id, name))
+                else:
+                    pipe.lrange(self._child_key(ticket_id, name), 0, -1)
+            data, *stored = pipe.execute()
+        else:
+            data = self._memory_store.get(ticket_id)  # type: ignore
+            children = self._memory_children.get(ticket_id, {})
+            stored = [children.get(name) for name in names]
+
+        if not data:
+            return None
+
+        return self._merge_children(_from_header(Ticket.from_dict(decode_payload(data))), names, stored)
+
+    def _merge_children(self, ticket: Ticket, names: List[str], stored: List[Any]) -> Ticket:
+        for name, raw in zip(names, stored):
+            # 尚未迁移的旧格式工单：内嵌子记录（仍在待保存列表中）在前
+            setattr(ticket, name, list(ticket.unsaved_children.get(name, [])) + decode_children(name, raw))
+        return ticket
+
+    def load_children(self, ticket: Ticket, names: Iterable[str] = TICKET_CHILD_COLLECTIONS) -> Ticket:
+        """为已加载的工单主体补充子记录（写操作只读工单主体，返回详情时再加载子记录）"""
+        names = list(names)
+        if self.redis:
+            pipe = self.redis.pipeline(transaction=False)
+            for name in names:
+                if name in KEYED_CHILD_COLLECTIONS:
+                    pipe.hgetall(self._child_key(ticket.ticket_id, name))
+                else:
+                    pipe.lrange(self._child_key(ticket.ticket_id, name), 0, -1)
+            stored = pipe.execute()
+        else:
+            children = self._memory_children.get(ticket.ticket_id, {})
+            stored = [children.get(name) for name in names]
+        return self._merge_children(ticket, names, stored)
+
+    def _save_many(self, tickets: Iterable[Ticket]) -> List[str]:
+        """
+        批量保存工单（Redis 模式先在一个 pipeline 中读取全部工单的索引值，保存脚本再一次往返）
+
+        每个工单单独校验版本号，冲突的工单不写入。
+
+        Returns:
+            版本冲突的工单 ID 列表
+        """
+        unique = list({ticket.ticket_id: ticket for ticket in tickets}.values())
+        conflicts: List[str] = []
+        if not self.redis:
+            for ticket in unique:
+                try:
+                    self._save_ticket(ticket)
+                except TicketConflictError:
+                    conflicts.append(ticket.ticket_id)
+            return conflicts
+        if not unique:
+            return conflicts
+
+        pipe = self.redis.pipeline(transaction=False)
+        for ticket in unique:
+            queue_index_snapshot(pipe, ticket.ticket_id)
+        snapshots = parse_index_snapshots(pipe.execute())
+
+        pipe = self.redis.pipeline(transaction=False)
+        for ticket, snapshot in zip(unique, snapshots):
+            expected = ticket.version
+            ticket.version = expected + 1
+            keys, args = save_script_params(
+                ticket, self.codec.dumps(ticket.header_dict()), expected, self.key_prefix, self.index_key,
+                snapshot
+            )
+            self._save_script(keys=keys, args=args, client=pipe)
+        for ticket, saved in zip(unique, pipe.execute()):
+            if saved:
+                ticket.mark_children_saved()
+            else:
+                ticket.version -= 1
+                conflicts.append(ticket.ticket_id)
+        return conflicts
+
+    def _modify(
+        self,
+        ticket_id: str,
+        apply: Callable[[Ticket], T]
+    ) -> Optional[Tuple[Ticket, T]]:
+        """
+        读取 - 修改 - 保存（乐观锁）
+
+        apply(ticket) 在刚读取的工单主体上修改并返回结果，结果为假值时不保存。
+        保存时版本冲突则重新读取并重新调用 apply（apply 不应有存储以外的副作用）。
 
-        return Ticket.from_dict(json.loads(data))
+        Returns:
+            (保存后的工单, apply 的返回值)；工单不存在时为 None
+
+        Raises:
+            TicketConflictError: 重试 MAX_SAVE_RETRIES 次后仍冲突
+        """
+        retries = 0
+        while True:
+            ticket = self._load_ticket(ticket_id)
+            if not ticket:
+                return None
+            result = apply(ticket)
+            if not result:
+                return ticket, result
+            try:
+                self._save_ticket(ticket)
+                return ticket, result
+            except TicketConflictError:
+                retries += 1
+                if retries > MAX_SAVE_RETRIES:
+                    raise
+
+    def load_many(self, ticket_ids: Iterable[str]) -> List[Ticket]:
+        """
+        批量加载工单
+
+        Redis 模式按 MGET_BATCH_SIZE 分批 MGET，所有批次在一个 pipeline 中一次往返；
+        解码后整批交给 pydantic-core 校验（decode_tickets()）。
+
+        Returns:
+            按输入顺序排列的工单列表（不存在或数据损坏的工单被跳过）
+        """
+        ids = list(ticket_ids)
+        if not ids:
+            return []
+
+        if self.redis:
+            pipe = self.redis.pipeline(transaction=False)
+            for batch in _chunked(ids, MGET_BATCH_SIZE):
+                pipe.execute_command(
+                    "MGET", *[f"{self.key_prefix}:{ticket_id}" for ticket_id in batch], **{NEVER_DECODE: True}
+                )
+            payloads = [raw for result in pipe.execute() for raw in result]
+        else:
+            payloads = [self._memory_store.get(ticket_id) for ticket_id in ids]  # type: ignore
+        return decode_tickets(ids, payloads)
 
     def _load_all_ids(self) -> List[str]:
         if self.redis:
             ids = self.redis.smembers(self.index_key)
-            return [id_.decode("utf-8") if isinstance(id_, bytes) else str(id_) for id_ in ids]
+            return [_decode_id(id_) for id_ in ids]
         if self._memory_store:
             return list(self._memory_store.keys())
         return []
 
+    def _query_ids(self, query: TicketQuery, *, offset: int = 0, limit: int = 50) -> tuple[int, List[str]]:
+        """
+        按查询计划返回 (总数, 当前页工单 ID)
+
+        Redis 模式在脚本中完成交集、范围过滤与分页；内存模式逐个判断。
+        limit 为 -1 时返回全部匹配 ID。
+        """
+        if self.redis:
+            if query.prefixes:
+                query = query.expand_prefixes(self._lexicon_terms)
+            keys, args = query.script_params(offset, limit)
+            total, ids = self._query_script(keys=keys, args=args)
+            return int(total), [_decode_id(id_) for id_ in ids]
+
+        matched: List[tuple[float, str]] = []
+        for ticket in self.load_many(self._load_all_ids()):
+            score = query.score(ticket)
+            if score is not None:
+                matched.append((score, ticket.ticket_id))
+        matched.sort(key=lambda item: item[0], reverse=query.sort_desc)
+        page = matched[offset:] if limit < 0 else matched[offset:offset + limit]
+        return len(matched), [ticket_id for _, ticket_id in page]
+
+    def _lexicon_terms(self, prefix: str) -> List[str]:
+        """词项词典中以 prefix 开头的词项（按字典序，最多 PREFIX_EXPANSION_LIMIT 个）"""
+        start = prefix.encode("utf-8")
+        terms = self.redis.zrangebylex(
+            TERM_LEXICON_KEY, b"[" + start, b"[" + start + b"\xff", start=0, num=PREFIX_EXPANSION_LIMIT
+        )
+        return [_decode_id(term) for term in terms]
+
+    def _query(self, query: TicketQuery, *, offset: int = 0, limit: int = 50) -> tuple[int, List[Ticket]]:
+        """按查询计划返回 (总数, 当前页工单)"""
+        total, ids = self._query_ids(query, offset=offset, limit=limit)
+        return total, self.load_many(ids)
+
+    def ensure_indexes(self) -> int:
+        """
+        确保二级索引可用（启动时调用）
+
+        索引版本与 TICKET_INDEX_VERSION 不一致（旧数据或索引结构变更）时，
+        重新保存全部工单以重建索引。
+
+        Returns:
+            重建索引的工单数（索引已是最新时为 0）
+        """
+        if not self.redis:
+            return 0
+        version = self.redis.get(TICKET_INDEX_VERSION_KEY)
+        if version is not None and _decode_id(version) == TICKET_INDEX_VERSION:
+            return 0
+
+        rebuilt = 0
+        for batch in _chunked(self._load_all_ids(), MGET_BATCH_SIZE):
+            tickets = self.load_many(batch)
+            # 冲突说明其他 worker 刚保存过该工单，索引已由那次保存维护
+            self._save_many(tickets)
+            rebuilt += len(tickets)
+        self.redis.set(TICKET_INDEX_VERSION_KEY, TICKET_INDEX_VERSION)
+        return rebuilt
+
     # ------------------
     # 对外接口
     # ------------------
     def create(self, ticket: Ticket) -> Ticket:
         if not ticket.ticket_id:
             ticket.ticket_id = generate_ticket_id()
+        # 新工单构造时带入的子记录全部需要写入
+        ticket.queue_children_migration()
         now = time.time()
         ticket.created_at = now
         ticket.updated_at = now
@@ -166,27 +526,15 @@ class TicketStore:
         limit: int = 50,
         offset: int = 0,
     ) -> tuple[int, List[Ticket]]:
-        ids = self._load_all_ids()
-        tickets: List[Ticket] = []
-        for ticket_id in ids:
-            ticket = self._load_ticket(ticket_id)
-            if ticket:
-                tickets.append(ticket)
-
-        # 过滤
+        # 更新时间倒序
+        query = TicketQuery(sort_by="updated_at", sort_desc=True)
         if status:
-            tickets = [t for t in tickets if t.status == status]
+            query.where("status", [TicketStatus(status).value])
         if priority:
-            tickets = [t for t in tickets if t.priority == priority]
+            query.where("priority", [TicketPriority(priority).value])
         if assigned_agent_id:
-            tickets = [t for t in tickets if t.assigned_agent_id == assigned_agent_id]
-
-        # 更新时间倒序
-        tickets.sort(key=lambda t: t.updated_at, reverse=True)
-
-        total = len(tickets)
-        paginated = tickets[offset:offset + limit]
-        return total, paginated
+            query.where("assignee", [assigned_agent_id])
+        return self._query(query, offset=offset, limit=limit)
 
     def list_archived(
         self,
@@ -197,28 +545,24 @@ class TicketStore:
         limit: int = 50,
         offset: int = 0
     ) -> tuple[int, List[Ticket]]:
-        ids = self._load_all_ids()
-        archived: List[Ticket] = []
-        for ticket_id in ids:
-            ticket = self._load_ticket(ticket_id)
-            if not ticket or ticket.status != TicketStatus.ARCHIVED:
-                continue
-            if email and (not ticket.customer or (ticket.customer.email or "").lower() != email.lower()):
-                continue
-            created = ticket.created_at
-            if start_ts and created < start_ts:
-                continue
-            if end_ts and created > end_ts:
-                continue
-            archived.append(ticket)
-
-        archived.sort(key=lambda t: t.archived_at or t.created_at, reverse=True)
-        total = len(archived)
-        paginated = archived[offset:offset + limit]
-        return total, paginated
+        # 归档时间倒序（旧数据没有 archived_at 时按创建时间）
+        query = TicketQuery(sort_by="archived_at", sort_desc=True)
+        query.where("status", [TicketStatus.ARCHIVED.value])
+        if email:
+            query.where("email", [email.strip().lower()])
+        query.between("created_at", start_ts or None, end_ts or None)
+        return self._query(query, offset=offset, limit=limit)
+
+    def get(self, ticket_id: str, *, with_children: bool = True) -> Optional[Ticket]:
+        """
+        获取工单详情
 
-    def get(self, ticket_id: str) -> Optional[Ticket]:
-        return self._load_ticket(ticket_id)
+        Args:
+            with_children: 是否加载子记录（状态历史 / 指派记录 / 评论 / 附件），False 时只读工单主体
+        """
+        if not with_children:
+            return self._load_ticket(ticket_id)
+        return self._load_with_children(ticket_id)
 
     def update_ticket(
         self,
@@ -232,11 +576,51 @@ class TicketStore:
         metadata_updates: Optional[dict] = None,
         changed_by: str = "system",
         change_reason: Optional[str] = None,
+        with_children: bool = False,
     ) -> Optional[Ticket]:
-        ticket = self._load_ticket(ticket_id)
-        if not ticket:
+        """
+        更新工单（只读写工单主体，新子记录追加保存）
+
+        Args:
+            with_children: 保存后是否加载子记录（返回工单详情的接口使用）
+        """
+        modified = self._modify(ticket_id, lambda ticket: self._apply_update(
+            ticket,
+            status=status,
+            priority=priority,
+            assigned_agent_id=assigned_agent_id,
+            assigned_agent_name=assigned_agent_name,
+            note=note,
+            metadata_updates=metadata_updates,
+            changed_by=changed_by,
+            change_reason=change_reason
+        ))
+        if not modified:
             return None
+        return self.load_children(modified[0]) if with_children else modified[0]
 
+    def _apply_update(
+        self,
+        ticket: Ticket,
+        *,
+        status: Optional[TicketStatus] = None,
+        priority: Optional[TicketPriority] = None,
+        assigned_agent_id: Optional[str] = None,
+        assigned_agent_name: Optional[str] = None,
+        note: Optional[str] = None,
+        metadata_updates: Optional[dict] = None,
+        changed_by: str = "system",
+        change_reason: Optional[str] = None,
+    ) -> bool:
+        """
+        在已加载的工单上应用更新（不保存）
+
+        Returns:
+            是否有变化（有变化时已更新 updated_at，需要调用方保存）
+
+        Raises:
+            ValueError: 已归档工单不可编辑
+        """
         updated = False
         if ticket.status == TicketStatus.ARCHIVED:
             raise ValueError("ARCHIVED_TICKET: 已归档工单不可编辑")
@@ -290,9 +674,7 @@ class TicketStore:
 
         if updated:
             ticket.updated_at = time.time()
-            self._save_ticket(ticket)
-
-        return ticket
+        return updated
 
     def add_comment(
         self,
@@ -304,22 +686,20 @@ class TicketStore:
         comment_type: TicketCommentType = TicketCommentType.INTERNAL,
         mentions: Optional[List[str]] = None
     ) -> Optional[TicketComment]:
-        ticket = self._load_ticket(ticket_id)
-        if not ticket:
-            return None
-        if ticket.status == TicketStatus.ARCHIVED:
-            raise ValueError("ARCHIVED_TICKET: 无法对归档工单添加评论")
-
-        comment = ticket.add_comment(
-            content=content,
-            author_id=author_id,
-            author_name=author_name,
-            comment_type=comment_type,
-            mentions=mentions
-        )
-        ticket.updated_at = time.time()
-        self._save_ticket(ticket)
-        return comment
+        def comment(ticket: Ticket) -> TicketComment:
+            if ticket.status == TicketStatus.ARCHIVED:
+                raise ValueError("ARCHIVED_TICKET: 无法对归档工单添加评论")
+            ticket.updated_at = time.time()
+            return ticket.add_comment(
+                content=content,
+                author_id=author_id,
+                author_name=author_name,
+                comment_type=comment_type,
+                mentions=mentions
+            )
+
+        modified = self._modify(ticket_id, comment)
+        return modified[1] if modified else None
 
     def add_attachment(
         self,
@@ -333,51 +713,54 @@ class TicketStore:
         uploader_id: str,
         uploader_name: Optional[str]
     ) -> Optional[TicketAttachment]:
-        ticket = self._load_ticket(ticket_id)
-        if not ticket:
-            return None
-        if ticket.status == TicketStatus.ARCHIVED:
-            raise ValueError("ARCHIVED_TICKET: 无法对归档工单添加附件")
-
-        attachment = ticket.add_attachment(
-            filename=filename,
-            stored_path=stored_path,
-            size=size,
-            content_type=content_type,
-            comment_type=comment_type,
-            uploader_id=uploader_id,
-            uploader_name=uploader_name
-        )
-        ticket.updated_at = time.time()
-        self._save_ticket(ticket)
-        return attachment
+        def attach(ticket: Ticket) -> TicketAttachment:
+            if ticket.status == TicketStatus.ARCHIVED:
+                raise ValueError("ARCHIVED_TICKET: 无法对归档工单添加附件")
+            ticket.updated_at = time.time()
+            return ticket.add_attachment(
+                filename=filename,
+                stored_path=stored_path,
+                size=size,
+                content_type=content_type,
+                comment_type=comment_type,
+                uploader_id=uploader_id,
+                uploader_name=uploader_name
+            )
+
+        modified = self._modify(ticket_id, attach)
+        return modified[1] if modified else None
 
     def list_attachments(self, ticket_id: str) -> Optional[List[TicketAttachment]]:
-        ticket = self._load_ticket(ticket_id)
+        ticket = self._load_with_children(ticket_id, ("attachments",))
         if not ticket:
             return None
         return ticket.attachments
 
     def get_attachment(self, ticket_id: str, attachment_id: str) -> Optional[TicketAttachment]:
-        ticket = self._load_ticket(ticket_id)
+        ticket = self._load_with_children(ticket_id, ("attachments",))
         if not ticket:
             return None
         return ticket.get_attachment(attachment_id)
 
     def delete_comment(self, ticket_id: str, comment_id: str) -> bool:
-        ticket = self._load_ticket(ticket_id)
-        if not ticket:
-            return False
-        for idx, comment in enumerate(ticket.comments):
-            if comment.comment_id == comment_id:
-                del ticket.comments[idx]
-                ticket.updated_at = time.time()
-                self._save_ticket(ticket)
-                return True
-        return False
+        def remove(ticket: Ticket) -> bool:
+            # 尚未迁移的旧格式工单评论在主体内，其余在评论 HASH 中；删除随工单保存一起提交
+            exists = self._comment_exists(ticket_id, comment_id)
+            if not ticket.remove_comment(comment_id) and not exists:
+                return False
+            ticket.updated_at = time.time()
+            return True
+
+        modified = self._modify(ticket_id, remove)
+        return bool(modified and modified[1])
+
+    def _comment_exists(self, ticket_id: str, comment_id: str) -> bool:
+        if self.redis:
+            return bool(self.redis.hexists(self._child_key(ticket_id, "comments"), comment_id))
+        return comment_id in self._memory_children.get(ticket_id, {}).get("comments", {})
 
     def list_comments(self, ticket_id: str) -> Optional[List[TicketComment]]:
-        ticket = self._load_ticket(ticket_id)
+        ticket = self._load_with_children(ticket_id, ("comments",))
         if not ticket:
             return None
         return ticket.comments
@@ -388,11 +771,17 @@ class TicketStore:
         *,
         agent_id: str,
         reason: str,
-        comment: Optional[str] = None
+        comment: Optional[str] = None,
+        with_children: bool = False
     ) -> Ticket:
-        ticket = self._load_ticket(ticket_id)
-        if not ticket:
+        modified = self._modify(ticket_id, lambda ticket: self._apply_reopen(
+            ticket, agent_id=agent_id, reason=reason, comment=comment
+        ))
+        if not modified:
             raise ValueError("TICKET_NOT_FOUND")
+        return self.load_children(modified[0]) if with_children else modified[0]
+
+    def _apply_reopen(self, ticket: Ticket, *, agent_id: str, reason: str, comment: Optional[str]) -> bool:
         if ticket.status == TicketStatus.ARCHIVED:
             raise ValueError("TICKET_ARCHIVED: 已归档工单无法重开")
         if ticket.status != TicketStatus.CLOSED:
@@ -421,19 +810,24 @@ class TicketStore:
                 "type": "reopen"
             })
         ticket.updated_at = ticket.reopened_at
-        self._save_ticket(ticket)
-        return ticket
+        return True
 
     def archive_ticket(
         self,
         ticket_id: str,
         *,
         agent_id: str = "system",
-        reason: Optional[str] = None
+        reason: Optional[str] = None,
+        with_children: bool = False
     ) -> Ticket:
-        ticket = self._load_ticket(ticket_id)
-        if not ticket:
+        modified = self._modify(ticket_id, lambda ticket: self._apply_archive(
+            ticket, agent_id=agent_id, reason=reason
+        ))
+        if not modified:
             raise ValueError("TICKET_NOT_FOUND")
+        return self.load_children(modified[0]) if with_children else modified[0]
+
+    def _apply_archive(self, ticket: Ticket, *, agent_id: str, reason: Optional[str]) -> bool:
         if ticket.status != TicketStatus.CLOSED:
             raise ValueError("INVALID_STATUS: 仅已关闭工单可归档")
 
@@ -447,8 +841,7 @@ class TicketStore:
             comment=None
         )
         ticket.updated_at = ticket.archived_at
-        self._save_ticket(ticket)
-        return ticket
+        return True
 
     def auto_archive_closed(
         self,
@@ -459,21 +852,20 @@ class TicketStore:
         """自动归档关闭超过阈值的工单"""
         now = time.time()
         archived = []
-        for ticket_id in self._load_all_ids():
-            ticket = self._load_ticket(ticket_id)
-            if not ticket:
-                continue
-            if ticket.status != TicketStatus.CLOSED:
-                continue
-            if not ticket.closed_at:
-                continue
-            if (now - ticket.closed_at) < older_than_seconds:
+        query = TicketQuery(sort_by="closed_at", sort_desc=False)
+        query.where("status", [TicketStatus.CLOSED.value])
+        query.between("closed_at", 0, now - older_than_seconds, low_exclusive=True)
+        _, ticket_ids = self._query_ids(query, limit=-1)
+        for ticket_id in ticket_ids:
+            try:
+                ticket = self.archive_ticket(
+                    ticket_id,
+                    agent_id=agent_id,
+                    reason=f"auto_archive_{older_than_seconds//86400}d"
+                )
+            except (ValueError, TicketConflictError):
+                # 查询后工单已被重开或删除，或正被其他请求修改（下次归档任务再处理）
                 continue
-            ticket = self.archive_ticket(
-                ticket_id,
-                agent_id=agent_id,
-                reason=f"auto_archive_{older_than_seconds//86400}d"
-            )
             archived.append(ticket.ticket_id)
 
         return {
@@ -481,63 +873,39 @@ class TicketStore:
             "ticket_ids": archived
         }
 
-    def search(self, query: str, *, limit: int = 50) -> tuple[int, List[Ticket]]:
-        """根据关键词搜索工单"""
+    def search(self, query: str, *, limit: int = 50, offset: int = 0) -> tuple[int, List[Ticket]]:
+        """
+        根据关键词搜索工单
+
+        依次尝试：工单 ID 精确匹配 → 订单号 / Shopify 订单 ID 精确匹配 → 全文检索。
+        全文检索的多个词项为 AND 关系，按相关度（词项所在字段权重之和）排序，相关度相同时按更新时间倒序。
+        """
         if not query or not query.strip():
             return 0, []
 
         limit = max(1, min(limit, 200))
+        offset = max(0, offset)
         normalized = query.strip()
         normalized_upper = normalized.upper()
-        normalized_lower = normalized.lower()
 
         # 精确匹配：工单ID
-        ticket = self.get(normalized_upper)
-        if not ticket and normalized_upper != normalized:
-            ticket = self.get(normalized)
-        if ticket:
-            return 1, [ticket]
-
-        all_tickets: List[Ticket] = []
-        for ticket_id in self._load_all_ids():
-            loaded = self._load_ticket(ticket_id)
-            if loaded:
-                all_tickets.append(loaded)
+        candidates = list(dict.fromkeys([normalized_upper, normalized]))
+        tickets = self.load_many(candidates)
+        if tickets:
+            return 1, tickets[:1] if offset == 0 else []
 
         # 精确匹配：订单号
-        if normalized_upper.startswith("ORD"):
-            order_matches: List[Ticket] = []
-            order_keys = [
-                "order_id",
-                "order_number",
-                "related_order_id",
-                "order_no",
-                "shopify_order_id"
-            ]
-            for ticket in all_tickets:
-                metadata = ticket.metadata or {}
-                for key in order_keys:
-                    value = metadata.get(key)
-                    if value and str(value).upper() == normalized_upper:
-                        order_matches.append(ticket)
-                        break
-            order_matches.sort(key=lambda t: t.updated_at, reverse=True)
-            return len(order_matches), order_matches[:limit]
-
-        results: List[Ticket] = []
-        for ticket in all_tickets:
-            searchable_fields = self._ticket_searchable_strings(ticket)
-            if any(
-                normalized_lower in field.lower()
-                for field in searchable_fields
-                if field
-            ):
-                results.append(ticket)
-
-        results.sort(key=lambda t: t.updated_at, reverse=True)
-        total = len(results)
-        limited = results[:limit]
-        return total, limited
+        order_query = TicketQuery(sort_by="updated_at", sort_desc=True)
+        order_query.where("order", [normalize_order_number(normalized)])
+        total, tickets = self._query(order_query, offset=offset, limit=limit)
+        if total:
+            return total, tickets
+
+        terms = query_terms(normalized)
+        if not terms:
+            return 0, []
+        text_query = TicketQuery(sort_by="updated_at", sort_desc=True).match_terms(terms, ranked=True, prefix_last=True)
+        return self._query(text_query, offset=offset, limit=limit)
 
     def filter_tickets(
         self,
@@ -560,131 +928,55 @@ class TicketStore:
         sort_desc: bool = True,
         current_agent_id: Optional[str] = None
     ) -> tuple[int, List[Ticket]]:
-        """多条件筛选工单"""
-        limit = max(1, min(limit, 200))
-        offset = max(0, offset)
-        statuses_set = set(statuses) if statuses else None
-        priorities_set = set(priorities) if priorities else None
-        types_set = set(ticket_types) if ticket_types else None
-        assigned_ids_set = {agent_id for agent_id in (assigned_agent_ids or []) if agent_id}
-        keyword_lower = keyword.strip().lower() if keyword and keyword.strip() else None
-        tags_set = {tag.lower() for tag in (tags or []) if tag}
-        categories_set = {cat.lower() for cat in (categories or []) if cat}
-
-        filtered: List[Ticket] = []
-        for ticket_id in self._load_all_ids():
-            ticket = self._load_ticket(ticket_id)
-            if not ticket:
-                continue
-
-            if statuses_set and ticket.status not in statuses_set:
-                continue
-            if priorities_set and ticket.priority not in priorities_set:
-                continue
-            if types_set and ticket.ticket_type not in types_set:
-                continue
-
-            if assigned_ids_set:
-                if (ticket.assigned_agent_id or "") not in assigned_ids_set:
-                    continue
-
-            if assigned:
-                if assigned == "unassigned":
-                    if ticket.assigned_agent_id:
-                        continue
-                elif assigned == "mine":
-                    if not current_agent_id or ticket.assigned_agent_id != current_agent_id:
-                        continue
-                else:
-                    if ticket.assigned_agent_id != assigned:
-                        continue
-
-            if created_start is not None and ticket.created_at < created_start:
-                continue
-            if created_end is not None and ticket.created_at > created_end:
-                continue
-            if updated_start is not None and ticket.updated_at < updated_start:
-                continue
-            if updated_end is not None and ticket.updated_at > updated_end:
-                continue
-
-            if tags_set:
-                metadata_tags = (ticket.metadata or {}).get("tags", [])
-                if isinstance(metadata_tags, str):
-                    metadata_values = [metadata_tags]
-                elif isinstance(metadata_tags, dict):
-                    metadata_values = list(metadata_tags.values())
-                elif isinstance(metadata_tags, list):
-                    metadata_values = metadata_tags
-                else:
-                    metadata_values = []
-                normalized_tags = {str(tag).lower() for tag in metadata_values if tag}
-                if not normalized_tags.intersection(tags_set):
-                    continue
-
-            if categories_set:
-                metadata = ticket.metadata or {}
-                category_values: List[str] = []
-                if "category" in metadata and metadata["category"]:
-                    category_values.append(str(metadata["category"]))
-                categories_value = metadata.get("categories")
-                if isinstance(categories_value, str):
-                    category_values.append(categories_value)
-                elif isinstance(categories_value, list):
-                    category_values.extend(str(item) for item in categories_value if item)
-                elif isinstance(categories_value, dict):
-                    category_values.extend(str(item) for item in categories_value.values() if item)
-                normalized_categories = {value.lower() for value in category_values if value}
-                if not normalized_categories.intersection(categories_set):
-                    continue
-
-            if keyword_lower:
-                searchable_fields = self._ticket_searchable_strings(ticket)
-                if not any(keyword_lower in field.lower() for field in searchable_fields):
-                    continue
-
-            filtered.append(ticket)
-
-        priority_weight = {
-            TicketPriority.URGENT: 4,
-            TicketPriority.HIGH: 3,
-            TicketPriority.MEDIUM: 2,
-            TicketPriority.LOW: 1
-        }
-        status_weight = {
-            TicketStatus.PENDING: 6,
-            TicketStatus.IN_PROGRESS: 5,
-            TicketStatus.WAITING_CUSTOMER: 4,
-            TicketStatus.WAITING_VENDOR: 3,
-            TicketStatus.RESOLVED: 2,
-            TicketStatus.CLOSED: 1,
-            TicketStatus.ARCHIVED: 0
-        }
-
-        def sort_key(ticket: Ticket):
-            if sort_by == "priority":
-                return priority_weight.get(ticket.priority, 0)
-            if sort_by == "status":
-                return status_weight.get(ticket.status, 0)
-
-            value = getattr(ticket, sort_by, None)
-            if value is None:
-                return 0
-            if isinstance(value, TicketStatus):
-                return status_weight.get(value, 0)
-            if isinstance(value, TicketPriority):
-                return priority_weight.get(value, 0)
-            return value
+        """
+        多条件筛选工单
 
-        filtered.sort(key=sort_key, reverse=sort_desc)
+        条件组、关键词词项（全文检索索引，AND 关系，最后一个词项按前缀匹配）与时间范围由二级索引求交集并在 Redis 中分页。
+        关键词没有可检索的词项（如只有标点）时返回空结果。
 
-        total = len(filtered)
-        paginated = filtered[offset:offset + limit]
-        return total, paginated
+        Raises:
+            ValueError: sort_by 不是可排序字段（INVALID_SORT_FIELD）
+        """
+        limit = max(1, min(limit, 200))
+        offset = max(0, offset)
+        query = TicketQuery(sort_by=sort_by, sort_desc=sort_desc)
+        if statuses:
+            query.where("status", [TicketStatus(status).value for status in statuses])
+        if priorities:
+            query.where("priority", [TicketPriority(priority).value for priority in priorities])
+        if ticket_types:
+            query.where("type", [TicketType(ticket_type).value for ticket_type in ticket_types])
+
+        assigned_ids = [agent_id for agent_id in (assigned_agent_ids or []) if agent_id]
+        if assigned_ids:
+            query.where("assignee", assigned_ids)
+        if assigned:
+            if assigned == "unassigned":
+                query.where("assignee", [UNASSIGNED])
+            elif assigned == "mine":
+                query.where("assignee", [current_agent_id] if current_agent_id else [])
+            else:
+                query.where("assignee", [assigned])
+
+        tag_values = normalized_values(tags or [])
+        if tag_values:
+            query.where("tag", tag_values)
+        category_values = normalized_values(categories or [])
+        if category_values:
+            query.where("category", category_values)
+
+        if keyword and keyword.strip():
+            terms = query_terms(keyword)
+            if not terms:
+                return 0, []
+            query.match_terms(terms, prefix_last=True)
+
+        query.between("created_at", created_start, created_end)
+        query.between("updated_at", updated_start, updated_end)
+        return self._query(query, offset=offset, limit=limit)
 
     def get_sla_summary(self) -> Dict[str, Any]:
         """计算工单 SLA 概览"""
-        ids = self._load_all_ids()
         total = 0
         first_response_sum = 0.0
         first_response_count = 0
@@ -693,10 +985,7 @@ class TicketStore:
         open_tickets = 0
         pending_tickets = 0
 
-        for ticket_id in ids:
-            ticket = self._load_ticket(ticket_id)
-            if not ticket:
-                continue
+        for ticket in self.load_many(self._load_all_ids()):
             total += 1
             if ticket.first_response_at:
                 first_response_sum += ticket.first_response_at - ticket.created_at
@@ -753,15 +1042,15 @@ class TicketStore:
         now = time.time()
         all_alerts: List[Dict[str, Any]] = []
 
-        for ticket_id in self._load_all_ids():
-            ticket = self._load_ticket(ticket_id)
-            if not ticket:
-                continue
-
-            # 只检查未完成的工单
-            if ticket.status in {TicketStatus.CLOSED, TicketStatus.ARCHIVED}:
-                continue
+        # 只检查未完成的工单（由状态索引筛选，不加载已关闭 / 已归档工单）
+        open_query = TicketQuery(sort_by="created_at", sort_desc=False)
+        open_query.where("status", [
+            status.value for status in TicketStatus
+            if status not in (TicketStatus.CLOSED, TicketStatus.ARCHIVED)
+        ])
+        _, open_ids = self._query_ids(open_query, limit=-1)
 
+        for ticket in self.load_many(open_ids):
             # 使用新的 SLA 预警检查函数
             ticket_alerts = check_sla_alerts(ticket, now)
             for alert in ticket_alerts:
@@ -809,36 +1098,17 @@ class TicketStore:
             changed_by: 操作者
             note: 备注
         """
-        updated_tickets: List[Ticket] = []
-        failures: List[Dict[str, str]] = []
-
-        for ticket_id in ticket_ids:
-            try:
-                ticket = self.update_ticket(
-                    ticket_id,
-                    assigned_agent_id=assigned_agent_id,
-                    assigned_agent_name=assigned_agent_name,
-                    note=note,
-                    changed_by=changed_by,
-                    change_reason="batch_assign"
-                )
-                if ticket:
-                    updated_tickets.append(ticket)
-                else:
-                    failures.append({
-                        "ticket_id": ticket_id,
-                        "error": "TICKET_NOT_FOUND"
-                    })
-            except ValueError as exc:
-                failures.append({
-                    "ticket_id": ticket_id,
-                    "error": str(exc)
-                })
+        def assign(ticket: Ticket) -> bool:
+            return self._apply_update(
+                ticket,
+                assigned_agent_id=assigned_agent_id,
+                assigned_agent_name=assigned_agent_name,
+                note=note,
+                changed_by=changed_by,
+                change_reason="batch_assign"
+            )
 
-        return {
-            "tickets": updated_tickets,
-            "failed": failures
-        }
+        return self._batch_apply(ticket_ids, assign)
 
     def batch_close(
         self,
@@ -851,40 +1121,18 @@ class TicketStore:
         """
         批量关闭工单（仅支持已解决状态）
         """
-        successes: List[Ticket] = []
-        failures: List[Dict[str, str]] = []
-
-        for ticket_id in ticket_ids:
-            ticket = self._load_ticket(ticket_id)
-            if not ticket:
-                failures.append({"ticket_id": ticket_id, "error": "TICKET_NOT_FOUND"})
-                continue
+        def close(ticket: Ticket) -> bool:
             if ticket.status != TicketStatus.RESOLVED:
-                failures.append({
-                    "ticket_id": ticket_id,
-                    "error": "INVALID_STATUS: 仅已解决工单可关闭"
-                })
-                continue
-
-            try:
-                updated = self.update_ticket(
-                    ticket_id,
-                    status=TicketStatus.CLOSED,
-                    note=comment,
-                    changed_by=changed_by,
-                    change_reason=reason or "batch_close"
-                )
-                if updated:
-                    successes.append(updated)
-                else:
-                    failures.append({"ticket_id": ticket_id, "error": "UNKNOWN_ERROR"})
-            except ValueError as exc:
-                failures.append({"ticket_id": ticket_id, "error": str(exc)})
+                raise ValueError("INVALID_STATUS: 仅已解决工单可关闭")
+            return self._apply_update(
+                ticket,
+                status=TicketStatus.CLOSED,
+                note=comment,
+                changed_by=changed_by,
+                change_reason=reason or "batch_close"
+            )
 
-        return {
-            "tickets": successes,
-            "failed": failures
-        }
+        return self._batch_apply(ticket_ids, close)
 
     def batch_update_priority(
         self,
@@ -895,24 +1143,55 @@ class TicketStore:
         changed_by: str
     ) -> Dict[str, Any]:
         """批量调整优先级"""
+        def update_priority(ticket: Ticket) -> bool:
+            return self._apply_update(
+                ticket,
+                priority=priority,
+                changed_by=changed_by,
+                change_reason=reason or "batch_priority"
+            )
+
+        return self._batch_apply(ticket_ids, update_priority)
+
+    def _batch_apply(self, ticket_ids: List[str], apply: Callable[[Ticket], bool]) -> Dict[str, Any]:
+        """
+        批量操作：load_many 一次读取，逐个应用 apply(ticket)，有变化的工单一次批量保存
+
+        apply 返回是否有变化，抛出 ValueError 时记为失败（错误信息为异常文本）。
+        版本冲突的工单重新读取并重新应用（最多 MAX_SAVE_RETRIES 次），仍冲突时记为失败（TICKET_CONFLICT）。
+        """
+        results: Dict[str, Any] = {}
+        pending = list(dict.fromkeys(ticket_ids))
+
+        for _ in range(MAX_SAVE_RETRIES + 1):
+            loaded = {ticket.ticket_id: ticket for ticket in self.load_many(pending)}
+            changed: List[Ticket] = []
+            for ticket_id in pending:
+                ticket = loaded.get(ticket_id)
+                if not ticket:
+                    results[ticket_id] = "TICKET_NOT_FOUND"
+                    continue
+                try:
+                    if apply(ticket):
+                        changed.append(ticket)
+                    results[ticket_id] = ticket
+                except ValueError as exc:
+                    results[ticket_id] = str(exc)
+
+            pending = self._save_many(changed)
+            if not pending:
+                break
+        for ticket_id in pending:
+            results[ticket_id] = "TICKET_CONFLICT: 工单已被其他请求修改，请刷新后重试"
+
         successes: List[Ticket] = []
         failures: List[Dict[str, str]] = []
-
         for ticket_id in ticket_ids:
-            try:
-                ticket = self.update_ticket(
-                    ticket_id,
-                    priority=priority,
-                    changed_by=changed_by,
-                    change_reason=reason or "batch_priority"
-                )
-                if ticket:
-                    successes.append(ticket)
-                else:
-                    failures.append({"ticket_id": ticket_id, "error": "TICKET_NOT_FOUND"})
-            except ValueError as exc:
-                failures.append({"ticket_id": ticket_id, "error": str(exc)})
-
+            result = results[ticket_id]
+            if isinstance(result, Ticket):
+                successes.append(result)
+            else:
+                failures.append({"ticket_id": ticket_id, "error": result})
         return {
             "tickets": successes,
             "failed": failures
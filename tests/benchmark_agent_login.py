@@ -0,0 +1,135 @@
+"""
+坐席集中登录对对话流延迟的影响基准测试
+
+模拟交接班时 N 个坐席同时登录（bcrypt 验证），同时运行若干条对话流
+（每 20ms 推送一个增量），统计对话流推送间隔的超时延迟（p50 / p99）。
+
+对比模式:
+    inline  - 在事件循环中直接执行 bcrypt（原实现）
+    pool    - AsyncPasswordHasher 独立线程池（不使用验证缓存）
+    cached  - AsyncPasswordHasher 第二轮登录（命中验证成功缓存）
+
+运行方式:
+    python tests/benchmark_agent_login.py
+    python tests/benchmark_agent_login.py --logins 100 --streams 50 --cost 12 --modes pool,cached
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import bcrypt
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.agent_auth import PasswordHasher  # noqa: E402
+from src.password_hashing import AsyncPasswordHasher, PasswordHasherBusy  # noqa: E402
+
+TICK_SECONDS = 0.02
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def chat_stream(lags: list, stop: asyncio.Event):
+    """模拟对话流：每个 tick 推送一次，记录实际间隔超出预期的毫秒数"""
+    expected = time.perf_counter() + TICK_SECONDS
+    while not stop.is_set():
+        await asyncio.sleep(TICK_SECONDS)
+        now = time.perf_counter()
+        lags.append(max(0.0, (now - expected) * 1000))
+        expected = now + TICK_SECONDS
+
+
+async def run_wave(mode: str, credentials, hasher: AsyncPasswordHasher, streams: int):
+    lags: list = []
+    login_ms: list = []
+    rejected = 0
+    stop = asyncio.Event()
+    stream_tasks = [asyncio.create_task(chat_stream(lags, stop)) for _ in range(streams)]
+    await asyncio.sleep(TICK_SECONDS * 5)
+    lags.clear()
+
+    async def login(password: str, password_hash: str):
+        nonlocal rejected
+        start = time.perf_counter()
+        try:
+            if mode == "inline":
+                await asyncio.sleep(0)
+                assert PasswordHasher.verify_password(password, password_hash)
+            else:
+                assert await hasher.verify_password(password, password_hash)
+        except PasswordHasherBusy:
+            rejected += 1
+            return
+        login_ms.append((time.perf_counter() - start) * 1000)
+
+    wave_start = time.perf_counter()
+    await asyncio.gather(*[login(password, password_hash) for password, password_hash in credentials])
+    wave_ms = (time.perf_counter() - wave_start) * 1000
+
+    stop.set()
+    await asyncio.gather(*stream_tasks)
+    return {
+        "wave_ms": wave_ms,
+        "login_p99": percentile(login_ms, 0.99),
+        "chat_p50": statistics.median(lags) if lags else 0.0,
+        "chat_p99": percentile(lags, 0.99),
+        "rejected": rejected,
+    }
+
+
+async def main_async(args):
+    print(f"🔐 生成 {args.logins} 个坐席凭据 (bcrypt cost={args.cost})...")
+    credentials = []
+    for index in range(args.logins):
+        password = f"Passw0rd-{index}"
+        password_hash = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=args.cost)).decode("utf-8")
+        credentials.append((password, password_hash))
+
+    hasher = AsyncPasswordHasher(max_workers=args.threads or None, max_pending=args.max_pending)
+    uncached = AsyncPasswordHasher(max_workers=hasher.max_workers, max_pending=args.max_pending, cache_ttl=0)
+
+    print(f"📦 {args.logins} 个并发登录, {args.streams} 条对话流 (每 {TICK_SECONDS * 1000:.0f}ms 推送), "
+          f"bcrypt 线程 {hasher.max_workers}")
+    print(f"{'模式':<10}{'登录波次 ms':>12}{'登录 p99 ms':>12}{'对话 p50 ms':>12}{'对话 p99 ms':>12}{'拒绝':>6}")
+    print("-" * 64)
+
+    for mode in args.modes.split(","):
+        if mode == "cached":
+            await run_wave("pool", credentials, hasher, args.streams)  # 预热验证缓存
+            result = await run_wave("pool", credentials, hasher, args.streams)
+        elif mode == "pool":
+            result = await run_wave("pool", credentials, uncached, args.streams)
+        elif mode == "inline":
+            result = await run_wave("inline", credentials, hasher, args.streams)
+        else:
+            print(f"{mode:<10}  跳过: 未知模式")
+            continue
+        print(f"{mode:<10}{result['wave_ms']:>12.0f}{result['login_p99']:>12.0f}"
+              f"{result['chat_p50']:>12.1f}{result['chat_p99']:>12.1f}{result['rejected']:>6}")
+
+    hasher.shutdown()
+    uncached.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="坐席集中登录基准测试")
+    parser.add_argument("--logins", type=int, default=100, help="并发登录数（默认 100）")
+    parser.add_argument("--streams", type=int, default=50, help="并发对话流数（默认 50）")
+    parser.add_argument("--cost", type=int, default=12, help="bcrypt 代价因子（默认 12，与线上一致）")
+    parser.add_argument("--threads", type=int, default=0, help="bcrypt 线程数（默认 min(4, CPU 核数)）")
+    parser.add_argument("--max-pending", type=int, default=200, help="最大排队数")
+    parser.add_argument("--modes", default="inline,pool,cached", help="对比模式，逗号分隔")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+会话 / 工单编解码器基准测试
+
+对典型会话（50 条消息）比较各编解码器的存储体积与编解码耗时。
+
+运行方式:
+    python tests/benchmark_payload_codec.py
+    python tests/benchmark_payload_codec.py --messages 50 --rounds 2000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.payload_codec import get_codec  # noqa: E402
+from src.redis_session_store import decode_session, encode_session  # noqa: E402
+from src.session_state import (  # noqa: E402
+    AgentInfo,
+    EscalationInfo,
+    EscalationReason,
+    Message,
+    SessionState,
+    SessionStatus,
+)
+
+CODECS = ["json", "orjson", "msgpack", "orjson+zstd", "msgpack+zstd"]
+
+CUSTOMER_LINES = [
+    "您好，我的电动自行车电池充不进电，订单号 FD{order}，请问怎么处理？",
+    "Hi, my Fiido D11 display shows error code E{code} after riding in the rain.",
+    "快递显示已签收，但我没有收到包裹，能帮我查一下物流吗？",
+    "Can I change the shipping address for order #{order}? I moved last week.",
+    "刹车有异响，骑行 {km} 公里后开始出现，需要寄回维修吗？",
+]
+AGENT_LINES = [
+    "您好，已为您查询到订单 FD{order}，我们会在 24 小时内安排售后工程师联系您。",
+    "Sorry for the inconvenience. Please try resetting the controller by holding the power button for {code} seconds.",
+    "请提供车架号照片和故障视频，我们会尽快为您处理。",
+    "We have updated the address. The new tracking number will be emailed to you shortly.",
+]
+
+
+def build_typical_session(message_count: int) -> SessionState:
+    """构造一个典型的人工服务中会话（消息内容各不相同）"""
+    rng = random.Random(42)
+    state = SessionState(
+        session_name="session_1731000000_f3a9c2",
+        status=SessionStatus.MANUAL_LIVE,
+        conversation_id="7437000000000000000",
+        assigned_agent=AgentInfo(id="agent_001", name="Alice"),
+        escalation=EscalationInfo(reason=EscalationReason.KEYWORD, details="用户要求人工"),
+    )
+    state.user_profile.nickname = "Customer 8812"
+    state.user_profile.email = "customer8812@example.com"
+
+    for index in range(message_count):
+        lines = CUSTOMER_LINES if index % 2 == 0 else AGENT_LINES
+        content = rng.choice(lines).format(
+            order=rng.randint(10000, 99999),
+            code=rng.randint(1, 30),
+            km=rng.randint(50, 3000),
+        )
+        role = "user" if index % 2 == 0 else "agent"
+        state.add_message(
+            Message(role=role, content=content, agent_id="agent_001" if role == "agent" else None),
+            max_history=message_count,
+        )
+    return state
+
+
+def measure_us(func, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="会话编解码器基准测试")
+    parser.add_argument("--messages", type=int, default=50, help="会话消息数（默认 50）")
+    parser.add_argument("--rounds", type=int, default=2000, help="每项测试循环次数")
+    args = parser.parse_args()
+
+    state = build_typical_session(args.messages)
+    baseline = None
+
+    print(f"📦 会话: {args.messages} 条消息, 每项 {args.rounds} 次")
+    print(f"{'编解码器':<14}{'字节/会话':>10}{'相对体积':>10}{'编码 µs':>10}{'解码 µs':>10}")
+    print("-" * 54)
+
+    for name in CODECS:
+        try:
+            codec = get_codec(name)
+        except RuntimeError as exc:
+            print(f"{name:<14}  跳过: {exc}")
+            continue
+
+        payload = encode_session(state, codec)
+        size = len(payload.encode("utf-8") if isinstance(payload, str) else payload)
+        baseline = baseline or size
+
+        assert decode_session(payload).session_name == state.session_name
+        encode_us = measure_us(lambda: encode_session(state, codec), args.rounds)
+        decode_us = measure_us(lambda: decode_session(payload), args.rounds)
+
+        print(f"{name:<14}{size:>10}{size / baseline:>10.0%}{encode_us:>10.1f}{decode_us:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
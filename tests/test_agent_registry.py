@@ -0,0 +1,248 @@
+"""
+坐席注册表单元测试
+
+验证 AgentManager 的注册表（Hash + ID Set + 版本号）、进程内快照与心跳在线集合行为。
+"""
+
+import fnmatch
+
+from src.agent_auth import AgentManager, AgentRole, AgentStatus
+
+
+class FakeRedis:
+    """测试专用的同步 Redis（仅实现注册表用到的命令，统计往返次数）"""
+
+    def __init__(self):
+        self.data = {}
+        self.round_trips = 0
+        self.scans = 0
+
+    def _call(self, name, *args, **kwargs):
+        self.round_trips += 1
+        return getattr(self, f"_{name}")(*args, **kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._call(name, *args, **kwargs)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def register_script(self, script):
+        if "ZSCORE" in script:
+            def advance_presence(keys, args, client=None):
+                command = ("advance_presence", (keys[0], args[0], float(args[1])), {})
+                if client is not None:
+                    client.commands.append(command)
+                    return None
+                return self._call(command[0], *command[1])
+            return advance_presence
+
+        def claim_idle(keys, args):
+            self.round_trips += 1
+            cutoff, limit = float(args[0]), int(args[1])
+            zset = self.data.get(keys[0], {})
+            idle = sorted((score, member) for member, score in zset.items() if score <= cutoff)[:limit]
+            result = []
+            for score, member in idle:
+                del zset[member]
+                result.extend([member, str(score)])
+            return result
+        return claim_idle
+
+    def scan_iter(self, pattern, count=None):
+        self.scans += 1
+        return [key for key in list(self.data) if fnmatch.fnmatch(key, pattern)]
+
+    def _get(self, key):
+        return self.data.get(key)
+
+    def _set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def _exists(self, key):
+        return int(key in self.data)
+
+    def _delete(self, *keys):
+        return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+    def _incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+    def _hset(self, key, field, value):
+        self.data.setdefault(key, {})[field] = value
+
+    def _hdel(self, key, *fields):
+        return sum(1 for field in fields if self.data.get(key, {}).pop(field, None) is not None)
+
+    def _hvals(self, key):
+        return list(self.data.get(key, {}).values())
+
+    def _sadd(self, key, member):
+        self.data.setdefault(key, set()).add(member)
+
+    def _srem(self, key, member):
+        self.data.get(key, set()).discard(member)
+
+    def _sismember(self, key, member):
+        return member in self.data.get(key, set())
+
+    def _advance_presence(self, key, member, score):
+        zset = self.data.setdefault(key, {})
+        if member in zset and zset[member] >= score:
+            return 0
+        zset[member] = score
+        return 1
+
+    def _zadd(self, key, mapping, xx=False, ch=False):
+        zset = self.data.setdefault(key, {})
+        changed = 0
+        for member, score in mapping.items():
+            if xx and member not in zset:
+                continue
+            changed += zset.get(member) != score
+            zset[member] = score
+        return changed
+
+    def _zrem(self, key, *members):
+        return sum(1 for member in members if self.data.get(key, {}).pop(member, None) is not None)
+
+    def _zscore(self, key, member):
+        return self.data.get(key, {}).get(member)
+
+    def _zrange(self, key, start, end, withscores=False):
+        return sorted(self.data.get(key, {}).items(), key=lambda item: item[1])
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    def execute(self):
+        self.redis.round_trips += 1
+        return [getattr(self.redis, f"_{name}")(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+def make_manager(redis=None, snapshot_ttl=0.0) -> AgentManager:
+    return AgentManager(redis_client=redis or FakeRedis(), snapshot_ttl=snapshot_ttl)
+
+
+def test_list_agents_uses_registry_without_scan():
+    """写入时维护注册表，列出坐席不再 SCAN，版本未变时只校验版本号"""
+    manager = make_manager()
+    manager.create_agent("alice", "pw", "Alice", password_hash="h")
+    manager.create_agent("bob", "pw", "Bob", role=AgentRole.ADMIN, password_hash="h")
+
+    assert sorted(a.username for a in manager.get_all_agents()) == ["alice", "bob"]
+    redis = manager.redis
+    before = redis.round_trips
+    assert manager.count_admins() == 1
+    assert redis.round_trips - before == 1
+    assert redis.scans == 0
+
+
+def test_snapshot_is_copied_and_invalidated_by_writes():
+    """快照返回拷贝；本 worker 或其他 worker 写入后版本号变化，快照失效"""
+    redis = FakeRedis()
+    manager = make_manager(redis)
+    other_worker = make_manager(redis)
+    manager.create_agent("alice", "pw", "Alice", password_hash="h")
+
+    agents = manager.get_all_agents()
+    agents[0].name = "changed"
+    assert manager.get_all_agents()[0].name == "Alice"
+
+    other_worker.update_status("alice", manager.get_agent_by_username("alice").status, "lunch")
+    assert manager.get_all_agents()[0].status_note == "lunch"
+
+    other_worker.delete_agent("alice")
+    assert manager.get_all_agents() == []
+
+
+def test_snapshot_ttl_skips_redis():
+    """snapshot_ttl 内重复列出坐席不访问 Redis"""
+    manager = make_manager(snapshot_ttl=60)
+    manager.create_agent("alice", "pw", "Alice", password_hash="h")
+    manager.get_all_agents()
+
+    before = manager.redis.round_trips
+    for _ in range(5):
+        assert len(manager.get_all_agents()) == 1
+    assert manager.redis.round_trips == before
+
+
+def test_registry_rebuilt_from_legacy_keys():
+    """旧数据没有注册表时扫描一次重建，之后按 ID 查询走注册表"""
+    legacy = make_manager()
+    agent = legacy.create_agent("carol", "pw", "Carol", password_hash="h")
+    redis = legacy.redis
+    for key in (legacy.registry_key, legacy.registry_ids_key, legacy.registry_version_key, f"agent_id:{agent.id}"):
+        redis.data.pop(key)
+
+    manager = make_manager(redis)
+    assert manager.get_agent_by_id(agent.id).username == "carol"
+    assert redis.scans == 1
+    assert manager.get_agent_by_id("agent_missing") is None
+    assert redis.scans == 1
+
+
+def test_heartbeat_only_updates_presence():
+    """在线坐席心跳只写在线集合，不改写坐席 JSON，也不使快照失效；读取时以心跳时间为准"""
+    manager = make_manager()
+    manager.create_agent("alice", "pw", "Alice", password_hash="h")
+    manager.update_status("alice", AgentStatus.ONLINE)
+    redis = manager.redis
+    record_before = redis.data["agent:alice"]
+    version_before = redis.data[manager.registry_version_key]
+
+    before = redis.round_trips
+    last_active = manager.update_last_active("alice")
+    assert redis.round_trips - before == 1
+    assert redis.data["agent:alice"] == record_before
+    assert redis.data[manager.registry_version_key] == version_before
+    assert manager.get_agent_by_username("alice").last_active_at == last_active
+    assert manager.get_all_agents()[0].last_active_at == last_active
+
+
+def test_record_write_does_not_rewind_heartbeat():
+    """资料 / 状态保存使用记录中较旧的 last_active_at，不回拨心跳分数"""
+    manager = make_manager()
+    manager.create_agent("alice", "pw", "Alice", password_hash="h")
+    manager.update_status("alice", AgentStatus.ONLINE)
+    stale = manager.get_agent_by_username("alice")
+    last_active = manager.update_last_active("alice")
+
+    stale.status_note = "lunch"
+    manager._store_agent_record(stale)
+    assert manager.redis.data[manager.presence_key]["alice"] == last_active
+
+
+def test_offline_agents_are_not_tracked():
+    """离线坐席不在在线集合中；不存在的坐席心跳返回 None"""
+    manager = make_manager()
+    manager.create_agent("bob", "pw", "Bob", password_hash="h")
+    manager.update_status("bob", AgentStatus.OFFLINE)
+
+    assert manager.update_last_active("bob") is not None
+    assert "bob" not in manager.redis.data[manager.presence_key]
+    assert manager.update_last_active("ghost") is None
+
+
+def test_claim_idle_agents_returns_only_expired_once():
+    """只领取心跳超时的坐席，且同一坐席只被领取一次"""
+    manager = make_manager()
+    for username in ("alice", "bob"):
+        manager.create_agent(username, "pw", username, password_hash="h")
+        manager.update_status(username, AgentStatus.ONLINE)
+    manager.redis.data[manager.presence_key]["alice"] = 100.0
+
+    claimed = manager.claim_idle_agents(cutoff=200.0)
+    assert claimed == [("alice", 100.0)]
+    assert manager.claim_idle_agents(cutoff=200.0) == []
+    assert "bob" in manager.redis.data[manager.presence_key]
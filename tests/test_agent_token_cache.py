@@ -0,0 +1,131 @@
+"""
+坐席 Token 验证缓存单元测试
+
+验证已验证 Token 缓存的命中、过期与吊销行为。
+"""
+
+import time
+
+import fakeredis
+
+from src.agent_auth import (
+    REVOCATION_CLOCK_SKEW,
+    Agent,
+    AgentManager,
+    AgentRole,
+    AgentTokenManager,
+    next_revocation_epoch,
+)
+
+
+def make_agent(username: str = "alice") -> Agent:
+    return Agent(id=f"agent_{username}", username=username, password_hash="x", name=username, role=AgentRole.AGENT)
+
+
+def test_verified_token_is_served_from_cache():
+    """重复验证同一 Token 只解码一次，且返回的载荷互不影响"""
+    manager = AgentTokenManager(secret_key="secret")
+    token = manager.create_access_token(make_agent())
+
+    first = manager.verify_token(token)
+    first["role"] = "admin"
+    second = manager.verify_token(token)
+
+    assert second["username"] == "alice" and second["role"] == "agent"
+    stats = manager.verified_cache_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_cached_token_expires_with_exp(monkeypatch):
+    """缓存条目在 Token exp 时失效，之后重新解码校验"""
+    manager = AgentTokenManager(secret_key="secret", access_token_expire_minutes=1)
+    token = manager.create_access_token(make_agent())
+    assert manager.verify_token(token)
+
+    real_time = time.time
+    monkeypatch.setattr("src.bounded_cache.time.time", lambda: real_time() + 120)
+
+    assert manager.verify_token(token)
+    assert manager.verified_cache_stats()["misses"] == 2
+
+
+def test_revocation_rejects_tokens_issued_before():
+    """吊销后旧 Token（含缓存中的）失效，之后签发的 Token 正常"""
+    manager = AgentTokenManager(secret_key="secret")
+    alice, bob = make_agent("alice"), make_agent("bob")
+    old_token = manager.create_access_token(alice)
+    bob_token = manager.create_access_token(bob)
+    assert manager.verify_token(old_token)
+
+    manager.revoke_agent_tokens("alice")
+    new_token = manager.create_access_token(alice)
+
+    assert manager.verify_token(old_token) is None
+    assert manager.verify_token(new_token)["username"] == "alice"
+    assert manager.verify_token(bob_token)["username"] == "bob"
+
+
+def test_merge_revocations_keeps_latest():
+    """合并其他 worker 的吊销记录时保留较大的纪元"""
+    manager = AgentTokenManager(secret_key="secret")
+    manager.revoke_agent_tokens("alice", epoch=1)
+    token = manager.create_access_token(make_agent())
+    assert manager.verify_token(token)
+
+    manager.merge_revocations({"alice": next_revocation_epoch(1), "bob": 2})
+    manager.merge_revocations({"alice": 1})
+
+    assert manager.verify_token(token) is None
+    assert manager.verified_cache_stats()["revoked_agents"] == 2
+
+
+def test_revocation_ignores_clock_skew_between_workers(monkeypatch):
+    """吊销按纪元判断：签发节点时钟超前时旧 Token 仍被吊销，吊销节点时钟超前时新 Token 仍然有效"""
+    issuer, revoker = AgentTokenManager(secret_key="secret"), AgentTokenManager(secret_key="secret")
+    real_time = time.time
+
+    monkeypatch.setattr("src.agent_auth.time.time", lambda: real_time() + 60)
+    old_token = issuer.create_access_token(make_agent())
+    monkeypatch.setattr("src.agent_auth.time.time", real_time)
+    epoch = revoker.revoke_agent_tokens("alice")
+    issuer.merge_revocations({"alice": epoch})
+    assert issuer.verify_token(old_token) is None
+
+    monkeypatch.setattr("src.agent_auth.time.time", lambda: real_time() - 60)
+    new_token = issuer.create_access_token(make_agent())
+    revoker.merge_revocations({"alice": epoch})
+    assert revoker.verify_token(new_token)["rev"] == epoch
+    # 时钟回拨后再次吊销，纪元仍然递增
+    assert issuer.revoke_agent_tokens("alice") == epoch + 1
+    assert issuer.verify_token(new_token) is None
+
+
+def test_revocations_pruned_after_token_lifetime():
+    """早于 Token 有效期（另加时钟偏差余量）的吊销记录被清理，清理后再次吊销仍然生效"""
+    manager = AgentTokenManager(secret_key="secret", access_token_expire_minutes=1, refresh_token_expire_days=1)
+    now = time.time()
+    manager.revoke_agent_tokens("alice", epoch=next_revocation_epoch(0, now - 86400 - REVOCATION_CLOCK_SKEW - 1))
+    manager.revoke_agent_tokens("bob", epoch=next_revocation_epoch(0, now - 86400))
+
+    assert manager.prune_revocations(manager.revocation_cutoff(now)) == 1
+    assert manager.verified_cache_stats()["revoked_agents"] == 1
+
+    token = manager.create_access_token(make_agent("alice"))
+    assert manager.verify_token(token)["rev"] == 0
+    manager.revoke_agent_tokens("alice")
+    assert manager.verify_token(token) is None
+
+
+def test_agent_manager_records_monotonic_revocations():
+    """Redis 中的吊销纪元严格递增，旧版本按秒记录的吊销时刻换算为毫秒纪元，过期记录被清理"""
+    manager = AgentManager(redis_client=fakeredis.FakeRedis(decode_responses=True))
+    first = manager.record_token_revocation("alice", next_revocation_epoch(0))
+    assert manager.record_token_revocation("alice", first - 5000) == first + 1
+    assert manager.get_token_revocation("alice") == first + 1
+    assert manager.get_token_revocation("bob") == 0
+
+    manager.redis.hset(manager.token_revocation_key, "bob", 1000.5)
+    manager.redis.hset(manager.token_revocation_key, "carol", "1700000000.25")
+    revocations = manager.get_token_revocations(min_epoch=1700000000000)
+    assert revocations == {"alice": first + 1, "carol": 1700000000250}
+    assert manager.redis.hexists(manager.token_revocation_key, "bob") == 0
@@ -0,0 +1,98 @@
+"""
+有界 LRU/TTL 缓存单元测试
+"""
+
+import asyncio
+import time
+
+from src.bounded_cache import BoundedCache
+
+
+def test_lru_eviction_keeps_recently_used_entries():
+    cache = BoundedCache("test", max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_by_ttl_or_absolute_time():
+    cache = BoundedCache("test", default_ttl=60)
+    cache.set("ttl", "x", ttl=-1)
+    cache.set("absolute", "y", expires_at=time.time() - 1)
+    cache.set("default", "z")
+
+    assert cache.get("ttl") is None
+    assert cache.get("absolute", "missing") == "missing"
+    assert cache.get("default") == "z"
+    assert cache.stats()["expirations"] == 2
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_purge_expired_and_peek_do_not_touch_stats():
+    cache = BoundedCache("test")
+    cache.set("old", 1, ttl=-1)
+    cache.set("new", 2)
+
+    assert cache.peek("new") == 2 and cache.peek("old") is None
+    assert cache.purge_expired() == 1
+    assert len(cache) == 1
+    assert cache.stats()["hits"] == 0
+
+
+def test_redis_tier_write_through_and_read_back():
+    class FakeAsyncRedis:
+        def __init__(self):
+            self.data = {}
+
+        async def set(self, key, value, ex=None):
+            self.data[key] = (value, ex)
+
+        async def delete(self, key):
+            self.data.pop(key, None)
+
+        def pipeline(self, transaction=False):
+            redis = self
+
+            class Pipeline:
+                def __init__(self):
+                    self.keys = []
+
+                async def __aenter__(self):
+                    return self
+
+                async def __aexit__(self, *exc):
+                    return False
+
+                def get(self, key):
+                    self.keys.append(("get", key))
+
+                def ttl(self, key):
+                    self.keys.append(("ttl", key))
+
+                async def execute(self):
+                    value, ex = redis.data.get(self.keys[0][1], (None, None))
+                    return [value, ex if value is not None else -2]
+
+            return Pipeline()
+
+    redis = FakeAsyncRedis()
+
+    async def scenario():
+        writer = BoundedCache("conversation", default_ttl=3600)
+        writer.attach_redis(redis, key_prefix="conversation_map:")
+        await writer.aset("session_1", "conv_1")
+
+        restarted = BoundedCache("conversation", default_ttl=3600)
+        restarted.attach_redis(redis, key_prefix="conversation_map:")
+        first = await restarted.aget("session_1")
+        await restarted.adelete("session_1")
+        return first, restarted.peek("session_1"), await restarted.aget("session_1")
+
+    assert asyncio.run(scenario()) == ("conv_1", None, None)
+    assert redis.data == {}
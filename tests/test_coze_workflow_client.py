@@ -0,0 +1,100 @@
+"""
+Coze 工作流对话客户端单元测试
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from src.coze_workflow_client import (
+    EVENT_MESSAGE_DELTA,
+    CozeAPIError,
+    CozeWorkflowClient,
+    SSEFrameParser,
+)
+
+
+def sse(event: str, data) -> bytes:
+    body = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)
+    return f"event:{event}\ndata:{body}\n\n".encode("utf-8")
+
+
+STREAM = b"".join([
+    sse("conversation.chat.created", {"id": "c1", "conversation_id": "conv_1"}),
+    sse("conversation.message.delta", {"role": "assistant", "content": "您好，"}),
+    sse("conversation.message.delta", {"role": "assistant", "content": "请提供订单号"}),
+    sse("conversation.message.completed", "{not parsed"),
+    sse("conversation.chat.completed", {"usage": {"output_count": 7}}),
+    sse("done", "\"[DONE]\""),
+])
+
+
+def make_client(handler) -> CozeWorkflowClient:
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return CozeWorkflowClient(http_client, "https://api.coze.test", "wf_1", "app_1")
+
+
+def test_parser_handles_arbitrary_chunk_boundaries():
+    parser = SSEFrameParser()
+    frames = []
+    for index in range(len(STREAM)):
+        frames.extend(parser.feed(STREAM[index:index + 1]))
+    frames.extend(parser.flush())
+
+    assert [frame.event for frame in frames][:2] == ["conversation.chat.created", EVENT_MESSAGE_DELTA]
+    assert json.loads(frames[1].data)["content"] == "您好，"
+    assert len(frames) == 6
+
+
+def test_parser_flushes_unterminated_frame_and_joins_data_lines():
+    parser = SSEFrameParser()
+
+    assert parser.feed(b"event: error\r\ndata: {\"msg\":\r\ndata: \"boom\"}") == []
+    frames = parser.flush()
+
+    assert frames[0].event == "error"
+    assert json.loads(frames[0].data) == {"msg": "boom"}
+
+
+def test_chat_collects_reply_conversation_and_stats():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, content=STREAM)
+
+    result = asyncio.run(make_client(handler).chat("token", "退款", session_name="s1", parameters={"lang": "zh"}))
+
+    assert result.content == "您好，请提供订单号"
+    assert result.conversation_id == "conv_1"
+    assert result.error is None
+    assert result.stats.delta_count == 2
+    assert result.stats.tokens == 7
+    assert result.stats.total_ms is not None
+    assert requests[0]["parameters"] == {"USER_INPUT": "退款", "lang": "zh"}
+    assert "conversation_id" not in requests[0]
+
+
+def test_ignored_events_are_not_decoded():
+    async def scenario():
+        client = make_client(lambda request: httpx.Response(200, content=STREAM))
+        async with client.stream_chat("token", "hi", session_name="s1") as stream:
+            return [event async for event in stream]
+
+    events = asyncio.run(scenario())
+
+    completed = [event for event in events if event.event == "conversation.message.completed"]
+    assert completed[0].data is None
+
+
+def test_failed_chat_and_http_errors():
+    failed = sse("conversation.chat.failed", {"last_error": {"code": 4000, "msg": "quota exceeded"}})
+    result = asyncio.run(make_client(lambda request: httpx.Response(200, content=failed)).chat("t", "hi", "s1"))
+    assert result.error == "quota exceeded"
+
+    with pytest.raises(CozeAPIError) as excinfo:
+        asyncio.run(make_client(lambda request: httpx.Response(401, text="invalid token")).chat("t", "hi", "s1"))
+    assert excinfo.value.status_code == 401
+    assert "invalid token" in str(excinfo.value)
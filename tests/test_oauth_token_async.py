@@ -0,0 +1,98 @@
+"""
+OAuthTokenManager 异步获取单元测试（single-flight / 提前刷新）
+"""
+
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+from src.oauth_token_manager import OAuthTokenManager
+
+
+class StaticSigner:
+    def create_jwt(self, session_name=None, device_id=None):
+        return f"jwt-{session_name}"
+
+
+def make_manager(expires_in_seconds: int = 86399):
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.headers["Authorization"])
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={
+            "access_token": f"token-{len(calls)}",
+            "expires_in": int(time.time()) + expires_in_seconds
+        })
+
+    manager = OAuthTokenManager(jwt_signer=StaticSigner(), api_base="https://api.coze.test")
+    manager.attach_async(http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return manager, calls
+
+
+def test_concurrent_callers_share_one_fetch():
+    manager, calls = make_manager()
+
+    async def scenario():
+        return await asyncio.gather(*[
+            manager.get_access_token_async(session_name="visitor_1") for _ in range(20)
+        ])
+
+    tokens = asyncio.run(scenario())
+
+    assert set(tokens) == {"token-1"}
+    assert calls == ["Bearer jwt-visitor_1"]
+    assert manager._inflight == {}
+
+
+def test_cached_token_is_reused_and_expiry_uses_timestamp():
+    manager, calls = make_manager()
+
+    async def scenario():
+        first = await manager.get_access_token_async(session_name="visitor_1")
+        second = await manager.get_access_token_async(session_name="visitor_1")
+        return first, second
+
+    assert asyncio.run(scenario()) == ("token-1", "token-1")
+    assert len(calls) == 1
+    expires_at = manager._token_cache.peek("visitor_1")["expires_at"]
+    assert expires_at < datetime.now() + timedelta(days=1)
+
+
+def test_token_near_expiry_is_returned_and_refreshed_in_background():
+    manager, calls = make_manager()
+
+    async def scenario():
+        await manager.get_access_token_async(session_name="visitor_1")
+        manager._token_cache.peek("visitor_1")["expires_at"] = datetime.now() + timedelta(minutes=5)
+
+        current = await manager.get_access_token_async(session_name="visitor_1")
+        await asyncio.sleep(0.05)
+        return current
+
+    assert asyncio.run(scenario()) == "token-1"
+    assert manager._token_cache.peek("visitor_1")["token"] == "token-2"
+    assert len(calls) == 2
+
+
+def test_shared_cache_is_read_before_fetching():
+    manager, calls = make_manager()
+
+    class SharedCache:
+        def __init__(self):
+            self.data = {"coze_oauth_token:visitor_1": json.dumps({
+                "token": "shared-token",
+                "expires_at": time.time() + 3600,
+                "session_name": "visitor_1"
+            })}
+
+        async def get(self, key):
+            return self.data.get(key)
+
+    manager._redis = SharedCache()
+
+    assert asyncio.run(manager.get_access_token_async(session_name="visitor_1")) == "shared-token"
+    assert calls == []
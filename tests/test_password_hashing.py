@@ -0,0 +1,80 @@
+"""
+密码哈希异步执行层单元测试
+"""
+
+import asyncio
+
+import bcrypt
+import pytest
+
+from src.agent_auth import PasswordHasher
+from src.password_hashing import AsyncPasswordHasher, PasswordHasherBusy
+
+
+def cheap_hash(password: str) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=4)).decode("utf-8")
+
+
+def test_hash_and_verify_run_in_pool():
+    hasher = AsyncPasswordHasher(max_workers=2)
+
+    async def scenario():
+        password_hash = await hasher.hash_password("Passw0rd!")
+        return (
+            await hasher.verify_password("Passw0rd!", password_hash),
+            await hasher.verify_password("wrong", password_hash),
+        )
+
+    assert asyncio.run(scenario()) == (True, False)
+    hasher.shutdown()
+
+
+def test_verified_credentials_are_cached_per_password_hash(monkeypatch):
+    hasher = AsyncPasswordHasher(max_workers=1)
+    password_hash = cheap_hash("Passw0rd!")
+    calls = []
+    original = PasswordHasher.verify_password
+
+    def counting_verify(password, stored_hash):
+        calls.append(password)
+        return original(password, stored_hash)
+
+    monkeypatch.setattr(PasswordHasher, "verify_password", staticmethod(counting_verify))
+
+    async def scenario():
+        for _ in range(3):
+            assert await hasher.verify_password("Passw0rd!", password_hash)
+        assert not await hasher.verify_password("wrong", password_hash)
+        assert not await hasher.verify_password("wrong", password_hash)
+        # 密码修改后哈希变化，旧缓存不再命中
+        assert await hasher.verify_password("Passw0rd!", cheap_hash("Passw0rd!"))
+
+    asyncio.run(scenario())
+
+    assert calls == ["Passw0rd!", "wrong", "wrong", "Passw0rd!"]
+    assert hasher.stats()["credential_cache"]["hits"] == 2
+    hasher.shutdown()
+
+
+def test_admission_limit_rejects_excess_requests():
+    hasher = AsyncPasswordHasher(max_workers=1, max_pending=1, cache_ttl=0)
+    password_hash = bcrypt.hashpw(b"Passw0rd!", bcrypt.gensalt(rounds=10)).decode("utf-8")
+
+    async def scenario():
+        return await asyncio.gather(
+            *[hasher.verify_password("Passw0rd!", password_hash) for _ in range(3)],
+            return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+
+    assert results[:2] == [True, True]
+    assert isinstance(results[2], PasswordHasherBusy)
+    assert hasher.stats()["rejected"] == 1
+    hasher.shutdown()
+
+
+def test_disabled_cache_reports_none():
+    hasher = AsyncPasswordHasher(max_workers=1, cache_ttl=0)
+    assert hasher.stats()["credential_cache"] is None
+    hasher.shutdown()
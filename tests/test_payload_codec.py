@@ -0,0 +1,42 @@
+"""
+存储编解码器单元测试
+"""
+
+import pytest
+
+from src.payload_codec import ENVELOPE_MAGIC, decode_payload, get_codec
+from src.redis_session_store import decode_session, encode_session
+from src.session_state import Message, SessionState
+
+AVAILABLE_CODECS = []
+for _name in ("json", "orjson", "msgpack", "orjson+zstd", "msgpack+zstd"):
+    try:
+        AVAILABLE_CODECS.append(get_codec(_name))
+    except RuntimeError:
+        pass
+
+
+@pytest.mark.parametrize("codec", AVAILABLE_CODECS, ids=lambda c: c.name)
+def test_session_round_trip(codec):
+    state = SessionState(session_name="s1")
+    state.add_message(Message(role="user", content="电池充不进电 ✓"))
+
+    payload = encode_session(state, codec)
+
+    assert decode_session(payload).model_dump() == state.model_dump()
+    if not codec.is_legacy:
+        assert payload[0] == ENVELOPE_MAGIC
+
+
+def test_legacy_json_is_readable_without_header():
+    legacy = SessionState(session_name="s1").model_dump_json()
+
+    assert decode_payload(legacy)["session_name"] == "s1"
+    assert decode_payload(legacy.encode("utf-8"))["session_name"] == "s1"
+
+
+def test_unknown_codec_name_is_rejected():
+    with pytest.raises(ValueError):
+        get_codec("pickle")
+    with pytest.raises(ValueError):
+        get_codec("json+zstd")
@@ -137,7 +137,7 @@ async def test_redis_persistence():
 
     # 7. 健康检查
     print("🏥 Redis 健康检查...")
-    health = store.check_health()
+    health = await store.check_health()
     print(f"   状态: {health['status']}")
     print(f"   内存使用: {health['used_memory_mb']}MB")
     print(f"   会话数: {health['total_sessions']}")
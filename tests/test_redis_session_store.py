@@ -0,0 +1,340 @@
+"""
+Redis 会话存储单元测试
+
+同步（RedisSessionStore）与异步（AsyncRedisSessionStore）两种存储通过 fakeredis + lupa
+执行 SAVE_SESSION_LUA / DELETE_SESSION_LUA（未安装时跳过），验证保存、状态变化、
+重新分配和删除后索引、统计计数器、历史、摘要与检索词项的维护结果一致。
+"""
+
+import asyncio
+
+import pytest
+import redis
+import redis.asyncio as aioredis
+
+from src.async_redis_session_store import AsyncRedisSessionStore
+from src.redis_session_store import (
+    DELETE_SESSION_LUA,
+    SAVE_SESSION_LUA,
+    SCRIPT_STALE,
+    SESSION_STATUS_HASH,
+    RedisSessionStore,
+    delete_script_params,
+    history_key,
+    parse_session_snapshots,
+    queue_session_snapshot,
+    save_script_params,
+    session_index_key,
+    status_index_key,
+)
+from src.session_state import (
+    SESSION_HISTORY_LIMIT,
+    AgentInfo,
+    Message,
+    SessionState,
+    SessionStatus,
+    UNASSIGNED_AGENT,
+    UserProfile,
+)
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+
+@pytest.fixture(params=["sync", "async"])
+def make_store(request, monkeypatch):
+    """返回在当前事件循环中创建存储的工厂（异步客户端需在使用它的事件循环中创建）"""
+    server = fakeredis.FakeServer()
+    if request.param == "sync":
+        monkeypatch.setattr(
+            redis, "Redis",
+            lambda connection_pool: fakeredis.FakeRedis(server=server, decode_responses=True)
+        )
+        return RedisSessionStore
+    monkeypatch.setattr(
+        aioredis, "Redis",
+        lambda connection_pool: fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    )
+    return AsyncRedisSessionStore
+
+
+async def _call(result):
+    """同步存储的 Redis 客户端直接返回结果，异步存储返回协程"""
+    if asyncio.iscoroutine(result):
+        return await result
+    return result
+
+
+def _session(name: str, updated_at: float, nickname: str = "访客") -> SessionState:
+    state = SessionState(
+        session_name=name,
+        status=SessionStatus.PENDING_MANUAL,
+        user_profile=UserProfile(nickname=nickname)
+    )
+    state.created_at = updated_at
+    state.updated_at = updated_at
+    return state
+
+
+def _snapshot(client, name: str, include_messages: bool = False):
+    pipe = client.pipeline(transaction=False)
+    queue_session_snapshot(pipe, name, include_messages)
+    return parse_session_snapshots(pipe.execute())[0]
+
+
+def _names(sessions) -> list:
+    return [s.session_name for s in sessions]
+
+
+def test_save_get_and_history(make_store):
+    async def run():
+        store = make_store()
+        state = _session("s1", 100)
+        for index in range(SESSION_HISTORY_LIMIT + 5):
+            state.add_message(Message(role="user", content=f"message {index}", timestamp=float(index)))
+        assert await store.save(state)
+        assert state.unsaved_messages == []
+
+        loaded = await store.get("s1")
+        assert len(loaded.history) == SESSION_HISTORY_LIMIT
+        assert loaded.history[-1].content == f"message {SESSION_HISTORY_LIMIT + 4}"
+        assert await _call(store.redis.llen(history_key("s1"))) == SESSION_HISTORY_LIMIT
+
+        # 追加一条新消息只写入新消息，历史仍按上限裁剪
+        loaded.add_message(Message(role="assistant", content="reply", timestamp=999.0))
+        await store.save(loaded)
+        history = (await store.get("s1")).history
+        assert len(history) == SESSION_HISTORY_LIMIT
+        assert history[-1].content == "reply"
+
+        await store.save(_session("s2", 200))
+        light = await store.get_many(["s2", "missing", "s1"], include_history=False)
+        assert _names(light) == ["s2", "s1"]
+        assert [len(s.history) for s in light] == [0, 1]
+
+        summaries = await store.get_summaries(["s1"])
+        assert summaries[0].last_message_preview == "reply"
+        assert summaries[0].status == SessionStatus.PENDING_MANUAL.value
+
+    asyncio.run(run())
+
+
+def test_indexes_and_stats_follow_status_and_agent(make_store):
+    async def run():
+        store = make_store()
+        for index in range(4):
+            await store.save(_session(f"s{index}", 100 + index))
+
+        state = await store.get("s1")
+        state.status = SessionStatus.MANUAL_LIVE
+        state.assigned_agent = AgentInfo(id="agent_a", name="Alice")
+        await store.save(state)
+
+        pending, total = await store.query(
+            status=SessionStatus.PENDING_MANUAL, agent_id=UNASSIGNED_AGENT, limit=2, offset=1
+        )
+        assert (total, _names(pending)) == (3, ["s2", "s0"])
+        live, total = await store.query(status=SessionStatus.MANUAL_LIVE, agent_id="agent_a")
+        assert (total, _names(live)) == (1, ["s1"])
+        summaries, total = await store.query_summaries(agent_id="agent_a")
+        assert (total, [s.agent_name for s in summaries]) == (1, ["Alice"])
+
+        stats = await store.get_stats()
+        assert stats["total"] == 4
+        assert stats["by_status"]["pending_manual"] == 3
+        assert stats["live_by_agent"] == {"agent_a": 1}
+
+        # 重新分配并回到排队：旧坐席、旧状态的单条件和组合索引都被移除
+        state.status = SessionStatus.PENDING_MANUAL
+        state.assigned_agent = AgentInfo(id="agent_b", name="Bob")
+        await store.save(state)
+        for key in (
+            session_index_key("updated_at", agent_id="agent_a"),
+            session_index_key("updated_at", status=SessionStatus.MANUAL_LIVE),
+            session_index_key("updated_at", status=SessionStatus.MANUAL_LIVE, agent_id="agent_a"),
+            session_index_key("created_at", status=SessionStatus.PENDING_MANUAL, agent_id="agent_a"),
+        ):
+            assert await _call(store.redis.zcard(key)) == 0
+        assert await _call(store.redis.smembers(status_index_key(SessionStatus.MANUAL_LIVE))) == set()
+
+        _, total = await store.query(status=SessionStatus.PENDING_MANUAL, agent_id="agent_b")
+        assert total == 1
+        stats = await store.get_stats()
+        assert stats["live_by_agent"] == {}
+        assert stats["pending_by_agent"] == {"agent_b": 1}
+        assert stats["by_status"]["pending_manual"] == 4
+
+    asyncio.run(run())
+
+
+def test_priority_index_orders_vip_first_then_newest(make_store):
+    """默认排序（按状态筛选）与 VIP 排序直接从 priority 索引分页"""
+    async def run():
+        store = make_store()
+        for index, vip in enumerate((False, True, False, True)):
+            state = _session(f"s{index}", 100 + index)
+            state.user_profile.vip = vip
+            await store.save(state)
+
+        summaries, total = await store.query_summaries(
+            status=SessionStatus.PENDING_MANUAL, order_by="priority", limit=3
+        )
+        assert (total, _names(summaries)) == (4, ["s3", "s1", "s2"])
+
+        # 取消 VIP 后重新排序
+        state = await store.get("s3")
+        state.user_profile.vip = False
+        await store.save(state)
+        summaries, _ = await store.query_summaries(order_by="priority", limit=2, offset=1)
+        assert _names(summaries) == ["s3", "s2"]
+
+    asyncio.run(run())
+
+
+def test_search_terms_follow_profile_changes(make_store):
+    async def run():
+        store = make_store()
+        state = _session("s1", 100, nickname="alice")
+        state.add_message(Message(role="user", content="电池 bob", timestamp=1.0))
+        await store.save(state)
+        assert await store.search_sessions("alice") == ["s1"]
+        assert await store.search_sessions("电池") == ["s1"]
+        assert await store.search_sessions("") is None
+
+        state.user_profile.nickname = "bob"
+        state.assigned_agent = AgentInfo(id="agent_a", name="carol")
+        await store.save(state)
+        assert await store.search_sessions("alice") == []
+        assert await store.search_sessions("carol") == ["s1"]
+
+        # 旧昵称同时出现在消息中时仍可检索
+        state.user_profile.nickname = "dave"
+        await store.save(state)
+        assert await store.search_sessions("bob") == ["s1"]
+
+    asyncio.run(run())
+
+
+def test_search_prefix_and_symbol_keywords(make_store):
+    async def run():
+        store = make_store()
+        await store.save(_session("session_1731234567_abc", 100, nickname="Alexander"))
+        other = _session("session_1731299999_def", 200)
+        other.add_message(Message(role="user", content="退款申请", timestamp=1.0))
+        await store.save(other)
+
+        assert await store.search_sessions("!!!") == []
+        assert await store.search_sessions("@") == []
+        assert sorted(await store.search_sessions("session_173123")) == ["session_1731234567_abc"]
+        assert sorted(await store.search_sessions("session 1731")) == [
+            "session_1731234567_abc", "session_1731299999_def"
+        ]
+        assert await store.search_sessions("alex") == ["session_1731234567_abc"]
+        assert await store.search_sessions("def 退款") == ["session_1731299999_def"]
+        assert await store.search_sessions("sessionx") == []
+
+        # 会话删除后只属于它的词项移出词典
+        await store.delete("session_1731234567_abc")
+        assert await store.search_sessions("alex") == []
+        lexicon = await _call(store.redis.zrange("session_search:lexicon", 0, -1))
+        assert "alexander" not in lexicon and "session" in lexicon
+
+    asyncio.run(run())
+
+
+def test_delete_and_purge_clean_all_keys(make_store):
+    async def run():
+        store = make_store()
+        for name, agent in (("s1", "agent_a"), ("s2", None)):
+            state = _session(name, 100, nickname=name)
+            state.add_message(Message(role="user", content="hello", timestamp=1.0))
+            if agent:
+                state.status = SessionStatus.MANUAL_LIVE
+                state.assigned_agent = AgentInfo(id=agent, name=agent)
+            await store.save(state)
+
+        assert await store.delete("s1")
+        # s2 的主数据 TTL 到期：查询时发现缺失，清理索引与计数器
+        await _call(store.redis.delete("session:s2"))
+        sessions, _ = await store.query()
+        assert sessions == []
+        sessions, total = await store.query()
+        assert (sessions, total) == ([], 0)
+
+        keys = await _call(store.redis.keys("*"))
+        assert sorted(keys) == ["session_stats"]
+        stats = await store.get_stats()
+        assert stats["total"] == 0
+        assert stats["live_by_agent"] == {}
+
+    asyncio.run(run())
+
+
+def test_scripts_clear_stale_status_when_hash_is_missing():
+    """状态哈希缺失（升级前数据）时按全部状态清理旧成员；仅清理过期会话时不删除仍存在的会话"""
+    client = fakeredis.FakeRedis(decode_responses=True)
+    save = client.register_script(SAVE_SESSION_LUA)
+    delete = client.register_script(DELETE_SESSION_LUA)
+
+    state = _session("s1", 100)
+    keys, args = save_script_params(state, ttl=60)
+    save(keys=keys, args=args)
+    client.hdel(SESSION_STATUS_HASH, "s1")
+
+    state.status = SessionStatus.CLOSED
+    # 快照与 Redis 中的旧值不一致时不写入
+    keys, args = save_script_params(state, ttl=60)
+    assert save(keys=keys, args=args) == SCRIPT_STALE
+    assert client.zscore(session_index_key("updated_at", status=SessionStatus.CLOSED), "s1") is None
+
+    keys, args = save_script_params(state, ttl=60, snapshot=_snapshot(client, "s1"))
+    assert save(keys=keys, args=args) is None
+    assert client.smembers(status_index_key(SessionStatus.PENDING_MANUAL)) == set()
+    assert client.zcard(session_index_key("updated_at", status=SessionStatus.PENDING_MANUAL)) == 0
+    assert client.zcard(session_index_key(
+        "updated_at", status=SessionStatus.PENDING_MANUAL, agent_id=UNASSIGNED_AGENT
+    )) == 0
+    assert client.zscore(session_index_key("updated_at", status=SessionStatus.CLOSED), "s1") == 100
+
+    keys, args = delete_script_params("s1", _snapshot(client, "s1", True), expired_only=True)
+    assert delete(keys=keys, args=args) == 0
+    # 快照中的旧坐席或检索词项与 Redis 不一致时不删除
+    snapshot = _snapshot(client, "s1", True)
+    keys, args = delete_script_params("s1", snapshot._replace(agent_id="agent_x"))
+    assert delete(keys=keys, args=args) == SCRIPT_STALE
+    keys, args = delete_script_params("s1", snapshot._replace(terms=snapshot.terms[1:]))
+    assert delete(keys=keys, args=args) == SCRIPT_STALE
+    assert client.exists("session:s1")
+    keys, args = delete_script_params("s1", _snapshot(client, "s1", True))
+    assert delete(keys=keys, args=args) == 1
+    assert client.keys("session_search:*") == []
+    assert client.zcard(session_index_key("updated_at")) == 0
+    assert client.hget("session_stats", "status:closed") == "0"
+
+
+def test_health_and_maintenance_share_one_implementation(make_store):
+    """同步 / asyncio 存储的健康检查、索引重建和清空走同一套实现"""
+    async def run():
+        store = make_store()
+        for index in range(3):
+            await store.save(_session(f"s{index}", 100 + index))
+
+        # fakeredis 不支持 INFO
+        memory = {"used_memory": 1024 * 1024}
+
+        async def async_info(section):
+            return memory
+
+        store.redis.info = (lambda section: memory) if isinstance(store, RedisSessionStore) else async_info
+        health = await store.check_health()
+        assert (health["status"], health["total_sessions"]) == ("healthy", 3)
+
+        # 删除索引版本后重建：索引与计数器恢复
+        await _call(store.redis.delete("session_idx:version", "session_stats"))
+        assert await store.ensure_indexes() == 3
+        assert (await store.get_stats())["total"] == 3
+
+        assert await store.clear_all() == 3
+        assert await _call(store.redis.keys("*")) == []
+
+    asyncio.run(run())
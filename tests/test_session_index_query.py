@@ -0,0 +1,170 @@
+"""
+会话 ZSET 索引查询单元测试
+"""
+
+import asyncio
+
+from src.redis_session_store import (
+    SESSION_AGENT_HASH,
+    SESSION_STATS_HASH,
+    SESSION_STATUS_HASH,
+    SESSION_VIP_HASH,
+    SessionSnapshot,
+    compute_session_stats,
+    index_rank_window,
+    parse_session_stats,
+    resolve_index_query,
+    save_script_params,
+)
+from src.session_state import (
+    AgentInfo,
+    InMemorySessionStore,
+    SessionState,
+    SessionStatus,
+    UNASSIGNED_AGENT,
+)
+
+
+def _build_session(name: str, created_at: float, agent_id: str = None) -> SessionState:
+    state = SessionState(session_name=name, status=SessionStatus.PENDING_MANUAL)
+    state.created_at = created_at
+    if agent_id:
+        state.assigned_agent = AgentInfo(id=agent_id, name=agent_id)
+    return state
+
+
+def test_index_rank_window_offsets_past_skipped_members():
+    # 分数范围前有 3 个成员，范围内 10 个成员，取第 2 页（每页 4 个）
+    assert index_rank_window(total=10, skipped=3, offset=4, limit=4) == (7, 10)
+    # 最后一页不足 limit
+    assert index_rank_window(total=10, skipped=3, offset=8, limit=4) == (11, 12)
+    # 超出范围 / 不限数量
+    assert index_rank_window(total=10, skipped=3, offset=10, limit=4) is None
+    assert index_rank_window(total=10, skipped=0, offset=2, limit=None) == (2, 9)
+
+
+def test_resolve_index_query_uses_composite_index():
+    key = resolve_index_query(SessionStatus.PENDING_MANUAL, UNASSIGNED_AGENT, "created_at")
+    assert key == "session_idx:created_at:status:pending_manual:agent:__unassigned__"
+
+    assert resolve_index_query(SessionStatus.CLOSED, None, "updated_at") == "session_idx:updated_at:status:closed"
+    assert resolve_index_query(None, "agent_a", "updated_at") == "session_idx:updated_at:agent:agent_a"
+
+
+def test_in_memory_query_filters_by_agent_and_created_range():
+    store = InMemorySessionStore()
+    store._store = {
+        s.session_name: s for s in [
+            _build_session("s1", 100, "agent_a"),
+            _build_session("s2", 200),
+            _build_session("s3", 300, "agent_a"),
+            _build_session("s4", 400, "agent_a"),
+        ]
+    }
+
+    sessions, total = asyncio.run(store.query(
+        agent_id="agent_a",
+        order_by="created_at",
+        min_score=150,
+        descending=False,
+        limit=1
+    ))
+
+    assert total == 2
+    assert [s.session_name for s in sessions] == ["s3"]
+
+    unassigned, total = asyncio.run(store.query(agent_id=UNASSIGNED_AGENT))
+    assert total == 1
+    assert unassigned[0].session_name == "s2"
+
+
+def test_in_memory_priority_order_puts_vip_first():
+    store = InMemorySessionStore()
+    sessions = [_build_session(f"s{index}", 100) for index in range(3)]
+    for index, state in enumerate(sessions):
+        state.updated_at = 100 + index
+    sessions[0].user_profile.vip = True
+    store._store = {s.session_name: s for s in sessions}
+
+    ordered, total = asyncio.run(store.query(order_by="priority"))
+    assert total == 3
+    assert [s.session_name for s in ordered] == ["s0", "s2", "s1"]
+
+
+def test_save_script_params_carry_status_agent_and_scores():
+    state = _build_session("s1", 100, "agent_a")
+    state.updated_at = 150.5
+    # 保存前为 agent_b 服务中，profile 词项为 bob
+    snapshot = SessionSnapshot("manual_live", "agent_b", ["bob"])
+
+    keys, args = save_script_params(state, ttl=60, snapshot=snapshot)
+
+    assert keys[:11] == [
+        "session:s1", SESSION_STATUS_HASH, SESSION_AGENT_HASH, SESSION_VIP_HASH, SESSION_STATS_HASH,
+        "session_history:s1", "session_summary:s1", "session_search:doc:s1", "session_search:profile:s1",
+        "session_search:lexicon", "status:pending_manual"
+    ]
+    assert keys[11:15] == [
+        "session_idx:updated_at",
+        "session_idx:updated_at:status:pending_manual",
+        "session_idx:updated_at:agent:agent_a",
+        "session_idx:updated_at:status:pending_manual:agent:agent_a",
+    ]
+    assert args[0] == "s1"
+    assert args[1] == "60"
+    assert args[3:8] == ["pending_manual", "agent_a", "0", "150.5", "100.0"]
+    assert args[8:12] == ["150.5", "50", "manual_live", "agent_b"]
+
+    # 旧 ZSET 索引：每个字段为旧状态、旧坐席及组合索引；旧状态集合只有 manual_live
+    index_count, set_count = int(args[12]), int(args[13])
+    assert (index_count, set_count) == (15, 1)
+    stale = keys[23:23 + index_count]
+    assert stale[:4] == [
+        "session_idx:updated_at:status:manual_live",
+        "session_idx:updated_at:agent:agent_b",
+        "session_idx:updated_at:status:pending_manual:agent:agent_b",
+        "session_idx:updated_at:status:manual_live:agent:agent_a",
+    ]
+    assert "session_idx:updated_at:status:manual_live:agent:agent_b" in stale
+    assert keys[23 + index_count] == "status:manual_live"
+
+    # 变长段：新消息（0 条）、摘要 field/value、新消息词项、profile 词项、快照 profile 词项
+    cursor = 14
+    for _ in range(3):
+        cursor += int(args[cursor]) + 1
+    # profile 词项：会话 ID、默认昵称（访客）、坐席名称
+    assert args[cursor:cursor + 7] == ["6", "a", "agent", "s1", "客", "访", "访客"]
+    cursor += int(args[cursor]) + 1
+    assert args[cursor:] == ["1", "bob"]
+    # 词项倒排集合与 ARGV 中的词项一一对应
+    assert keys[24 + index_count:] == [
+        f"session_search:term:{term}" for term in ["a", "agent", "s1", "客", "访", "访客", "bob"]
+    ]
+
+
+def test_session_stats_counters_round_trip():
+    vip_pending = _build_session("s1", 100)
+    vip_pending.user_profile.vip = True
+    live = _build_session("s2", 200, "agent_a")
+    live.status = SessionStatus.MANUAL_LIVE
+
+    counters = compute_session_stats([vip_pending, live])
+    # Redis 哈希读回的值均为字符串
+    stats = parse_session_stats({field: str(value) for field, value in counters.items()})
+
+    assert stats["total"] == 2
+    assert stats["by_status"]["pending_manual"] == 1
+    assert stats["by_status"]["manual_live"] == 1
+    assert stats["live_by_agent"] == {"agent_a": 1}
+    assert stats["vip_pending"] == 1
+
+
+def test_session_stats_counts_pending_by_agent():
+    assigned = _build_session("s1", 100, "agent_a")
+    unassigned = _build_session("s2", 200)
+
+    counters = compute_session_stats([assigned, unassigned])
+    stats = parse_session_stats({field: str(value) for field, value in counters.items()})
+
+    assert stats["pending_by_agent"] == {"agent_a": 1}
+    assert stats["live_by_agent"] == {}
@@ -0,0 +1,72 @@
+"""
+会话全文检索分词与内存检索单元测试
+"""
+
+import asyncio
+
+from src.session_search import index_terms, match_terms, query_terms
+from src.session_state import AgentInfo, InMemorySessionStore, Message, SessionState
+
+
+def test_index_terms_mix_cjk_bigrams_and_words():
+    terms = index_terms("申请退款 Fiido D11", "session_1731_f3a9")
+
+    assert {"申请", "请退", "退款", "退", "fiido", "d11", "session", "1731", "f3a9"} <= terms
+
+
+def test_query_terms_use_bigrams_for_cjk():
+    assert query_terms("退款 D11") == ["退款", "d11"]
+    assert query_terms("质量问题") == ["质量", "量问", "问题"]
+    assert query_terms("退") == ["退"]
+    assert query_terms(" ,. ") == []
+
+
+def test_query_terms_are_subset_of_index_terms():
+    text = "电动自行车电池充不进电，Battery won't charge"
+
+    assert set(query_terms("电池充不进")) <= index_terms(text)
+    assert set(query_terms("battery")) <= index_terms(text)
+
+
+def test_in_memory_search_sessions():
+    store = InMemorySessionStore()
+
+    async def scenario():
+        first = SessionState(session_name="s1")
+        first.add_message(Message(role="user", content="我要退款"))
+        second = SessionState(session_name="s2", assigned_agent=AgentInfo(id="a1", name="Alice"))
+        await store.save(first)
+        await store.save(second)
+        return (
+            await store.search_sessions("退款"),
+            await store.search_sessions("alice"),
+            await store.search_sessions("  "),
+        )
+
+    refund, agent, empty = asyncio.run(scenario())
+
+    assert refund == ["s1"]
+    assert agent == ["s2"]
+    assert empty is None
+
+
+def test_match_terms_prefix_matches_last_term():
+    document = index_terms("session_1731234567_abc", "申请退款")
+
+    assert match_terms(document, query_terms("session_17312"))
+    assert match_terms(document, query_terms("退款 abc"))
+    assert not match_terms(document, query_terms("sess 1731234567"))
+    assert not match_terms(document, [])
+
+
+def test_in_memory_search_prefix_and_symbols():
+    store = InMemorySessionStore()
+
+    async def scenario():
+        await store.save(SessionState(session_name="session_1731234567_abc"))
+        return await store.search_sessions("session_17312"), await store.search_sessions("!!!")
+
+    prefix, symbols = asyncio.run(scenario())
+
+    assert prefix == ["session_1731234567_abc"]
+    assert symbols == []
@@ -0,0 +1,72 @@
+"""
+会话批量读取（get_many）与历史列表单元测试
+"""
+
+import asyncio
+
+from src.payload_codec import get_codec
+from src.redis_session_store import (
+    chunked,
+    decode_session,
+    decode_sessions,
+    encode_session,
+    restore_history,
+    save_script_params,
+)
+from src.session_state import InMemorySessionStore, Message, SessionState
+
+
+def test_in_memory_get_many_keeps_order_and_skips_missing():
+    store = InMemorySessionStore()
+
+    async def scenario():
+        for name in ("s1", "s2", "s3"):
+            await store.save(SessionState(session_name=name))
+        return await store.get_many(["s3", "missing", "s1"])
+
+    sessions = asyncio.run(scenario())
+
+    assert [s.session_name for s in sessions] == ["s3", "s1"]
+
+
+def test_chunked_splits_into_fixed_batches():
+    batches = list(chunked((f"s{i}" for i in range(5)), size=2))
+
+    assert batches == [["s0", "s1"], ["s2", "s3"], ["s4"]]
+
+
+def test_decode_sessions_skips_expired_and_corrupt_payloads():
+    payload = SessionState(session_name="s1").model_dump_json()
+
+    sessions = decode_sessions(["s1", "s2", "s3"], [payload, None, "{broken"])
+
+    assert [s.session_name for s in sessions] == ["s1"]
+
+
+def test_save_appends_only_unsaved_messages_and_blob_keeps_last():
+    state = SessionState(session_name="s1")
+    for index in range(3):
+        state.add_message(Message(role="user", content=f"m{index}"))
+    state.mark_messages_saved()
+    state.add_message(Message(role="agent", content="reply"))
+
+    _, args = save_script_params(state, ttl=60)
+    blob = decode_session(encode_session(state, get_codec("json")))
+
+    assert args[14] == "1"
+    assert Message.model_validate_json(args[15]).content == "reply"
+    assert [m.content for m in blob.history] == ["reply"]
+
+
+def test_restore_history_migrates_legacy_sessions():
+    legacy = SessionState(session_name="s1")
+    legacy.history = [Message(role="user", content=f"m{index}") for index in range(3)]
+    payload = legacy.model_dump_json()
+
+    # 历史列表不存在：旧格式主数据中的完整历史在下次保存时写入列表
+    migrated = restore_history(decode_session(payload), [])
+    assert [m.content for m in migrated.unsaved_messages] == ["m0", "m1", "m2"]
+
+    listed = restore_history(decode_session(payload), [m.model_dump_json() for m in legacy.history[1:]])
+    assert [m.content for m in listed.history] == ["m1", "m2"]
+    assert listed.unsaved_messages == []
@@ -0,0 +1,71 @@
+"""
+会话摘要投影（SessionSummary）单元测试
+"""
+
+import asyncio
+
+from src.redis_session_store import decode_summary, encode_summary
+from src.session_state import (
+    AgentInfo,
+    EscalationInfo,
+    EscalationReason,
+    InMemorySessionStore,
+    Message,
+    PriorityLevel,
+    SessionState,
+    SessionStatus,
+    SessionSummary,
+)
+
+
+def _build_pending_session(name: str, vip: bool = False) -> SessionState:
+    state = SessionState(session_name=name, status=SessionStatus.PENDING_MANUAL)
+    state.escalation = EscalationInfo(reason=EscalationReason.KEYWORD, details="用户要求人工")
+    state.user_profile.vip = vip
+    state.add_message(Message(role="user", content="我要投诉，订单一直没有发货" * 5))
+    return state
+
+
+def test_summary_hash_round_trip_matches_state_summary():
+    state = _build_pending_session("s1")
+    state.assigned_agent = AgentInfo(id="agent_a", name="Alice")
+    state.tickets = ["TK001"]
+
+    fields = encode_summary(state)
+    summary = decode_summary(dict(zip(fields[::2], fields[1::2])))
+
+    expected = state.to_summary()
+    actual = summary.to_summary()
+    # waiting_seconds 按调用时刻计算
+    expected["escalation"].pop("waiting_seconds")
+    actual["escalation"].pop("waiting_seconds")
+    assert actual == expected
+    assert actual["last_message_preview"]["content"].endswith("...")
+
+
+def test_refresh_priority_uses_recorded_keywords_and_vip():
+    summary = SessionSummary.from_state(_build_pending_session("s1"))
+    summary.refresh_priority()
+
+    assert summary.urgent_keywords == ["投诉"]
+    assert summary.priority_level == PriorityLevel.HIGH.value
+
+    vip_summary = SessionSummary.from_state(_build_pending_session("s2", vip=True))
+    vip_summary.refresh_priority()
+
+    assert vip_summary.priority_level == PriorityLevel.URGENT.value
+
+
+def test_in_memory_query_summaries():
+    store = InMemorySessionStore()
+
+    async def scenario():
+        await store.save(_build_pending_session("s1"))
+        await store.save(SessionState(session_name="s2"))
+        return await store.query_summaries(status=SessionStatus.PENDING_MANUAL)
+
+    summaries, total = asyncio.run(scenario())
+
+    assert total == 1
+    assert summaries[0].session_name == "s1"
+    assert summaries[0].nickname == "访客"
@@ -0,0 +1,175 @@
+"""
+SSE 事件总线单元测试
+"""
+
+import asyncio
+
+import pytest
+
+from src import sse_event_bus
+from src.sse_event_bus import LocalEventBus, RedisEventBus, create_event_bus, decode_event, encode_event
+
+
+@pytest.fixture
+def redis_buses(monkeypatch):
+    """返回创建 RedisEventBus 的工厂，多个总线（模拟多个 worker）共用一个 fakeredis 服务"""
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        sse_event_bus.aioredis, "from_url",
+        lambda url, **kwargs: fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    )
+
+    async def start(count: int):
+        buses = [RedisEventBus("redis://fake") for _ in range(count)]
+        for bus in buses:
+            await bus.start()
+        return buses
+
+    return start
+
+
+async def _next(queue: asyncio.Queue):
+    return await asyncio.wait_for(queue.get(), timeout=1)
+
+
+async def _settle():
+    """等待各总线的监听任务处理完已发布的事件"""
+    await asyncio.sleep(0.1)
+
+
+def test_publish_only_reaches_existing_subscribers():
+    async def scenario():
+        bus = LocalEventBus()
+        queue = bus.subscribe("session_1")
+
+        await bus.publish("session_1", {"type": "manual_message"})
+        await bus.publish("session_2", {"type": "manual_message"})
+
+        assert queue.get_nowait() == {"type": "manual_message"}
+        assert not bus.has_subscriber("session_2")
+
+    asyncio.run(scenario())
+
+
+def test_create_buffers_until_target_connects():
+    async def scenario():
+        bus = LocalEventBus()
+
+        await bus.publish("agent_alice", {"type": "mention"}, create=True)
+
+        assert bus.subscribe("agent_alice").get_nowait() == {"type": "mention"}
+
+    asyncio.run(scenario())
+
+
+def test_disconnect_releases_queue_after_last_connection():
+    async def scenario():
+        bus = LocalEventBus()
+        queue = await bus.connect("agent_alice")
+        assert await bus.connect("agent_alice") is queue
+
+        bus.disconnect("agent_alice")
+        assert bus.has_subscriber("agent_alice")
+        bus.disconnect("agent_alice")
+        assert not bus.has_subscriber("agent_alice")
+
+        await bus.publish("agent_alice", {"type": "mention"})
+        assert not bus.has_subscriber("agent_alice")
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_drops_oldest_event():
+    async def scenario():
+        bus = LocalEventBus(queue_maxsize=2)
+        queue = bus.subscribe("session_1")
+
+        for index in range(3):
+            await bus.publish("session_1", {"index": index})
+
+        assert [queue.get_nowait()["index"] for _ in range(queue.qsize())] == [1, 2]
+
+    asyncio.run(scenario())
+
+
+def test_event_envelope_round_trip():
+    event = decode_event(encode_event("session_1", {"content": "您好"}, create=True))
+
+    assert event == {"target": "session_1", "payload": {"content": "您好"}, "create": True}
+    assert decode_event("not json") is None
+    assert decode_event('{"target": "session_1"}') is None
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_event_bus("kafka")
+    with pytest.raises(ValueError):
+        create_event_bus("redis", redis_url=None)
+
+
+def test_redis_publish_reaches_subscriber_on_other_worker(redis_buses):
+    async def scenario():
+        publisher, remote = await redis_buses(2)
+        queue = remote.subscribe("session_1")
+
+        await publisher.publish("session_1", {"type": "manual_message"})
+        await publisher.publish("session_2", {"type": "manual_message"})
+        await publisher.publish("session_1", {"type": "status_change"})
+
+        assert await _next(queue) == {"type": "manual_message"}
+        assert await _next(queue) == {"type": "status_change"}
+        # 没有订阅者且 create=False 的事件在任何 worker 上都不创建队列
+        assert not remote.has_subscriber("session_2")
+        assert not publisher.has_subscriber("session_1")
+
+        for bus in (publisher, remote):
+            await bus.close()
+
+    asyncio.run(scenario())
+
+
+def test_redis_create_is_buffered_once_until_connect(redis_buses):
+    async def scenario():
+        buses = await redis_buses(3)
+
+        await buses[0].publish("agent_alice", {"type": "mention"}, create=True)
+        await _settle()
+
+        # 目标未连接：事件只缓存在 Redis 中，各 worker 都不创建本地队列
+        assert not any(bus.has_subscriber("agent_alice") for bus in buses)
+
+        queue = await buses[2].connect("agent_alice")
+        assert queue.get_nowait() == {"type": "mention"}
+        # 缓存已被取走，其他 worker 上的连接不会重复补发
+        assert (await buses[1].connect("agent_alice")).empty()
+
+        for bus in buses:
+            await bus.close()
+
+    asyncio.run(scenario())
+
+
+def test_redis_reconnect_to_other_worker_does_not_replay(redis_buses):
+    async def scenario():
+        first, second, publisher = await redis_buses(3)
+        queue = await first.connect("agent_alice")
+
+        await publisher.publish("agent_alice", {"type": "mention"}, create=True)
+        assert await _next(queue) == {"type": "mention"}
+        await _settle()
+        assert not second.has_subscriber("agent_alice")
+
+        # SSE 断开后释放本地队列；重连到另一个 worker 时没有残留事件
+        first.disconnect("agent_alice")
+        assert not first.has_subscriber("agent_alice")
+        assert (await second.connect("agent_alice")).empty()
+
+        # 断开期间发布的 create=True 事件由新连接所在 worker 投递
+        await publisher.publish("agent_alice", {"type": "assist_request"}, create=True)
+        assert await _next(second.queues["agent_alice"]) == {"type": "assist_request"}
+
+        for bus in (first, second, publisher):
+            await bus.close()
+
+    asyncio.run(scenario())
@@ -11,7 +11,7 @@ import pytest
 
 from src.agent_auth import Agent, AgentRole, AgentStatus, AgentSkill, AgentSkillLevel
 from src.session_state import SessionState, InMemorySessionStore, AgentInfo, SessionStatus
-from src.ticket_assignment import SmartAssignmentEngine
+from src.ticket_assignment import SkillTagIndex, SmartAssignmentEngine
 
 
 class FakeAgentManager:
@@ -75,3 +75,68 @@ def test_assign_balances_existing_load():
     assigned = asyncio.run(engine.assign_session(new_session))
     assert assigned is not None
     assert assigned.agent.id == "agent_free"
+
+
+def test_assign_counts_pending_sessions_from_stats():
+    """负载读取会话存储的按坐席计数器，已分配待接入的会话同样计入负载"""
+    class CountersOnlyStore(InMemorySessionStore):
+        async def list_by_status(self, *args, **kwargs):
+            raise AssertionError("分配时不应逐条加载会话")
+
+    store = CountersOnlyStore()
+    agents = [_make_agent("agent_a"), _make_agent("agent_b")]
+    engine = SmartAssignmentEngine(agent_manager=FakeAgentManager(agents), session_store=store)
+
+    for name in ("pending_1", "pending_2"):
+        pending = SessionState(session_name=name, status=SessionStatus.PENDING_MANUAL)
+        pending.assigned_agent = AgentInfo(id="agent_a", name="Agent A")
+        asyncio.run(store.save(pending))
+
+    assigned = asyncio.run(engine.assign_session(SessionState(session_name="new_session")))
+    assert assigned.agent.id == "agent_b"
+    assert assigned.pending_sessions == 0
+
+
+def test_skill_index_updates_incrementally():
+    """技能修改后只调整变化的标签；注册表版本号未变化时跳过同步"""
+    index = SkillTagIndex()
+    agent = _make_agent("agent_a", skills=[AgentSkill(category="Battery", tags=["Charger"])])
+    index.sync([agent], version="1")
+    assert index.match({"battery"}) == {"agent_a"}
+    assert index.match({"charger", "motor"}) == {"agent_a"}
+
+    agent.skills = [AgentSkill(category="motor")]
+    index.sync([agent], version="1")
+    assert index.match({"motor"}) == set()
+
+    assert index.update_agent(agent)
+    assert index.match({"motor"}) == {"agent_a"}
+    assert index.match({"battery", "charger"}) == set()
+
+    index.sync([], version="2")
+    assert index.match({"motor"}) == set()
+
+
+def test_assign_uses_skill_index_from_versioned_snapshot():
+    """提供注册表版本号的坐席管理器：版本不变时复用索引，技能更新后通过 refresh_agent 生效"""
+    class VersionedAgentManager(FakeAgentManager):
+        def get_agents_snapshot(self):
+            return "1", self._agents
+
+    agents = [
+        _make_agent("agent_a", skills=[AgentSkill(category="battery")]),
+        _make_agent("agent_b", skills=[AgentSkill(category="logistics")])
+    ]
+    engine = SmartAssignmentEngine(agent_manager=VersionedAgentManager(agents), session_store=InMemorySessionStore())
+    session = SessionState(session_name="session_1")
+    session.user_profile.metadata["category"] = "logistics"
+
+    decision = asyncio.run(engine.assign_session(session, remember_choice=False))
+    assert decision.agent.id == "agent_b"
+    assert decision.matched_tags == ["logistics"]
+
+    agents[0].skills = [AgentSkill(category="logistics")]
+    agents[1].skills = []
+    engine.refresh_agent(agents[0])
+    engine.refresh_agent(agents[1])
+    assert asyncio.run(engine.assign_session(session, remember_choice=False)).agent.id == "agent_a"
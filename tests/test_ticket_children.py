@@ -0,0 +1,154 @@
+"""
+工单子记录独立存储单元测试
+
+工单主体不含评论/历史/附件/指派记录，详情接口按需加载；保存时只追加新增子记录。
+"""
+
+import json
+
+import pytest
+
+from src.ticket import Ticket, TicketCommentType, TicketPriority, TicketStatus, TicketType
+from src.ticket_index import TICKET_INDEX_VERSION_KEY
+from src.ticket_store import TicketStore
+
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request):
+    if request.param == "memory":
+        return TicketStore()
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return TicketStore(fakeredis.FakeRedis())
+
+
+def _ticket(ticket_id: str) -> Ticket:
+    return Ticket(
+        ticket_id=ticket_id,
+        title=f"Ticket {ticket_id}",
+        description="desc",
+        created_by="tester",
+        ticket_type=TicketType.AFTER_SALE,
+        priority=TicketPriority.MEDIUM
+    )
+
+
+def _comment(store: TicketStore, ticket_id: str, content: str):
+    return store.add_comment(
+        ticket_id,
+        content=content,
+        author_id="agent_1",
+        author_name="Agent",
+        comment_type=TicketCommentType.INTERNAL
+    )
+
+
+def test_header_excludes_children(store):
+    """列表视图只读工单主体，详情接口加载全部子记录"""
+    store.create(_ticket("TKT-1"))
+    _comment(store, "TKT-1", "first")
+    store.update_ticket("TKT-1", status=TicketStatus.IN_PROGRESS, assigned_agent_id="agent_1")
+
+    header = store.list()[1][0]
+    assert (header.history, header.comments, header.assignments) == ([], [], [])
+
+    ticket = store.get("TKT-1")
+    assert [record.change_reason for record in ticket.history][0] == "created"
+    assert len(ticket.history) == 2
+    assert [comment.content for comment in ticket.comments] == ["first"]
+    assert ticket.assignments[0].agent_id == "agent_1"
+
+
+def test_writes_read_only_the_header(store, monkeypatch):
+    """写操作只读工单主体；需要详情时保存后再加载子记录"""
+    for ticket_id in ("TKT-1", "TKT-2"):
+        store.create(_ticket(ticket_id))
+    _comment(store, "TKT-1", "first")
+    store.update_ticket("TKT-2", status=TicketStatus.CLOSED)
+    monkeypatch.setattr(store, "_load_with_children", lambda *args, **kwargs: pytest.fail("读取了全部子记录"))
+
+    ticket = store.update_ticket("TKT-1", status=TicketStatus.CLOSED)
+    # 只含本次新增的记录
+    assert [h.to_status for h in ticket.history] == [TicketStatus.CLOSED]
+    assert ticket.comments == []
+    assert store.search("TKT-1")[1][0].comments == []
+    ticket = store.reopen_ticket("TKT-2", agent_id="agent_1", reason="customer", with_children=True)
+    assert [h.to_status for h in ticket.history] == [TicketStatus.PENDING, TicketStatus.CLOSED, TicketStatus.IN_PROGRESS]
+
+    assert store.auto_archive_closed(older_than_seconds=-60)["ticket_ids"] == ["TKT-1"]
+    ticket = store.load_children(store.get("TKT-1", with_children=False))
+    assert [h.to_status for h in ticket.history] == [TicketStatus.PENDING, TicketStatus.CLOSED, TicketStatus.ARCHIVED]
+    assert [c.content for c in ticket.comments] == ["first"]
+
+
+def test_comments_append_and_delete(store):
+    store.create(_ticket("TKT-1"))
+    first = _comment(store, "TKT-1", "first")
+    _comment(store, "TKT-1", "second")
+
+    assert [c.content for c in store.list_comments("TKT-1")] == ["first", "second"]
+    assert store.delete_comment("TKT-1", first.comment_id)
+    assert not store.delete_comment("TKT-1", first.comment_id)
+    assert [c.content for c in store.list_comments("TKT-1")] == ["second"]
+    assert store.list_comments("TKT-X") is None
+
+
+def test_attachments_are_loaded_on_demand(store):
+    store.create(_ticket("TKT-1"))
+    attachment = store.add_attachment(
+        "TKT-1",
+        filename="photo.jpg",
+        stored_path="/tmp/photo.jpg",
+        size=10,
+        content_type="image/jpeg",
+        comment_type=TicketCommentType.INTERNAL,
+        uploader_id="agent_1",
+        uploader_name="Agent"
+    )
+
+    assert [a.attachment_id for a in store.list_attachments("TKT-1")] == [attachment.attachment_id]
+    assert store.get_attachment("TKT-1", attachment.attachment_id).filename == "photo.jpg"
+    assert store.get_attachment("TKT-1", "attach_missing") is None
+
+
+def test_legacy_ticket_migrated_on_rebuild():
+    """旧格式（子记录内嵌在工单 JSON 中）的工单在重建索引时迁移到独立存储"""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    store = TicketStore(fakeredis.FakeRedis())
+
+    legacy = _ticket("TKT-OLD")
+    legacy.add_status_history(
+        from_status=None, to_status=TicketStatus.PENDING, changed_by="tester", change_reason="created"
+    )
+    legacy.add_comment(content="legacy", author_id="agent_1", author_name=None, comment_type=TicketCommentType.INTERNAL)
+    store.redis.set("ticket:TKT-OLD", json.dumps(legacy.to_dict()))
+    store.redis.sadd("ticket:index", "TKT-OLD")
+    store.redis.delete(TICKET_INDEX_VERSION_KEY)
+
+    assert store.ensure_indexes() == 1
+    header = json.loads(store.redis.get("ticket:TKT-OLD"))
+    assert "comments" not in header and "history" not in header
+
+    ticket = store.get("TKT-OLD")
+    assert [c.content for c in ticket.comments] == ["legacy"]
+    assert [h.change_reason for h in ticket.history] == ["created"]
+
+
+def test_legacy_ticket_migrated_on_update(store):
+    """旧格式工单被写操作保存时迁移子记录，返回的详情不重复"""
+    legacy = _ticket("TKT-OLD")
+    legacy.add_comment(content="legacy", author_id="agent_1", author_name=None, comment_type=TicketCommentType.INTERNAL)
+    legacy.mark_children_saved()
+    store._save_ticket(legacy)
+    # 模拟旧格式：工单主体内嵌子记录
+    data = store.codec.dumps(legacy.to_dict())
+    if store.redis:
+        store.redis.set("ticket:TKT-OLD", data)
+    else:
+        store._memory_store["TKT-OLD"] = data
+
+    assert [c.content for c in store.get("TKT-OLD").comments] == ["legacy"]
+    ticket = store.update_ticket("TKT-OLD", priority=TicketPriority.HIGH, with_children=True)
+    assert [c.content for c in ticket.comments] == ["legacy"]
+    assert [c.content for c in store.list_comments("TKT-OLD")] == ["legacy"]
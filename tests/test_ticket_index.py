@@ -0,0 +1,279 @@
+"""
+工单二级索引单元测试
+
+内存模式与 Redis 模式（需要 fakeredis + lupa 执行 Lua，未安装时跳过）使用同一查询计划，结果应一致。
+"""
+
+import pytest
+
+from src.ticket import Ticket, TicketCustomerInfo, TicketPriority, TicketStatus, TicketType
+from src.ticket_index import (
+    UNASSIGNED,
+    TicketQuery,
+    parse_index_snapshots,
+    queue_index_snapshot,
+    save_script_params,
+    ticket_set_dimensions,
+    ticket_sort_scores,
+    ticket_term_weights,
+)
+from src.ticket_store import TicketStore
+
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request):
+    if request.param == "memory":
+        return TicketStore()
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return TicketStore(fakeredis.FakeRedis())
+
+
+def _ticket(ticket_id: str, **kwargs) -> Ticket:
+    return Ticket(
+        ticket_id=ticket_id,
+        title=kwargs.pop("title", f"Ticket {ticket_id}"),
+        description=kwargs.pop("description", "desc"),
+        created_by="tester",
+        ticket_type=kwargs.pop("ticket_type", TicketType.AFTER_SALE),
+        priority=kwargs.pop("priority", TicketPriority.MEDIUM),
+        **kwargs
+    )
+
+
+def test_dimensions_and_scores():
+    """索引值归一化：未指派、邮箱小写、标签/分类去重；空时间分数为 0"""
+    ticket = _ticket(
+        "TKT-1",
+        customer=TicketCustomerInfo(name="A", email=" Alice@Example.com "),
+        metadata={"tags": ["VIP", "vip", ""], "category": "Battery", "categories": ["battery", "Motor"]}
+    )
+    dimensions = ticket_set_dimensions(ticket)
+    assert dimensions["assignee"] == [UNASSIGNED]
+    assert dimensions["email"] == ["alice@example.com"]
+    assert dimensions["tag"] == ["vip"]
+    assert dimensions["category"] == ["battery", "motor"]
+
+    scores = ticket_sort_scores(ticket)
+    assert scores["resolved_at"] == 0
+    assert scores["priority"] == 2
+
+
+def test_term_weights_use_best_field():
+    """词项分数取所在字段的最高权重；中文按单字 + 二元组分词；订单号大写入集合维度"""
+    ticket = _ticket("TKT-1", title="电池故障", description="电池 battery", metadata={"order_no": "ord-9", "note": "battery"})
+    weights = ticket_term_weights(ticket)
+    assert weights["电池"] == 3.0
+    assert weights["battery"] == 2.0
+    assert ticket_set_dimensions(ticket)["order"] == ["ORD-9"]
+
+
+def test_query_script_params():
+    """排序字段的范围直接作为分页区间，其他字段作为范围条件；非法排序字段报错"""
+    query = TicketQuery(sort_by="created_at")
+    query.where("status", ["pending", "pending", "closed"])
+    query.between("created_at", 10, None)
+    query.between("closed_at", 0, 20, low_exclusive=True)
+    query.between("updated_at")
+
+    keys, args = query.script_params(offset=5, limit=10)
+    assert keys == [
+        "ticket:idx:z:created_at", "ticket:idx:tmp:c",
+        "ticket:idx:status:pending", "ticket:idx:status:closed", "ticket:idx:tmp:g1",
+        "ticket:idx:z:closed_at", "ticket:idx:tmp:r1",
+    ]
+    assert args == ["1", "5", "10", "10.0", "+inf", "1", "2", "0.0", "1", "(0.0", "20.0"]
+    with pytest.raises(ValueError):
+        TicketQuery(sort_by="title")
+
+
+def test_ranked_query_moves_sort_range():
+    """带相关度的查询：排序字段范围改为普通范围条件，词项组带放大后的权重"""
+    query = TicketQuery().match_terms(["退款"], ranked=True).between("updated_at", 5, None)
+    keys, args = query.script_params()
+    assert keys == [
+        "ticket:idx:z:updated_at", "ticket:idx:tmp:c", "ticket:idx:term:退款",
+        "ticket:idx:z:updated_at", "ticket:idx:tmp:r1",
+    ]
+    assert args == ["1", "0", "50", "-inf", "+inf", "1", "1", "10000000000.0", "1", "5.0", "+inf"]
+
+
+def test_filter_uses_index_dimensions(store):
+    store.create(_ticket("TKT-A", assigned_agent_id="agent_1", metadata={"tags": ["VIP"]}))
+    store.create(_ticket("TKT-B", priority=TicketPriority.URGENT, metadata={"category": "Battery"}))
+    store.create(_ticket("TKT-C", assigned_agent_id="agent_2", ticket_type=TicketType.PRE_SALE))
+
+    total, tickets = store.filter_tickets(assigned="unassigned")
+    assert (total, [t.ticket_id for t in tickets]) == (1, ["TKT-B"])
+
+    total, tickets = store.filter_tickets(assigned_agent_ids=["agent_1", "agent_2"], sort_by="created_at", sort_desc=False)
+    assert [t.ticket_id for t in tickets] == ["TKT-A", "TKT-C"]
+
+    assert store.filter_tickets(tags=["vip"])[1][0].ticket_id == "TKT-A"
+    assert store.filter_tickets(categories=["BATTERY"])[1][0].ticket_id == "TKT-B"
+    assert store.filter_tickets(ticket_types=[TicketType.PRE_SALE])[0] == 1
+    assert store.filter_tickets(assigned="mine")[0] == 0
+    assert store.filter_tickets(sort_by="priority")[1][0].ticket_id == "TKT-B"
+
+
+def test_index_follows_updates(store):
+    """状态、指派变化后旧索引值被移除"""
+    store.create(_ticket("TKT-A"))
+    store.update_ticket("TKT-A", status=TicketStatus.IN_PROGRESS, assigned_agent_id="agent_1")
+
+    assert store.list(status=TicketStatus.PENDING)[0] == 0
+    assert store.list(status=TicketStatus.IN_PROGRESS, assigned_agent_id="agent_1")[0] == 1
+    assert store.filter_tickets(assigned="unassigned")[0] == 0
+
+
+def test_filter_paginates_and_counts(store):
+    for index in range(5):
+        store.create(_ticket(f"TKT-{index}", title=f"battery {index}" if index % 2 else "motor"))
+
+    total, tickets = store.filter_tickets(limit=2, offset=1, sort_by="created_at", sort_desc=False)
+    assert total == 5
+    assert [t.ticket_id for t in tickets] == ["TKT-1", "TKT-2"]
+
+    total, tickets = store.filter_tickets(keyword="battery", limit=1)
+    assert total == 2
+    assert len(tickets) == 1
+
+
+def test_archive_queries(store):
+    store.create(_ticket("TKT-OLD", customer=TicketCustomerInfo(name="A", email="a@example.com")))
+    store.create(_ticket("TKT-NEW"))
+    store.update_ticket("TKT-OLD", status=TicketStatus.CLOSED)
+    store.update_ticket("TKT-NEW", status=TicketStatus.CLOSED)
+    old = store.get("TKT-OLD")
+    old.closed_at -= 40 * 86400
+    store._save_ticket(old)
+
+    result = store.auto_archive_closed(older_than_seconds=30 * 86400)
+    assert result["ticket_ids"] == ["TKT-OLD"]
+    assert store.list_archived(email="A@example.com")[0] == 1
+    assert store.list_archived(email="b@example.com")[0] == 0
+    assert store.list(status=TicketStatus.CLOSED)[1][0].ticket_id == "TKT-NEW"
+
+
+def test_range_on_other_fields(store):
+    """非排序字段的范围条件：有条件组与无条件组两种路径，开区间边界与排序字段范围一起生效"""
+    for index in range(4):
+        ticket = _ticket(f"TKT-{index}", assigned_agent_id="agent_1" if index % 2 else None)
+        ticket.created_at = 100.0 + index
+        ticket.updated_at = 200.0 - index
+        store._save_ticket(ticket)
+
+    def ids(query):
+        return store._query_ids(query, limit=-1)[1]
+
+    query = TicketQuery(sort_by="created_at", sort_desc=False).between("updated_at", 198, 200)
+    assert ids(query) == ["TKT-0", "TKT-1", "TKT-2"]
+    query = TicketQuery(sort_by="created_at", sort_desc=False).between("updated_at", 198, 200, low_exclusive=True)
+    assert ids(query) == ["TKT-0", "TKT-1"]
+    query = TicketQuery(sort_by="created_at").where("assignee", ["agent_1"]).between("updated_at", None, 199)
+    assert ids(query) == ["TKT-3", "TKT-1"]
+    query = (
+        TicketQuery(sort_by="created_at")
+        .between("updated_at", 197, None)
+        .between("closed_at", None, 0)
+        .between("created_at", 101, None)
+    )
+    assert ids(query) == ["TKT-3", "TKT-2", "TKT-1"]
+
+
+def test_search_exact_matches(store):
+    """工单号、订单号、Shopify 订单 ID 精确匹配；订单号修改后旧值不再命中"""
+    store.create(_ticket("TKT-A", metadata={"order_number": "ord-1001"}))
+    store.create(_ticket("TKT-B", metadata={"shopify_order_id": 5551234}))
+
+    assert store.search("tkt-a")[1][0].ticket_id == "TKT-A"
+    assert store.search("ORD-1001")[1][0].ticket_id == "TKT-A"
+    assert store.search("5551234")[1][0].ticket_id == "TKT-B"
+
+    store.update_ticket("TKT-A", metadata_updates={"order_number": "ORD-2002"})
+    assert store.search("ord-1001")[0] == 0
+    assert store.search("ord-2002")[0] == 1
+
+
+def test_search_ranks_and_pages(store):
+    """全文检索：词项 AND，标题命中排在描述命中之前，支持分页"""
+    store.create(_ticket("TKT-1", title="电池无法充电", description="battery"))
+    store.create(_ticket("TKT-2", title="退款申请", description="电池鼓包需要退款",
+                         customer=TicketCustomerInfo(name="Alice", email="alice@example.com")))
+    store.create(_ticket("TKT-3", title="Battery swap", description="退款"))
+
+    total, tickets = store.search("电池")
+    assert (total, [t.ticket_id for t in tickets]) == (2, ["TKT-1", "TKT-2"])
+    assert [t.ticket_id for t in store.search("退款")[1]] == ["TKT-2", "TKT-3"]
+    assert store.search("电池 退款")[0] == 1
+    assert store.search("alice@example.com")[1][0].ticket_id == "TKT-2"
+
+    total, tickets = store.search("battery", limit=1, offset=1)
+    assert (total, [t.ticket_id for t in tickets]) == (2, ["TKT-1"])
+    assert store.search("!!!") == (0, [])
+
+    assert store.filter_tickets(keyword="退款", sort_by="created_at", sort_desc=False)[1][0].ticket_id == "TKT-2"
+
+
+def test_last_term_matches_as_prefix(store):
+    """边输入边搜索：最后一个词项按前缀匹配，前面的词项仍需完整匹配；无可检索词项的关键词不返回结果"""
+    store.create(_ticket("TKT-1", title="Refund request", description="battery"))
+    store.create(_ticket("TKT-2", title="Battery", description="refund pending"))
+    store.create(_ticket("TKT-3", title="Motor"))
+
+    assert [t.ticket_id for t in store.search("refu")[1]] == ["TKT-1", "TKT-2"]
+    assert store.search("refund batt")[0] == 2
+    assert store.search("refu batt")[0] == 0
+    assert store.filter_tickets(keyword="mot")[1][0].ticket_id == "TKT-3"
+    assert store.filter_tickets(keyword="!!") == (0, [])
+    assert store.filter_tickets(keyword="  ")[0] == 3
+
+
+def test_lexicon_drops_unused_terms():
+    """词项不再被任何工单使用时从词项词典移除"""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    store = TicketStore(fakeredis.FakeRedis())
+    store.create(_ticket("TKT-1", title="refund"))
+    assert store._lexicon_terms("ref") == ["refund"]
+
+    ticket = store.get("TKT-1", with_children=False)
+    ticket.title = "exchange"
+    store._save_ticket(ticket)
+    assert store._lexicon_terms("ref") == []
+    assert store.search("refu")[0] == 0
+
+
+def test_save_script_declares_every_key():
+    """保存脚本访问的 Key 全部通过 KEYS 声明；索引快照在读取后被修改时按冲突处理"""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    client = fakeredis.FakeRedis()
+    store = TicketStore(client)
+    script = store._save_script
+    declared = set()
+
+    def record(keys, args, client=None):
+        declared.update(keys)
+        return script(keys=keys, args=args, client=client)
+
+    store._save_script = record
+    store.create(_ticket("TKT-1", title="refund", metadata={"tags": ["vip"]}))
+    ticket = store.get("TKT-1", with_children=False)
+    ticket.status = TicketStatus.IN_PROGRESS
+    ticket.title = "exchange"
+    ticket.metadata = {}
+    store._save_ticket(ticket)
+
+    assert {"ticket:idx:status:pending", "ticket:idx:tag:vip", "ticket:idx:term:refund"} <= declared
+    written = {key.decode() for key in client.keys("*")} - {"ticket:idx:version"}
+    assert written <= declared
+
+    # 快照读取后索引值被其他写入修改：不写入，返回 0
+    ticket = store.get("TKT-1", with_children=False)
+    pipe = client.pipeline(transaction=False)
+    queue_index_snapshot(pipe, "TKT-1")
+    snapshot, = parse_index_snapshots(pipe.execute())
+    client.hset("ticket:idx:of:status", "TKT-1", "closed")
+    keys, args = save_script_params(ticket, b"{}", ticket.version, "ticket", "ticket:index", snapshot)
+    assert script(keys=keys, args=args) == 0
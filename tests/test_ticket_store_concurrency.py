@@ -0,0 +1,144 @@
+"""
+TicketStore 乐观锁单元测试
+
+保存时校验版本号，版本冲突时重新读取并重新应用修改，重试耗尽后抛出 TicketConflictError。
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.ticket import Ticket, TicketCommentType, TicketPriority, TicketStatus, TicketType
+from src.ticket_store import MAX_SAVE_RETRIES, TicketConflictError, TicketStore
+
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request):
+    if request.param == "memory":
+        return TicketStore()
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return TicketStore(fakeredis.FakeRedis())
+
+
+def _ticket(ticket_id: str) -> Ticket:
+    return Ticket(
+        ticket_id=ticket_id,
+        title=f"Ticket {ticket_id}",
+        description="desc",
+        created_by="tester",
+        ticket_type=TicketType.AFTER_SALE,
+        priority=TicketPriority.MEDIUM
+    )
+
+
+def _interleave_once(store: TicketStore, name: str, write):
+    """第一次读取后模拟另一个 worker 写入同一工单"""
+    original = getattr(store, name)
+    calls = []
+
+    def load(*args, **kwargs):
+        result = original(*args, **kwargs)
+        calls.append(args)
+        if len(calls) == 1:
+            write()
+        return result
+
+    setattr(store, name, load)
+    return calls
+
+
+def test_stale_save_is_rejected(store):
+    store.create(_ticket("TKT-1"))
+    first = store.get("TKT-1")
+    second = store.get("TKT-1")
+
+    first.priority = TicketPriority.HIGH
+    store._save_ticket(first)
+    assert first.version == 2
+
+    second.title = "stale"
+    with pytest.raises(TicketConflictError):
+        store._save_ticket(second)
+    assert second.version == 1
+    assert store.get("TKT-1").title == "Ticket TKT-1"
+
+
+def test_update_retries_on_conflict(store):
+    """读取后被其他请求修改：重新读取并重新应用，两次修改都保留"""
+    store.create(_ticket("TKT-1"))
+    calls = _interleave_once(store, "_load_ticket", lambda: store.update_ticket("TKT-1", metadata_updates={"a": 1}))
+
+    ticket = store.update_ticket("TKT-1", status=TicketStatus.IN_PROGRESS, metadata_updates={"b": 2})
+    assert len(calls) == 3  # 首次读取、另一请求的读取、冲突后重新读取
+    assert ticket.metadata == {"a": 1, "b": 2}
+    assert [h.to_status for h in store.get("TKT-1").history] == [TicketStatus.PENDING, TicketStatus.IN_PROGRESS]
+
+
+def test_update_raises_after_retries(store, monkeypatch):
+    store.create(_ticket("TKT-1"))
+    attempts = []
+
+    def conflict(ticket):
+        attempts.append(ticket.ticket_id)
+        raise TicketConflictError("TICKET_CONFLICT")
+
+    monkeypatch.setattr(store, "_save_ticket", conflict)
+    with pytest.raises(TicketConflictError):
+        store.update_ticket("TKT-1", priority=TicketPriority.URGENT)
+    assert len(attempts) == MAX_SAVE_RETRIES + 1
+
+
+def test_comment_delete_commits_with_the_save(store, monkeypatch):
+    """删除评论随工单保存一起提交：保存因冲突失败时评论保留"""
+    store.create(_ticket("TKT-1"))
+    comment = store.add_comment(
+        "TKT-1", content="hi", author_id="agent_1", author_name=None, comment_type=TicketCommentType.INTERNAL
+    )
+    save = store._save_ticket
+
+    def conflict(ticket):
+        raise TicketConflictError("TICKET_CONFLICT")
+
+    monkeypatch.setattr(store, "_save_ticket", conflict)
+    with pytest.raises(TicketConflictError):
+        store.delete_comment("TKT-1", comment.comment_id)
+    assert [c.comment_id for c in store.list_comments("TKT-1")] == [comment.comment_id]
+
+    monkeypatch.setattr(store, "_save_ticket", save)
+    assert store.delete_comment("TKT-1", comment.comment_id)
+    assert store.list_comments("TKT-1") == []
+
+
+def test_batch_retries_conflicted_tickets(store):
+    for ticket_id in ("TKT-1", "TKT-2"):
+        store.create(_ticket(ticket_id))
+    calls = _interleave_once(store, "load_many", lambda: store.update_ticket("TKT-2", metadata_updates={"a": 1}))
+
+    result = store.batch_update_priority(["TKT-1", "TKT-2"], priority=TicketPriority.URGENT, reason=None, changed_by="admin")
+    assert result["failed"] == []
+    assert calls[1] == (["TKT-2"],)
+    tickets = store.load_many(["TKT-1", "TKT-2"])
+    assert {t.priority for t in tickets} == {TicketPriority.URGENT}
+    assert tickets[1].metadata == {"a": 1}
+
+
+def test_batch_reports_persistent_conflicts(store, monkeypatch):
+    store.create(_ticket("TKT-1"))
+    monkeypatch.setattr(store, "_save_many", lambda tickets: [t.ticket_id for t in tickets])
+
+    result = store.batch_update_priority(["TKT-1"], priority=TicketPriority.URGENT, reason=None, changed_by="admin")
+    assert result["tickets"] == []
+    assert result["failed"][0]["error"].startswith("TICKET_CONFLICT")
+
+
+def test_concurrent_updates_are_not_lost(store):
+    """多个线程同时修改同一工单的不同字段，没有更新丢失"""
+    store.create(_ticket("TKT-1"))
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(
+            lambda index: store.update_ticket("TKT-1", metadata_updates={f"k{index}": index}),
+            range(4)
+        ))
+
+    assert store.get("TKT-1").metadata == {f"k{index}": index for index in range(4)}
@@ -0,0 +1,73 @@
+"""
+TicketStore 批量加载单元测试
+"""
+
+import pytest
+
+from src.ticket import Ticket, TicketPriority, TicketStatus, TicketType
+from src.ticket_store import TicketStore, decode_tickets
+
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request):
+    if request.param == "memory":
+        return TicketStore()
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return TicketStore(fakeredis.FakeRedis())
+
+
+def _ticket(ticket_id: str, status: TicketStatus = TicketStatus.PENDING) -> Ticket:
+    return Ticket(
+        ticket_id=ticket_id,
+        title=f"Ticket {ticket_id}",
+        description="desc",
+        status=status,
+        created_by="tester",
+        ticket_type=TicketType.AFTER_SALE,
+        priority=TicketPriority.MEDIUM
+    )
+
+
+def test_load_many_keeps_order_and_skips_missing(store):
+    for ticket_id in ("TKT-1", "TKT-2", "TKT-3"):
+        store.create(_ticket(ticket_id))
+
+    tickets = store.load_many(["TKT-3", "TKT-MISSING", "TKT-1"])
+    assert [t.ticket_id for t in tickets] == ["TKT-3", "TKT-1"]
+    # 批量加载只读工单主体，子记录通过 get 懒加载
+    assert tickets[0].history == []
+    assert store.get("TKT-3").history[0].change_reason == "created"
+    assert store.load_many([]) == []
+
+
+def test_decode_tickets_skips_corrupt_records():
+    """批内有损坏数据时逐个校验，只跳过损坏项"""
+    good = TicketStore().codec.dumps(_ticket("TKT-1").to_dict())
+    tickets = decode_tickets(
+        ["TKT-1", "TKT-BAD", "TKT-JSON", "TKT-NONE"],
+        [good, b'{"ticket_id": "TKT-BAD"}', b"{not json", None]
+    )
+    assert [t.ticket_id for t in tickets] == ["TKT-1"]
+
+
+def test_batch_operations_share_one_load(store, monkeypatch):
+    """批量操作不再逐个 _load_ticket"""
+    for ticket in (_ticket("TKT-1", status=TicketStatus.RESOLVED), _ticket("TKT-2")):
+        store.create(ticket)
+        ticket.created_at -= 30 * 86400
+        store._save_ticket(ticket)
+    monkeypatch.setattr(store, "_load_ticket", lambda ticket_id: pytest.fail("逐个加载工单"))
+
+    result = store.batch_close(["TKT-1", "TKT-2", "TKT-X"], reason=None, comment=None, changed_by="admin")
+    assert [t.ticket_id for t in result["tickets"]] == ["TKT-1"]
+    assert [f["error"] for f in result["failed"]] == ["INVALID_STATUS: 仅已解决工单可关闭", "TICKET_NOT_FOUND"]
+
+    store.batch_update_priority(["TKT-1", "TKT-2"], priority=TicketPriority.URGENT, reason=None, changed_by="admin")
+    tickets = store.load_many(["TKT-1", "TKT-2"])
+    assert tickets[0].status == TicketStatus.CLOSED
+    assert {t.priority for t in tickets} == {TicketPriority.URGENT}
+    assert store.get_sla_summary()["total_tickets"] == 2
+    # 已关闭工单不参与 SLA 预警
+    alerts = store.detect_sla_alerts()["alerts"]
+    assert {alert["ticket_id"] for alert in alerts} == {"TKT-2"}